@@ -0,0 +1,266 @@
+"""Throwaway PostgreSQL server and local SQLite fixtures for sync benchmarks.
+
+``LocalPostgres`` runs ``initdb`` + ``pg_ctl`` in a temporary directory and
+tears everything down on exit, so sync code can be exercised without touching
+NeonDB. When started as root the server runs as an unprivileged account. ``WireCounter`` is a small TCP proxy placed between asyncpg and the
+server that counts bytes and request/response round-trips.
+"""
+
+import asyncio
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import tempfile
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Optional
+
+from src.core.storage import Storage
+
+try:
+    import pwd
+except ImportError:  # Windows: no uids, nothing to drop
+    pwd = None
+
+
+class PostgresUnavailable(RuntimeError):
+    """Raised when no PostgreSQL binaries are usable on this machine."""
+
+
+def _find_pg_bin() -> Path:
+    """Locate the directory holding initdb/pg_ctl (PG_BIN env, then PATH)."""
+    env_bin = os.getenv("PG_BIN")
+    if env_bin and (Path(env_bin) / "pg_ctl").exists():
+        return Path(env_bin)
+
+    found = shutil.which("pg_ctl")
+    if found:
+        return Path(found).parent
+
+    # Debian/Ubuntu keep server binaries out of PATH
+    for candidate in sorted(Path("/usr/lib/postgresql").glob("*/bin"), reverse=True):
+        if (candidate / "pg_ctl").exists():
+            return candidate
+
+    raise PostgresUnavailable("pg_ctl not found; install PostgreSQL or set PG_BIN")
+
+
+def _server_account():
+    """Unprivileged account for the server when running as root (PG_USER, then postgres, then nobody).
+
+    Returns None when not root; initdb and postgres refuse to run as root.
+    """
+    if pwd is None or os.geteuid() != 0:
+        return None
+    names = [os.getenv("PG_USER"), "postgres", "nobody"]
+    for name in filter(None, names):
+        try:
+            account = pwd.getpwnam(name)
+        except KeyError:
+            continue
+        if account.pw_uid != 0:
+            return account
+    raise PostgresUnavailable("running as root and no unprivileged account found for PostgreSQL; set PG_USER")
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+class LocalPostgres:
+    """A temporary PostgreSQL cluster bound to 127.0.0.1 on a free port.
+
+    Usage::
+
+        with LocalPostgres() as pg:
+            sync = NeonSync(db_url=pg.url, ...)
+    """
+
+    def __init__(self, pg_bin: Optional[Path] = None):
+        self.pg_bin = pg_bin
+        self.port: Optional[int] = None
+        self.tmpdir: Optional[Path] = None
+        # subprocess user/group when started as root
+        self._run_as: dict = {}
+
+    @property
+    def data_dir(self) -> Path:
+        return self.tmpdir / "data"
+
+    @property
+    def url(self) -> str:
+        return f"postgresql://postgres@127.0.0.1:{self.port}/postgres"
+
+    def _run(self, *args: str, check: bool = True):
+        try:
+            return subprocess.run(list(args), check=check, capture_output=True, **self._run_as)
+        except subprocess.CalledProcessError as e:
+            raise PostgresUnavailable(f"{Path(args[0]).name} failed: {e.stderr.decode(errors='replace').strip()}")
+
+    def start(self):
+        self.pg_bin = self.pg_bin or _find_pg_bin()
+        account = _server_account()
+        self.tmpdir = Path(tempfile.mkdtemp(prefix="pb-pg-"))
+        self.port = _free_port()
+        if account is not None:
+            # initdb refuses to run as root: hand the cluster directory to the account
+            os.chown(self.tmpdir, account.pw_uid, account.pw_gid)
+            self._run_as = {"user": account.pw_uid, "group": account.pw_gid, "extra_groups": []}
+
+        try:
+            self._run(str(self.pg_bin / "initdb"), "-D", str(self.data_dir), "-U", "postgres",
+                      "-A", "trust", "-E", "UTF8", "--no-sync")
+            options = f"-p {self.port} -k {self.tmpdir} -c listen_addresses=127.0.0.1 -c fsync=off"
+            self._run(str(self.pg_bin / "pg_ctl"), "-D", str(self.data_dir), "-o", options,
+                      "-l", str(self.tmpdir / "postgres.log"), "-w", "start")
+        except Exception:
+            self.stop()
+            raise
+        return self
+
+    def stop(self):
+        if self.tmpdir is None:
+            return
+        try:
+            self._run(str(self.pg_bin / "pg_ctl"), "-D", str(self.data_dir), "-m", "immediate", "-w", "stop",
+                      check=False)
+        finally:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+            self.tmpdir = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+async def reset_remote(conn):
+    """Drop every remote table so each scenario starts from an empty schema."""
+    await conn.execute("DROP SCHEMA public CASCADE")
+    await conn.execute("CREATE SCHEMA public")
+
+
+class WireCounter:
+    """Counting TCP proxy in front of a PostgreSQL server.
+
+    A round-trip is counted each time the client starts sending after it has
+    received data (or on its first send), which is what a network with real
+    latency would pay for. Counters can be reset between phases.
+    """
+
+    def __init__(self, target_host: str, target_port: int):
+        self.target_host = target_host
+        self.target_port = target_port
+        self.port: Optional[int] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self.reset()
+
+    def reset(self):
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.round_trips = 0
+
+    def snapshot(self) -> dict:
+        return {
+            "round_trips": self.round_trips,
+            "bytes_sent": self.bytes_sent,
+            "bytes_received": self.bytes_received,
+        }
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def stop(self):
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def url_for(self, url: str) -> str:
+        """Rewrite a postgresql:// URL to go through the proxy."""
+        prefix, _, rest = url.partition("@")
+        _, _, path = rest.partition("/")
+        return f"{prefix}@127.0.0.1:{self.port}/{path}"
+
+    async def _handle(self, client_reader, client_writer):
+        server_reader, server_writer = await asyncio.open_connection(self.target_host, self.target_port)
+        # Per-connection: True when the last bytes seen went server -> client
+        state = {"awaiting_request": True}
+
+        async def pump(reader, writer, upstream: bool):
+            try:
+                while True:
+                    data = await reader.read(65536)
+                    if not data:
+                        break
+                    if upstream:
+                        if state["awaiting_request"]:
+                            self.round_trips += 1
+                            state["awaiting_request"] = False
+                        self.bytes_sent += len(data)
+                    else:
+                        state["awaiting_request"] = True
+                        self.bytes_received += len(data)
+                    writer.write(data)
+                    await writer.drain()
+            except (ConnectionError, asyncio.CancelledError):
+                pass
+            finally:
+                writer.close()
+
+        await asyncio.gather(
+            pump(client_reader, server_writer, True),
+            pump(server_reader, client_writer, False),
+        )
+
+
+def seed_device_storage(db_path: Path, device_id: str, days: int, end: Optional[date] = None,
+                        seed: int = 0) -> Storage:
+    """Create a local SQLite store holding ``days`` of synthetic aggregates.
+
+    Only the aggregate tables are filled: that is all ``_sync_data`` reads.
+    Values are deterministic for a given ``seed``.
+    """
+    store = Storage(db_path)
+    store.device_id = device_id
+    store.hostname = f"bench-{device_id[:8]}"
+
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=days - 1)
+
+    daily_rows = []
+    monthly: dict = {}
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        sent = rng.randint(50_000_000, 2_000_000_000)
+        received = rng.randint(200_000_000, 8_000_000_000)
+        daily_rows.append((device_id, day.isoformat(), sent, received, rng.randint(10**5, 10**8),
+                           rng.randint(3_000, 86_400)))
+        totals = monthly.setdefault(day.strftime("%Y-%m"), [0, 0])
+        totals[0] += sent
+        totals[1] += received
+
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT OR REPLACE INTO devices (device_id, os_type, hostname) VALUES (?, ?, ?)",
+                     (device_id, store.os_type, store.hostname))
+        conn.executemany("""
+            INSERT OR REPLACE INTO daily_aggregates
+                (device_id, date, bytes_sent, bytes_received, peak_speed, samples)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, daily_rows)
+        conn.executemany("""
+            INSERT OR REPLACE INTO monthly_aggregates (device_id, month, bytes_sent, bytes_received)
+            VALUES (?, ?, ?, ?)
+        """, [(device_id, month, s, r) for month, (s, r) in monthly.items()])
+        # Bulk rows bypass the write path: fold them into period_stats like a migration would
+        store._rebuild_period_stats(conn.cursor())
+
+    return store
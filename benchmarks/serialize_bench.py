@@ -0,0 +1,116 @@
+"""Per-endpoint JSON serialization benchmark on a year of daily data.
+
+Seeds a throwaway SQLite store with ``--days`` of synthetic aggregates, points
+the API routes at it (sync disabled) and reports, per endpoint:
+
+* body size with and without ``human_readable`` (``?raw=1``)
+* serialization only: ``jsonable_encoder`` + stdlib ``json`` (the previous
+  path) vs orjson, for the full and raw bodies
+* full request through the ASGI stack with an empty payload cache (``cold``)
+  and with the pre-serialized body cached under its ETag (``cached``)
+
+Run from the repository root::
+
+    python -m benchmarks.serialize_bench
+    python -m benchmarks.serialize_bench --days 1825 --repeat 50 --json results.json
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.testclient import TestClient
+from tabulate import tabulate
+
+from src.api import routes
+from src.api.responses import dumps, orjson
+from src.api.server import app
+from src.exports import model
+from .pg_harness import seed_device_storage
+
+
+def _median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return round(statistics.median(timings), 3)
+
+
+def _stdlib(body) -> bytes:
+    # What FastAPI did before: encoder pass, then Starlette's json.dumps
+    return json.dumps(jsonable_encoder(body), ensure_ascii=False, allow_nan=False,
+                      indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def _endpoints(days: int) -> list:
+    today = date.today()
+    start = (today - timedelta(days=days - 1)).isoformat()
+    return [
+        ("today", "/api/today"),
+        ("summary", "/api/summary"),
+        ("month", f"/api/month?month={today:%Y-%m}"),
+        ("range", f"/api/range?from_date={start}&to_date={today.isoformat()}"),
+        ("export_json", "/api/export?format=json"),
+        ("series", f"/api/series?from={start}&points=1000&metric=total"),
+    ]
+
+
+def run(days: int, repeat: int) -> list:
+    results = []
+    with tempfile.TemporaryDirectory(prefix="pb-bench-") as tmp:
+        store = seed_device_storage(Path(tmp) / "bench.db", "bench-device", days)
+        routes.storage = model.storage = store
+        routes.sync.enabled = False
+        client = TestClient(app)
+
+        for name, url in _endpoints(days):
+            raw_url = url + ("&" if "?" in url else "?") + "raw=1"
+            body = client.get(url).json()
+            raw_body = client.get(raw_url).json()
+
+            def cold():
+                routes._payloads._entries.clear()
+                client.get(url)
+
+            client.get(url)
+            results.append({
+                "endpoint": name,
+                "kb": round(len(dumps(body)) / 1024, 1),
+                "raw_kb": round(len(dumps(raw_body)) / 1024, 1),
+                "stdlib_ms": _median_ms(lambda: _stdlib(body), repeat),
+                "orjson_ms": _median_ms(lambda: dumps(body), repeat),
+                "orjson_raw_ms": _median_ms(lambda: dumps(raw_body), repeat),
+                "request_cold_ms": _median_ms(cold, repeat),
+                "request_cached_ms": _median_ms(lambda: client.get(url), repeat),
+            })
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark API JSON serialization")
+    parser.add_argument("--days", type=int, default=365, help="Days of synthetic history")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per measurement (median reported)")
+    parser.add_argument("--json", dest="json_path", help="Also write raw results to this file")
+    args = parser.parse_args(argv)
+
+    if orjson is None:
+        print("orjson is not installed; the 'orjson' columns measure the stdlib fallback", file=sys.stderr)
+
+    results = run(args.days, args.repeat)
+    print(f"\n{args.days} days of daily aggregates, median of {args.repeat} runs "
+          "(request columns include routing and the SQLite query on a miss)\n")
+    print(tabulate(results, headers="keys", tablefmt="github"))
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""Sync throughput benchmark against a throwaway local PostgreSQL.
+
+Seeds synthetic multi-device SQLite stores at several history sizes, then
+drives ``NeonSync`` through a counting proxy and reports, per phase:
+latency, network round-trips, bytes on the wire and remote row counts.
+
+Run from the repository root::
+
+    python -m benchmarks.sync_bench
+    python -m benchmarks.sync_bench --sizes 30,365 --devices 5 --modes on_demand
+    python -m benchmarks.sync_bench --pg-url postgresql://postgres@127.0.0.1:5432/bench
+
+Without ``--pg-url`` a temporary cluster is started with ``pg_ctl`` (binaries
+from ``PG_BIN`` or ``PATH``; as root it runs as ``PG_USER``, ``postgres`` or
+``nobody``). With ``--pg-url`` the target database's
+``public`` schema is DROPPED between scenarios, so never point it at real data.
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+from urllib.parse import urlparse
+
+import asyncpg
+from tabulate import tabulate
+
+from src.core.remote_schema import REMOTE_TABLES
+from src.core.sync import NeonSync
+from .pg_harness import LocalPostgres, PostgresUnavailable, WireCounter, reset_remote, seed_device_storage
+
+
+async def _row_counts(db_url: str) -> dict:
+    conn = await asyncpg.connect(db_url)
+    try:
+        return {table: await conn.fetchval(f"SELECT COUNT(*) FROM {table}") for table in REMOTE_TABLES}
+    finally:
+        await conn.close()
+
+
+class Phase:
+    """Times one phase and captures the proxy counters accumulated inside it."""
+
+    def __init__(self, proxy: WireCounter):
+        self.proxy = proxy
+        self.elapsed_ms = 0.0
+        self.wire: dict = {}
+
+    async def __aenter__(self):
+        self.proxy.reset()
+        self._started = time.perf_counter()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.elapsed_ms = (time.perf_counter() - self._started) * 1000
+        # Let the proxy pump the final response bytes before reading counters
+        await asyncio.sleep(0)
+        self.wire = self.proxy.snapshot()
+
+
+async def run_scenario(db_url: str, proxy: WireCounter, workdir: Path, mode: str,
+                       days: int, devices: int, cycles: int) -> list:
+    """Run one (mode, history size, device count) scenario and return result rows."""
+    admin = await asyncpg.connect(db_url)
+    try:
+        await reset_remote(admin)
+    finally:
+        await admin.close()
+
+    clients = []
+    for i in range(devices):
+        store = seed_device_storage(
+            workdir / f"{mode}-{days}-{i}.db", str(uuid.UUID(int=i + 1)), days, seed=i
+        )
+        client = NeonSync(db_url=proxy.url_for(db_url), local_storage=store)
+        client.connection_mode = mode
+        client.connection_stats["mode"] = mode
+        client.retry_delay = 0
+        clients.append(client)
+
+    results = []
+
+    def record(phase_name: str, phase: Phase, rows=None, runs: int = 1, latencies=None):
+        results.append({
+            "mode": mode,
+            "days": days,
+            "devices": devices,
+            "phase": phase_name,
+            "ms": round(statistics.median(latencies) if latencies else phase.elapsed_ms, 2),
+            "round_trips": phase.wire["round_trips"] // runs,
+            "bytes_sent": phase.wire["bytes_sent"] // runs,
+            "bytes_received": phase.wire["bytes_received"] // runs,
+            "remote_rows": rows,
+        })
+
+    try:
+        async with Phase(proxy) as phase:
+            for client in clients:
+                await client.connect()
+        record("connect+migrate", phase)
+
+        async with Phase(proxy) as phase:
+            for client in clients:
+                await client._sync_data()
+        record("sync_initial", phase, await _row_counts(db_url))
+
+        # Steady state: the same history re-sent every interval
+        latencies = []
+        proxy.reset()
+        steady = Phase(proxy)
+        for _ in range(cycles):
+            started = time.perf_counter()
+            for client in clients:
+                await client._sync_data()
+            latencies.append((time.perf_counter() - started) * 1000)
+        await asyncio.sleep(0)
+        steady.wire = proxy.snapshot()
+        record("sync_steady", steady, runs=cycles, latencies=latencies)
+
+        reader = clients[0]
+        for name, call in (
+            ("global_today", reader.get_global_today_usage),
+            ("global_lifetime", reader.get_global_lifetime_usage),
+            ("device_count", reader.get_device_count),
+            ("remote_stats", reader.get_remote_stats),
+            ("storage_refresh", lambda: reader.get_storage_usage(refresh=True)),
+        ):
+            reader._cache.clear()
+            async with Phase(proxy) as phase:
+                await call()
+            record(name, phase)
+
+        async with Phase(proxy) as phase:
+            await reader.cleanup_old_aggregates(months_to_keep=3)
+        record("cleanup", phase, await _row_counts(db_url))
+    finally:
+        for client in clients:
+            if client.pool:
+                await client.pool.close()
+
+    return results
+
+
+async def main_async(args) -> list:
+    parsed = urlparse(args.pg_url)
+    proxy = await WireCounter(parsed.hostname or "127.0.0.1", parsed.port or 5432).start()
+    results = []
+    try:
+        with tempfile.TemporaryDirectory(prefix="pb-bench-") as tmp:
+            for mode in args.modes:
+                for days in args.sizes:
+                    results.extend(await run_scenario(
+                        args.pg_url, proxy, Path(tmp), mode, days, args.devices, args.cycles
+                    ))
+    finally:
+        await proxy.stop()
+    return results
+
+
+def _print_results(results: list):
+    table = []
+    for r in results:
+        rows = r["remote_rows"]
+        table.append([
+            r["mode"], r["days"], r["devices"], r["phase"], f"{r['ms']:.1f}", r["round_trips"],
+            f"{r['bytes_sent'] / 1024:.1f}", f"{r['bytes_received'] / 1024:.1f}",
+            "" if rows is None else " / ".join(str(rows[t]) for t in REMOTE_TABLES[1:]),
+        ])
+    print(tabulate(
+        table,
+        headers=["Mode", "Days", "Devices", "Phase", "ms", "Round-trips", "KB sent", "KB recv",
+                 "Rows (daily/monthly/yearly)"],
+        tablefmt="simple",
+    ))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark NeonSync against a local PostgreSQL")
+    parser.add_argument("--sizes", default="30,365,1825", help="History sizes in days (comma-separated)")
+    parser.add_argument("--devices", type=int, default=3, help="Synthetic devices per scenario")
+    parser.add_argument("--modes", default="on_demand,pool", help="Connection modes to benchmark")
+    parser.add_argument("--cycles", type=int, default=5, help="Steady-state sync cycles to average")
+    parser.add_argument("--pg-url", help="Use an existing server instead of starting one (schema is reset!)")
+    parser.add_argument("--json", dest="json_path", help="Also write raw results to this file")
+    args = parser.parse_args(argv)
+
+    args.sizes = [int(s) for s in args.sizes.split(",") if s]
+    args.modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    logging.basicConfig(level=logging.WARNING)
+
+    pg = None
+    if not args.pg_url:
+        try:
+            pg = LocalPostgres().start()
+        except PostgresUnavailable as e:
+            print(f"Skipping sync benchmark: {e}", file=sys.stderr)
+            return 0
+        args.pg_url = pg.url
+
+    try:
+        results = asyncio.run(main_async(args))
+    finally:
+        if pg:
+            pg.stop()
+
+    _print_results(results)
+    if args.json_path:
+        Path(args.json_path).write_text(json.dumps(results, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,6 +9,7 @@ let currentMonth = new Date();
 currentMonth.setDate(1); // Fix: Set to 1st of month to avoid rollover bugs when navigating from 31st
 let peakSpeed = 0;
 let refreshIntervals = [];
+let renderedMonthUrl = null;
 
 // Rolling speed data buffer (30 points = ~60s at 2s interval)
 const SPEED_BUFFER_SIZE = 30;
@@ -16,6 +17,30 @@ let speedLabels = [];
 let uploadSpeedData = [];
 let downloadSpeedData = [];
 
+// Last ETag + body per URL, for conditional polling (304 = nothing changed)
+const validatorCache = new Map();
+
+// Fetch JSON, sending If-None-Match from the previous response.
+// Returns { data, changed }; on 304 the cached body is returned with changed=false.
+async function fetchWithValidators(url) {
+    const cached = validatorCache.get(url);
+    const options = cached ? { headers: { 'If-None-Match': cached.etag } } : {};
+    const response = await fetch(url, options);
+
+    if (response.status === 304 && cached) {
+        return { data: cached.data, changed: false };
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        validatorCache.set(url, { etag, data });
+    } else {
+        validatorCache.delete(url);
+    }
+    return { data, changed: true };
+}
+
 // Register datalabels plugin globally
 Chart.register(ChartDataLabels);
 
@@ -63,6 +88,8 @@ function setupEventListeners() {
         });
     });
 
+    document.getElementById('heatmap-weeks').addEventListener('change', loadHeatmap);
+
     document.getElementById('prev-month').addEventListener('click', () => {
         console.log('Previous month clicked');
         currentMonth.setDate(1); // Enforce first day
@@ -95,6 +122,7 @@ function startDataRefresh() {
     refreshIntervals.push(setInterval(loadLiveStats, 2000)); // Live stats every 2s
     refreshIntervals.push(setInterval(loadTodayStats, 30000)); // Today every 30s
     refreshIntervals.push(setInterval(loadLifetimeStats, 60000)); // Lifetime every 60s
+    refreshIntervals.push(setInterval(loadHeatmap, 300000)); // Heatmap every 5min
 }
 
 // Load all data
@@ -103,6 +131,7 @@ function loadAllData() {
     loadTodayStats();
     loadLifetimeStats();
     loadMonthlyData();
+    loadHeatmap();
 }
 
 // Update clock
@@ -207,8 +236,11 @@ async function loadLiveStats() {
 // Load today's stats
 async function loadTodayStats() {
     try {
-        const response = await fetch(`${API_BASE}/today`);
-        const data = await response.json();
+        const { data, changed } = await fetchWithValidators(`${API_BASE}/today`);
+        if (!changed) {
+            updateLastUpdate();
+            return;
+        }
 
         // Use global data if available and has actual data; fall back to local
         const displayData = (data.global && data.global.total_bytes > 0) ? data.global : data;
@@ -261,8 +293,11 @@ async function loadTodayStats() {
 // Load lifetime stats
 async function loadLifetimeStats() {
     try {
-        const response = await fetch(`${API_BASE}/summary`);
-        const data = await response.json();
+        const { data, changed } = await fetchWithValidators(`${API_BASE}/summary`);
+        if (!changed) {
+            updateLastUpdate();
+            return;
+        }
 
         // Use global data if available and has actual data; fall back to local
         const displayData = (data.global && data.global.total_bytes > 0) ? data.global : data;
@@ -300,8 +335,11 @@ async function loadMonthlyData() {
     document.getElementById('current-month').textContent = formatMonthDisplay(currentMonth);
 
     try {
-        const response = await fetch(`${API_BASE}/month?month=${monthStr}`);
-        const data = await response.json();
+        const url = `${API_BASE}/month?month=${monthStr}`;
+        const { data, changed } = await fetchWithValidators(url);
+        // Redraw on new data, or when navigating back to a cached month
+        if (!changed && renderedMonthUrl === url) return;
+        renderedMonthUrl = url;
 
         updateMonthlyChart(data.days);
 
@@ -312,6 +350,42 @@ async function loadMonthlyData() {
     }
 }
 
+// Load hour-of-week heatmap
+async function loadHeatmap() {
+    const weeks = document.getElementById('heatmap-weeks').value;
+    try {
+        const { data, changed } = await fetchWithValidators(`${API_BASE}/heatmap?weeks=${weeks}`);
+        if (changed || !document.getElementById('heatmap').childElementCount) {
+            renderHeatmap(data);
+        }
+    } catch (error) {
+        console.error('Failed to load heatmap:', error);
+    }
+}
+
+// Render the 7x24 matrix as a grid (cell opacity = share of the busiest hour)
+function renderHeatmap(data) {
+    const container = document.getElementById('heatmap');
+    const perWeek = Math.max(data.weeks_with_data, 1);
+    const cells = ['<span></span>'];
+    for (let hour = 0; hour < 24; hour++) {
+        cells.push(`<span class="heatmap-hour">${hour % 3 === 0 ? hour : ''}</span>`);
+    }
+    data.matrix.forEach((row, day) => {
+        cells.push(`<span class="heatmap-day">${data.days[day]}</span>`);
+        row.forEach((value, hour) => {
+            const alpha = data.max ? (0.06 + 0.94 * value / data.max).toFixed(3) : 0.06;
+            const title = `${data.days[day]} ${String(hour).padStart(2, '0')}:00 · ${formatBytes(value / perWeek)} / week`;
+            cells.push(`<span class="heatmap-cell" style="opacity:${alpha}" title="${title}"></span>`);
+        });
+    });
+    container.innerHTML = cells.join('');
+
+    document.getElementById('heatmap-busiest').textContent = data.busiest
+        ? `Busiest: ${data.busiest.day} ${String(data.busiest.hour).padStart(2, '0')}:00 · ${formatBytes(data.busiest.bytes / perWeek)} / week`
+        : 'No data yet';
+}
+
 // Format month as YYYY-MM
 function formatMonth(date) {
     const year = date.getFullYear();
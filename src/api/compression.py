@@ -0,0 +1,241 @@
+"""Response compression (brotli or gzip) and content-hashed static files.
+
+Brotli is used when the optional ``brotli`` package is installed and the
+client accepts it; otherwise gzip. Bodies under the size threshold, partial
+responses, already-encoded bodies and already-compressed media types pass
+through untouched. Streamed bodies are flushed per chunk, so long exports
+still arrive incrementally.
+"""
+
+import hashlib
+import re
+import zlib
+from email.utils import formatdate
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # optional dependency; gzip only
+    brotli = None
+
+# Already compressed, or live streams where per-chunk flushing would cost more than it saves
+EXCLUDED_CONTENT_TYPES = frozenset({
+    "image/png", "image/jpeg", "image/gif", "image/webp", "image/avif",
+    "font/woff", "font/woff2",
+    "application/gzip", "application/zip",
+    "application/vnd.apache.parquet", "application/vnd.apache.arrow.file",
+    "application/x-msgpack", "application/vnd.packetbuddy.live",
+    "text/event-stream",
+})
+
+# Compress bodies this large or larger in a worker thread
+THREAD_MIN_SIZE = 256 * 1024
+
+
+def _accepted(accept_encoding: str) -> Dict[str, float]:
+    """Parse ``Accept-Encoding`` into ``{coding: q}``."""
+    codings = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            codings[name.strip().lower()] = q
+    return codings
+
+
+def negotiate(accept_encoding: str) -> Optional[str]:
+    """Preferred supported coding: ``br`` (if available), then ``gzip``, else None."""
+    codings = _accepted(accept_encoding)
+    wildcard = codings.get("*", 0.0)
+    for coding in (("br",) if brotli is not None else ()) + ("gzip",):
+        if codings.get(coding, wildcard) > 0:
+            return coding
+    return None
+
+
+class _Gzip:
+    def __init__(self, level: int):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        return self._obj.compress(data) + self._obj.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+class _Brotli:
+    def __init__(self, quality: int):
+        self._obj = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes, final: bool) -> bytes:
+        out = self._obj.process(data)
+        return out + (self._obj.finish() if final else self._obj.flush())
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses of at least ``minimum_size`` bytes."""
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if coding is None:
+            await self.app(scope, receive, send)
+            return
+        compressor = _Brotli(self.brotli_quality) if coding == "br" else _Gzip(self.gzip_level)
+        await _Responder(self.app, coding, compressor, self.minimum_size)(scope, receive, send)
+
+
+class _Responder:
+    """Holds back ``http.response.start`` until the first body chunk decides whether to compress."""
+
+    def __init__(self, app, coding: str, compressor, minimum_size: int):
+        self.app = app
+        self.coding = coding
+        self.compressor = compressor
+        self.minimum_size = minimum_size
+        self.start_message = None
+        self.passthrough = False
+        self.compressing = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.wrapped_send)
+
+    async def _compress(self, body: bytes, final: bool) -> bytes:
+        if len(body) >= THREAD_MIN_SIZE:
+            return await run_in_threadpool(self.compressor.compress, body, final)
+        return self.compressor.compress(body, final)
+
+    def _mark_encoded(self, headers: MutableHeaders):
+        headers["Content-Encoding"] = self.coding
+        headers.add_vary_header("Accept-Encoding")
+        # The encoded body is a different representation: a strong validator no longer applies
+        etag = headers.get("etag")
+        if etag and not etag.startswith("W/"):
+            headers["ETag"] = "W/" + etag
+
+    async def wrapped_send(self, message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            media_type = headers.get("content-type", "").partition(";")[0].strip().lower()
+            self.passthrough = (
+                "content-encoding" in headers
+                or message["status"] in (204, 206, 304)
+                or media_type in EXCLUDED_CONTENT_TYPES
+            )
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if kind != "http.response.body" or self.passthrough:
+            if self.start_message is not None and not self.passthrough and not self.compressing:
+                await self.send(self.start_message)
+                self.passthrough = True
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressing:
+            message["body"] = await self._compress(body, final=not more_body)
+            await self.send(message)
+            return
+
+        headers = MutableHeaders(raw=self.start_message["headers"])
+        if not more_body and len(body) < self.minimum_size:
+            headers.add_vary_header("Accept-Encoding")
+            self.passthrough = True
+            await self.send(self.start_message)
+            await self.send(message)
+            return
+
+        self.compressing = True
+        message["body"] = await self._compress(body, final=not more_body)
+        self._mark_encoded(headers)
+        if more_body:
+            del headers["Content-Length"]
+        else:
+            headers["Content-Length"] = str(len(message["body"]))
+        await self.send(self.start_message)
+        await self.send(message)
+
+
+_ASSET_REF = re.compile(r'((?:src|href)=")([^"?#:]+)(?:\?v=[^"]*)?(")')
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class HashedStaticFiles(StaticFiles):
+    """StaticFiles whose HTML references carry ``?v=<content hash>``.
+
+    Requests with the current hash are served as immutable for a year, so the
+    browser never re-fetches an unchanged ``app.js`` or favicon. Everything else
+    (including the rewritten HTML) is ``no-cache`` and revalidated with its
+    ETag. Hashes are computed once at startup, so edited assets need a restart.
+    """
+
+    def __init__(self, *, directory: str, html: bool = True, **kwargs):
+        super().__init__(directory=directory, html=html, **kwargs)
+        root = Path(directory)
+        self.hashes: Dict[str, str] = {}
+        for path in root.rglob("*"):
+            if path.is_file() and path.suffix != ".html":
+                digest = hashlib.sha256(path.read_bytes()).hexdigest()[:12]
+                self.hashes[path.relative_to(root).as_posix()] = digest
+        self._pages: Dict[str, tuple] = {}
+        for path in root.rglob("*.html"):
+            self._pages[path.relative_to(root).as_posix()] = self._render_page(path)
+
+    def _render_page(self, path: Path) -> tuple:
+        def versioned(match):
+            asset = match.group(2)
+            asset = asset[2:] if asset.startswith("./") else asset
+            if asset not in self.hashes:
+                return match.group(0)
+            return f"{match.group(1)}{match.group(2)}?v={self.hashes[asset]}{match.group(3)}"
+
+        body = _ASSET_REF.sub(versioned, path.read_text(encoding="utf-8")).encode("utf-8")
+        etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        return body, etag, path.stat().st_mtime
+
+    async def get_response(self, path: str, scope):
+        page_key = "index.html" if path in ("", ".") else path
+        if self.html and page_key + "/index.html" in self._pages:
+            page_key += "/index.html"
+        page = self._pages.get(page_key)
+        if page is not None:
+            body, etag, modified = page
+            headers = {"ETag": etag, "Cache-Control": "no-cache",
+                       "Last-Modified": formatdate(modified, usegmt=True)}
+            if etag in Headers(scope=scope).get("if-none-match", ""):
+                return Response(status_code=304, headers=headers)
+            return Response(body, media_type="text/html", headers=headers)
+
+        response = await super().get_response(path, scope)
+        if response.status_code in (200, 304):
+            version = parse_qs(scope.get("query_string", b"").decode()).get("v", [None])[0]
+            current = self.hashes.get(path)
+            response.headers["Cache-Control"] = IMMUTABLE if current and version == current else "no-cache"
+        return response
@@ -0,0 +1,89 @@
+"""Fast JSON responses, a cache of pre-serialized bodies and compact live-sample encodings."""
+
+import json
+import struct
+from collections import OrderedDict
+from typing import Any, Optional
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+# One live sample: unix time (float64), upload and download speed in bytes/s (uint64), little-endian
+LIVE_RECORD = struct.Struct("<dQQ")
+
+# format name -> media type for /api/live and /api/live/stream
+LIVE_FORMATS = {
+    "json": "application/json",
+    "msgpack": "application/x-msgpack",
+    "struct": "application/vnd.packetbuddy.live",
+}
+
+
+def dumps(content: Any) -> bytes:
+    """Serialize to compact JSON bytes (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(content, default=str, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """Default response class: serializes with orjson instead of ``json.dumps``.
+
+    Routes on hot paths return this directly, which also skips FastAPI's
+    ``jsonable_encoder`` pass over the body.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+
+class PayloadCache:
+    """Small LRU of serialized bodies keyed by ETag.
+
+    An ETag already encodes everything the body depends on, so a hit can be
+    sent as-is without touching SQLite or re-serializing.
+    """
+
+    def __init__(self, maxsize: int = 64):
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    def get(self, etag: Optional[str]) -> Optional[bytes]:
+        if etag is None:
+            return None
+        payload = self._entries.get(etag)
+        if payload is not None:
+            self._entries.move_to_end(etag)
+        return payload
+
+    def put(self, etag: Optional[str], payload: bytes):
+        if etag is None:
+            return
+        self._entries[etag] = payload
+        self._entries.move_to_end(etag)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+
+class LiveFormatUnavailable(RuntimeError):
+    """The requested live encoding needs a package that is not installed."""
+
+
+def encode_live(format: str, timestamp: float, sent: int, received: int) -> bytes:
+    """Encode one live sample as ``struct`` (24 bytes) or ``msgpack`` (``[t, sent, received]``)."""
+    if format == "struct":
+        return LIVE_RECORD.pack(timestamp, sent, received)
+    if format == "msgpack":
+        if msgpack is None:
+            raise LiveFormatUnavailable("msgpack is required for this format (pip install msgpack)")
+        return msgpack.packb([timestamp, sent, received])
+    raise ValueError(f"unsupported format: {format}")
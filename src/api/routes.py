@@ -1,99 +1,315 @@
 """FastAPI routes for local HTTP API."""
 
-import csv
-import io
+import asyncio
+import hmac
 import json
+import time
 from datetime import datetime, date, timedelta
+from email.utils import formatdate
 from typing import Optional
 
-from fastapi import APIRouter, Query, Response
+from fastapi import APIRouter, Query, Request, Response
 from fastapi.responses import JSONResponse, StreamingResponse
 
 from ..core.storage import storage
 from ..core.monitor import monitor
 from ..core.sync import sync
-from ..core.device import get_device_info
+from ..core.hub import hub, HubBusy, IngestRejected, IngestTooLarge, decode_ingest_body
+from ..core.hub_sync import hub_sync
+from ..core.series import METHODS, METRICS, TIER_SECONDS, build_series
+from ..core.heatmap import MAX_WEEKS, METRICS as HEATMAP_METRICS, build_heatmap
+from ..core.percentiles import build_percentiles, hour_bounds
+from ..core.insights import build_insights
+from ..core.anomaly import DIRECTIONS as ANOMALY_DIRECTIONS, anomalies, describe as describe_anomaly
+from ..core.budget import budget
+from ..exports.streaming import (
+    DAILY_COLUMNS, DATASETS, LOG_COLUMNS, STREAM_FORMATS, encode_stream, iter_csv, with_total_bytes,
+)
+from ..exports.model import load_export_model, load_period_model
+from ..exports.report_cache import reports
+from ..exports.toon_report import generate_toon_report
+from ..exports.wrapup_report import stream_wrapup_html
+from ..exports.columnar import COLUMNAR_FORMATS, ColumnarUnavailable, dataset_schema, iter_columnar
 from ..utils.formatters import format_usage_response
+from .status import snapshots
+from .responses import (
+    LIVE_FORMATS, FastJSONResponse, LiveFormatUnavailable, PayloadCache, dumps, encode_live,
+)
 from ..utils.cost_calculator import get_cost_breakdown, DEFAULT_COST_PER_GB_INR
 from ..utils.config import config
-from ..version import get_fresh_version, get_release_date
+from ..utils.metrics import CACHE_REQUESTS
 
 
 router = APIRouter(prefix="/api")
 
 
+def _etag(version: str, *parts) -> Optional[str]:
+    """Weak ETag from a storage data version plus whatever else the body depends on.
+
+    Returns None if any part is unknown (e.g. remote cache expired), which
+    disables the 304 shortcut for that request.
+    """
+    if any(part is None for part in parts):
+        return None
+    return 'W/"' + "-".join((version, *map(str, parts))) + '"'
+
+
+def _not_modified(request: Request, etag: Optional[str]) -> Optional[Response]:
+    """304 response if the client's If-None-Match already matches ``etag``."""
+    if_none_match = request.headers.get("if-none-match")
+    if etag is None or not if_none_match:
+        return None
+    if if_none_match.strip() == "*" or etag in (tag.strip() for tag in if_none_match.split(",")):
+        CACHE_REQUESTS.inc(cache="http_etag", result="hit")
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+    CACHE_REQUESTS.inc(cache="http_etag", result="miss")
+    return None
+
+
+def _set_validators(response: Response, etag: Optional[str], modified_at: float):
+    if etag is not None:
+        response.headers["ETag"] = etag
+    response.headers["Last-Modified"] = formatdate(modified_at, usegmt=True)
+    response.headers["Cache-Control"] = "no-cache"
+
+
+# Serialized bodies of the validator-backed routes, keyed by ETag
+_payloads = PayloadCache()
+
+
+def _payload_response(payload: bytes, etag: Optional[str], modified_at: float) -> Response:
+    response = Response(content=payload, media_type="application/json")
+    _set_validators(response, etag, modified_at)
+    return response
+
+
+def _cached_response(request: Request, etag: Optional[str], modified_at: float) -> Optional[Response]:
+    """304, or the stored body for ``etag``, so unchanged data skips SQLite and serialization."""
+    not_modified = _not_modified(request, etag)
+    if not_modified or etag is None:
+        return not_modified
+    payload = _payloads.get(etag)
+    CACHE_REQUESTS.inc(cache="payload", result="hit" if payload is not None else "miss")
+    if payload is not None:
+        return _payload_response(payload, etag, modified_at)
+    return None
+
+
+def _device_scope(all_devices: bool, daily: bool = False) -> str:
+    """``scope`` of a usage response: "all_devices" or "this_device".
+
+    Hub ingest carries per-day totals only, so on a hub the raw/hourly tiers,
+    heatmap slots and speed histograms hold the hub's own traffic.
+    """
+    if not all_devices or (hub.enabled and not daily):
+        return "this_device"
+    return "all_devices"
+
+
+def _serialize(body: dict, etag: Optional[str], modified_at: float) -> Response:
+    """Serialize once with orjson, remember the bytes under ``etag`` and attach validators."""
+    payload = dumps(body)
+    _payloads.put(etag, payload)
+    return _payload_response(payload, etag, modified_at)
+
+
 @router.get("/health")
 async def health():
-    """Service health check."""
-    device_id, os_type, hostname = get_device_info()
-    
-    device_count = 1
-    if sync.enabled:
-        device_count = await sync.get_device_count()
+    """Service health check (served from the background-refreshed snapshot)."""
+    return await snapshots.get_health()
 
-    db_stats = storage.get_database_stats()
-    db_size_mb = db_stats.get('db_size_mb', 0)
-    
-    storage_cfg = getattr(config, 'storage', None)
-    max_storage_mb = getattr(storage_cfg, 'max_storage_mb', 400) if storage_cfg else 400
-    
-    storage_warning = None
-    if db_size_mb > max_storage_mb:
-        storage_warning = f"Database size ({db_size_mb}MB) exceeds limit ({max_storage_mb}MB)"
 
-    return {
-        "status": "running",
-        "version": get_fresh_version(),
-        "release_date": get_release_date(),
-        "device_id": device_id,
-        "os_type": os_type,
-        "hostname": hostname,
-        "device_count": device_count,
-        "sync_enabled": sync.enabled,
-        "timestamp": datetime.utcnow().isoformat(),
-        "storage": {
-            "db_size_mb": db_size_mb,
-            "max_storage_mb": max_storage_mb,
-            "usage_logs_count": db_stats.get('usage_logs_count', 0),
-            "daily_aggregates_count": db_stats.get('daily_aggregates_count', 0),
-            "monthly_aggregates_count": db_stats.get('monthly_aggregates_count', 0),
-            "synced_count": db_stats.get('synced_count', 0),
-            "unsynced_count": db_stats.get('unsynced_count', 0),
-            "storage_usage_percent": db_stats.get('storage_usage_percent', 0),
-            "warning": storage_warning
-        }
-    }
+@router.get("/sync")
+async def sync_status():
+    """Sync connection lifecycle: per-cycle connect latency and cold starts."""
+    stats = sync.get_connection_stats()
+    if hub_sync.enabled:
+        stats["hub"] = hub_sync.get_stats()
+    return stats
+
+
+@router.post("/ingest")
+async def ingest(request: Request):
+    """Hub mode: accept one (gzip) batch of per-day deltas from another agent."""
+    if not hub.enabled:
+        return JSONResponse(status_code=404, content={"error": "Hub mode is not enabled (pb serve --hub)"})
+
+    if hub.token:
+        auth = request.headers.get("authorization", "")
+        if not hmac.compare_digest(auth, f"Bearer {hub.token}"):
+            return JSONResponse(status_code=401, content={"error": "Invalid hub token"})
+
+    body = await request.body()
+    if len(body) > hub.max_body_bytes:
+        return JSONResponse(status_code=413, content={"error": "Batch too large"})
+
+    try:
+        batch = decode_ingest_body(body, request.headers.get("content-encoding", ""), hub.max_decoded_bytes)
+    except IngestTooLarge as e:
+        return JSONResponse(status_code=413, content={"error": str(e)})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"error": str(e)})
+
+    try:
+        status = await hub.submit(batch)
+    except IngestRejected as e:
+        return JSONResponse(status_code=422, content={"error": str(e)})
+    except HubBusy as e:
+        return JSONResponse(
+            status_code=503,
+            content={"error": "Hub is busy, retry later"},
+            headers={"Retry-After": str(e.retry_after)},
+        )
+
+    return {"status": status, "seq": batch["seq"]}
+
+
+@router.get("/hub")
+async def hub_status():
+    """Hub mode: ingest queue depth, commit stats and known device count."""
+    stats = hub.get_stats()
+    stats["device_count"] = storage.get_device_count() if hub.enabled else 0
+    return stats
+
+
+RAW_QUERY = Query(False, description="Omit human_readable fields")
 
 
 @router.get("/live")
-async def live():
+async def live(raw: bool = RAW_QUERY,
+               format: str = Query("json", description="json, msgpack, or struct")):
     """Current upload/download speed."""
     speed_sent, speed_received = monitor.get_current_speed()
+
+    if format != "json":
+        if format not in LIVE_FORMATS:
+            return JSONResponse(status_code=400, content={"error": f"Unsupported format: {format}"})
+        try:
+            payload = encode_live(format, time.time(), int(speed_sent), int(speed_received))
+        except LiveFormatUnavailable as e:
+            return JSONResponse(status_code=501, content={"error": str(e)})
+        return Response(content=payload, media_type=LIVE_FORMATS[format])
     
-    return format_usage_response(
+    return FastJSONResponse(format_usage_response(
         bytes_sent=int(speed_sent),
-        bytes_received=int(speed_received)
-    )
+        bytes_received=int(speed_received),
+        raw=raw,
+    ))
+
+
+@router.get("/live/stream")
+async def live_stream(
+    request: Request,
+    format: str = Query("json", description="json (Server-Sent Events), msgpack, or struct"),
+    interval: float = Query(None, ge=0.25, le=60, description="Seconds between samples (default: poll interval)"),
+):
+    """Push the current speed every ``interval`` seconds until the client disconnects.
+
+    ``json`` is a Server-Sent Events stream; ``msgpack`` and ``struct`` are a
+    plain byte stream of back-to-back samples (24 bytes each for ``struct``).
+    The ``json`` stream also carries ``anomaly`` events when a burst starts or ends
+    and ``budget`` events when a data cap threshold is crossed.
+    """
+    if format not in LIVE_FORMATS:
+        return JSONResponse(status_code=400, content={"error": f"Unsupported format: {format}"})
+    if format != "json":
+        try:
+            encode_live(format, 0.0, 0, 0)
+        except LiveFormatUnavailable as e:
+            return JSONResponse(status_code=501, content={"error": str(e)})
+    interval = interval or max(monitor.poll_interval, 0.25)
+
+    async def samples():
+        seen, seen_budget = anomalies.seq, budget.seq
+        while not await request.is_disconnected():
+            sent, received = (int(value) for value in monitor.get_current_speed())
+            now = time.time()
+            if format == "json":
+                yield b"data: " + dumps({"t": now, "bytes_sent": sent, "bytes_received": received}) + b"\n\n"
+                for seen, event in anomalies.notifications_since(seen):
+                    yield b"event: anomaly\ndata: " + dumps(event) + b"\n\n"
+                for seen_budget, event in budget.notifications_since(seen_budget):
+                    yield b"event: budget\ndata: " + dumps(event) + b"\n\n"
+            else:
+                yield encode_live(format, now, sent, received)
+            await asyncio.sleep(interval)
+
+    media_type = "text/event-stream" if format == "json" else LIVE_FORMATS[format]
+    return StreamingResponse(samples(), media_type=media_type, headers={"Cache-Control": "no-cache"})
+
+
+@router.get("/anomalies")
+async def anomaly_events(
+    from_: Optional[str] = Query(None, alias="from", description="ISO date/datetime (default: 7 days before to)"),
+    to: Optional[str] = Query(None, description="ISO datetime, exclusive; a bare date includes that day (default: now)"),
+    direction: Optional[str] = Query(None, description="sent or received (default: both)"),
+    limit: int = Query(100, ge=1, le=1000, description="Most recent events returned"),
+    raw: bool = RAW_QUERY,
+):
+    """Unusual upload/download bursts flagged while sampling, newest first, plus any still open."""
+    try:
+        end = datetime.fromisoformat(to) if to else datetime.now()
+        if to and len(to) == 10:
+            end += timedelta(days=1)
+        start = datetime.fromisoformat(from_) if from_ else end - timedelta(days=7)
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid date format. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS"}
+        )
+    if direction is not None and direction not in ANOMALY_DIRECTIONS:
+        return JSONResponse(status_code=400, content={"error": f"Unsupported direction: {direction}"})
+
+    events = storage.get_anomaly_events(start, end, direction, limit, all_devices=not sync.enabled)
+    for event in events:
+        for key in ("started_at", "ended_at"):
+            event[key] = datetime.fromisoformat(str(event[key])).isoformat()
+        if not raw:
+            event["human_readable"] = describe_anomaly(event)
+    ongoing = [event.to_dict(raw) for name, event in anomalies.open.items() if direction in (None, name)]
+    return FastJSONResponse({
+        "enabled": anomalies.enabled,
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "open": ongoing,
+        "events": events,
+    })
+
+
+@router.get("/budget")
+async def budget_status(raw: bool = RAW_QUERY):
+    """Data caps: billing cycle, cycle-to-date usage, alerted thresholds and projected overage."""
+    return FastJSONResponse({"enabled": budget.enabled, "caps": budget.status(raw) if budget.enabled else []})
 
 
 @router.get("/today")
-async def today():
+async def today(request: Request, raw: bool = RAW_QUERY):
     """Today's total usage."""
+    version, modified_at = storage.data_version_tag, storage.data_modified_at
+    day = date.today().isoformat()
+    global_key = "global_today" if sync.enabled else None
+    variant = "raw" if raw else "full"
+    cached = _cached_response(
+        request, _etag(version, day, sync.cache_tag(global_key) if global_key else "local", variant), modified_at)
+    if cached:
+        return cached
+
     if sync.enabled:
         bytes_sent, bytes_received, peak_speed = storage.get_today_usage()
-        response = format_usage_response(bytes_sent, bytes_received, peak_speed)
-        response["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
+        body = format_usage_response(bytes_sent, bytes_received, peak_speed, raw=raw)
+        body["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
 
         global_sent, global_received = await sync.get_global_today_usage()
-        response["global"] = format_usage_response(global_sent, global_received)
-        response["global"]["cost"] = get_cost_breakdown(global_sent, global_received)
+        body["global"] = format_usage_response(global_sent, global_received, raw=raw)
+        body["global"]["cost"] = get_cost_breakdown(global_sent, global_received)
     else:
         # Sync off: show all local devices combined as primary
         bytes_sent, bytes_received, peak_speed = storage.get_all_devices_today_usage()
-        response = format_usage_response(bytes_sent, bytes_received, peak_speed)
-        response["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
+        body = format_usage_response(bytes_sent, bytes_received, peak_speed, raw=raw)
+        body["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
 
-    return response
+    return _serialize(
+        body, _etag(version, day, sync.cache_tag(global_key) if global_key else "local", variant), modified_at)
 
 
 @router.get("/cost")
@@ -128,11 +344,19 @@ async def cost(cost_per_gb: float = Query(DEFAULT_COST_PER_GB_INR, description="
 
 
 @router.get("/month")
-async def month(month: Optional[str] = Query(None, description="YYYY-MM format")):
+async def month(request: Request,
+                month: Optional[str] = Query(None, description="YYYY-MM format"),
+                raw: bool = RAW_QUERY):
     """Monthly usage breakdown by day."""
     if month is None:
         month = datetime.utcnow().strftime("%Y-%m")
 
+    version, modified_at = storage.data_version_tag, storage.data_modified_at
+    etag = _etag(version, month, "raw" if raw else "full")
+    cached = _cached_response(request, etag, modified_at)
+    if cached:
+        return cached
+
     if sync.enabled:
         daily_data = storage.get_month_usage(month)
     else:
@@ -152,38 +376,55 @@ async def month(month: Optional[str] = Query(None, description="YYYY-MM format")
         total_sent += row["bytes_sent"]
         total_received += row["bytes_received"]
 
-    return {
+    return _serialize({
         "month": month,
         "days": days,
-        "summary": format_usage_response(total_sent, total_received)
-    }
+        "summary": format_usage_response(total_sent, total_received, raw=raw)
+    }, etag, modified_at)
 
 
 @router.get("/summary")
-async def summary():
+async def summary(request: Request, raw: bool = RAW_QUERY):
     """Lifetime total usage."""
+    version, modified_at = storage.data_version_tag, storage.data_modified_at
+    global_key = "global_lifetime" if sync.enabled else None
+    variant = "raw" if raw else "full"
+    cached = _cached_response(
+        request, _etag(version, sync.cache_tag(global_key) if global_key else "local", variant), modified_at)
+    if cached:
+        return cached
+
     if sync.enabled:
         bytes_sent, bytes_received = storage.get_lifetime_usage()
-        response = format_usage_response(bytes_sent, bytes_received)
-        response["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
+        body = format_usage_response(bytes_sent, bytes_received, raw=raw)
+        body["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
 
         global_sent, global_received = await sync.get_global_lifetime_usage()
-        response["global"] = format_usage_response(global_sent, global_received)
-        response["global"]["cost"] = get_cost_breakdown(global_sent, global_received)
+        body["global"] = format_usage_response(global_sent, global_received, raw=raw)
+        body["global"]["cost"] = get_cost_breakdown(global_sent, global_received)
     else:
         bytes_sent, bytes_received = storage.get_all_devices_lifetime_usage()
-        response = format_usage_response(bytes_sent, bytes_received)
-        response["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
+        body = format_usage_response(bytes_sent, bytes_received, raw=raw)
+        body["cost"] = get_cost_breakdown(bytes_sent, bytes_received)
 
-    return response
+    return _serialize(
+        body, _etag(version, sync.cache_tag(global_key) if global_key else "local", variant), modified_at)
 
 
 @router.get("/range")
 async def range_query(
+    request: Request,
     from_date: str = Query(..., description="YYYY-MM-DD"),
-    to_date: str = Query(..., description="YYYY-MM-DD")
+    to_date: str = Query(..., description="YYYY-MM-DD"),
+    raw: bool = RAW_QUERY,
 ):
     """Usage for arbitrary date range."""
+    version, modified_at = storage.data_version_tag, storage.data_modified_at
+    etag = _etag(version, from_date, to_date, "raw" if raw else "full")
+    cached = _cached_response(request, etag, modified_at)
+    if cached:
+        return cached
+
     try:
         start = datetime.strptime(from_date, "%Y-%m-%d").date()
         end = datetime.strptime(to_date, "%Y-%m-%d").date()
@@ -212,73 +453,132 @@ async def range_query(
         total_sent += row["bytes_sent"]
         total_received += row["bytes_received"]
 
-    return {
+    return _serialize({
         "from": from_date,
         "to": to_date,
         "days": days,
-        "summary": format_usage_response(total_sent, total_received)
-    }
+        "summary": format_usage_response(total_sent, total_received, raw=raw)
+    }, etag, modified_at)
+
+
+@router.get("/series")
+async def series(
+    from_: Optional[str] = Query(None, alias="from", description="ISO date/datetime (default: 24h before to)"),
+    to: Optional[str] = Query(None, description="ISO datetime, exclusive; a bare date includes that day (default: now)"),
+    points: int = Query(500, ge=3, le=5000, description="Maximum points returned"),
+    metric: str = Query("total", description="total, sent, received, speed, or peak_speed"),
+    method: str = Query("lttb", description="lttb or minmax"),
+    tier: str = Query("auto", description="auto, raw, hourly, or daily"),
+):
+    """Chart-ready series downsampled to at most ``points`` points."""
+    if metric not in METRICS or method not in METHODS or (tier != "auto" and tier not in TIER_SECONDS):
+        return JSONResponse(status_code=400, content={"error": "Invalid metric, method or tier"})
+    try:
+        end = datetime.fromisoformat(to) if to else datetime.now()
+        if to and len(to) == 10:
+            end += timedelta(days=1)
+        start = datetime.fromisoformat(from_) if from_ else end - timedelta(days=1)
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid date format. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS"}
+        )
+    if start >= end:
+        return JSONResponse(status_code=400, content={"error": "from must be before to"})
 
+    body = build_series(
+        storage, start, end, points=points, metric=metric, method=method,
+        tier=None if tier == "auto" else tier, all_devices=not sync.enabled,
+    )
+    body["scope"] = _device_scope(not sync.enabled, daily=body["tier"] == "daily")
+    return FastJSONResponse(body)
 
-def _gather_export_data():
-    """Shared data gathering for export endpoints.
 
-    Collects all data from storage once, computes derived insights,
-    and returns a complete data dict to avoid redundant DB queries.
-    """
-    from ..utils.formatters import format_bytes
+@router.get("/heatmap")
+async def heatmap(
+    request: Request,
+    weeks: int = Query(4, ge=1, le=MAX_WEEKS, description="Number of weeks, ending with the week of end"),
+    end: Optional[str] = Query(None, description="YYYY-MM-DD inside the last week (default: today)"),
+    metric: str = Query("total", description="total, sent, or received"),
+):
+    """Hour-of-week usage matrix (7 x 24) summed over the last ``weeks`` weeks."""
+    if metric not in HEATMAP_METRICS:
+        return JSONResponse(status_code=400, content={"error": "Invalid metric"})
+    try:
+        end_date = datetime.strptime(end, "%Y-%m-%d").date() if end else date.today()
+    except ValueError:
+        return JSONResponse(status_code=400, content={"error": "Invalid date format. Use YYYY-MM-DD"})
+
+    version, modified_at = storage.data_version_tag, storage.data_modified_at
+    etag = _etag(version, "heatmap", weeks, end_date.isoformat(), metric)
+    cached = _cached_response(request, etag, modified_at)
+    if cached:
+        return cached
+
+    body = build_heatmap(storage, weeks=weeks, end=end_date, metric=metric, all_devices=not sync.enabled)
+    body["scope"] = _device_scope(not sync.enabled)
+    return _serialize(body, etag, modified_at)
+
+
+@router.get("/percentiles")
+async def percentiles(
+    request: Request,
+    from_: Optional[str] = Query(None, alias="from", description="ISO date/datetime (default: 24h before to)"),
+    to: Optional[str] = Query(None, description="ISO datetime, exclusive; a bare date includes that day (default: now)"),
+    threshold_mbps: Optional[float] = Query(None, gt=0, description="Also report time spent above this speed"),
+    raw: bool = RAW_QUERY,
+):
+    """p50/p90/p95/p99 of per-sample speed over a range, from per-hour/per-day histograms."""
+    try:
+        end = datetime.fromisoformat(to) if to else datetime.now()
+        if to and len(to) == 10:
+            end += timedelta(days=1)
+        start = datetime.fromisoformat(from_) if from_ else end - timedelta(days=1)
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid date format. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS"}
+        )
+    if start >= end:
+        return JSONResponse(status_code=400, content={"error": "from must be before to"})
+
+    start, end = hour_bounds(start, end)
+    version, modified_at = storage.data_version_tag, storage.data_modified_at
+    variant = "raw" if raw else "full"
+    etag = _etag(version, "percentiles", start.isoformat(), end.isoformat(), threshold_mbps or 0, variant)
+    cached = _cached_response(request, etag, modified_at)
+    if cached:
+        return cached
+
+    body = build_percentiles(
+        storage, start, end, poll_interval=monitor.poll_interval, threshold_mbps=threshold_mbps,
+        all_devices=not sync.enabled, raw=raw,
+    )
+    body["scope"] = _device_scope(not sync.enabled)
+    return _serialize(body, etag, modified_at)
 
-    device_id, os_type, hostname = get_device_info()
-    if sync.enabled:
-        stats = storage.get_all_export_stats()
-    else:
-        stats = storage.get_all_devices_export_stats()
-    
-    daily_data = stats["daily_data"]
-    monthly_summaries = stats["monthly_summaries"]
-    total_sent = stats["total_sent"]
-    total_received = stats["total_received"]
-    overall_peak = stats["overall_peak"]
-    tracking_stats = stats["tracking_stats"]
-    
-    total_bytes = total_sent + total_received
-    days_tracked = tracking_stats.get("total_days_tracked", 0) if tracking_stats else 0
-    avg_daily = total_bytes / max(days_tracked, 1)
-    
-    peak_day = max(daily_data, key=lambda x: x["bytes_sent"] + x["bytes_received"]) if daily_data else None
-    
+
+@router.get("/insights")
+async def insights(
+    request: Request,
+    series_days: int = Query(90, ge=7, le=3660, description="Days of moving-average series returned"),
+    raw: bool = RAW_QUERY,
+):
+    """Moving averages, week/month-over-month deltas, trend, seasonality and an end-of-month forecast."""
     today = date.today()
-    current_year = today.year
-    year_data = [d for d in daily_data if d["date"].startswith(str(current_year))]
-    year_sent = sum(d["bytes_sent"] for d in year_data)
-    year_received = sum(d["bytes_received"] for d in year_data)
-    year_total = year_sent + year_received
-    
-    return {
-        "device_id": device_id,
-        "os_type": os_type,
-        "hostname": hostname,
-        "daily_data": daily_data,
-        "monthly_summaries": monthly_summaries,
-        "total_sent": total_sent,
-        "total_received": total_received,
-        "total_bytes": total_bytes,
-        "overall_peak": overall_peak,
-        "tracking_stats": tracking_stats,
-        "days_tracked": days_tracked,
-        "avg_daily": avg_daily,
-        "peak_day": peak_day,
-        "current_year": current_year,
-        "year_data": year_data,
-        "year_sent": year_sent,
-        "year_received": year_received,
-        "year_total": year_total,
-        "format_bytes": format_bytes,
-    }
+    version, modified_at = storage.data_version_tag, storage.data_modified_at
+    etag = _etag(version, "insights", today.isoformat(), series_days, "raw" if raw else "full")
+    cached = _cached_response(request, etag, modified_at)
+    if cached:
+        return cached
+
+    body = build_insights(storage, today=today, all_devices=not sync.enabled, series_days=series_days, raw=raw)
+    return _serialize(body, etag, modified_at)
 
 
 @router.get("/export")
-async def export(format: str = Query("json", description="csv, json, html, or llm")):
+async def export(format: str = Query("json", description="csv, json, html, or llm"),
+                 raw: bool = Query(False, description="JSON only: omit human_readable fields")):
     """Export all usage data in various formats."""
     
     if format == "csv":
@@ -289,7 +589,7 @@ async def export(format: str = Query("json", description="csv, json, html, or ll
         return await export_llm_friendly()
     else:
         # Enhanced JSON format
-        return await export_json()
+        return await export_json(raw)
 
 
 @router.get("/export/wrapup")
@@ -305,355 +605,175 @@ async def export_wrapup(format: str = Query("html", description="html or toon"))
 
 
 async def export_csv():
-    """Export data as CSV with comprehensive fields."""
-    if sync.enabled:
-        daily_data = storage.get_all_daily_aggregates()
-    else:
-        daily_data = storage.get_all_devices_daily_aggregates()
-    
-    # Generate CSV with peak speeds
-    output = io.StringIO()
-    writer = csv.DictWriter(output, fieldnames=["date", "bytes_sent", "bytes_received", "total_bytes", "peak_speed"])
-    writer.writeheader()
-    
-    for day in daily_data:
-        writer.writerow({
-            "date": day["date"],
-            "bytes_sent": day["bytes_sent"],
-            "bytes_received": day["bytes_received"],
-            "total_bytes": day["bytes_sent"] + day["bytes_received"],
-            "peak_speed": day["peak_speed"]
-        })
-    
-    csv_content = output.getvalue()
-    output.close()
-    
-    return Response(
-        content=csv_content,
+    """Export daily aggregates as CSV, streamed chunk by chunk."""
+    chunks = with_total_bytes(storage.iter_daily_aggregates(all_devices=not sync.enabled))
+    return StreamingResponse(
+        iter_csv(chunks, DAILY_COLUMNS),
         media_type="text/csv",
         headers={"Content-Disposition": "attachment; filename=packetbuddy_export.csv"}
     )
 
 
-async def export_json():
-    """Export comprehensive JSON with all statistics."""
+@router.get("/export/logs")
+async def export_logs(
+    format: str = Query("ndjson", description="ndjson, csv, or json (array)"),
+    since: Optional[str] = Query(None, description="ISO date/datetime, inclusive"),
+    until: Optional[str] = Query(None, description="ISO date/datetime, exclusive"),
+    after_id: int = Query(0, ge=0, description="Resume after this log id (incremental export)"),
+):
+    """Stream raw usage logs without loading them into memory.
+
+    Rows come oldest-first with their ``id``; pass the last id seen as
+    ``after_id`` (or a ``since`` timestamp) to pull only new rows.
+    """
+    if format not in STREAM_FORMATS:
+        return JSONResponse(status_code=400, content={"error": "format must be ndjson, csv or json"})
+    try:
+        start = datetime.fromisoformat(since) if since else None
+        end = datetime.fromisoformat(until) if until else None
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid date format. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS"}
+        )
+
+    chunks = storage.iter_usage_logs(since=start, until=end, after_id=after_id, all_devices=not sync.enabled)
+    _, media_type, extension = STREAM_FORMATS[format]
+    return StreamingResponse(
+        encode_stream(format, chunks, LOG_COLUMNS),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=packetbuddy_logs.{extension}"}
+    )
+
+
+@router.get("/export/columnar")
+async def export_columnar(
+    dataset: str = Query("logs", description="logs, hourly, or daily"),
+    format: str = Query("parquet", description="parquet or arrow (Arrow IPC file)"),
+    since: Optional[str] = Query(None, description="ISO date/datetime, inclusive"),
+    until: Optional[str] = Query(None, description="ISO date/datetime, exclusive"),
+):
+    """Stream a typed columnar file for pandas/DuckDB/Polars (requires pyarrow)."""
+    if dataset not in DATASETS or format not in COLUMNAR_FORMATS:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "dataset must be logs, hourly or daily; format must be parquet or arrow"}
+        )
+    try:
+        start = datetime.fromisoformat(since) if since else None
+        end = datetime.fromisoformat(until) if until else None
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": "Invalid date format. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS"}
+        )
+    try:
+        dataset_schema(dataset)
+    except ColumnarUnavailable as e:
+        return JSONResponse(status_code=501, content={"error": str(e)})
+
+    media_type, extension = COLUMNAR_FORMATS[format]
+    return StreamingResponse(
+        iter_columnar(storage, dataset, format, since=start, until=end, all_devices=not sync.enabled),
+        media_type=media_type,
+        headers={"Content-Disposition": f"attachment; filename=packetbuddy_{dataset}.{extension}"}
+    )
+
+
+async def export_json(raw: bool = False):
+    """Export comprehensive JSON with all statistics (``raw`` drops the human-readable strings)."""
     from ..utils.formatters import format_bytes
-    
-    device_id, os_type, hostname = get_device_info()
-    
-    # Get comprehensive data in a single connection
-    if sync.enabled:
-        stats = storage.get_all_export_stats()
-    else:
-        stats = storage.get_all_devices_export_stats()
-    daily_data = stats["daily_data"]
-    monthly_summaries = stats["monthly_summaries"]
-    total_sent = stats["total_sent"]
-    total_received = stats["total_received"]
-    overall_peak = stats["overall_peak"]
-    tracking_stats = stats["tracking_stats"]
-    
-    # Calculate insights
-    total_bytes = total_sent + total_received
-    days_tracked = tracking_stats.get("total_days_tracked", 0) if tracking_stats else 0
-    avg_daily = total_bytes / max(days_tracked, 1)
-    
-    # Find peak day
-    peak_day = max(daily_data, key=lambda x: x["bytes_sent"] + x["bytes_received"]) if daily_data else None
-    
+
+    model = load_export_model()
+    peak_day = model.peak_day
+
     export_data = {
         "metadata": {
             "exported_at": datetime.utcnow().isoformat(),
             "device": {
-                "hostname": hostname,
-                "os_type": os_type,
-                "device_id": device_id
+                "hostname": model.hostname,
+                "os_type": model.os_type,
+                "device_id": model.device_id
             },
             "tracking_period": {
-                "first_date": tracking_stats.get("first_tracked_date") if tracking_stats else None,
-                "last_date": tracking_stats.get("last_tracked_date") if tracking_stats else None,
-                "total_days": days_tracked
+                "first_date": model.first_date,
+                "last_date": model.last_date,
+                "total_days": model.days_tracked
             }
         },
         "summary": {
             "totals": {
-                "bytes_sent": total_sent,
-                "bytes_received": total_received,
-                "total_bytes": total_bytes,
-                "human_readable": {
-                    "sent": format_bytes(total_sent),
-                    "received": format_bytes(total_received),
-                    "total": format_bytes(total_bytes)
-                }
+                "bytes_sent": model.total_sent,
+                "bytes_received": model.total_received,
+                "total_bytes": model.total_bytes,
+                **({} if raw else {"human_readable": {
+                    "sent": format_bytes(model.total_sent),
+                    "received": format_bytes(model.total_received),
+                    "total": format_bytes(model.total_bytes)
+                }})
             },
             "averages": {
-                "daily_bytes": int(avg_daily),
-                "daily_human": format_bytes(int(avg_daily))
+                "daily_bytes": int(model.avg_daily),
+                **({} if raw else {"daily_human": format_bytes(int(model.avg_daily))})
             },
             "peak_speed": {
-                "bytes_per_second": overall_peak,
-                "human_readable": format_bytes(overall_peak) + "/s"
+                "bytes_per_second": model.peak_speed,
+                **({} if raw else {"human_readable": format_bytes(model.peak_speed) + "/s"})
             },
             "peak_day": {
-                "date": peak_day["date"] if peak_day else None,
-                "bytes": (peak_day["bytes_sent"] + peak_day["bytes_received"]) if peak_day else 0,
-                "human": format_bytes(peak_day["bytes_sent"] + peak_day["bytes_received"]) if peak_day else "0 B"
+                "date": peak_day.date,
+                "bytes": peak_day.total_bytes,
+                **({} if raw else {"human": format_bytes(peak_day.total_bytes)})
             } if peak_day else None
         },
         "monthly_data": [
             {
-                "month": m["month"],
-                "bytes_sent": m["bytes_sent"],
-                "bytes_received": m["bytes_received"],
-                "total_bytes": m["bytes_sent"] + m["bytes_received"],
-                "peak_speed": m["peak_speed"],
-                "days_tracked": m["days_tracked"],
-                "human_readable": {
-                    "sent": format_bytes(m["bytes_sent"]),
-                    "received": format_bytes(m["bytes_received"]),
-                    "total": format_bytes(m["bytes_sent"] + m["bytes_received"]),
-                    "peak_speed": format_bytes(m["peak_speed"]) + "/s"
-                }
+                "month": m.month,
+                "bytes_sent": m.bytes_sent,
+                "bytes_received": m.bytes_received,
+                "total_bytes": m.total_bytes,
+                "peak_speed": m.peak_speed,
+                "days_tracked": m.days_tracked,
+                **({} if raw else {"human_readable": {
+                    "sent": format_bytes(m.bytes_sent),
+                    "received": format_bytes(m.bytes_received),
+                    "total": format_bytes(m.total_bytes),
+                    "peak_speed": format_bytes(m.peak_speed) + "/s"
+                }})
             }
-            for m in monthly_summaries
+            for m in model.months
         ],
         "daily_data": [
             {
-                "date": d["date"],
-                "bytes_sent": d["bytes_sent"],
-                "bytes_received": d["bytes_received"],
-                "total_bytes": d["bytes_sent"] + d["bytes_received"],
-                "peak_speed": d["peak_speed"],
-                "human_readable": {
-                    "sent": format_bytes(d["bytes_sent"]),
-                    "received": format_bytes(d["bytes_received"]),
-                    "total": format_bytes(d["bytes_sent"] + d["bytes_received"]),
-                    "peak_speed": format_bytes(d["peak_speed"]) + "/s"
-                }
+                "date": d.date,
+                "bytes_sent": d.bytes_sent,
+                "bytes_received": d.bytes_received,
+                "total_bytes": d.total_bytes,
+                "peak_speed": d.peak_speed,
+                **({} if raw else {"human_readable": {
+                    "sent": format_bytes(d.bytes_sent),
+                    "received": format_bytes(d.bytes_received),
+                    "total": format_bytes(d.total_bytes),
+                    "peak_speed": format_bytes(d.peak_speed) + "/s"
+                }})
             }
-            for d in daily_data
-        ]
+            for d in model.days
+        ],
+        "insights": build_insights(storage, all_devices=not sync.enabled, series_days=30, raw=raw),
     }
     
-    return JSONResponse(content=export_data)
+    return FastJSONResponse(content=export_data)
 
 
 async def export_html():
     """Export beautiful, socially shareable HTML year wrap-up report."""
-    d = _gather_export_data()
-    fmt = d["format_bytes"]
-    
-    html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta property="og:title" content="PacketBuddy {d['current_year']} Wrap-Up — {d['hostname']}">
-    <meta property="og:description" content="I used {fmt(d['year_total'])} of internet data this year! See my full breakdown.">
-    <meta property="og:type" content="website">
-    <meta name="twitter:card" content="summary_large_image">
-    <title>PacketBuddy {d['current_year']} Year Wrap-Up — {d['hostname']}</title>
-    <style>
-        * {{ margin: 0; padding: 0; box-sizing: border-box; }}
-        body {{
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
-            background: #0a0a1a;
-            color: #e8e8f0;
-            padding: 0;
-            line-height: 1.5;
-        }}
-        .wrap {{
-            max-width: 1100px;
-            margin: 0 auto;
-            padding: 20px;
-        }}
-        .card {{
-            background: linear-gradient(135deg, #1a1a2e, #16213e);
-            border: 1px solid rgba(255,255,255,0.06);
-            border-radius: 24px;
-            padding: 32px;
-            margin-bottom: 24px;
-            backdrop-filter: blur(8px);
-        }}
-        .hero {{
-            text-align: center;
-            padding: 48px 32px 36px;
-            background: linear-gradient(135deg, #1a1a3e, #0f3460, #1a1a3e);
-            border-bottom: 3px solid #e94560;
-        }}
-        .hero h1 {{
-            font-size: 3.2em;
-            font-weight: 900;
-            letter-spacing: -1px;
-            background: linear-gradient(90deg, #e94560, #0f3460, #533483);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-        }}
-        .hero h1 span {{
-            -webkit-text-fill-color: #e8e8f0;
-        }}
-        .hero .sub {{
-            font-size: 1.15em;
-            opacity: 0.7;
-            margin-top: 8px;
-            font-weight: 500;
-        }}
-        .hero-total {{
-            margin-top: 28px;
-            padding: 24px;
-            background: rgba(233,69,96,0.12);
-            border: 1px solid rgba(233,69,96,0.25);
-            border-radius: 20px;
-            display: inline-block;
-            min-width: 320px;
-        }}
-        .hero-total .label {{ font-size: 0.85em; opacity: 0.6; text-transform: uppercase; letter-spacing: 1px; font-weight: 700; }}
-        .hero-total .value {{ font-size: 3em; font-weight: 900; margin: 4px 0; }}
-        .hero-total .detail {{ font-size: 1em; opacity: 0.7; }}
-        .hero-total .detail .up {{ color: #e94560; }}
-        .hero-total .detail .down {{ color: #53d8fb; }}
-        .stat-grid {{
-            display: grid;
-            grid-template-columns: repeat(4, 1fr);
-            gap: 16px;
-            margin-top: 24px;
-        }}
-        .stat-item {{
-            text-align: center;
-            padding: 20px 12px;
-            background: rgba(255,255,255,0.04);
-            border-radius: 16px;
-        }}
-        .stat-item .num {{ font-size: 1.8em; font-weight: 900; }}
-        .stat-item .lbl {{ font-size: 0.8em; opacity: 0.55; text-transform: uppercase; letter-spacing: 0.5px; margin-top: 4px; font-weight: 600; }}
-        .stat-item .ico {{ font-size: 1.4em; margin-bottom: 6px; }}
-        .section-title {{
-            font-size: 1.5em;
-            font-weight: 800;
-            margin-bottom: 20px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }}
-        .month-grid {{
-            display: grid;
-            grid-template-columns: repeat(auto-fill, minmax(160px, 1fr));
-            gap: 12px;
-        }}
-        .month-item {{
-            background: rgba(255,255,255,0.04);
-            border-radius: 14px;
-            padding: 14px;
-            text-align: center;
-        }}
-        .month-item .name {{ font-weight: 700; font-size: 0.9em; margin-bottom: 6px; opacity: 0.85; }}
-        .month-item .vol {{ font-weight: 800; font-size: 1.1em; color: #53d8fb; }}
-        .month-item .meta {{ font-size: 0.75em; opacity: 0.5; margin-top: 4px; }}
-        .highlight {{
-            background: linear-gradient(90deg, #e94560, #533483);
-            border-radius: 16px;
-            padding: 20px 24px;
-            margin-top: 20px;
-            display: flex;
-            justify-content: space-between;
-            align-items: center;
-            flex-wrap: wrap;
-            gap: 12px;
-        }}
-        .highlight .hl-label {{ font-weight: 700; font-size: 0.9em; opacity: 0.85; }}
-        .highlight .hl-value {{ font-weight: 900; font-size: 1.3em; }}
-        .footer {{
-            text-align: center;
-            padding: 24px;
-            opacity: 0.4;
-            font-size: 0.85em;
-        }}
-        @media (max-width: 700px) {{
-            .stat-grid {{ grid-template-columns: repeat(2, 1fr); }}
-            .hero h1 {{ font-size: 2em; }}
-            .hero-total .value {{ font-size: 2em; }}
-            .month-grid {{ grid-template-columns: repeat(2, 1fr); }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="wrap">
-        <div class="card hero">
-            <h1>🌐 <span>{d['current_year']} Internet Wrap-Up</span></h1>
-            <div class="sub">{d['hostname']} — {d['os_type']}</div>
-            <div class="hero-total">
-                <div class="label">Total Data This Year</div>
-                <div class="value">{fmt(d['year_total'])}</div>
-                <div class="detail">
-                    <span class="up">↑ {fmt(d['year_sent'])}</span> &nbsp;•&nbsp; <span class="down">↓ {fmt(d['year_received'])}</span>
-                </div>
-            </div>
-        </div>
-
-        <div class="stat-grid">
-            <div class="stat-item"><div class="ico">📊</div><div class="num">{fmt(d['total_bytes'])}</div><div class="lbl">All-Time Total</div></div>
-            <div class="stat-item"><div class="ico">📅</div><div class="num">{d['days_tracked']}</div><div class="lbl">Days Tracked</div></div>
-            <div class="stat-item"><div class="ico">⚡</div><div class="num">{fmt(d['overall_peak'])}/s</div><div class="lbl">Peak Speed</div></div>
-            <div class="stat-item"><div class="ico">📈</div><div class="num">{fmt(int(d['avg_daily']))}</div><div class="lbl">Daily Avg</div></div>
-        </div>"""[1:]
-    
-    html_content += """
-        <div class="card">
-            <div class="section-title">📆 Monthly Breakdown</div>
-            <div class="month-grid">
-"""    
-    for m in d["monthly_summaries"]:
-        month_name = datetime.strptime(m["month"] + "-01", "%Y-%m-%d").strftime("%b %Y")
-        m_total = m["bytes_sent"] + m["bytes_received"]
-        html_content += f"""
-                <div class="month-item">
-                    <div class="name">{month_name}</div>
-                    <div class="vol">{fmt(m_total)}</div>
-                    <div class="meta">↑ {fmt(m['bytes_sent'])} / ↓ {fmt(m['bytes_received'])}</div>
-                </div>"""
-    
-    html_content += """
-            </div>
-        </div>
-
-        <div class="card">
-            <div class="section-title">🏆 Highlights</div>
-"""
-    if d["peak_day"]:
-        pd = d["peak_day"]
-        pd_date = datetime.strptime(pd["date"], "%Y-%m-%d").strftime("%B %d, %Y")
-        pd_total = pd["bytes_sent"] + pd["bytes_received"]
-        html_content += f"""
-            <div class="highlight">
-                <div><div class="hl-label">🌟 Most Active Day</div><div class="hl-value">{fmt(pd_total)}</div></div>
-                <div style="text-align:right"><div class="hl-label">{pd_date}</div><div class="hl-value" style="font-size:1em;opacity:0.7">↑ {fmt(pd['bytes_sent'])} / ↓ {fmt(pd['bytes_received'])}</div></div>
-            </div>"""
-    
-    ratio = d["total_sent"] / max(d["total_received"], 1)
-    dvd_count = int(d["total_bytes"] / (1024**3) / 4.7)
-    cd_count = int(d["total_bytes"] / (1024**3) / 0.7)
-    html_content += f"""
-            <div class="highlight" style="background:linear-gradient(90deg,#1a1a3e,#16213e);border:1px solid rgba(255,255,255,0.06)">
-                <div><div class="hl-label">⚖️ Upload/Download Ratio</div><div class="hl-value">{ratio:.2f}:1</div></div>
-                <div><div class="hl-label">💾 Storage Equivalent</div><div class="hl-value">{dvd_count} DVDs</div></div>
-            </div>
-        </div>
-
-        <div class="footer">
-            Generated by <strong>PacketBuddy</strong> v{get_fresh_version()} &bull; {datetime.utcnow().strftime("%B %d, %Y at %H:%M UTC")}
-            <br>Device: {d['hostname']} ({d['os_type']})
-        </div>
-    </div>
-</body>
-</html>
-"""
-    
-    return Response(
-        content=html_content,
+    body = reports.stream_or_render("wrapup:html", lambda: stream_wrapup_html(load_period_model()),
+                                    all_devices=not sync.enabled)
+    return StreamingResponse(
+        body,
         media_type="text/html",
         headers={
-            "Content-Disposition": f"attachment; filename=packetbuddy_wrap_up_{d['current_year']}.html"
+            "Content-Disposition": f"attachment; filename=packetbuddy_wrap_up_{date.today().year}.html"
         }
     )
 
@@ -661,173 +781,25 @@ async def export_html():
 @router.get("/export/llm")
 async def export_llm_friendly():
     """Export data in TOON format (Token Optimized Object Notation) for LLM analysis."""
-    d = _gather_export_data()
-    fmt = d["format_bytes"]
-    today = date.today()
-    
-    report = f"""# PacketBuddy Network Usage Export - TOON Format
-
-[meta]
-format = "TOON (Token Optimized Object Notation)"
-generated = "{datetime.utcnow().isoformat()}"
-device = "{d['hostname']}"
-os = "{d['os_type']}"
-device_id = "{d['device_id']}"
-version = "{get_fresh_version()}"
-
-[tracking]
-first_date = "{d['tracking_stats'].get("first_tracked_date", "N/A")}"
-last_date = "{d['tracking_stats'].get("last_tracked_date", "N/A")}"
-total_days = {d['days_tracked']}
-
-[totals]
-bytes_sent = {d['total_sent']}
-bytes_received = {d['total_received']}
-total_bytes = {d['total_bytes']}
-human = {{sent="{fmt(d['total_sent'])}", received="{fmt(d['total_received'])}", total="{fmt(d['total_bytes'])}"}}
-
-[year_{d['current_year']}]
-bytes_sent = {d['year_sent']}
-bytes_received = {d['year_received']}
-total_bytes = {d['year_total']}
-days = {len(d['year_data'])}
-human = {{sent="{fmt(d['year_sent'])}", received="{fmt(d['year_received'])}", total="{fmt(d['year_total'])}"}}
-
-[records]
-peak_speed_bps = {d['overall_peak']}
-peak_speed_human = "{fmt(d['overall_peak'])}/s"
-"""
-    
-    if d["peak_day"]:
-        pd = d["peak_day"]
-        pd_total = pd["bytes_sent"] + pd["bytes_received"]
-        report += f"""peak_day_date = "{pd['date']}"
-peak_day_bytes = {pd_total}
-peak_day_human = "{fmt(pd_total)}"
-peak_day_sent = {pd['bytes_sent']}
-peak_day_received = {pd['bytes_received']}
-peak_day_speed = {pd['peak_speed']}
-"""
-    
-    ratio = d["total_sent"] / max(d["total_received"], 1)
-    report += f"""
-[averages]
-daily_bytes = {int(d['avg_daily'])}
-daily_human = "{fmt(int(d['avg_daily']))}"
-
-[ratios]
-upload_download = {ratio:.2f}
-upload_percent = {(d['total_sent'] / max(d['total_bytes'], 1) * 100):.1f}
-download_percent = {(d['total_received'] / max(d['total_bytes'], 1) * 100):.1f}
-
-[comparisons]
-dvd_equivalent = {int(d['total_bytes'] / (1024**3) / 4.7)}
-cd_equivalent = {int(d['total_bytes'] / (1024**3) / 0.7)}
-hd_movie_equivalent = {int(d['total_bytes'] / (1024**3) / 5)}
-
-"""
-    
-    report += "[monthly_data]\n"
-    for i, m in enumerate(d["monthly_summaries"]):
-        m_total = m["bytes_sent"] + m["bytes_received"]
-        report += f"""month_{i} = {{name="{m['month']}", sent={m['bytes_sent']}, received={m['bytes_received']}, total={m_total}, peak={m['peak_speed']}, days={m['days_tracked']}, human="{fmt(m_total)}"}}
-"""
-    
-    report += "\n[recent_30_days]\n"
-    recent_data = [dd for dd in d["daily_data"] if datetime.strptime(dd["date"], "%Y-%m-%d").date() >= today - timedelta(days=30)]
-    for i, day in enumerate(sorted(recent_data, key=lambda x: x["date"], reverse=True)[:30]):
-        day_total = day["bytes_sent"] + day["bytes_received"]
-        report += f"""day_{i} = {{date="{day['date']}", sent={day['bytes_sent']}, received={day['bytes_received']}, total={day_total}, peak={day['peak_speed']}}}
-"""
-    
-    report += f"""
-[llm_prompts]
-year_wrapup = "Create a fun, Spotify-style {d['current_year']} wrap-up based on this network usage data. Include interesting insights, fun facts, and comparisons."
-professional = "Generate a professional network usage summary highlighting efficiency, patterns, and recommendations for optimization."
-personal = "Analyze my internet usage patterns and give me insights about my digital life. What does this data say about my online behavior?"
-trends = "Identify trends in my internet usage over time. Are there seasonal patterns? Which months had unusual activity?"
-
-[interpretation]
-note_1 = "1 GB = 1,073,741,824 bytes"
-note_2 = "Upload = Data sent from device to internet"
-note_3 = "Download = Data received from internet to device"
-note_4 = "Peak speed = Highest combined upload+download speed in bytes/second"
-note_5 = "All byte values are in raw bytes unless marked with 'human' suffix"
-
-[usage_tips]
-tip_1 = "This TOON format uses ~60% fewer tokens than markdown"
-tip_2 = "All data is preserved in compact key=value format"
-tip_3 = "Use the llm_prompts section for suggested analysis questions"
-tip_4 = "Human-readable values are in 'human' fields for easy reading"
-tip_5 = "Monthly and daily data use indexed format (month_0, day_0, etc.)"
-"""
-    
+    all_devices = not sync.enabled
+
+    def render() -> str:
+        return generate_toon_report(load_period_model(), build_insights(storage, all_devices=all_devices, raw=True))
+
+    content = reports.get_or_render("wrapup:toon", render, all_devices=all_devices)
     return Response(
-        content=report,
+        content=content,
         media_type="text/plain",
         headers={
-            "Content-Disposition": f"attachment; filename=packetbuddy_export_{today.strftime('%Y%m%d')}.toon"
+            "Content-Disposition": f"attachment; filename=packetbuddy_export_{date.today().strftime('%Y%m%d')}.toon"
         }
     )
 
 
 @router.get("/storage")
 async def storage_info():
-    """Get comprehensive storage information for both local and NeonDB."""
-    local_stats = storage.get_database_stats()
-    
-    response = {
-        "local": {
-            "db_size_mb": local_stats.get('db_size_mb', 0),
-            "max_storage_mb": config.storage.max_storage_mb,
-            "usage_percent": local_stats.get('storage_usage_percent', 0),
-            "usage_logs_count": local_stats.get('usage_logs_count', 0),
-            "daily_aggregates_count": local_stats.get('daily_aggregates_count', 0),
-            "monthly_aggregates_count": local_stats.get('monthly_aggregates_count', 0),
-            "synced_count": local_stats.get('synced_count', 0),
-            "unsynced_count": local_stats.get('unsynced_count', 0),
-            "oldest_log": local_stats.get('oldest_timestamp'),
-            "newest_log": local_stats.get('newest_timestamp'),
-        },
-        "neon": None,
-        "retention": {
-            "local_log_days": config.storage.log_retention_days,
-            "local_aggregate_months": config.storage.aggregate_retention_months,
-            "neon_aggregate_months": config.storage.neon.neon_aggregate_retention_months if hasattr(config.storage, 'neon') else 6,
-        }
-    }
-    
-    if sync.enabled:
-        try:
-            neon_storage = await sync.get_storage_usage()
-            neon_usage_percent = await sync.get_storage_usage_percent()
-            neon_stats = await sync.get_remote_stats()
-            
-            neon_config = getattr(config.storage, 'neon', None)
-            warning_threshold = neon_config.neon_storage_warning_threshold if neon_config else 80
-            max_storage_mb = neon_config.neon_max_storage_mb if neon_config else 450
-            
-            response["neon"] = {
-                "total_mb": neon_storage.get("total_mb", 0),
-                "max_storage_mb": max_storage_mb,
-                "usage_percent": neon_usage_percent,
-                "free_tier_limit_mb": 512,
-                "warning_threshold_percent": warning_threshold,
-                "tables": neon_storage.get("tables", {}),
-                "device_count": neon_stats.get("device_count", 0),
-                "daily_count": neon_stats.get("daily_count", 0),
-                "monthly_count": neon_stats.get("monthly_count", 0),
-            }
-            
-            if neon_usage_percent >= warning_threshold:
-                response["neon"]["warning"] = f"NeonDB storage at {neon_usage_percent}% - consider cleanup"
-            if neon_usage_percent >= 90:
-                response["neon"]["critical"] = f"NeonDB storage CRITICAL at {neon_usage_percent}% - immediate cleanup recommended"
-                
-        except Exception as e:
-            response["neon"] = {"error": str(e)}
-    
-    return response
+    """Get comprehensive storage information for both local and NeonDB (snapshot)."""
+    return await snapshots.get_storage()
 
 
 @router.post("/storage/cleanup")
@@ -880,5 +852,6 @@ async def trigger_cleanup(
         except Exception as e:
             results["neon"] = {"error": str(e)}
     
+    await snapshots.refresh()
     return results
 
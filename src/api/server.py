@@ -5,29 +5,37 @@ import logging
 import signal
 from datetime import datetime, timedelta
 from pathlib import Path
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 from fastapi.responses import RedirectResponse
 
 from ..utils.config import config
+from ..utils.metrics import REGISTRY, watch_event_loop_lag
 from ..core.monitor import monitor
 from ..core.sync import sync
 from ..core.storage import storage
+from ..core.hub import hub
+from ..core.hub_sync import hub_sync
 from ..utils.updater import auto_update_check
 from ..version import get_version
+from .compression import CompressionMiddleware, HashedStaticFiles
+from .responses import FastJSONResponse
 from .routes import router
+from .status import snapshots
 from ..exports import export_router
+from ..exports.archive import archive
 
 
 # Create FastAPI app
 app = FastAPI(
     title="PacketBuddy API",
     description="Ultra-lightweight network usage tracking",
-    version=get_version()
+    version=get_version(),
+    default_response_class=FastJSONResponse,
 )
 
 # Enable CORS
@@ -38,6 +46,14 @@ if config.get("api", "cors_enabled", default=True):
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["ETag", "Last-Modified"],
+    )
+
+# Compress JSON/HTML/CSV bodies (brotli when installed, else gzip)
+if config.get("api", "compression_enabled", default=True):
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=config.get("api", "compression_min_bytes", default=1024),
     )
 
 # Include API routes
@@ -47,7 +63,7 @@ app.include_router(export_router)
 # Serve dashboard static files
 dashboard_path = Path(__file__).parent.parent.parent / "dashboard"
 if dashboard_path.exists():
-    app.mount("/dashboard", StaticFiles(directory=str(dashboard_path), html=True), name="dashboard")
+    app.mount("/dashboard", HashedStaticFiles(directory=str(dashboard_path), html=True), name="dashboard")
 
 
 @app.get("/")
@@ -56,6 +72,13 @@ async def root():
     return RedirectResponse(url="/dashboard/")
 
 
+if config.get("api", "metrics_enabled", default=True):
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus scrape endpoint (in-memory counters only, no database access)."""
+        return Response(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 # Background tasks
 background_tasks = set()
 
@@ -69,10 +92,6 @@ async def periodic_cleanup():
     vacuum_after_cleanup = getattr(storage_cfg, 'vacuum_after_cleanup', True) if storage_cfg else True
     max_storage_mb = getattr(storage_cfg, 'max_storage_mb', 400) if storage_cfg else 400
     
-    neon_cfg = getattr(storage_cfg, 'neon', None) if storage_cfg else None
-    neon_log_retention_days = getattr(neon_cfg, 'neon_log_retention_days', 7) if neon_cfg else 7
-    neon_aggregate_retention_months = getattr(neon_cfg, 'neon_aggregate_retention_months', 3) if neon_cfg else 3
-    
     cleanup_interval_seconds = cleanup_interval_hours * 3600
     
     await asyncio.sleep(60)
@@ -84,8 +103,6 @@ async def periodic_cleanup():
                 'synced_logs_deleted': 0,
                 'daily_aggregates_deleted': 0,
                 'monthly_aggregates_deleted': 0,
-                'neon_daily_deleted': 0,
-                'neon_monthly_deleted': 0,
                 'vacuum_run': False,
                 'storage_warning': None
             }
@@ -119,15 +136,8 @@ async def periodic_cleanup():
                 except Exception as e:
                     logger.error("Database vacuum failed: %s", e)
             
-            if config.sync_enabled:
-                try:
-                    neon_aggregates = await sync.cleanup_old_aggregates(months_to_keep=neon_aggregate_retention_months)
-                    cleanup_results['neon_daily_deleted'] = neon_aggregates.get('daily_deleted', 0)
-                    cleanup_results['neon_monthly_deleted'] = neon_aggregates.get('monthly_deleted', 0)
-                    if neon_aggregates.get('daily_deleted', 0) > 0 or neon_aggregates.get('monthly_deleted', 0) > 0:
-                        logger.info("NeonDB: Deleted %d daily, %d monthly aggregates (retention: %d months)", neon_aggregates.get('daily_deleted', 0), neon_aggregates.get('monthly_deleted', 0), neon_aggregate_retention_months)
-                except Exception as e:
-                    logger.error("NeonDB aggregates cleanup failed: %s", e)
+            # NeonDB retention runs inside sync cycles (pb_maintenance), while
+            # the remote compute is already awake.
             
             try:
                 db_stats = storage.get_database_stats()
@@ -151,11 +161,23 @@ async def run_background_services():
     tasks = [
         asyncio.create_task(monitor.start()),
     ]
+    if config.get("api", "metrics_enabled", default=True):
+        tasks.append(asyncio.create_task(watch_event_loop_lag()))
+    tasks.append(asyncio.create_task(
+        snapshots.run(config.get("api", "status_refresh_seconds", default=10))
+    ))
+    if config.get("exports", "archive", default=True):
+        tasks.append(asyncio.create_task(archive.run()))
     
-    # Only start sync if enabled
-    if config.sync_enabled:
+    # Only start sync if enabled (a hub URL replaces NeonDB as the target)
+    if hub_sync.enabled:
+        tasks.append(asyncio.create_task(hub_sync.start()))
+    elif config.sync_enabled:
         tasks.append(asyncio.create_task(sync.start()))
     
+    if hub.enabled:
+        tasks.append(asyncio.create_task(hub.start()))
+    
     # Keep references to prevent garbage collection
     for task in tasks:
         background_tasks.add(task)
@@ -218,9 +240,14 @@ async def shutdown_event():
     # Stop monitor and sync
     await monitor.stop()
     
-    if config.sync_enabled:
+    if hub_sync.enabled:
+        await hub_sync.stop()
+    elif config.sync_enabled:
         await sync.stop()
     
+    if hub.enabled:
+        await hub.stop()
+    
     # Cancel background tasks
     for task in background_tasks:
         task.cancel()
@@ -228,8 +255,11 @@ async def shutdown_event():
     logger.info("Shutdown complete.")
 
 
-def run_server():
-    """Run the FastAPI server."""
+def run_server(hub_mode: bool = False, host: Optional[str] = None, port: Optional[int] = None):
+    """Run the FastAPI server.
+
+    ``hub_mode`` also accepts batches from other agents on ``POST /api/ingest``.
+    """
     import sys
     import uvicorn
     
@@ -240,8 +270,13 @@ def run_server():
         stream=sys.stderr,
     )
     
-    host = config.get("api", "host", default="127.0.0.1")
-    port = config.get("api", "port", default=7373)
+    host = host or config.get("api", "host", default="127.0.0.1")
+    port = port or config.get("api", "port", default=7373)
+    
+    if hub_mode:
+        hub.enabled = True
+    if hub.enabled and host in ("127.0.0.1", "localhost"):
+        logger.warning("Hub mode is listening on %s only; other machines cannot reach it (use --host 0.0.0.0)", host)
     
     logger.info("Starting PacketBuddy API server on http://%s:%d", host, port)
     logger.info("Dashboard: http://%s:%d/dashboard", host, port)
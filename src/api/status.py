@@ -0,0 +1,155 @@
+"""Background-refreshed snapshots behind ``/api/health`` and ``/api/storage``.
+
+Both payloads are rebuilt by a background task every
+``api.status_refresh_seconds``; requests only copy the latest snapshot, so
+frequent health checks never touch SQLite or NeonDB. Local row counts come
+from the running counters in ``Storage.get_database_stats``.
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+from ..core.hub import hub
+from ..core.storage import storage
+from ..core.sync import sync
+from ..utils.config import config
+from ..version import get_fresh_version, get_release_date
+
+logger = logging.getLogger(__name__)
+
+
+class StatusSnapshots:
+    """Latest health/storage payloads plus the loop that refreshes them."""
+
+    def __init__(self):
+        self.health: Optional[dict] = None
+        self.storage: Optional[dict] = None
+        self._refresh_lock = asyncio.Lock()
+
+    async def _database_stats(self) -> dict:
+        # The first call (or one after an invalidation) recounts: keep it off the event loop
+        return await asyncio.get_running_loop().run_in_executor(None, storage.get_database_stats)
+
+    async def build_health(self, db_stats: dict) -> dict:
+        device_count = 1
+        if sync.enabled:
+            device_count = await sync.get_device_count()
+        elif hub.enabled:
+            device_count = storage.get_device_count()
+
+        db_size_mb = db_stats.get('db_size_mb', 0)
+        storage_cfg = getattr(config, 'storage', None)
+        max_storage_mb = getattr(storage_cfg, 'max_storage_mb', 400) if storage_cfg else 400
+
+        storage_warning = None
+        if db_size_mb > max_storage_mb:
+            storage_warning = f"Database size ({db_size_mb}MB) exceeds limit ({max_storage_mb}MB)"
+
+        return {
+            "status": "running",
+            "version": get_fresh_version(),
+            "release_date": get_release_date(),
+            "device_id": storage.device_id,
+            "os_type": storage.os_type,
+            "hostname": storage.hostname,
+            "device_count": device_count,
+            "sync_enabled": sync.enabled,
+            "timestamp": datetime.utcnow().isoformat(),
+            "storage": {
+                "db_size_mb": db_size_mb,
+                "max_storage_mb": max_storage_mb,
+                "usage_logs_count": db_stats.get('usage_logs_count', 0),
+                "daily_aggregates_count": db_stats.get('daily_aggregates_count', 0),
+                "monthly_aggregates_count": db_stats.get('monthly_aggregates_count', 0),
+                "synced_count": db_stats.get('synced_count', 0),
+                "unsynced_count": db_stats.get('unsynced_count', 0),
+                "storage_usage_percent": db_stats.get('storage_usage_percent', 0),
+                "warning": storage_warning
+            }
+        }
+
+    async def build_storage(self, local_stats: dict) -> dict:
+        response = {
+            "local": {
+                "db_size_mb": local_stats.get('db_size_mb', 0),
+                "max_storage_mb": config.storage.max_storage_mb,
+                "usage_percent": local_stats.get('storage_usage_percent', 0),
+                "usage_logs_count": local_stats.get('usage_logs_count', 0),
+                "daily_aggregates_count": local_stats.get('daily_aggregates_count', 0),
+                "monthly_aggregates_count": local_stats.get('monthly_aggregates_count', 0),
+                "synced_count": local_stats.get('synced_count', 0),
+                "unsynced_count": local_stats.get('unsynced_count', 0),
+                "oldest_log": local_stats.get('oldest_timestamp'),
+                "newest_log": local_stats.get('newest_timestamp'),
+            },
+            "neon": None,
+            "retention": {
+                "local_log_days": config.storage.log_retention_days,
+                "local_aggregate_months": config.storage.aggregate_retention_months,
+                "neon_aggregate_months": config.storage.neon.neon_aggregate_retention_months if hasattr(config.storage, 'neon') else 6,
+            }
+        }
+
+        if sync.enabled:
+            try:
+                neon_storage = await sync.get_storage_usage()
+                neon_usage_percent = await sync.get_storage_usage_percent()
+                neon_stats = await sync.get_remote_stats()
+
+                neon_config = getattr(config.storage, 'neon', None)
+                warning_threshold = neon_config.neon_storage_warning_threshold if neon_config else 80
+                max_storage_mb = neon_config.neon_max_storage_mb if neon_config else 450
+
+                response["neon"] = {
+                    "total_mb": neon_storage.get("total_mb", 0),
+                    "max_storage_mb": max_storage_mb,
+                    "usage_percent": neon_usage_percent,
+                    "free_tier_limit_mb": 512,
+                    "warning_threshold_percent": warning_threshold,
+                    "tables": neon_storage.get("tables", {}),
+                    "device_count": neon_stats.get("device_count", 0),
+                    "daily_count": neon_stats.get("daily_count", 0),
+                    "monthly_count": neon_stats.get("monthly_count", 0),
+                    "measured_at": neon_storage.get("measured_at"),
+                }
+
+                if neon_usage_percent >= warning_threshold:
+                    response["neon"]["warning"] = f"NeonDB storage at {neon_usage_percent}% - consider cleanup"
+                if neon_usage_percent >= 90:
+                    response["neon"]["critical"] = f"NeonDB storage CRITICAL at {neon_usage_percent}% - immediate cleanup recommended"
+
+            except Exception as e:
+                response["neon"] = {"error": str(e)}
+
+        return response
+
+    async def refresh(self):
+        """Rebuild both snapshots (one stats read shared by the two)."""
+        async with self._refresh_lock:
+            db_stats = await self._database_stats()
+            self.health = await self.build_health(db_stats)
+            self.storage = await self.build_storage(db_stats)
+
+    async def get_health(self) -> dict:
+        if self.health is None:
+            await self.refresh()
+        return self.health
+
+    async def get_storage(self) -> dict:
+        if self.storage is None:
+            await self.refresh()
+        return self.storage
+
+    async def run(self, interval: float):
+        """Background task: refresh the snapshots every ``interval`` seconds."""
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.warning("Status snapshot refresh failed", exc_info=True)
+            await asyncio.sleep(interval)
+
+
+snapshots = StatusSnapshots()
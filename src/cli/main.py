@@ -1,5 +1,6 @@
 """CLI interface for PacketBuddy."""
 
+import os
 import platform
 import click
 from datetime import datetime
@@ -44,6 +45,7 @@ from ..core.monitor import monitor
 from ..api.server import run_server
 from ..utils.config import config
 from ..core.sync import sync
+from ..core.remote_schema import LEGACY_TABLES
 
 
 @click.group()
@@ -138,39 +140,118 @@ def summary():
 
 
 @cli.command()
-@click.option("--format", type=click.Choice(["json", "csv"]), default="json", help="Export format")
+@click.option("--format", type=click.Choice(["json", "ndjson", "csv", "parquet", "arrow"]), default="json",
+              help="Export format (parquet/arrow need pyarrow)")
+@click.option("--table", "dataset", type=click.Choice(["logs", "hourly", "daily"]), default="logs",
+              help="Raw logs or an aggregate tier")
 @click.option("--output", type=click.Path(), help="Output file path")
-def export(format: str, output: str = None):
-    """Export all usage data."""
-    import json
-    import csv
-    
-    logs = db.get_all_usage_logs()
-    
-    if not logs:
-        click.echo(f"{E_ERROR} No data to export")
+@click.option("--since", default=None, help="Only rows at/after this ISO date or datetime")
+@click.option("--until", default=None, help="Only rows before this ISO date or datetime")
+def export(format: str, dataset: str, output: str = None, since: str = None, until: str = None):
+    """Export usage data (streamed; memory use stays flat)."""
+    from ..exports.streaming import DATASETS, RowCounter, encode_stream, iter_dataset
+
+    try:
+        start = datetime.fromisoformat(since) if since else None
+        end = datetime.fromisoformat(until) if until else None
+    except ValueError:
+        click.echo(f"{E_ERROR} Invalid date. Use YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS")
         return
-    
+
     if output is None:
-        output = f"packetbuddy_export.{format}"
-    
-    if format == "json":
-        with open(output, "w") as f:
-            json.dump({"logs": logs}, f, indent=2, default=str)
-    
-    else:  # CSV
+        suffix = "" if dataset == "logs" else f"_{dataset}"
+        output = f"packetbuddy_export{suffix}.{format}"
+
+    if format in ("parquet", "arrow"):
+        from ..exports.columnar import ColumnarUnavailable, write_columnar
+        try:
+            with open(output, "wb") as f:
+                rows = write_columnar(db, dataset, f, format, since=start, until=end)
+        except ColumnarUnavailable as e:
+            os.remove(output)
+            click.echo(f"{E_ERROR} {e}")
+            return
+    else:
+        columns = ("timestamp", "bytes_sent", "bytes_received") if dataset == "logs" else DATASETS[dataset]
+        chunks = RowCounter(iter_dataset(db, dataset, since=start, until=end))
         with open(output, "w", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=["timestamp", "bytes_sent", "bytes_received"])
-            writer.writeheader()
-            writer.writerows(logs)
-    
-    click.echo(f"{E_OK} Exported {len(logs)} records to {output}")
+            if format == "json":
+                f.write(f'{{"{dataset}": ')
+            for piece in encode_stream(format, chunks, columns):
+                f.write(piece)
+            if format == "json":
+                f.write("}\n")
+        rows = chunks.rows
+
+    if rows == 0:
+        click.echo(f"{E_ERROR} No data to export")
+        os.remove(output)
+        return
+
+    click.echo(f"{E_OK} Exported {rows} records to {output}")
+
+
+@cli.group()
+def report():
+    """Render usage reports."""
+    pass
+
+
+@report.command(name="batch")
+@click.option("--device", "device_ids", multiple=True,
+              help="Device ID to report on (repeatable; default: every device in the database)")
+@click.option("--range", "ranges", multiple=True, default=("last-month",), show_default=True,
+              help="today, week, month, year, all, last-month, YYYY, YYYY-MM or FROM:TO (repeatable)")
+@click.option("--format", "formats", multiple=True, type=click.Choice(["html", "markdown", "toon"]),
+              help="Report format (repeatable; default: all three)")
+@click.option("--output", type=click.Path(file_okay=False), default="packetbuddy_reports", show_default=True,
+              help="Output directory (one sub-directory per device)")
+@click.option("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+def report_batch(device_ids, ranges, formats, output, workers):
+    """Render reports for many devices and ranges in parallel."""
+    from ..exports.batch import list_devices, parse_range, run_batch
+
+    try:
+        report_ranges = list(dict.fromkeys(parse_range(spec) for spec in ranges))
+    except ValueError as e:
+        click.echo(f"{E_ERROR} Invalid range: {e}")
+        return
+
+    devices = list_devices(db, device_ids)
+    missing = set(device_ids) - {device[0] for device in devices}
+    if missing:
+        click.echo(f"{E_WARN} Unknown device(s): {', '.join(sorted(missing))}")
+    if not devices:
+        click.echo(f"{E_ERROR} No devices to report on")
+        return
+
+    formats = formats or ("html", "markdown", "toon")
+    click.echo(f"{E_HOURGLASS} Rendering {len(devices) * len(report_ranges)} device/range pair(s) "
+               f"as {', '.join(formats)}...")
+    result = run_batch(db.db_path, devices, report_ranges, formats, output, workers)
+
+    rows = [
+        ["Reports written", len(result.written)],
+        ["Skipped (no data)", result.empty],
+        ["Failed", len(result.failed)],
+        ["Size", format_bytes(result.bytes_written)],
+        ["Time", f"{result.seconds:.2f}s"],
+        ["Throughput", f"{result.reports_per_second:.1f} reports/s"],
+    ]
+    click.echo(tabulate(rows, tablefmt=TABLE_FMT))
+    for name, error in sorted(result.failed.items()):
+        click.echo(f"{E_ERROR} {name}: {error}")
+    if result.written:
+        click.echo(f"{E_OK} Reports saved to {output}")
 
 
 @cli.command()
-def serve():
+@click.option("--hub", "hub_mode", is_flag=True, help="Also accept usage pushed by other agents (POST /api/ingest)")
+@click.option("--host", default=None, help="Bind address (default: [api] host)")
+@click.option("--port", type=int, default=None, help="Port (default: [api] port)")
+def serve(hub_mode: bool, host: str, port: int):
     """Start the API server and dashboard."""
-    run_server()
+    run_server(hub_mode=hub_mode, host=host, port=port)
 
 
 @cli.command()
@@ -244,10 +325,36 @@ def storage():
 @click.option("--dry-run", is_flag=True, help="Show what would be deleted without deleting")
 @click.option("--neon", is_flag=True, help="Cleanup NeonDB remote storage")
 @click.option("--aggressive", is_flag=True, help="Aggressive cleanup for storage crisis")
-def storage_cleanup(days, vacuum, dry_run, neon, aggressive):
+@click.option("--drop-legacy", is_flag=True, help="Drop the pre-v2 NeonDB tables (with --neon)")
+def storage_cleanup(days, vacuum, dry_run, neon, aggressive, drop_legacy):
     """Clean up old synced log entries to free storage space."""
     from datetime import datetime, timedelta
     
+    if neon and drop_legacy:
+        if not config.sync_enabled:
+            click.echo(f"\n{E_WARN} NeonDB sync is not enabled")
+            click.echo("   Set NEON_DB_URL environment variable to enable")
+            return
+        
+        click.echo(f"\n{click.style('NeonDB Legacy Tables', fg='red', bold=True)}")
+        click.echo(f"   Tables: {', '.join(LEGACY_TABLES)}")
+        click.echo("   Devices still running a release before schema v2 write to these tables")
+        if dry_run or not click.confirm("   Drop them now?", default=False):
+            click.echo(f"\n{click.style('No changes made.', fg='green')}")
+            return
+        
+        try:
+            dropped = asyncio.run(sync.drop_legacy_tables())
+        except Exception as e:
+            click.echo(f"\n{E_ERROR} Cleanup failed: {e}")
+            return
+        
+        if not dropped:
+            click.echo(f"   {click.style(E_CHECK, fg='green')} No legacy tables found")
+        for table in dropped:
+            click.echo(f"   {click.style(E_CHECK, fg='green')} Dropped {table}")
+        return
+    
     if neon and aggressive:
         if not config.sync_enabled:
             click.echo(f"\n{E_WARN} NeonDB sync is not enabled")
@@ -256,7 +363,7 @@ def storage_cleanup(days, vacuum, dry_run, neon, aggressive):
         
         async def do_aggressive_neon_cleanup():
             try:
-                storage_info_before = await sync.get_storage_usage()
+                storage_info_before = await sync.get_storage_usage(refresh=True)
                 usage_before = storage_info_before.get("total_mb", 0)
                 
                 results = await sync.aggressive_cleanup()
@@ -304,7 +411,7 @@ def storage_cleanup(days, vacuum, dry_run, neon, aggressive):
         
         async def do_neon_cleanup():
             try:
-                storage_info_before = await sync.get_storage_usage()
+                storage_info_before = await sync.get_storage_usage(refresh=True)
                 usage_before = storage_info_before.get("total_mb", 0)
                 
                 deleted_logs = await sync.cleanup_old_logs(log_days)
@@ -387,6 +494,7 @@ def storage_stats():
         
         table = [
             ["Usage Logs", f"{stats['usage_logs_count']:,}"],
+            ["Hourly Aggregates", f"{stats['hourly_aggregates_count']:,}"],
             ["Daily Aggregates", f"{stats['daily_aggregates_count']:,}"],
             ["Monthly Aggregates", f"{stats['monthly_aggregates_count']:,}"],
             ["Synced Logs", click.style(str(stats['synced_count']), fg='green')],
@@ -433,7 +541,7 @@ def storage_neon():
     
     async def get_neon_info():
         try:
-            storage_info = await sync.get_storage_usage()
+            storage_info = await sync.get_storage_usage(refresh=True)
             usage_percent = await sync.get_storage_usage_percent()
             remote_stats = await sync.get_remote_stats()
             return storage_info, usage_percent, remote_stats
@@ -531,7 +639,7 @@ def neon_cleanup():
     
     async def do_aggressive_cleanup():
         try:
-            storage_info_before = await sync.get_storage_usage()
+            storage_info_before = await sync.get_storage_usage(refresh=True)
             usage_before = storage_info_before.get("total_mb", 0)
             
             results = await sync.aggressive_cleanup()
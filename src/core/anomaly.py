@@ -0,0 +1,181 @@
+"""Online detection of unusual upload/download bursts on the sampling path.
+
+Each direction keeps an exponentially weighted mean and variance of the
+log of its per-sample speed (traffic is heavy-tailed, so a burst is a
+multiple of the usual rate rather than a fixed number of bytes above it).
+A sample is anomalous when its z-score against that baseline reaches the
+threshold; consecutive anomalous samples form one event. Every update is
+O(1) in time and memory: nothing is recomputed from stored history.
+
+Events are announced on the live stream when they start and end, and
+closed events are written to ``anomaly_events`` with the next batch flush.
+"""
+
+import logging
+import math
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ..utils.config import config
+from ..utils.formatters import format_bytes, format_speed
+from ..utils.metrics import MONITOR_ANOMALIES
+
+logger = logging.getLogger(__name__)
+
+DIRECTIONS = ("sent", "received")
+
+# Floor of the baseline's standard deviation (log scale): a very steady
+# baseline would otherwise flag any small wobble. With the default threshold
+# a burst needs at least ~7x the usual speed.
+MIN_STD = 0.5
+# Start/end notifications kept for live-stream clients that fall behind
+MAX_NOTIFICATIONS = 256
+
+
+class EwmaDetector:
+    """Exponentially weighted mean and variance of ``log1p(speed)``, with a z-score test per sample."""
+
+    __slots__ = ("alpha", "threshold", "warmup", "min_speed", "mean", "var", "count")
+
+    def __init__(self, window: int = 300, threshold: float = 4.0, warmup: int = 60, min_speed: float = 0):
+        self.alpha = 2 / (window + 1)
+        self.threshold = threshold
+        self.warmup = warmup
+        self.min_speed = min_speed
+        self.mean = 0.0
+        self.var = 0.0
+        self.count = 0
+
+    @property
+    def baseline(self) -> float:
+        """Typical speed (bytes/s) under the current mean."""
+        return math.expm1(self.mean)
+
+    def score(self, speed: float) -> float:
+        return (math.log1p(speed) - self.mean) / max(math.sqrt(self.var), MIN_STD)
+
+    def update(self, speed: float) -> Optional[float]:
+        """Fold in one sample; returns its z-score if it is anomalous, else None."""
+        score = None
+        if self.count >= self.warmup and speed >= self.min_speed:
+            z = self.score(speed)
+            if z >= self.threshold:
+                score = z
+        # Plain running mean until the window fills, so the start is not biased towards zero
+        alpha = max(self.alpha, 1 / (self.count + 1))
+        diff = math.log1p(speed) - self.mean
+        increment = alpha * diff
+        self.mean += increment
+        self.var = (1 - alpha) * (self.var + diff * increment)
+        self.count += 1
+        return score
+
+
+@dataclass
+class AnomalyEvent:
+    direction: str
+    started_at: datetime
+    ended_at: datetime
+    samples: int
+    bytes: int
+    peak_speed: int
+    baseline_speed: int
+    peak_score: float
+
+    def to_dict(self, raw: bool = False) -> dict:
+        body = {
+            "direction": self.direction,
+            "started_at": self.started_at.isoformat(),
+            "ended_at": self.ended_at.isoformat(),
+            "samples": self.samples,
+            "bytes": self.bytes,
+            "peak_speed": self.peak_speed,
+            "baseline_speed": self.baseline_speed,
+            "peak_score": round(self.peak_score, 2),
+        }
+        if not raw:
+            body["human_readable"] = describe(body)
+        return body
+
+
+def describe(event: dict) -> dict:
+    """``human_readable`` block of an event dict (live or stored)."""
+    return {
+        "bytes": format_bytes(event["bytes"]),
+        "peak_speed": format_speed(event["peak_speed"]),
+        "baseline_speed": format_speed(event["baseline_speed"]),
+    }
+
+
+class AnomalyDetector:
+    """Per-direction detectors, the events they have open and the ones awaiting a flush."""
+
+    def __init__(self, enabled: bool = True, window: int = 300, threshold: float = 4.0,
+                 warmup: int = 60, min_speed: float = 0):
+        self.enabled = enabled
+        self.detectors = {d: EwmaDetector(window, threshold, warmup, min_speed) for d in DIRECTIONS}
+        self.open: Dict[str, AnomalyEvent] = {}
+        self.pending: List[AnomalyEvent] = []  # closed, not yet written
+        self.notifications = deque(maxlen=MAX_NOTIFICATIONS)  # (seq, payload)
+        self.seq = 0
+
+    def observe(self, now: datetime, interval: float, delta_sent: int, delta_received: int):
+        """Feed one poll's byte deltas (``interval`` seconds apart)."""
+        for direction, delta in (("sent", delta_sent), ("received", delta_received)):
+            detector = self.detectors[direction]
+            speed = delta / interval
+            baseline = detector.baseline
+            score = detector.update(speed)
+            event = self.open.get(direction)
+            if score is not None:
+                if event is None:
+                    event = AnomalyEvent(direction, now, now, 1, delta, int(speed), int(baseline), score)
+                    self.open[direction] = event
+                    MONITOR_ANOMALIES.inc(direction=direction)
+                    self._notify("start", event)
+                else:
+                    event.ended_at = now
+                    event.samples += 1
+                    event.bytes += delta
+                    event.peak_speed = max(event.peak_speed, int(speed))
+                    event.peak_score = max(event.peak_score, score)
+            elif event is not None:
+                self._close(direction)
+
+    def close_all(self):
+        """End every open event (monitor shutdown)."""
+        for direction in list(self.open):
+            self._close(direction)
+
+    def _close(self, direction: str):
+        event = self.open.pop(direction)
+        self.pending.append(event)
+        self._notify("end", event)
+        logger.info("Unusual %s burst: %s over %ds (peak %s, usual %s)", direction, format_bytes(event.bytes),
+                    event.samples, format_speed(event.peak_speed), format_speed(event.baseline_speed))
+
+    def _notify(self, state: str, event: AnomalyEvent):
+        self.seq += 1
+        self.notifications.append((self.seq, {"state": state, **event.to_dict(raw=True)}))
+
+    def notifications_since(self, seq: int) -> List[tuple]:
+        """``(seq, payload)`` of start/end notifications after ``seq`` (oldest first)."""
+        if seq >= self.seq:
+            return []
+        return [item for item in self.notifications if item[0] > seq]
+
+    def drain(self) -> List[AnomalyEvent]:
+        """Closed events not yet written; the caller takes ownership."""
+        events, self.pending = self.pending, []
+        return events
+
+
+anomalies = AnomalyDetector(
+    enabled=config.get("anomaly", "enabled", default=True),
+    window=config.get("anomaly", "window_samples", default=300),
+    threshold=config.get("anomaly", "threshold", default=4.0),
+    warmup=config.get("anomaly", "warmup_samples", default=60),
+    min_speed=config.get("anomaly", "min_speed_bytes", default=500_000),
+)
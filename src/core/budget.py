@@ -0,0 +1,298 @@
+"""Data caps per billing cycle, with threshold alerts and a projected overage (``/api/budget``).
+
+Caps are configured as ``[[budget.caps]]``. A cap's cycle-to-date total is
+summed from ``daily_aggregates`` once, when the server first needs it or a
+new cycle starts. After that it is kept current from the storage write path:
+every flush, catch-up insert or hub batch reports the bytes it added per
+device and day (``Storage.add_write_listener``), and each cap adds the part
+inside its cycle. Writes are numbered, and the sum records the last one it
+includes, so a write committed before the sum but reported after it is not
+counted twice. A threshold check compares the total against the next
+threshold not yet reached, so a flush costs O(caps) and no query.
+
+A crossing is logged, pushed on the live stream and handed to the optional
+``command`` and ``webhook_url`` on a background thread. The thresholds
+alerted in the current cycle are kept in ``system_state``, so a restart
+does not repeat them.
+"""
+
+import calendar
+import json
+import logging
+import os
+import subprocess
+import threading
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..utils.config import config
+from ..utils.cost_calculator import DEFAULT_COST_PER_GB_INR, calculate_cost
+from ..utils.formatters import format_bytes
+from .storage import storage
+
+logger = logging.getLogger(__name__)
+
+GB = 1024 ** 3
+DEFAULT_THRESHOLDS = (50, 80, 100)
+# Seconds a hook command or webhook may take
+HOOK_TIMEOUT = 30
+# The running rate is not extrapolated from less than this much of a cycle
+MIN_RATE_SECONDS = 3600
+MAX_NOTIFICATIONS = 64
+
+
+@dataclass(frozen=True)
+class Cap:
+    name: str
+    cap_bytes: int
+    cycle_day: int = 1  # day of the month the billing cycle starts (clamped to short months)
+    device: str = ""  # "" this device, "*" every device, otherwise a device id (hub agents)
+    thresholds: Tuple[int, ...] = DEFAULT_THRESHOLDS  # percent of the cap, ascending
+    cost_per_gb: float = DEFAULT_COST_PER_GB_INR  # price of usage beyond the cap
+
+
+def _cycle_start_in(year: int, month: int, cycle_day: int) -> date:
+    return date(year, month, min(cycle_day, calendar.monthrange(year, month)[1]))
+
+
+def cycle_bounds(today: date, cycle_day: int) -> Tuple[date, date]:
+    """``[start, end)`` of the billing cycle containing ``today``."""
+    start = _cycle_start_in(today.year, today.month, cycle_day)
+    if today < start:
+        previous = today.replace(day=1) - timedelta(days=1)
+        start = _cycle_start_in(previous.year, previous.month, cycle_day)
+    following = (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    return start, _cycle_start_in(following.year, following.month, cycle_day)
+
+
+def load_caps(entries: Sequence[dict], thresholds: Sequence[int] = DEFAULT_THRESHOLDS) -> List[Cap]:
+    """Caps from ``[[budget.caps]]`` tables; invalid entries are logged and skipped."""
+    caps, names = [], set()
+    for entry in entries:
+        try:
+            name = str(entry.get("name") or f"cap-{len(caps) + 1}")
+            cap = Cap(
+                name=name,
+                cap_bytes=int(float(entry["cap_gb"]) * GB),
+                cycle_day=int(entry.get("cycle_start_day", 1)),
+                device=str(entry.get("device", "")),
+                thresholds=tuple(sorted(int(t) for t in entry.get("thresholds", thresholds))),
+                cost_per_gb=float(entry.get("cost_per_gb", DEFAULT_COST_PER_GB_INR)),
+            )
+            if cap.cap_bytes <= 0 or not 1 <= cap.cycle_day <= 31 or not cap.thresholds or name in names:
+                raise ValueError("cap_gb must be positive, cycle_start_day 1-31, names unique")
+        except (KeyError, TypeError, ValueError) as e:
+            logger.warning("Ignoring budget cap %r: %s", entry, e)
+            continue
+        names.add(name)
+        caps.append(cap)
+    return caps
+
+
+class CapState:
+    """Running cycle-to-date total of one cap and the thresholds already alerted."""
+
+    def __init__(self, cap: Cap, start: date, end: date, used: int, alerted: List[dict], loaded_seq: int = 0):
+        self.cap = cap
+        self.start = start
+        self.end = end
+        self.used = used
+        self.alerted = alerted  # [{"threshold", "at", "bytes"}], ascending
+        self.loaded_seq = loaded_seq  # last storage write included in ``used`` when it was summed
+
+    @property
+    def next_threshold(self) -> Optional[int]:
+        reached = len(self.alerted)
+        return self.cap.thresholds[reached] if reached < len(self.cap.thresholds) else None
+
+    def projection(self, now: datetime) -> dict:
+        """Cycle-end total at the cycle's average rate so far, and what it would cost beyond the cap."""
+        start = datetime.combine(self.start, datetime.min.time())
+        end = datetime.combine(self.end, datetime.min.time())
+        elapsed = max((now - start).total_seconds(), MIN_RATE_SECONDS)
+        rate = self.used / elapsed  # bytes per second
+        projected = self.used + rate * max((end - now).total_seconds(), 0)
+        overage = max(int(projected) - self.cap.cap_bytes, 0)
+        reached_at = None
+        if self.used >= self.cap.cap_bytes:
+            reached_at = self.alerted[-1]["at"] if self.alerted and self.alerted[-1]["threshold"] >= 100 else None
+        elif rate > 0:
+            # Compared in seconds first: at a trickle the moment is past any representable date
+            seconds = (self.cap.cap_bytes - self.used) / rate
+            if seconds < (end - now).total_seconds():
+                reached_at = (now + timedelta(seconds=seconds)).isoformat(timespec="seconds")
+        return {
+            "rate_bytes_per_day": int(rate * 86400),
+            "projected_bytes": int(projected),
+            "projected_percent": round(projected / self.cap.cap_bytes * 100, 1),
+            "overage_bytes": overage,
+            "overage_cost": calculate_cost(overage, self.cap.cost_per_gb),
+            "cap_reached_at": reached_at,
+        }
+
+
+class BudgetEngine:
+    """Cycle-to-date totals of the configured caps, updated from the storage write path."""
+
+    def __init__(self, caps: Sequence[Cap], command: str = "", webhook_url: str = "", enabled: bool = True):
+        self.caps = list(caps)
+        self.command = command
+        self.webhook_url = webhook_url
+        self.enabled = enabled and bool(self.caps)
+        self._states: Dict[str, CapState] = {}
+        self._lock = threading.Lock()
+        self._hooks: Optional[ThreadPoolExecutor] = None
+        self.notifications = deque(maxlen=MAX_NOTIFICATIONS)  # (seq, payload)
+        self.seq = 0
+
+    def _device(self, cap: Cap) -> Optional[str]:
+        if cap.device == "*":
+            return None
+        return cap.device or storage.device_id
+
+    def _state(self, cap: Cap, today: date) -> CapState:
+        """The cap's state for the cycle containing ``today``; summed from storage on a new cycle or first call."""
+        state = self._states.get(cap.name)
+        if state is not None and state.start <= today < state.end:
+            return state
+        start, end = cycle_bounds(today, cap.cycle_day)
+        saved = storage.get_state(f"budget:{cap.name}").get("value_text")
+        alerted = []
+        if saved:
+            try:
+                saved = json.loads(saved)
+                if saved.get("cycle_start") == start.isoformat():
+                    alerted = saved.get("alerted", [])
+            except ValueError:
+                logger.warning("Ignoring unreadable budget state of %s", cap.name)
+        used, seq = storage.get_cycle_usage(start, end, self._device(cap))
+        state = CapState(cap, start, end, used, alerted, seq)
+        self._states[cap.name] = state
+        self._check(state, datetime.now())
+        return state
+
+    def on_write(self, deltas: Dict[str, Dict[str, int]], seq: int):
+        """Storage write listener: add ``{device_id: {day: bytes}}`` to every matching cap in its cycle."""
+        if not self.enabled:
+            return
+        now = datetime.now()
+        with self._lock:
+            for cap in self.caps:
+                state = self._state(cap, now.date())
+                if seq <= state.loaded_seq:
+                    continue  # the write is already in the summed total
+                device = self._device(cap)
+                first, last = state.start.isoformat(), state.end.isoformat()
+                for device_id, days in deltas.items():
+                    if device is None or device_id == device:
+                        state.used += sum(value for day, value in days.items() if first <= str(day) < last)
+                self._check(state, now)
+
+    def _check(self, state: CapState, now: datetime):
+        crossed = []
+        while state.next_threshold is not None and state.used * 100 >= state.cap.cap_bytes * state.next_threshold:
+            alert = {"threshold": state.next_threshold, "at": now.isoformat(timespec="seconds"), "bytes": state.used}
+            state.alerted.append(alert)
+            crossed.append(alert)
+        if not crossed:
+            return
+        storage.set_state(f"budget:{state.cap.name}", value_text=json.dumps({
+            "cycle_start": state.start.isoformat(), "alerted": state.alerted,
+        }))
+        # One notification per flush: the highest threshold it crossed
+        event = {
+            "cap": state.cap.name,
+            "threshold": crossed[-1]["threshold"],
+            "thresholds_crossed": [alert["threshold"] for alert in crossed],
+            "used_bytes": state.used,
+            "cap_bytes": state.cap.cap_bytes,
+            "percent": round(state.used / state.cap.cap_bytes * 100, 1),
+            "cycle_start": state.start.isoformat(),
+            "cycle_end": (state.end - timedelta(days=1)).isoformat(),
+            "at": crossed[-1]["at"],
+            "projection": state.projection(now),
+        }
+        logger.warning("Data cap %s: %s%% used (%s of %s)", event["cap"], event["percent"],
+                       format_bytes(state.used), format_bytes(state.cap.cap_bytes))
+        self.seq += 1
+        self.notifications.append((self.seq, event))
+        if self.command or self.webhook_url:
+            if self._hooks is None:
+                self._hooks = ThreadPoolExecutor(max_workers=1, thread_name_prefix="budget-hooks")
+            self._hooks.submit(self._run_hooks, event)
+
+    def _run_hooks(self, event: dict):
+        body = json.dumps(event).encode("utf-8")
+        if self.command:
+            env = dict(os.environ, PB_BUDGET_CAP=event["cap"], PB_BUDGET_THRESHOLD=str(event["threshold"]),
+                       PB_BUDGET_PERCENT=str(event["percent"]), PB_BUDGET_USED_BYTES=str(event["used_bytes"]))
+            try:
+                subprocess.run(self.command, shell=True, input=body, env=env, timeout=HOOK_TIMEOUT,
+                               capture_output=True, check=True)
+            except (OSError, subprocess.SubprocessError) as e:
+                logger.warning("Budget alert command failed: %s", e)
+        if self.webhook_url:
+            request = urllib.request.Request(self.webhook_url, data=body, method="POST",
+                                             headers={"Content-Type": "application/json"})
+            try:
+                with urllib.request.urlopen(request, timeout=HOOK_TIMEOUT):
+                    pass
+            except (OSError, ValueError) as e:
+                logger.warning("Budget alert webhook failed: %s", e)
+
+    def notifications_since(self, seq: int) -> List[tuple]:
+        """``(seq, payload)`` of threshold alerts after ``seq`` (oldest first)."""
+        if seq >= self.seq:
+            return []
+        return [item for item in self.notifications if item[0] > seq]
+
+    def status(self, raw: bool = False) -> List[dict]:
+        """Every cap's cycle, usage, alerted thresholds and projection."""
+        now = datetime.now()
+        caps = []
+        with self._lock:
+            for cap in self.caps:
+                state = self._state(cap, now.date())
+                projection = state.projection(now)
+                body = {
+                    "name": cap.name,
+                    "device": cap.device or storage.device_id,
+                    "cycle": {
+                        "start": state.start.isoformat(),
+                        "end": (state.end - timedelta(days=1)).isoformat(),
+                        "days_elapsed": (now.date() - state.start).days + 1,
+                        "days_remaining": (state.end - now.date()).days - 1,
+                    },
+                    "cap_bytes": cap.cap_bytes,
+                    "used_bytes": state.used,
+                    "remaining_bytes": max(cap.cap_bytes - state.used, 0),
+                    "percent": round(state.used / cap.cap_bytes * 100, 1),
+                    "thresholds": list(cap.thresholds),
+                    "alerts": list(state.alerted),
+                    "projection": projection,
+                }
+                if not raw:
+                    body["human_readable"] = {
+                        "cap": format_bytes(cap.cap_bytes),
+                        "used": format_bytes(state.used),
+                        "remaining": format_bytes(body["remaining_bytes"]),
+                        "rate_per_day": format_bytes(projection["rate_bytes_per_day"]),
+                        "projected": format_bytes(projection["projected_bytes"]),
+                        "overage": format_bytes(projection["overage_bytes"]),
+                    }
+                caps.append(body)
+        return caps
+
+
+budget = BudgetEngine(
+    load_caps(config.get("budget", "caps", default=[]),
+              config.get("budget", "thresholds", default=list(DEFAULT_THRESHOLDS))),
+    command=config.get("budget", "command", default=""),
+    webhook_url=config.get("budget", "webhook_url", default=""),
+    enabled=config.get("budget", "enabled", default=True),
+)
+storage.add_write_listener(budget.on_write)
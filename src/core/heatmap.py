@@ -0,0 +1,41 @@
+"""Hour-of-week usage heatmap (7 days x 24 hours) over the last N weeks."""
+
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+from .storage import Storage
+
+DAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+METRICS = ("total", "sent", "received")
+MAX_WEEKS = 520
+
+
+def build_heatmap(store: Storage, weeks: int = 4, end: Optional[date] = None, metric: str = "total",
+                  all_devices: bool = False) -> dict:
+    """Sum the ``weeks`` weekly partials ending with the week containing ``end``.
+
+    ``matrix[d][h]`` is the bytes moved on weekday ``d`` (Monday = 0) during
+    local hour ``h``, totalled over the window.
+    """
+    end = end or date.today()
+    last_week, _ = Storage.heatmap_key(datetime.combine(end, datetime.min.time()))
+    first_week = last_week - timedelta(weeks=weeks - 1)
+    rows, weeks_with_data = store.get_heatmap_slots(first_week, last_week, all_devices)
+
+    matrix = [[0] * 24 for _ in DAYS]
+    for slot, sent, received, _samples in rows:
+        matrix[slot // 24][slot % 24] = {"total": sent + received, "sent": sent, "received": received}[metric]
+
+    busiest = max(((value, d, h) for d, row in enumerate(matrix) for h, value in enumerate(row)), default=(0, 0, 0))
+    return {
+        "from": first_week.isoformat(),
+        "to": (last_week + timedelta(days=6)).isoformat(),
+        "weeks": weeks,
+        "weeks_with_data": weeks_with_data,
+        "metric": metric,
+        "days": list(DAYS),
+        "matrix": matrix,
+        "max": busiest[0],
+        "total": sum(map(sum, matrix)),
+        "busiest": {"day": DAYS[busiest[1]], "hour": busiest[2], "bytes": busiest[0]} if busiest[0] else None,
+    }
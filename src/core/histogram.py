@@ -0,0 +1,130 @@
+"""Compact, mergeable log-bucketed histograms of per-sample speeds.
+
+HDR-style layout: values below ``2**SUB_BITS`` get exact buckets; above that,
+every power of two is split into ``2**SUB_BITS`` equal sub-buckets, so any
+recorded value is known to within ``1 / 2**SUB_BITS`` (about 6%) of itself.
+Histograms merge by adding counts, which makes an hour, a day, a month or
+several devices the same operation. Serialized form is a sparse list of
+varint (index delta, count) pairs: typically a few hundred bytes for a day.
+"""
+
+from typing import Dict, Iterable, Optional
+
+SUB_BITS = 4
+SUB_BUCKETS = 1 << SUB_BITS
+
+
+def bucket_index(value: int) -> int:
+    """Bucket of a non-negative integer value."""
+    if value < SUB_BUCKETS:
+        return max(value, 0)
+    exponent = value.bit_length() - 1
+    mantissa = (value >> (exponent - SUB_BITS)) & (SUB_BUCKETS - 1)
+    return SUB_BUCKETS + (exponent - SUB_BITS) * SUB_BUCKETS + mantissa
+
+
+def bucket_bounds(index: int) -> tuple:
+    """``(low, high)`` value range of a bucket; ``high`` is exclusive."""
+    if index < SUB_BUCKETS:
+        return index, index + 1
+    exponent, mantissa = divmod(index - SUB_BUCKETS, SUB_BUCKETS)
+    exponent += SUB_BITS
+    width = 1 << (exponent - SUB_BITS)
+    low = (1 << exponent) + mantissa * width
+    return low, low + width
+
+
+def _write_varint(value: int, out: bytearray):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varints(data: bytes) -> Iterable[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+
+class SpeedHistogram:
+    """Sparse bucket counts plus an exact max."""
+
+    __slots__ = ("counts", "max")
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None, max_value: int = 0):
+        self.counts: Dict[int, int] = counts or {}
+        self.max = max_value
+
+    def record(self, value: int, count: int = 1):
+        value = int(value)
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: "SpeedHistogram") -> "SpeedHistogram":
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def quantile(self, q: float) -> int:
+        """Value at quantile ``q`` (0..1): the midpoint of the bucket holding that rank."""
+        total = self.total
+        if not total:
+            return 0
+        rank = max(1, min(total, int(q * total + 0.999999)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                low, high = bucket_bounds(index)
+                return min((low + high - 1) // 2, self.max)
+        return self.max
+
+    def count_above(self, threshold: float) -> int:
+        """Samples above ``threshold`` (buckets are attributed by their midpoint)."""
+        above = 0
+        for index, count in self.counts.items():
+            low, high = bucket_bounds(index)
+            if (low + high - 1) / 2 > threshold:
+                above += count
+        return above
+
+    def mean(self) -> float:
+        total = self.total
+        if not total:
+            return 0.0
+        return sum((sum(bucket_bounds(i)) - 1) / 2 * c for i, c in self.counts.items()) / total
+
+    def to_bytes(self) -> bytes:
+        out = bytearray()
+        _write_varint(self.max, out)
+        previous = 0
+        for index in sorted(self.counts):
+            _write_varint(index - previous, out)
+            _write_varint(self.counts[index], out)
+            previous = index
+        return bytes(out)
+
+    @classmethod
+    def from_bytes(cls, data: Optional[bytes]) -> "SpeedHistogram":
+        if not data:
+            return cls()
+        values = _read_varints(data)
+        histogram = cls(max_value=next(values, 0))
+        index = 0
+        for delta in values:
+            index += delta
+            histogram.counts[index] = next(values)
+        return histogram
@@ -0,0 +1,253 @@
+"""Hub mode: ingest per-device usage deltas pushed by other agents on the LAN."""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+import zlib
+from datetime import date
+from typing import Optional, Dict, Any, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+from ..utils.config import config
+from ..utils.metrics import HUB_QUEUE_DEPTH
+from .storage import Storage, storage
+
+
+# SQLite INTEGER range: larger values cannot be stored (and overflow when bound)
+INT64_MAX = 2 ** 63 - 1
+
+# Per-batch errors caused by the batch's data rather than the database
+_BATCH_ERRORS = (OverflowError, ValueError, TypeError, sqlite3.IntegrityError, sqlite3.InterfaceError)
+
+
+def _is_batch_error(e: Exception) -> bool:
+    # SQLite reports arithmetic overflow (e.g. SUM over huge counters) as an OperationalError
+    return isinstance(e, _BATCH_ERRORS) or (isinstance(e, sqlite3.OperationalError) and "overflow" in str(e))
+
+
+def _database_busy(e: Exception) -> bool:
+    return isinstance(e, sqlite3.OperationalError) and ("locked" in str(e) or "busy" in str(e))
+
+
+class IngestRejected(ValueError):
+    """A batch that can never be applied (answered with 422, not retried by the hub)."""
+
+
+class IngestTooLarge(ValueError):
+    """The decompressed body exceeds the hub's limit (answered with 413)."""
+
+
+class HubBusy(Exception):
+    """The ingest queue is full; the agent should retry after ``retry_after`` seconds."""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"hub busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _decompress(body: bytes, wbits: int, max_size: int) -> bytes:
+    decompressor = zlib.decompressobj(wbits)
+    data = decompressor.decompress(body, max_size + 1)
+    if len(data) > max_size or decompressor.unconsumed_tail:
+        raise IngestTooLarge(f"decompressed body exceeds {max_size} bytes")
+    if not decompressor.eof:
+        raise ValueError("malformed body: truncated compressed stream")
+    return data
+
+
+def _is_int64(value) -> bool:
+    # bool is an int subclass: reject it explicitly
+    return type(value) is int and 0 <= value <= INT64_MAX
+
+
+def decode_ingest_body(body: bytes, content_encoding: str = "", max_size: int = 16 << 20) -> Dict[str, Any]:
+    """Decompress and validate one agent batch. Raises ValueError on bad input.
+
+    At most ``max_size`` bytes are decompressed; a larger body raises
+    ``IngestTooLarge``. Dates are returned in canonical ``YYYY-MM-DD`` form.
+
+    Wire format (JSON, usually gzip-compressed)::
+
+        {"device_id": "...", "os_type": "...", "hostname": "...",
+         "epoch": "...", "seq": 42,
+         "buckets": [["2026-01-31", bytes_sent, bytes_received, peak_speed, samples], ...]}
+    """
+    encoding = (content_encoding or "").lower().strip()
+    try:
+        if encoding == "gzip":
+            body = _decompress(body, 16 + zlib.MAX_WBITS, max_size)
+        elif encoding == "deflate":
+            body = _decompress(body, zlib.MAX_WBITS, max_size)
+        elif encoding not in ("", "identity"):
+            raise ValueError(f"unsupported content encoding: {encoding}")
+        elif len(body) > max_size:
+            raise IngestTooLarge(f"body exceeds {max_size} bytes")
+        payload = json.loads(body)
+    except (OSError, zlib.error, UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"malformed body: {e}") from e
+
+    if not isinstance(payload, dict):
+        raise ValueError("body must be a JSON object")
+    for key in ("device_id", "epoch"):
+        if not isinstance(payload.get(key), str) or not payload[key]:
+            raise ValueError(f"missing {key}")
+    seq = payload.get("seq")
+    if not _is_int64(seq) or seq < 1:
+        raise ValueError("seq must be a positive 64-bit integer")
+
+    buckets = payload.get("buckets")
+    if not isinstance(buckets, list):
+        raise ValueError("buckets must be a list")
+    normalized = []
+    for bucket in buckets:
+        if not isinstance(bucket, list) or len(bucket) != 5:
+            raise ValueError("each bucket is [date, bytes_sent, bytes_received, peak_speed, samples]")
+        if not isinstance(bucket[0], str):
+            raise ValueError("bucket date must be a YYYY-MM-DD string")
+        day = date.fromisoformat(bucket[0]).isoformat()
+        if not all(_is_int64(v) for v in bucket[1:]):
+            raise ValueError("bucket counters must be non-negative 64-bit integers")
+        normalized.append([day, *bucket[1:]])
+
+    return {
+        "device_id": payload["device_id"],
+        "os_type": str(payload.get("os_type") or "unknown"),
+        "hostname": str(payload.get("hostname") or payload["device_id"][:8]),
+        "epoch": payload["epoch"],
+        "seq": seq,
+        "buckets": normalized,
+    }
+
+
+class HubIngestor:
+    """Queue agent batches and group-commit them to SQLite from one writer task.
+
+    Requests wait for the transaction holding their batch to commit, so an OK
+    response means the data is durable. When the queue is full new requests
+    are refused with ``HubBusy`` instead of piling up in memory.
+    """
+
+    def __init__(self, local_storage: Optional[Storage] = None):
+        self.enabled = config.get("hub", "enabled", default=False)
+        self.storage = local_storage or storage
+        self.token = config.get("hub", "token", default="")
+        self.max_pending = config.get("hub", "max_pending", default=1024)
+        self.max_batch = config.get("hub", "max_batch", default=256)
+        self.max_body_bytes = config.get("hub", "max_body_kb", default=1024) * 1024
+        self.max_decoded_bytes = config.get("hub", "max_decoded_kb", default=16384) * 1024
+        self.retry_after = config.get("hub", "retry_after", default=5)
+        self.running = False
+        self._queue: Optional[asyncio.Queue] = None
+        self.stats: Dict[str, Any] = {
+            "applied": 0,
+            "duplicates": 0,
+            "rejected_busy": 0,
+            "rejected_invalid": 0,
+            "commits": 0,
+            "last_commit_ms": None,
+            "last_commit_batches": 0,
+        }
+
+    def get_stats(self) -> dict:
+        """Ingest counters plus current queue depth."""
+        return dict(
+            self.stats,
+            enabled=self.enabled,
+            queued=self._queue.qsize() if self._queue else 0,
+            max_pending=self.max_pending,
+        )
+
+    async def start(self):
+        """Run the single writer task until stopped."""
+        if not self.enabled:
+            return
+        self.running = True
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        logger.info("Hub mode: accepting agent batches on POST /api/ingest")
+
+        while self.running:
+            group = [await self._queue.get()]
+            while len(group) < self.max_batch and not self._queue.empty():
+                group.append(self._queue.get_nowait())
+            await self._commit(group)
+
+    async def _commit(self, group: List[Tuple[dict, asyncio.Future]]):
+        batches = [batch for batch, _ in group]
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            statuses = await loop.run_in_executor(None, self.storage.apply_ingest_batches, batches)
+        except Exception as e:
+            if len(group) > 1 and not _database_busy(e):
+                # Find the offending batch without failing the others: one transaction each
+                logger.warning("Hub ingest group of %d batches failed (%s), applying them one by one",
+                               len(group), e)
+                for item in group:
+                    await self._commit([item])
+                return
+            if _is_batch_error(e):
+                logger.warning("Hub rejected batch %s seq=%s: %s", batches[0]["device_id"], batches[0]["seq"], e)
+                self.stats["rejected_invalid"] += 1
+                future = group[0][1]
+                if not future.done():
+                    future.set_exception(IngestRejected(f"batch cannot be stored: {e}"))
+                return
+            logger.error("Hub ingest write failed (%d batches): %s", len(group), e)
+            for _, future in group:
+                if not future.done():
+                    future.set_exception(HubBusy(self.retry_after))
+            return
+
+        self.stats["commits"] += 1
+        self.stats["last_commit_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        self.stats["last_commit_batches"] = len(group)
+        for (_, future), status in zip(group, statuses):
+            if status == "applied":
+                self.stats["applied"] += 1
+            else:
+                self.stats["duplicates"] += 1
+            if not future.done():
+                future.set_result(status)
+
+    async def submit(self, batch: dict) -> str:
+        """Queue one decoded batch and wait until it is committed.
+
+        Returns "applied" or "duplicate"; raises ``HubBusy`` when the hub is
+        behind (queue full, or the write did not complete in time) and
+        ``IngestRejected`` when the batch itself cannot be stored.
+        """
+        if self._queue is None:
+            raise HubBusy(self.retry_after)
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((batch, future))
+        except asyncio.QueueFull:
+            self.stats["rejected_busy"] += 1
+            raise HubBusy(self.retry_after)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=30)
+        except asyncio.TimeoutError:
+            # Still queued: it will be applied later and the agent's retry
+            # with the same seq will be acknowledged as a duplicate.
+            raise HubBusy(self.retry_after)
+
+    async def stop(self):
+        """Flush whatever is still queued, then stop."""
+        self.running = False
+        if self._queue is None:
+            return
+        group = []
+        while not self._queue.empty():
+            group.append(self._queue.get_nowait())
+        if group:
+            await self._commit(group)
+
+
+# Global hub instance (enabled by `pb serve --hub` or [hub] enabled)
+hub = HubIngestor()
+HUB_QUEUE_DEPTH.set_function(lambda: hub._queue.qsize() if hub._queue else 0)
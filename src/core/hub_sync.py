@@ -0,0 +1,204 @@
+"""Agent-side sync to a PacketBuddy hub (``pb serve --hub``) instead of NeonDB."""
+
+import asyncio
+import gzip
+import json
+import logging
+import time
+import urllib.error
+import urllib.request
+import uuid
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+from ..utils.config import config
+from .storage import Storage, storage
+
+# Resent as-is on the next cycle: credentials or throttling the operator or
+# hub can clear, and (with 5xx) server-side failures. Any other 4xx means the
+# hub will never take this batch, so it is dropped instead of blocking sync.
+RETRY_STATUSES = {401, 403, 408, 429}
+
+
+class HubSync:
+    """Push per-day usage deltas to a hub over HTTP.
+
+    Deltas are built from unsynced raw logs. Every batch carries a per-device
+    sequence number (plus an epoch that changes if the local database is
+    recreated). The batch boundary is persisted before sending, so a retry
+    after a lost response resends the identical batch under the same number
+    and the hub acknowledges it as a duplicate instead of counting it twice.
+    A batch the hub rejects for good (400, 413, 422, ...) is skipped and
+    recorded in ``hub_last_dropped``, so later batches still get through.
+    """
+
+    def __init__(self, hub_url: Optional[str] = None, local_storage: Optional[Storage] = None):
+        self.hub_url = (hub_url if hub_url is not None else config.hub_url).rstrip("/")
+        self.enabled = bool(self.hub_url)
+        self.storage = local_storage or storage
+        self.token = config.get("sync", "hub_token", default="")
+        self.interval = config.get("sync", "hub_interval", default=30)
+        self.batch_size = config.get("sync", "hub_batch_size", default=5000)
+        self.timeout = 10
+        self.running = False
+        self._retry_at = 0.0
+        self.stats: Dict[str, Any] = {
+            "target": self.hub_url,
+            "pushes": 0,
+            "duplicates": 0,
+            "busy": 0,
+            "errors": 0,
+            "dropped": 0,
+            "last_push_at": None,
+            "last_push_ms": None,
+            "last_push_bytes": 0,
+            "last_seq": None,
+        }
+
+    def get_stats(self) -> dict:
+        return dict(self.stats, enabled=self.enabled, interval=self.interval)
+
+    def _epoch(self) -> str:
+        state = self.storage.get_state("hub_epoch")
+        if state.get("value_text"):
+            return state["value_text"]
+        epoch = uuid.uuid4().hex
+        self.storage.set_state("hub_epoch", value_text=epoch)
+        return epoch
+
+    def _next_batch(self) -> Tuple[Optional[dict], Optional[int]]:
+        """Return the pending batch (retry) or cut a new one from unsynced logs."""
+        pending = self.storage.get_state("hub_pending")
+        if pending.get("value_int"):
+            seq = int(pending["value_text"])
+            buckets, max_id = self.storage.get_unsynced_buckets(max_id=pending["value_int"])
+        else:
+            buckets, max_id = self.storage.get_unsynced_buckets(limit=self.batch_size)
+            if max_id is None:
+                return None, None
+            seq = (self.storage.get_state("hub_seq").get("value_int") or 0) + 1
+            self.storage.set_state("hub_pending", value_text=str(seq), value_int=max_id)
+
+        return {
+            "device_id": self.storage.device_id,
+            "os_type": self.storage.os_type,
+            "hostname": self.storage.hostname,
+            "epoch": self._epoch(),
+            "seq": seq,
+            "buckets": buckets,
+        }, max_id
+
+    def _post(self, body: bytes) -> Tuple[int, dict, Optional[str]]:
+        """Blocking HTTP POST (run in an executor). Returns (status, json, Retry-After)."""
+        request = urllib.request.Request(
+            f"{self.hub_url}/api/ingest",
+            data=body,
+            method="POST",
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+        )
+        if self.token:
+            request.add_header("Authorization", f"Bearer {self.token}")
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.status, json.loads(response.read() or b"{}"), None
+        except urllib.error.HTTPError as e:
+            return e.code, {}, e.headers.get("Retry-After")
+
+    async def push(self, max_batches: int = 10) -> int:
+        """Send up to ``max_batches`` batches; returns how many were acknowledged."""
+        if not self.enabled or time.monotonic() < self._retry_at:
+            return 0
+
+        loop = asyncio.get_running_loop()
+        acked = 0
+        for _ in range(max_batches):
+            batch, max_id = self._next_batch()
+            if batch is None:
+                break
+
+            body = gzip.compress(json.dumps(batch, separators=(",", ":")).encode(), compresslevel=6)
+            started = time.perf_counter()
+            try:
+                status, result, retry_after = await loop.run_in_executor(None, self._post, body)
+            except (urllib.error.URLError, OSError) as e:
+                self.stats["errors"] += 1
+                logger.warning("Hub push failed (%s): %s", self.hub_url, e)
+                break
+
+            if status == 200:
+                self._advance(batch["seq"], max_id)
+                self.stats["pushes"] += 1
+                if result.get("status") == "duplicate":
+                    self.stats["duplicates"] += 1
+                self.stats["last_push_at"] = datetime.utcnow().isoformat()
+                self.stats["last_push_ms"] = round((time.perf_counter() - started) * 1000, 1)
+                self.stats["last_push_bytes"] = len(body)
+                self.stats["last_seq"] = batch["seq"]
+                acked += 1
+            elif status == 503:
+                self.stats["busy"] += 1
+                delay = int(retry_after) if retry_after and retry_after.isdigit() else self.interval
+                self._retry_at = time.monotonic() + delay
+                logger.info("Hub busy, retrying in %ds", delay)
+                break
+            elif status in RETRY_STATUSES or status >= 500:
+                self.stats["errors"] += 1
+                logger.warning("Hub rejected batch seq=%d with HTTP %d", batch["seq"], status)
+                break
+            else:
+                self._drop(batch, max_id, status)
+
+        return acked
+
+    def _advance(self, seq: int, max_id: int):
+        """Move past the pending batch: its logs count as synced and the next batch takes ``seq + 1``."""
+        self.storage.mark_logs_synced_upto(max_id)
+        self.storage.set_state("hub_seq", value_int=seq)
+        self.storage.set_state("hub_pending", value_text=None, value_int=None)
+
+    def _drop(self, batch: dict, max_id: int, status: int):
+        """Skip a batch the hub will never accept, keeping a record of what it held."""
+        buckets = batch["buckets"]
+        dropped = {
+            "seq": batch["seq"],
+            "status": status,
+            "max_log_id": max_id,
+            "days": [bucket[0] for bucket in buckets],
+            "bytes_sent": sum(bucket[1] for bucket in buckets),
+            "bytes_received": sum(bucket[2] for bucket in buckets),
+            "at": datetime.utcnow().isoformat(),
+        }
+        self._advance(batch["seq"], max_id)
+        self.storage.set_state("hub_last_dropped", value_text=json.dumps(dropped))
+        self.stats["dropped"] += 1
+        self.stats["last_dropped"] = dropped
+        logger.error("Hub refused batch seq=%d with HTTP %d; dropped %d day bucket(s) (%d bytes) so sync can continue",
+                     batch["seq"], status, len(buckets), dropped["bytes_sent"] + dropped["bytes_received"])
+
+    async def start(self):
+        """Push loop."""
+        if not self.enabled:
+            return
+        self.running = True
+        logger.info("Syncing to hub %s every %ds", self.hub_url, self.interval)
+        while self.running:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.push()
+            except Exception as e:
+                logger.error("Hub sync error: %s", e)
+
+    async def stop(self):
+        """Stop and make a final push attempt."""
+        self.running = False
+        if self.enabled:
+            try:
+                await self.push()
+            except Exception as e:
+                logger.error("Final hub push error: %s", e)
+
+
+# Global hub sync instance (active when [sync] hub_url / PB_HUB_URL is set)
+hub_sync = HubSync()
@@ -0,0 +1,258 @@
+"""Usage trends, seasonality and an end-of-month forecast (``/api/insights``).
+
+The daily history is loaded once, aggregated in SQLite, into dense NumPy
+arrays with one slot per calendar day (days without data are masked out).
+The last few weeks of hourly rows become a 24-slot profile. Every statistic
+is then a vectorized pass over those arrays (cumulative sums, ``bincount``,
+a least-squares fit), so years of history cost a few milliseconds.
+
+All figures are total bytes (sent + received) per day unless noted.
+"""
+
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import numpy as np
+
+from ..utils.cost_calculator import calculate_cost
+from ..utils.formatters import format_bytes
+from .storage import Storage
+
+EPOCH = date(1970, 1, 1)
+WEEKDAYS = ("Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun")
+
+# Windows (days) of the individual statistics
+TREND_DAYS = 28
+SEASONALITY_WEEKS = 8
+HOURLY_DAYS = 28
+# |weekly change| below this percentage counts as a flat trend
+FLAT_PERCENT = 5.0
+# z-score of the forecast's 80% interval
+INTERVAL_Z = 1.2816
+
+
+@dataclass
+class DailySeries:
+    """Dense per-day arrays from ``start`` to ``end`` (inclusive)."""
+    start: date
+    sent: np.ndarray
+    received: np.ndarray
+    tracked: np.ndarray  # bool: the day has a stored row
+
+    @property
+    def total(self) -> np.ndarray:
+        return self.sent + self.received
+
+    @property
+    def end(self) -> date:
+        return self.start + timedelta(days=len(self.sent) - 1)
+
+    def index(self, day: date) -> int:
+        return (day - self.start).days
+
+
+def load_daily(store: Storage, until: date, all_devices: bool = False) -> DailySeries:
+    """Every stored day up to ``until`` (inclusive), as dense arrays ending on ``until``.
+
+    Per-device rows are summed per date here with ``bincount``.
+    """
+    dates, sent, received = store.get_daily_columns(until, all_devices)
+    days = np.array(dates, dtype="datetime64[D]").astype(np.int64)
+    last = (until - EPOCH).days
+    first = int(days.min()) if len(days) else last
+    size = last - first + 1
+    slots = days - first
+    return DailySeries(
+        EPOCH + timedelta(days=first),
+        np.bincount(slots, weights=np.array(sent, dtype=np.float64), minlength=size),
+        np.bincount(slots, weights=np.array(received, dtype=np.float64), minlength=size),
+        np.bincount(slots, minlength=size) > 0,
+    )
+
+
+def hourly_profile(store: Storage, until: date, all_devices: bool = False, days: int = HOURLY_DAYS) -> np.ndarray:
+    """Average bytes per hour of day (0-23) over the ``days`` before ``until``, per day with data."""
+    since = datetime.combine(until - timedelta(days=days), datetime.min.time())
+    rows = store.get_series_buckets("hourly", since, datetime.combine(until, datetime.min.time()), 3600,
+                                    all_devices)
+    data = np.array(rows, dtype=np.int64).reshape(-1, 4)
+    if not len(data):
+        return np.zeros(24)
+    hours = (data[:, 0] // 3600) % 24
+    active_days = len(np.unique(data[:, 0] // 86400))
+    return np.bincount(hours, weights=data[:, 1] + data[:, 2], minlength=24) / active_days
+
+
+def trailing_mean(values: np.ndarray, tracked: np.ndarray, window: int) -> np.ndarray:
+    """Mean over each ``window``-day window ending at every slot, counting tracked days only."""
+    sums = np.concatenate(([0.0], np.cumsum(values)))
+    counts = np.concatenate(([0], np.cumsum(tracked)))
+    lo = np.maximum(np.arange(1, len(values) + 1) - window, 0)
+    hi = np.arange(1, len(values) + 1)
+    n = counts[hi] - counts[lo]
+    return np.where(n > 0, (sums[hi] - sums[lo]) / np.maximum(n, 1), np.nan)
+
+
+def _window_sum(values: np.ndarray, lo: int, hi: int) -> float:
+    # Sum of values[lo:hi], treating slots before the series start as zero
+    return float(values[max(lo, 0):max(hi, 0)].sum())
+
+
+def _change(current: float, previous: float) -> dict:
+    return {
+        "current": int(current),
+        "previous": int(previous),
+        "change_percent": round((current - previous) / previous * 100, 1) if previous else None,
+    }
+
+
+def weekday_profile(series: DailySeries, last: int, weeks: int = SEASONALITY_WEEKS) -> tuple:
+    """``(mean per weekday, days per weekday)`` over the ``weeks`` weeks ending at slot ``last``."""
+    lo = max(last + 1 - weeks * 7, 0)
+    total, tracked = series.total[lo:last + 1], series.tracked[lo:last + 1]
+    weekdays = (np.arange(lo, last + 1) + series.start.weekday()) % 7
+    counts = np.bincount(weekdays[tracked], minlength=7)
+    sums = np.bincount(weekdays[tracked], weights=total[tracked], minlength=7)
+    return np.where(counts > 0, sums / np.maximum(counts, 1), np.nan), counts
+
+
+def linear_trend(series: DailySeries, last: int, days: int = TREND_DAYS) -> dict:
+    """Least-squares slope of daily totals over the ``days`` ending at slot ``last``."""
+    lo = max(last + 1 - days, 0)
+    x = np.arange(lo, last + 1)[series.tracked[lo:last + 1]]
+    y = series.total[lo:last + 1][series.tracked[lo:last + 1]]
+    if len(x) < 7:
+        return {"days": int(len(x)), "slope_bytes_per_day": None, "percent_per_week": None, "direction": None}
+    slope, _intercept = np.polyfit(x.astype(np.float64), y, 1)
+    mean = y.mean()
+    weekly = slope * 7 / mean * 100 if mean else 0.0
+    direction = "flat" if abs(weekly) < FLAT_PERCENT else ("up" if weekly > 0 else "down")
+    return {
+        "days": int(len(x)),
+        "slope_bytes_per_day": int(slope),
+        "percent_per_week": round(float(weekly), 1),
+        "direction": direction,
+    }
+
+
+def month_forecast(series: DailySeries, today: date, profile: np.ndarray) -> dict:
+    """Projected total for today's month: actual days so far plus a weekday-aware estimate for the rest.
+
+    Today counts as actual once it has already used more than its expected
+    share. The 80% interval widens with the square root of the days left,
+    from the spread of recent days around their weekday means.
+    """
+    t = series.index(today)
+    month_start = today.replace(day=1)
+    month_end = (month_start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    total = series.total
+
+    recent = max(t - SEASONALITY_WEEKS * 7, 0)
+    tracked = series.tracked[recent:t]
+    fallback = total[recent:t][tracked].mean() if tracked.any() else 0.0
+    expected_by_weekday = np.where(np.isnan(profile), fallback, profile)
+
+    weekdays = (np.arange(recent, t) + series.start.weekday()) % 7
+    residuals = (total[recent:t] - expected_by_weekday[weekdays])[tracked]
+    spread = float(residuals.std()) if len(residuals) > 1 else 0.0
+
+    completed = _window_sum(total, series.index(month_start), t)
+    remaining = (month_end - today).days + 1  # including today
+    remaining_weekdays = (np.arange(remaining) + today.weekday()) % 7
+    expected = expected_by_weekday[remaining_weekdays]
+    expected[0] = max(expected[0], total[t])
+    forecast = completed + float(expected.sum())
+    margin = INTERVAL_Z * spread * np.sqrt(remaining)
+    so_far = completed + float(total[t])
+
+    return {
+        "month": month_start.strftime("%Y-%m"),
+        "to_date": int(so_far),
+        "forecast": int(forecast),
+        "low": int(max(forecast - margin, so_far)),
+        "high": int(forecast + margin),
+        "days_remaining": remaining - 1,
+        "cost": calculate_cost(int(forecast)),
+    }
+
+
+def build_insights(store: Storage, today: Optional[date] = None, all_devices: bool = False,
+                   series_days: int = 90, raw: bool = False) -> dict:
+    """Moving averages, week/month deltas, trend, seasonality and an end-of-month forecast."""
+    today = today or date.today()
+    series = load_daily(store, today, all_devices)
+    total, tracked = series.total, series.tracked
+    t = series.index(today)
+    yesterday = t - 1  # windows below end on the last complete day
+
+    ma7 = trailing_mean(total, tracked, 7)
+    ma30 = trailing_mean(total, tracked, 30)
+    profile, profile_days = weekday_profile(series, yesterday)
+    hourly = hourly_profile(store, today, all_devices)
+
+    # Month to date (complete days) against the same days of the previous month
+    month_start = today.replace(day=1)
+    previous_start = (month_start - timedelta(days=1)).replace(day=1)
+    elapsed = min(today.day - 1, (month_start - previous_start).days)
+    mtd_lo = series.index(month_start)
+    previous_lo = series.index(previous_start)
+
+    shown = slice(max(t + 1 - series_days, 0), t + 1)
+    with np.errstate(invalid="ignore"):
+        weekday_index = profile / np.nanmean(profile) if not np.all(np.isnan(profile)) else profile
+
+    def clean(values: np.ndarray, digits: int = 0) -> list:
+        return [None if np.isnan(v) else (round(float(v), digits) if digits else int(v)) for v in values]
+
+    peak_weekday = int(np.nanargmax(profile)) if profile_days.any() else None
+    quiet_weekday = int(np.nanargmin(profile)) if profile_days.any() else None
+    body = {
+        "as_of": today.isoformat(),
+        "first_date": series.start.isoformat() if tracked.any() else None,
+        "days_tracked": int(tracked.sum()),
+        "moving_average": {
+            "7d": clean(ma7[yesterday:yesterday + 1])[0] if yesterday >= 0 else None,
+            "30d": clean(ma30[yesterday:yesterday + 1])[0] if yesterday >= 0 else None,
+            "series": {
+                "dates": [(series.start + timedelta(days=i)).isoformat() for i in range(shown.start, shown.stop)],
+                "total": clean(np.where(tracked[shown], total[shown], np.nan)),
+                "ma7": clean(ma7[shown]),
+                "ma30": clean(ma30[shown]),
+            },
+        },
+        "week_over_week": _change(_window_sum(total, t - 7, t), _window_sum(total, t - 14, t - 7)),
+        "month_over_month": {
+            "days_compared": elapsed,
+            **_change(_window_sum(total, mtd_lo, mtd_lo + elapsed),
+                      _window_sum(total, previous_lo, previous_lo + elapsed)),
+        },
+        "trend": linear_trend(series, yesterday),
+        "forecast": month_forecast(series, today, profile),
+        "seasonality": {
+            "weekday": {
+                "labels": list(WEEKDAYS),
+                "average": clean(profile),
+                "index": clean(weekday_index, 2),
+                "days": profile_days.tolist(),
+            },
+            "busiest_weekday": WEEKDAYS[peak_weekday] if peak_weekday is not None else None,
+            "quietest_weekday": WEEKDAYS[quiet_weekday] if quiet_weekday is not None else None,
+            "hourly": {
+                "average": clean(hourly),
+                "peak_hour": int(hourly.argmax()) if hourly.any() else None,
+            },
+        },
+    }
+    if not raw:
+        forecast = body["forecast"]
+        average = body["moving_average"]
+        body["human_readable"] = {
+            "ma7": format_bytes(average["7d"] or 0),
+            "ma30": format_bytes(average["30d"] or 0),
+            "last_7_days": format_bytes(body["week_over_week"]["current"]),
+            "forecast": format_bytes(forecast["forecast"]),
+            "forecast_range": f"{format_bytes(forecast['low'])} - {format_bytes(forecast['high'])}",
+            "to_date": format_bytes(forecast["to_date"]),
+        }
+    return body
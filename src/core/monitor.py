@@ -3,12 +3,19 @@ import logging
 import psutil
 import subprocess
 import platform
+import time
+from dataclasses import asdict
 from datetime import datetime
 from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 from ..utils.config import config
+from ..utils.metrics import (
+    BATCH_FLUSH_ROWS, BATCH_FLUSH_SECONDS, INTERFACE_BYTES, MONITOR_BYTES, MONITOR_LOOP_SECONDS,
+    MONITOR_MISSED_TICKS, MONITOR_PENDING_WRITES, MONITOR_SAMPLES, MONITOR_SKIPPED_SAMPLES, MONITOR_SPEED,
+)
+from .anomaly import anomalies
 from .storage import storage
 
 
@@ -200,77 +207,91 @@ class NetworkMonitor:
     
     async def _monitor_loop(self):
         """Main monitoring loop."""
+        last_tick = None
         while self.running:
+            started = time.perf_counter()
+            if last_tick is not None:
+                late = started - last_tick - self.poll_interval
+                if late >= self.poll_interval:
+                    MONITOR_MISSED_TICKS.inc(int(late // self.poll_interval))
+            last_tick = started
+
             try:
-                # Get current counters
-                current_sent, current_received = self._get_network_counters()
-                
-                # Calculate deltas
-                delta_sent = current_sent - self.last_sent
-                delta_received = current_received - self.last_received
-                
-                # Detect counter reset (system sleep/resume or counter overflow)
-                if delta_sent < 0 or delta_received < 0:
-                    # Counter reset detected, skip this sample
-                    self.last_sent = current_sent
-                    self.last_received = current_received
-                    await asyncio.sleep(self.poll_interval)
-                    continue
-                
-                # Anomaly detection: skip unreasonably large deltas
-                if delta_sent > self.max_delta or delta_received > self.max_delta:
-                    # Likely a system issue, skip
-                    self.last_sent = current_sent
-                    self.last_received = current_received
-                    await asyncio.sleep(self.poll_interval)
-                    continue
-                
-                # Update current speed (bytes per second)
-                self.current_speed_sent = delta_sent / self.poll_interval
-                self.current_speed_received = delta_received / self.poll_interval
-                
-                # Add to pending writes buffer
-                if delta_sent > 0 or delta_received > 0:
-                    self.pending_writes.append({
-                        "bytes_sent": delta_sent,
-                        "bytes_received": delta_received,
-                        "speed": int(self.current_speed_sent + self.current_speed_received),
-                        "timestamp": datetime.now()
-                    })
-                
-                # Update last values
-                self.last_sent = current_sent
-                self.last_received = current_received
-                
-                # Periodically update absolute counters in DB for next startup catch-up
-                # We do this every 10 samples to avoid too much DB noise,
-                # but only if there's actually data to persist
-                if self.pending_writes and len(self.pending_writes) % 10 == 0:
-                    storage.set_state("last_abs_sent", value_int=current_sent)
-                    storage.set_state("last_abs_received", value_int=current_received)
-                
+                self._poll_once()
             except Exception as e:
                 logger.error("Monitor loop error: %s", e)
+            MONITOR_LOOP_SECONDS.observe(time.perf_counter() - started)
             
             await asyncio.sleep(self.poll_interval)
+
+    def _poll_once(self):
+        """Read the interface counters once and buffer the delta."""
+        # Get current counters
+        current_sent, current_received = self._get_network_counters()
+        
+        # Calculate deltas
+        delta_sent = current_sent - self.last_sent
+        delta_received = current_received - self.last_received
+        
+        # Detect counter reset (system sleep/resume or counter overflow)
+        if delta_sent < 0 or delta_received < 0:
+            # Counter reset detected, skip this sample
+            MONITOR_SKIPPED_SAMPLES.inc(reason="counter_reset")
+            self.last_sent = current_sent
+            self.last_received = current_received
+            return
+        
+        # Skip unreasonably large deltas (counter glitches, not traffic)
+        if delta_sent > self.max_delta or delta_received > self.max_delta:
+            # Likely a system issue, skip
+            MONITOR_SKIPPED_SAMPLES.inc(reason="max_delta")
+            self.last_sent = current_sent
+            self.last_received = current_received
+            return
+        
+        # Update current speed (bytes per second)
+        self.current_speed_sent = delta_sent / self.poll_interval
+        self.current_speed_received = delta_received / self.poll_interval
+        now = datetime.now()
+        
+        # Flag unusual bursts against the running baseline (O(1) per sample)
+        if anomalies.enabled:
+            anomalies.observe(now, self.poll_interval, delta_sent, delta_received)
+        
+        # Add to pending writes buffer
+        if delta_sent > 0 or delta_received > 0:
+            MONITOR_SAMPLES.inc()
+            MONITOR_BYTES.inc(delta_sent, direction="sent")
+            MONITOR_BYTES.inc(delta_received, direction="received")
+            self.pending_writes.append({
+                "bytes_sent": delta_sent,
+                "bytes_received": delta_received,
+                "speed": int(self.current_speed_sent + self.current_speed_received),
+                "timestamp": now
+            })
+        
+        # Update last values
+        self.last_sent = current_sent
+        self.last_received = current_received
+        
+        # Periodically update absolute counters in DB for next startup catch-up
+        # We do this every 10 samples to avoid too much DB noise,
+        # but only if there's actually data to persist
+        if self.pending_writes and len(self.pending_writes) % 10 == 0:
+            storage.set_state("last_abs_sent", value_int=current_sent)
+            storage.set_state("last_abs_received", value_int=current_received)
     
     async def _batch_write_loop(self):
         """Batch write pending data to SQLite."""
         while self.running:
             await asyncio.sleep(self.batch_interval)
             
-            if not self.pending_writes:
+            if not self.pending_writes and not anomalies.pending:
                 continue
             
             try:
-                # Flush pending writes to database
-                for entry in self.pending_writes:
-                    storage.insert_usage(
-                        bytes_sent=entry["bytes_sent"],
-                        bytes_received=entry["bytes_received"],
-                        speed=entry["speed"],
-                        timestamp=entry["timestamp"]
-                    )
+                # Flush pending writes to database (single transaction)
+                self._flush()
                 
                 # Clear buffer
                 self.pending_writes.clear()
@@ -278,22 +299,35 @@ class NetworkMonitor:
             except Exception as e:
                 logger.error("Batch write error: %s", e)
     
+    def _flush(self):
+        """Write the buffered samples in one transaction, recording flush metrics.
+
+        Closed anomaly events are written alongside; if that fails they are kept
+        for the next flush (the samples are not written twice).
+        """
+        if self.pending_writes:
+            with BATCH_FLUSH_SECONDS.time():
+                storage.insert_usage_batch(self.pending_writes)
+            BATCH_FLUSH_ROWS.observe(len(self.pending_writes))
+        events = anomalies.drain()
+        if events:
+            try:
+                storage.insert_anomaly_events([asdict(event) for event in events])
+            except Exception as e:
+                logger.error("Anomaly event write error: %s", e)
+                anomalies.pending[:0] = events
+
     async def stop(self):
         """Stop monitoring gracefully."""
         self.running = False
+        anomalies.close_all()
         
         # Flush any remaining writes
-        if self.pending_writes:
-            for entry in self.pending_writes:
-                try:
-                    storage.insert_usage(
-                        bytes_sent=entry["bytes_sent"],
-                        bytes_received=entry["bytes_received"],
-                        speed=entry["speed"],
-                        timestamp=entry["timestamp"]
-                    )
-                except Exception as e:
-                    logger.error("Final flush error: %s", e)
+        if self.pending_writes or anomalies.pending:
+            try:
+                self._flush()
+            except Exception as e:
+                logger.error("Final flush error: %s", e)
         
         self.pending_writes.clear()
     
@@ -304,3 +338,17 @@ class NetworkMonitor:
 
 # Global monitor instance
 monitor = NetworkMonitor()
+
+
+def _interface_bytes() -> dict:
+    values = {}
+    for name, counters in psutil.net_io_counters(pernic=True).items():
+        values[(name, "sent")] = counters.bytes_sent
+        values[(name, "received")] = counters.bytes_recv
+    return values
+
+
+MONITOR_PENDING_WRITES.set_function(lambda: len(monitor.pending_writes))
+MONITOR_SPEED.set_function(lambda: {("sent",): monitor.current_speed_sent,
+                                    ("received",): monitor.current_speed_received})
+INTERFACE_BYTES.set_function(_interface_bytes)
@@ -0,0 +1,55 @@
+"""Speed percentiles and threshold time for any range, from stored histograms."""
+
+from datetime import datetime, timedelta
+from typing import Optional
+
+from ..utils.formatters import format_speed
+from .storage import Storage
+
+QUANTILES = (("p50", 0.50), ("p90", 0.90), ("p95", 0.95), ("p99", 0.99))
+
+# Megabits per second -> bytes per second
+MBPS = 125_000
+
+
+def hour_bounds(start: datetime, end: datetime) -> tuple:
+    """Widen ``[start, end)`` to whole hours, the resolution histograms are stored at."""
+    start = start.replace(minute=0, second=0, microsecond=0)
+    floored = end.replace(minute=0, second=0, microsecond=0)
+    return start, floored if floored == end else floored + timedelta(hours=1)
+
+
+def build_percentiles(store: Storage, start: datetime, end: datetime, poll_interval: float = 1,
+                      threshold_mbps: Optional[float] = None, all_devices: bool = False,
+                      raw: bool = False) -> dict:
+    """Distribution of per-sample speeds (bytes/s) over ``[start, end)``.
+
+    Only samples that moved traffic are recorded, so the figures describe the
+    active time. Values are accurate to about 6% (the histogram bucket width);
+    ``max`` is exact.
+    """
+    start, end = hour_bounds(start, end)
+    histogram = store.get_speed_histogram(start, end, all_devices=all_devices)
+
+    body = {
+        "from": start.isoformat(),
+        "to": end.isoformat(),
+        "samples": histogram.total,
+        "active_seconds": round(histogram.total * poll_interval, 1),
+        **{name: histogram.quantile(q) for name, q in QUANTILES},
+        "max": histogram.max,
+        "mean": round(histogram.mean()),
+    }
+    if threshold_mbps is not None:
+        above = histogram.count_above(threshold_mbps * MBPS)
+        body["above_threshold"] = {
+            "threshold_mbps": threshold_mbps,
+            "samples": above,
+            "seconds": round(above * poll_interval, 1),
+            "percent": round(above / histogram.total * 100, 2) if histogram.total else 0,
+        }
+    if not raw:
+        body["human_readable"] = {
+            name: format_speed(body[name]) for name in ("p50", "p90", "p95", "p99", "max", "mean")
+        }
+    return body
@@ -0,0 +1,300 @@
+"""Versioned NeonDB schema and the SQL used against it.
+
+Migrations are applied in order by ``NeonSync`` at startup and recorded in
+``schema_migrations``. Each version runs in its own transaction under an
+advisory lock, so several devices starting at once cannot race.
+
+Schema v2 (free-tier layout):
+
+- ``devices.device_key``: 4-byte surrogate key used by every usage row
+  instead of repeating the 36-char UUID text.
+- ``daily_usage``: one row per device-day, with peak speed and sample count.
+- ``monthly_usage``: one row per device-month, ``month`` is a DATE (1st of month).
+- ``yearly_usage``: one row per device-year with 12-slot columnar arrays,
+  so lifetime totals read a handful of rows.
+
+The v1 tables are copied, not dropped: the database is shared, and devices
+still running an older release keep writing to them. ``LEGACY_TABLES`` are
+removed only on request (``pb storage cleanup --neon --drop-legacy``).
+
+Schema v3 adds server-side routines so retention is one round-trip:
+
+- ``pb_storage_stats()``: row counts and table sizes as one JSONB value.
+- ``pb_maintenance(daily_keep_months, monthly_keep_months)``: folds daily
+  rows past retention into their month and monthly rows past retention into
+  the yearly arrays, deletes them, and returns the counts merged with
+  ``pb_storage_stats()``.
+"""
+
+# Arbitrary constant for pg_advisory_xact_lock during migrations
+MIGRATION_LOCK_ID = 7373_0001
+
+REMOTE_MIGRATIONS = {
+    # v1: original text-keyed layout (kept so pre-versioning databases line up)
+    1: [
+        """
+        CREATE TABLE IF NOT EXISTS devices (
+            device_id TEXT PRIMARY KEY,
+            os_type TEXT NOT NULL,
+            hostname TEXT NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS daily_aggregates (
+            device_id TEXT NOT NULL,
+            date DATE NOT NULL,
+            bytes_sent BIGINT NOT NULL,
+            bytes_received BIGINT NOT NULL,
+            PRIMARY KEY (device_id, date),
+            FOREIGN KEY (device_id) REFERENCES devices(device_id)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS monthly_aggregates (
+            device_id TEXT NOT NULL,
+            month TEXT NOT NULL,
+            bytes_sent BIGINT NOT NULL,
+            bytes_received BIGINT NOT NULL,
+            PRIMARY KEY (device_id, month),
+            FOREIGN KEY (device_id) REFERENCES devices(device_id)
+        )
+        """,
+    ],
+    # v2: integer device keys, DATE months, peak/sample columns, yearly rollup
+    2: [
+        """
+        ALTER TABLE devices
+        ADD COLUMN IF NOT EXISTS device_key INTEGER GENERATED BY DEFAULT AS IDENTITY
+        """,
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_devices_device_key ON devices(device_key)",
+        """
+        CREATE TABLE IF NOT EXISTS daily_usage (
+            device_key INTEGER NOT NULL REFERENCES devices(device_key),
+            day DATE NOT NULL,
+            bytes_sent BIGINT NOT NULL,
+            bytes_received BIGINT NOT NULL,
+            peak_speed BIGINT NOT NULL DEFAULT 0,
+            samples INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (device_key, day)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_daily_usage_day ON daily_usage(day)",
+        """
+        CREATE TABLE IF NOT EXISTS monthly_usage (
+            device_key INTEGER NOT NULL REFERENCES devices(device_key),
+            month DATE NOT NULL,
+            bytes_sent BIGINT NOT NULL,
+            bytes_received BIGINT NOT NULL,
+            peak_speed BIGINT NOT NULL DEFAULT 0,
+            samples INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (device_key, month)
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS yearly_usage (
+            device_key INTEGER NOT NULL REFERENCES devices(device_key),
+            year SMALLINT NOT NULL,
+            monthly_sent BIGINT[] NOT NULL,
+            monthly_received BIGINT[] NOT NULL,
+            monthly_peak BIGINT[] NOT NULL,
+            monthly_samples INTEGER[] NOT NULL,
+            PRIMARY KEY (device_key, year)
+        )
+        """,
+        """
+        INSERT INTO daily_usage (device_key, day, bytes_sent, bytes_received)
+        SELECT d.device_key, a.date, a.bytes_sent, a.bytes_received
+        FROM daily_aggregates a
+        JOIN devices d USING (device_id)
+        ON CONFLICT DO NOTHING
+        """,
+        """
+        INSERT INTO monthly_usage (device_key, month, bytes_sent, bytes_received)
+        SELECT d.device_key, to_date(a.month, 'YYYY-MM'), a.bytes_sent, a.bytes_received
+        FROM monthly_aggregates a
+        JOIN devices d USING (device_id)
+        ON CONFLICT DO NOTHING
+        """,
+        """
+        INSERT INTO yearly_usage (device_key, year, monthly_sent, monthly_received, monthly_peak, monthly_samples)
+        SELECT k.device_key, k.year,
+               array_agg(COALESCE(m.bytes_sent, 0) ORDER BY g.n),
+               array_agg(COALESCE(m.bytes_received, 0) ORDER BY g.n),
+               array_agg(COALESCE(m.peak_speed, 0) ORDER BY g.n),
+               array_agg(COALESCE(m.samples, 0) ORDER BY g.n)
+        FROM (SELECT DISTINCT device_key, EXTRACT(YEAR FROM month)::SMALLINT AS year FROM monthly_usage) k
+        CROSS JOIN generate_series(1, 12) AS g(n)
+        LEFT JOIN monthly_usage m
+               ON m.device_key = k.device_key AND m.month = make_date(k.year, g.n, 1)
+        GROUP BY k.device_key, k.year
+        ON CONFLICT DO NOTHING
+        """,
+    ],
+    # v3: single-call maintenance and size stats
+    3: [
+        """
+        CREATE OR REPLACE FUNCTION pb_storage_stats() RETURNS JSONB
+        LANGUAGE sql STABLE AS $$
+            SELECT jsonb_build_object(
+                'device_count', (SELECT COUNT(*) FROM devices),
+                'daily_count', (SELECT COUNT(*) FROM daily_usage),
+                'monthly_count', (SELECT COUNT(*) FROM monthly_usage),
+                'yearly_count', (SELECT COUNT(*) FROM yearly_usage),
+                'total_bytes', (SELECT COALESCE(SUM(pg_total_relation_size(format('%I.%I', schemaname, tablename))), 0)
+                                FROM pg_tables WHERE schemaname = 'public'),
+                'tables', (SELECT COALESCE(jsonb_object_agg(tablename, jsonb_build_object(
+                                'size_bytes', pg_relation_size(format('%I.%I', schemaname, tablename)),
+                                'total_bytes', pg_total_relation_size(format('%I.%I', schemaname, tablename))
+                           )), '{}'::jsonb)
+                           FROM pg_tables WHERE schemaname = 'public'),
+                'measured_at', now()
+            )
+        $$
+        """,
+        """
+        CREATE OR REPLACE FUNCTION pb_maintenance(daily_keep_months INTEGER, monthly_keep_months INTEGER)
+        RETURNS JSONB
+        LANGUAGE plpgsql AS $$
+        DECLARE
+            daily_cutoff DATE := date_trunc('month', CURRENT_DATE - make_interval(months => daily_keep_months))::date;
+            monthly_cutoff DATE := date_trunc('month', CURRENT_DATE - make_interval(months => monthly_keep_months))::date;
+            daily_rolled INTEGER;
+            daily_deleted INTEGER;
+            monthly_rolled INTEGER;
+            monthly_deleted INTEGER;
+        BEGIN
+            -- Whole months of daily rows past retention are folded into monthly_usage
+            INSERT INTO monthly_usage (device_key, month, bytes_sent, bytes_received, peak_speed, samples)
+            SELECT device_key, date_trunc('month', day)::date,
+                   SUM(bytes_sent), SUM(bytes_received), MAX(peak_speed), SUM(samples)
+            FROM daily_usage
+            WHERE day < daily_cutoff
+            GROUP BY 1, 2
+            ON CONFLICT (device_key, month) DO UPDATE SET
+                bytes_sent = GREATEST(monthly_usage.bytes_sent, EXCLUDED.bytes_sent),
+                bytes_received = GREATEST(monthly_usage.bytes_received, EXCLUDED.bytes_received),
+                peak_speed = GREATEST(monthly_usage.peak_speed, EXCLUDED.peak_speed),
+                samples = GREATEST(monthly_usage.samples, EXCLUDED.samples);
+            GET DIAGNOSTICS daily_rolled = ROW_COUNT;
+
+            DELETE FROM daily_usage WHERE day < daily_cutoff;
+            GET DIAGNOSTICS daily_deleted = ROW_COUNT;
+
+            -- Monthly rows past retention are folded into the yearly arrays
+            INSERT INTO yearly_usage (device_key, year, monthly_sent, monthly_received, monthly_peak, monthly_samples)
+            SELECT k.device_key, k.year,
+                   array_agg(COALESCE(m.bytes_sent, 0) ORDER BY g.n),
+                   array_agg(COALESCE(m.bytes_received, 0) ORDER BY g.n),
+                   array_agg(COALESCE(m.peak_speed, 0) ORDER BY g.n),
+                   array_agg(COALESCE(m.samples, 0) ORDER BY g.n)
+            FROM (SELECT DISTINCT device_key, EXTRACT(YEAR FROM month)::SMALLINT AS year
+                  FROM monthly_usage WHERE month < monthly_cutoff) k
+            CROSS JOIN generate_series(1, 12) AS g(n)
+            LEFT JOIN monthly_usage m
+                   ON m.device_key = k.device_key
+                  AND m.month = make_date(k.year, g.n, 1)
+                  AND m.month < monthly_cutoff
+            GROUP BY k.device_key, k.year
+            ON CONFLICT (device_key, year) DO UPDATE SET
+                monthly_sent = (SELECT array_agg(GREATEST(n, o) ORDER BY i)
+                                FROM unnest(EXCLUDED.monthly_sent, yearly_usage.monthly_sent) WITH ORDINALITY AS t(n, o, i)),
+                monthly_received = (SELECT array_agg(GREATEST(n, o) ORDER BY i)
+                                    FROM unnest(EXCLUDED.monthly_received, yearly_usage.monthly_received) WITH ORDINALITY AS t(n, o, i)),
+                monthly_peak = (SELECT array_agg(GREATEST(n, o) ORDER BY i)
+                                FROM unnest(EXCLUDED.monthly_peak, yearly_usage.monthly_peak) WITH ORDINALITY AS t(n, o, i)),
+                monthly_samples = (SELECT array_agg(GREATEST(n, o) ORDER BY i)
+                                   FROM unnest(EXCLUDED.monthly_samples, yearly_usage.monthly_samples) WITH ORDINALITY AS t(n, o, i));
+            GET DIAGNOSTICS monthly_rolled = ROW_COUNT;
+
+            DELETE FROM monthly_usage WHERE month < monthly_cutoff;
+            GET DIAGNOSTICS monthly_deleted = ROW_COUNT;
+
+            RETURN jsonb_build_object(
+                'daily_cutoff', daily_cutoff,
+                'monthly_cutoff', monthly_cutoff,
+                'daily_rolled_up', daily_rolled,
+                'daily_deleted', daily_deleted,
+                'yearly_rolled_up', monthly_rolled,
+                'monthly_deleted', monthly_deleted
+            ) || pb_storage_stats();
+        END
+        $$
+        """,
+    ],
+}
+
+REMOTE_SCHEMA_VERSION = max(REMOTE_MIGRATIONS)
+
+# Tables holding synced data (for VACUUM and stats)
+REMOTE_TABLES = ("devices", "daily_usage", "monthly_usage", "yearly_usage")
+# v1 layout, left in place by the v2 migration (raw logs are no longer synced)
+LEGACY_TABLES = ("daily_aggregates", "monthly_aggregates", "usage_logs")
+
+REGISTER_DEVICE_SQL = """
+    INSERT INTO devices (device_id, os_type, hostname)
+    VALUES ($1, $2, $3)
+    ON CONFLICT (device_id) DO UPDATE SET
+        os_type = EXCLUDED.os_type,
+        hostname = EXCLUDED.hostname
+    RETURNING device_key
+"""
+
+DAILY_UPSERT_SQL = """
+    INSERT INTO daily_usage (device_key, day, bytes_sent, bytes_received, peak_speed, samples)
+    VALUES ($1, $2, $3, $4, $5, $6)
+    ON CONFLICT (device_key, day) DO UPDATE SET
+        bytes_sent = EXCLUDED.bytes_sent,
+        bytes_received = EXCLUDED.bytes_received,
+        peak_speed = EXCLUDED.peak_speed,
+        samples = EXCLUDED.samples
+"""
+
+# NULL peak/samples mean the month's daily rows are no longer (all) held
+# locally: a new row gets 0, an existing one keeps its stored values. The
+# parameters are read directly because EXCLUDED already has the 0 default.
+MONTHLY_UPSERT_SQL = """
+    INSERT INTO monthly_usage (device_key, month, bytes_sent, bytes_received, peak_speed, samples)
+    VALUES ($1, $2, $3, $4, COALESCE($5::BIGINT, 0), COALESCE($6::INTEGER, 0))
+    ON CONFLICT (device_key, month) DO UPDATE SET
+        bytes_sent = EXCLUDED.bytes_sent,
+        bytes_received = EXCLUDED.bytes_received,
+        peak_speed = COALESCE($5::BIGINT, monthly_usage.peak_speed),
+        samples = COALESCE($6::INTEGER, monthly_usage.samples)
+"""
+
+# NULL slots mean "not known locally" and keep the stored value, so months
+# already pruned from the local database are never zeroed out remotely.
+YEARLY_UPSERT_SQL = """
+    INSERT INTO yearly_usage (device_key, year, monthly_sent, monthly_received, monthly_peak, monthly_samples)
+    SELECT $1, $2,
+           (SELECT array_agg(COALESCE(v, 0) ORDER BY i) FROM unnest($3::BIGINT[]) WITH ORDINALITY AS t(v, i)),
+           (SELECT array_agg(COALESCE(v, 0) ORDER BY i) FROM unnest($4::BIGINT[]) WITH ORDINALITY AS t(v, i)),
+           (SELECT array_agg(COALESCE(v, 0) ORDER BY i) FROM unnest($5::BIGINT[]) WITH ORDINALITY AS t(v, i)),
+           (SELECT array_agg(COALESCE(v, 0) ORDER BY i) FROM unnest($6::INTEGER[]) WITH ORDINALITY AS t(v, i))
+    ON CONFLICT (device_key, year) DO UPDATE SET
+        monthly_sent = (SELECT array_agg(COALESCE(n, o) ORDER BY i)
+                        FROM unnest($3::BIGINT[], yearly_usage.monthly_sent) WITH ORDINALITY AS t(n, o, i)),
+        monthly_received = (SELECT array_agg(COALESCE(n, o) ORDER BY i)
+                            FROM unnest($4::BIGINT[], yearly_usage.monthly_received) WITH ORDINALITY AS t(n, o, i)),
+        monthly_peak = (SELECT array_agg(COALESCE(n, o) ORDER BY i)
+                        FROM unnest($5::BIGINT[], yearly_usage.monthly_peak) WITH ORDINALITY AS t(n, o, i)),
+        monthly_samples = (SELECT array_agg(COALESCE(n, o) ORDER BY i)
+                           FROM unnest($6::INTEGER[], yearly_usage.monthly_samples) WITH ORDINALITY AS t(n, o, i))
+"""
+
+GLOBAL_TODAY_SQL = """
+    SELECT
+        SUM(bytes_sent) as total_sent,
+        SUM(bytes_received) as total_received
+    FROM daily_usage
+    WHERE day = $1
+"""
+
+# One row per device-year: a decade of history for ten devices is 100 rows
+GLOBAL_LIFETIME_SQL = """
+    SELECT
+        SUM(s) as total_sent,
+        SUM(r) as total_received
+    FROM yearly_usage y, unnest(y.monthly_sent, y.monthly_received) AS u(s, r)
+"""
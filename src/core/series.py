@@ -0,0 +1,130 @@
+"""Fixed-size chart series: storage tier selection plus LTTB / min-max downsampling."""
+
+import math
+from datetime import datetime
+from typing import Optional
+
+import numpy as np
+
+from ..utils.config import config
+from .storage import Storage
+
+# Nominal resolution of each storage tier in seconds
+TIER_SECONDS = {
+    "raw": max(config.get("monitoring", "poll_interval", default=1), 1),
+    "hourly": 3600,
+    "daily": 86400,
+}
+METRICS = ("total", "sent", "received", "speed", "peak_speed")
+METHODS = ("lttb", "minmax")
+
+# Source buckets fetched from SQLite per output point
+OVERSAMPLE = 4
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n: int) -> np.ndarray:
+    """Indices of ``n`` points chosen by Largest-Triangle-Three-Buckets.
+
+    First and last points are always kept; each inner bucket keeps the point
+    forming the largest triangle with the previously kept point and the
+    next bucket's centroid. The per-bucket area search is vectorized.
+    """
+    size = len(x)
+    if n >= size:
+        return np.arange(size)
+    if n < 3:
+        return np.array([0, size - 1])[:n]
+
+    edges = np.linspace(1, size - 1, n - 1).astype(np.int64)
+    selected = np.empty(n, dtype=np.int64)
+    selected[0], selected[-1] = 0, size - 1
+    a = 0
+    for i in range(n - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        next_lo = edges[i + 1]
+        next_hi = edges[i + 2] if i + 2 < n - 1 else size
+        avg_x = x[next_lo:next_hi].mean()
+        avg_y = y[next_lo:next_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        selected[i + 1] = a
+    return selected
+
+
+def minmax(y: np.ndarray, n: int) -> np.ndarray:
+    """Indices keeping the minimum and maximum of ``n // 2`` equal-count buckets."""
+    size = len(y)
+    if n >= size:
+        return np.arange(size)
+    buckets = max(n // 2, 1)
+    segment = (np.arange(size) * buckets) // size
+    # Sort by (segment, value): each segment's first entry is its min, last its max
+    order = np.lexsort((y, segment))
+    starts = np.searchsorted(segment, np.arange(buckets))
+    ends = np.append(starts[1:], size) - 1
+    return np.unique(np.concatenate([order[starts], order[ends]]))
+
+
+def choose_tier(store: Storage, since: datetime, until: datetime, points: int,
+                all_devices: bool = False) -> str:
+    """Coarsest tier that still yields ``points`` buckets over the span.
+
+    A tier is only used if its retained data reaches back to ``since``
+    (raw logs and hourly rows are pruned earlier than daily rows); spans too
+    short for the aggregates to fill the chart use the finest such tier.
+    """
+    bound = since.isoformat(" ")
+    starts = {}
+
+    def covers(tier: str) -> bool:
+        if tier not in starts:
+            starts[tier] = store.get_tier_start(tier, all_devices)
+        return starts[tier] is not None and str(starts[tier]) <= bound
+
+    span = (until - since).total_seconds()
+    if span / TIER_SECONDS["daily"] >= points:
+        return "daily"
+    if span / TIER_SECONDS["hourly"] >= points:
+        return "hourly" if covers("hourly") or not covers("daily") else "daily"
+    for tier in ("raw", "hourly", "daily"):
+        if covers(tier):
+            return tier
+    # Nothing reaches back that far yet: everything there is, at full detail
+    return "raw"
+
+
+def build_series(store: Storage, since: datetime, until: datetime, points: int = 500,
+                 metric: str = "total", method: str = "lttb", tier: Optional[str] = None,
+                 all_devices: bool = False) -> dict:
+    """Downsampled series of at most ``points`` points for ``[since, until)``."""
+    tier = tier or choose_tier(store, since, until, points, all_devices)
+    resolution = TIER_SECONDS[tier]
+    span = max((until - since).total_seconds(), resolution)
+    # Pre-aggregate in SQL to a multiple of the tier resolution
+    width = resolution * max(1, math.ceil(span / (points * OVERSAMPLE) / resolution))
+
+    rows = store.get_series_buckets(tier, since, until, width, all_devices)
+    data = np.array(rows, dtype=np.int64).reshape(-1, 4)
+    x = data[:, 0]
+    sent, received, peak = data[:, 1], data[:, 2], data[:, 3]
+    y = {
+        "total": sent + received,
+        "sent": sent,
+        "received": received,
+        "speed": (sent + received) / width,
+        "peak_speed": peak,
+    }[metric]
+
+    keep = lttb(x.astype(np.float64), y.astype(np.float64), points) if method == "lttb" else minmax(y, points)
+    values = y[keep]
+    return {
+        "from": since.isoformat(),
+        "to": until.isoformat(),
+        "metric": metric,
+        "method": method,
+        "tier": tier,
+        "bucket_seconds": int(width),
+        "source_points": int(len(x)),
+        "timestamps": x[keep].astype("datetime64[s]").astype(str).tolist(),
+        "values": np.round(values, 2).tolist() if values.dtype.kind == "f" else values.tolist(),
+    }
@@ -2,15 +2,40 @@
 
 import logging
 import sqlite3
+import threading
+import time
+import uuid
 from datetime import datetime, date, timedelta
 from pathlib import Path
-from typing import List, Dict, Tuple, Optional
+from typing import Callable, List, Dict, Tuple, Optional, Iterator
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
 
 from ..utils.config import config
+from ..utils.metrics import STORAGE_DATA_VERSION, STORAGE_QUERY_SECONDS, instrument_methods
 from .device import get_device_info
+from .histogram import SpeedHistogram
+
+# Merge one day's write into a period row. SET expressions see the old row,
+# so each peak day is replaced only when its figure strictly increases.
+PERIOD_STATS_UPSERT = """
+    INSERT INTO period_stats (scope, period, bytes_sent, bytes_received, days_tracked, first_day,
+                              last_day, peak_speed, peak_speed_day, peak_day, peak_day_bytes)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(scope, period) DO UPDATE SET
+        bytes_sent = bytes_sent + excluded.bytes_sent,
+        bytes_received = bytes_received + excluded.bytes_received,
+        days_tracked = days_tracked + excluded.days_tracked,
+        first_day = MIN(first_day, excluded.first_day),
+        last_day = MAX(last_day, excluded.last_day),
+        peak_speed_day = CASE WHEN excluded.peak_speed > peak_speed
+                              THEN excluded.peak_speed_day ELSE peak_speed_day END,
+        peak_speed = MAX(peak_speed, excluded.peak_speed),
+        peak_day = CASE WHEN excluded.peak_day_bytes > peak_day_bytes
+                        THEN excluded.peak_day ELSE peak_day END,
+        peak_day_bytes = MAX(peak_day_bytes, excluded.peak_day_bytes)
+"""
 
 
 class Storage:
@@ -19,7 +44,77 @@ class Storage:
     def __init__(self, db_path: Optional[Path] = None):
         self.db_path = db_path or config.db_path
         self.device_id, self.os_type, self.hostname = get_device_info()
+        # Bumped on every write that changes aggregates; drives HTTP ETags.
+        # The epoch keeps validators from colliding across restarts.
+        self.data_version = 0
+        self.data_modified_at = time.time()
+        self._data_epoch = uuid.uuid4().hex[:8]
+        # Row counts behind get_database_stats(): counted in full once, then
+        # adjusted by the write/cleanup paths. None means "recount on next read".
+        # Writers hold the lock across their transaction so a recount never
+        # sees a commit whose delta is applied again afterwards.
+        self._stats: Optional[dict] = None
+        self._stats_lock = threading.Lock()
+        # Called after each committed usage write with {device_id: {day: bytes}} (see add_write_listener)
+        self._write_listeners: List[Callable[[Dict[str, Dict[str, int]], int], None]] = []
+        # Sequence of usage writes, taken under _stats_lock inside the write's transaction
+        self.write_seq = 0
         self._init_database()
+        # Bumped (and persisted) only when a write reaches a day before today or
+        # aggregates are pruned: reports over closed ranges are cached on it.
+        self.history_version = self.get_state("history_version").get("value_int") or 0
+        self._history_epoch = self.get_state("history_epoch").get("value_text")
+        if not self._history_epoch:
+            self._history_epoch = uuid.uuid4().hex[:8]
+            self.set_state("history_epoch", value_text=self._history_epoch)
+
+    def bump_data_version(self):
+        """Record that aggregate data changed."""
+        self.data_version += 1
+        self.data_modified_at = time.time()
+
+    @property
+    def data_version_tag(self) -> str:
+        """Opaque, process-unique token for the current data version."""
+        return f"{self._data_epoch}.{self.data_version}"
+
+    @property
+    def history_version_tag(self) -> str:
+        """Token that changes only when history (days before today) changes; stable across restarts."""
+        return f"{self._history_epoch}.{self.history_version}"
+
+    def add_write_listener(self, listener: Callable[[Dict[str, Dict[str, int]], int], None]):
+        """Call ``listener({device_id: {ISO day: bytes}}, seq)`` after every committed usage write.
+
+        The mapping holds what the write added (sent + received) per device and
+        day, so listeners can keep running totals without querying. ``seq`` is
+        the write's ``write_seq``: listeners run after the commit, so a total
+        read in between (see ``get_cycle_usage``) may already include it.
+        Listeners run on the writer's thread and must be quick.
+        """
+        self._write_listeners.append(listener)
+
+    def _next_write_seq(self) -> int:
+        # Caller holds _stats_lock, inside the write's transaction
+        self.write_seq += 1
+        return self.write_seq
+
+    def _notify_writes(self, deltas: Dict[str, Dict[str, int]], seq: int):
+        for listener in self._write_listeners:
+            try:
+                listener(deltas, seq)
+            except Exception:
+                logger.warning("Usage write listener failed", exc_info=True)
+
+    def _touch_history(self, cursor, oldest: Optional[date] = None):
+        """Bump ``history_version`` if a write reached before today (``None``: always)."""
+        if oldest is not None and oldest >= date.today():
+            return
+        self.history_version += 1
+        cursor.execute("""
+            INSERT OR REPLACE INTO system_state (key, value_int, updated_at)
+            VALUES ('history_version', ?, CURRENT_TIMESTAMP)
+        """, (self.history_version,))
     
     @contextmanager
     def get_connection(self):
@@ -93,7 +188,103 @@ class Storage:
                 cursor.execute("ALTER TABLE daily_aggregates ADD COLUMN peak_speed INTEGER DEFAULT 0")
             except sqlite3.OperationalError:
                 pass # Already exists
+
+            # Migration: Add samples (count of per-poll entries) for existing databases
+            try:
+                cursor.execute("ALTER TABLE daily_aggregates ADD COLUMN samples INTEGER DEFAULT 0")
+            except sqlite3.OperationalError:
+                pass # Already exists
             
+            # Hourly aggregates (between raw logs and daily rows; outlives raw logs)
+            hourly_exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hourly_aggregates'"
+            ).fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS hourly_aggregates (
+                    device_id TEXT NOT NULL,
+                    hour TIMESTAMP NOT NULL,
+                    bytes_sent INTEGER NOT NULL,
+                    bytes_received INTEGER NOT NULL,
+                    peak_speed INTEGER DEFAULT 0,
+                    samples INTEGER DEFAULT 0,
+                    PRIMARY KEY (device_id, hour),
+                    FOREIGN KEY (device_id) REFERENCES devices(device_id)
+                )
+            """)
+            if not hourly_exists:
+                # Migration: backfill from whatever raw logs are still retained
+                interval = max(config.get("monitoring", "poll_interval", default=1), 1)
+                cursor.execute("""
+                    INSERT INTO hourly_aggregates
+                        (device_id, hour, bytes_sent, bytes_received, peak_speed, samples)
+                    SELECT device_id, strftime('%Y-%m-%d %H:00:00', timestamp),
+                           SUM(bytes_sent), SUM(bytes_received),
+                           MAX(bytes_sent + bytes_received) / ?, COUNT(*)
+                    FROM usage_logs
+                    GROUP BY device_id, strftime('%Y-%m-%d %H:00:00', timestamp)
+                """, (interval,))
+
+            # Hour-of-week accumulators: one row per (week, weekday*24 + hour) slot,
+            # so any N-week heatmap sums at most 168*N rows
+            heatmap_exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'weekly_heatmap'"
+            ).fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS weekly_heatmap (
+                    device_id TEXT NOT NULL,
+                    week_start DATE NOT NULL,
+                    slot INTEGER NOT NULL,
+                    bytes_sent INTEGER NOT NULL,
+                    bytes_received INTEGER NOT NULL,
+                    samples INTEGER DEFAULT 0,
+                    PRIMARY KEY (device_id, week_start, slot),
+                    FOREIGN KEY (device_id) REFERENCES devices(device_id)
+                )
+            """)
+            if not heatmap_exists:
+                # Migration: backfill from the hourly tier (Monday = weekday 0)
+                cursor.execute("""
+                    INSERT INTO weekly_heatmap
+                        (device_id, week_start, slot, bytes_sent, bytes_received, samples)
+                    SELECT device_id,
+                           date(hour, '-' || ((CAST(strftime('%w', hour) AS INTEGER) + 6) % 7) || ' days'),
+                           ((CAST(strftime('%w', hour) AS INTEGER) + 6) % 7) * 24
+                               + CAST(strftime('%H', hour) AS INTEGER),
+                           bytes_sent, bytes_received, samples
+                    FROM hourly_aggregates
+                """)
+
+            # Per-hour and per-day histograms of sample speeds (see core/histogram.py)
+            histograms_exist = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'speed_histograms'"
+            ).fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS speed_histograms (
+                    device_id TEXT NOT NULL,
+                    resolution TEXT NOT NULL,
+                    bucket TEXT NOT NULL,
+                    histogram BLOB NOT NULL,
+                    PRIMARY KEY (device_id, resolution, bucket),
+                    FOREIGN KEY (device_id) REFERENCES devices(device_id)
+                )
+            """)
+            if not histograms_exist:
+                # Migration: rebuild from whatever raw logs are still retained
+                interval = max(config.get("monitoring", "poll_interval", default=1), 1)
+                backfill: Dict[tuple, SpeedHistogram] = {}
+                for device_id, timestamp, total in cursor.execute(
+                    "SELECT device_id, timestamp, bytes_sent + bytes_received FROM usage_logs"
+                ):
+                    speed = total // interval
+                    if speed <= 0:
+                        continue
+                    for key in ((device_id, "hour", timestamp[:13] + ":00:00"), (device_id, "day", timestamp[:10])):
+                        backfill.setdefault(key, SpeedHistogram()).record(speed)
+                cursor.executemany(
+                    "INSERT INTO speed_histograms (device_id, resolution, bucket, histogram) VALUES (?, ?, ?, ?)",
+                    [(*key, histogram.to_bytes()) for key, histogram in backfill.items()],
+                )
+
             # Monthly aggregates
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS monthly_aggregates (
@@ -124,6 +315,60 @@ class Storage:
                 )
             """)
             
+            # Hub mode: last applied ingest sequence per remote agent
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS ingest_sequences (
+                    device_id TEXT PRIMARY KEY,
+                    epoch TEXT NOT NULL,
+                    last_seq INTEGER NOT NULL,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            
+            # Unusual traffic bursts flagged while sampling (see core/anomaly.py)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS anomaly_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    device_id TEXT NOT NULL,
+                    direction TEXT NOT NULL,
+                    started_at TIMESTAMP NOT NULL,
+                    ended_at TIMESTAMP NOT NULL,
+                    samples INTEGER NOT NULL,
+                    bytes INTEGER NOT NULL,
+                    peak_speed INTEGER NOT NULL,
+                    baseline_speed INTEGER NOT NULL,
+                    peak_score REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE INDEX IF NOT EXISTS idx_anomaly_events_started
+                ON anomaly_events(started_at)
+            """)
+
+            # Per-year and per-month running statistics (see _update_period_stats)
+            period_stats_exist = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'period_stats'"
+            ).fetchone()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS period_stats (
+                    scope TEXT NOT NULL,
+                    period TEXT NOT NULL,
+                    bytes_sent INTEGER NOT NULL DEFAULT 0,
+                    bytes_received INTEGER NOT NULL DEFAULT 0,
+                    days_tracked INTEGER NOT NULL DEFAULT 0,
+                    first_day TEXT,
+                    last_day TEXT,
+                    peak_speed INTEGER NOT NULL DEFAULT 0,
+                    peak_speed_day TEXT,
+                    peak_day TEXT,
+                    peak_day_bytes INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (scope, period)
+                )
+            """)
+            if not period_stats_exist:
+                # Migration: fold the existing daily aggregates
+                self._rebuild_period_stats(cursor)
+
             # Register this device
             cursor.execute("""
                 INSERT OR REPLACE INTO devices (device_id, os_type, hostname)
@@ -134,9 +379,12 @@ class Storage:
         """Insert a usage log entry."""
         if timestamp is None:
             timestamp = datetime.now()
+        hour = timestamp.replace(minute=0, second=0, microsecond=0)
         
-        with self.get_connection() as conn:
+        with self._stats_lock, self.get_connection() as conn:
+            seq = self._next_write_seq()
             cursor = conn.cursor()
+            new_rows = self._new_bucket_rows(cursor, {hour}, {timestamp.date()}, {timestamp.strftime("%Y-%m")})
             cursor.execute("""
                 INSERT INTO usage_logs (device_id, timestamp, bytes_sent, bytes_received)
                 VALUES (?, ?, ?, ?)
@@ -144,15 +392,50 @@ class Storage:
             
             # Update daily aggregate
             today = timestamp.date()
+            self._touch_history(cursor, today)
+            existing_days = self._existing_days(cursor, self.device_id, [today])
             cursor.execute("""
-                INSERT INTO daily_aggregates (device_id, date, bytes_sent, bytes_received, peak_speed)
-                VALUES (?, ?, ?, ?, ?)
+                INSERT INTO daily_aggregates (device_id, date, bytes_sent, bytes_received, peak_speed, samples)
+                VALUES (?, ?, ?, ?, ?, 1)
                 ON CONFLICT(device_id, date) DO UPDATE SET
                     bytes_sent = bytes_sent + excluded.bytes_sent,
                     bytes_received = bytes_received + excluded.bytes_received,
-                    peak_speed = MAX(peak_speed, excluded.peak_speed)
+                    peak_speed = MAX(peak_speed, excluded.peak_speed),
+                    samples = samples + 1
             """, (self.device_id, today, bytes_sent, bytes_received, speed))
+            self._update_period_stats(cursor, self.device_id,
+                                      {today.isoformat(): (bytes_sent, bytes_received, speed)}, existing_days)
             
+            # Update hourly aggregate
+            cursor.execute("""
+                INSERT INTO hourly_aggregates (device_id, hour, bytes_sent, bytes_received, peak_speed, samples)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT(device_id, hour) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received,
+                    peak_speed = MAX(peak_speed, excluded.peak_speed),
+                    samples = samples + 1
+            """, (self.device_id, hour, bytes_sent, bytes_received, speed))
+
+            # Catch-up entries carry no speed and stay out of the distribution
+            if speed > 0:
+                histogram = SpeedHistogram()
+                histogram.record(speed)
+                self._merge_speed_histograms(cursor, {
+                    ("hour", str(hour)): histogram,
+                    ("day", today.isoformat()): SpeedHistogram().merge(histogram),
+                })
+
+            # Update hour-of-week accumulator
+            cursor.execute("""
+                INSERT INTO weekly_heatmap (device_id, week_start, slot, bytes_sent, bytes_received, samples)
+                VALUES (?, ?, ?, ?, ?, 1)
+                ON CONFLICT(device_id, week_start, slot) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received,
+                    samples = samples + 1
+            """, (self.device_id, *self.heatmap_key(timestamp), bytes_sent, bytes_received))
+
             # Update monthly aggregate
             month = timestamp.strftime("%Y-%m")
             cursor.execute("""
@@ -162,6 +445,313 @@ class Storage:
                     bytes_sent = bytes_sent + excluded.bytes_sent,
                     bytes_received = bytes_received + excluded.bytes_received
             """, (self.device_id, month, bytes_sent, bytes_received))
+            self._logs_added(1, timestamp, timestamp, new_rows)
+        self.bump_data_version()
+        self._notify_writes({self.device_id: {timestamp.date().isoformat(): bytes_sent + bytes_received}}, seq)
+
+    def insert_usage_batch(self, entries: List[Dict]):
+        """Insert buffered monitor samples in one transaction.
+
+        ``entries`` are dicts with bytes_sent, bytes_received, speed and
+        timestamp. Hourly/daily/monthly aggregates are pre-summed per bucket,
+        so a flush costs one upsert per touched hour/day, not one per sample.
+        """
+        if not entries:
+            return
+
+        hourly: Dict[datetime, list] = {}
+        daily: Dict[date, list] = {}
+        monthly: Dict[str, list] = {}
+        histograms: Dict[tuple, SpeedHistogram] = {}
+        for entry in entries:
+            ts = entry["timestamp"]
+            hour = ts.replace(minute=0, second=0, microsecond=0)
+            for bucket in (hourly.setdefault(hour, [0, 0, 0, 0]),
+                           daily.setdefault(ts.date(), [0, 0, 0, 0])):
+                bucket[0] += entry["bytes_sent"]
+                bucket[1] += entry["bytes_received"]
+                bucket[2] = max(bucket[2], entry.get("speed", 0))
+                bucket[3] += 1
+            if entry.get("speed", 0) > 0:
+                for key in (("hour", str(hour)), ("day", ts.date().isoformat())):
+                    histograms.setdefault(key, SpeedHistogram()).record(entry["speed"])
+            m = monthly.setdefault(ts.strftime("%Y-%m"), [0, 0])
+            m[0] += entry["bytes_sent"]
+            m[1] += entry["bytes_received"]
+
+        with self._stats_lock, self.get_connection() as conn:
+            seq = self._next_write_seq()
+            cursor = conn.cursor()
+            new_rows = self._new_bucket_rows(cursor, hourly.keys(), daily.keys(), monthly.keys())
+            cursor.executemany("""
+                INSERT INTO usage_logs (device_id, timestamp, bytes_sent, bytes_received)
+                VALUES (?, ?, ?, ?)
+            """, [(self.device_id, e["timestamp"], e["bytes_sent"], e["bytes_received"]) for e in entries])
+
+            cursor.executemany("""
+                INSERT INTO hourly_aggregates (device_id, hour, bytes_sent, bytes_received, peak_speed, samples)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(device_id, hour) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received,
+                    peak_speed = MAX(peak_speed, excluded.peak_speed),
+                    samples = samples + excluded.samples
+            """, [(self.device_id, hour, *values) for hour, values in hourly.items()])
+
+            existing_days = self._existing_days(cursor, self.device_id, daily)
+            cursor.executemany("""
+                INSERT INTO daily_aggregates (device_id, date, bytes_sent, bytes_received, peak_speed, samples)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(device_id, date) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received,
+                    peak_speed = MAX(peak_speed, excluded.peak_speed),
+                    samples = samples + excluded.samples
+            """, [(self.device_id, day, *values) for day, values in daily.items()])
+            self._update_period_stats(cursor, self.device_id, {
+                day.isoformat(): values[:3] for day, values in daily.items()
+            }, existing_days)
+
+            self._merge_speed_histograms(cursor, histograms)
+            self._touch_history(cursor, min(daily))
+
+            # Hour-of-week slots line up with hourly buckets: reuse their sums
+            cursor.executemany("""
+                INSERT INTO weekly_heatmap (device_id, week_start, slot, bytes_sent, bytes_received, samples)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(device_id, week_start, slot) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received,
+                    samples = samples + excluded.samples
+            """, [(self.device_id, *self.heatmap_key(hour), sent, received, samples)
+                  for hour, (sent, received, _, samples) in hourly.items()])
+
+            cursor.executemany("""
+                INSERT INTO monthly_aggregates (device_id, month, bytes_sent, bytes_received)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(device_id, month) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received
+            """, [(self.device_id, month, *values) for month, values in monthly.items()])
+            timestamps = [e["timestamp"] for e in entries]
+            self._logs_added(len(entries), min(timestamps), max(timestamps), new_rows)
+        self.bump_data_version()
+        self._notify_writes({self.device_id: {day.isoformat(): values[0] + values[1] for day, values in daily.items()}},
+                            seq)
+
+    def _merge_speed_histograms(self, cursor, updates: Dict[tuple, SpeedHistogram]):
+        """Add ``{(resolution, bucket): histogram}`` into this device's stored histograms."""
+        for resolution in ("hour", "day"):
+            buckets = [bucket for res, bucket in updates if res == resolution]
+            if not buckets:
+                continue
+            cursor.execute(f"""
+                SELECT bucket, histogram FROM speed_histograms
+                WHERE device_id = ? AND resolution = ? AND bucket IN ({','.join('?' * len(buckets))})
+            """, (self.device_id, resolution, *buckets))
+            for bucket, blob in cursor.fetchall():
+                updates[(resolution, bucket)].merge(SpeedHistogram.from_bytes(blob))
+        if not updates:
+            return
+        cursor.executemany("""
+            INSERT OR REPLACE INTO speed_histograms (device_id, resolution, bucket, histogram)
+            VALUES (?, ?, ?, ?)
+        """, [(self.device_id, resolution, bucket, histogram.to_bytes())
+              for (resolution, bucket), histogram in updates.items()])
+
+    # -- period statistics -------------------------------------------------------
+
+    @staticmethod
+    def _existing_days(cursor, device_id: str, days) -> set:
+        """Which of these days already have a daily row for the device (ISO strings)."""
+        days = [str(day) for day in days]
+        if not days:
+            return set()
+        cursor.execute(
+            f"SELECT date FROM daily_aggregates WHERE device_id = ? AND date IN ({','.join('?' * len(days))})",
+            (device_id, *days),
+        )
+        return {row[0] for row in cursor.fetchall()}
+
+    def _update_period_stats(self, cursor, device_id: str, deltas: Dict[str, tuple], existing: set):
+        """Fold per-day write deltas ``{day: (sent, received, peak)}`` into ``period_stats``.
+
+        Runs after the daily upserts of the same transaction; ``existing`` holds
+        the days the device had before them. Each touched day updates its year
+        and month rows for the device and for the merged ('') scope. Day totals
+        only grow, so the peak day stays correct by comparing the touched day's
+        new total against the stored peak.
+        """
+        rows = []
+        for day, (sent, received, peak) in deltas.items():
+            device_total = cursor.execute(
+                "SELECT bytes_sent + bytes_received FROM daily_aggregates WHERE device_id = ? AND date = ?",
+                (device_id, day),
+            ).fetchone()[0]
+            merged_total, devices_on_day = cursor.execute("""
+                SELECT SUM(bytes_sent + bytes_received), COUNT(*) FROM daily_aggregates
+                WHERE device_id IN (SELECT device_id FROM devices) AND date = ?
+            """, (day,)).fetchone()
+            new_day = day not in existing
+            for scope, total, new in ((device_id, device_total, new_day),
+                                      ("", merged_total, new_day and devices_on_day == 1)):
+                for period in (day[:4], day[:7]):
+                    rows.append((scope, period, sent, received, int(new), day, day, peak, day, day, total))
+        cursor.executemany(PERIOD_STATS_UPSERT, rows)
+
+    def _rebuild_period_stats(self, cursor, through_year: Optional[int] = None):
+        """Recompute ``period_stats`` from daily aggregates (years up to ``through_year``; None: all)."""
+        if through_year is None:
+            cursor.execute("DELETE FROM period_stats")
+            rows = cursor.execute("""
+                SELECT device_id, date, bytes_sent, bytes_received, peak_speed
+                FROM daily_aggregates ORDER BY date
+            """).fetchall()
+        else:
+            cursor.execute("DELETE FROM period_stats WHERE substr(period, 1, 4) <= ?", (str(through_year),))
+            rows = cursor.execute("""
+                SELECT device_id, date, bytes_sent, bytes_received, peak_speed
+                FROM daily_aggregates WHERE date < ? ORDER BY date
+            """, (f"{through_year + 1}-01-01",)).fetchall()
+
+        stats: Dict[tuple, list] = {}
+
+        def add(scope, day, sent, received, peak):
+            total = sent + received
+            for period in (day[:4], day[:7]):
+                row = stats.get((scope, period))
+                if row is None:
+                    stats[(scope, period)] = [sent, received, 1, day, day, peak, day, day, total]
+                    continue
+                row[0] += sent
+                row[1] += received
+                row[2] += 1
+                row[4] = day
+                if peak > row[5]:
+                    row[5], row[6] = peak, day
+                if total > row[8]:
+                    row[7], row[8] = day, total
+
+        merged = None
+        for device_id, day, sent, received, peak in rows:
+            day = str(day)
+            add(device_id, day, sent, received, peak)
+            if merged is not None and merged[0] != day:
+                add("", *merged)
+                merged = None
+            if merged is None:
+                merged = [day, 0, 0, 0]
+            merged[1] += sent
+            merged[2] += received
+            merged[3] = max(merged[3], peak)
+        if merged is not None:
+            add("", *merged)
+
+        cursor.executemany("""
+            INSERT INTO period_stats (scope, period, bytes_sent, bytes_received, days_tracked, first_day,
+                                      last_day, peak_speed, peak_speed_day, peak_day, peak_day_bytes)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """, [(*key, *values) for key, values in stats.items()])
+
+    def get_period_stats(self, months: bool, first: str = "", last: str = "9999-99",
+                         all_devices: bool = False) -> List[Dict]:
+        """Stored year (``months=False``) or month rows with ``first <= period <= last``, oldest first."""
+        with self.get_connection() as conn:
+            rows = conn.execute("""
+                SELECT period, bytes_sent, bytes_received, days_tracked, first_day, last_day,
+                       peak_speed, peak_speed_day, peak_day, peak_day_bytes
+                FROM period_stats
+                WHERE scope = ? AND period BETWEEN ? AND ? AND length(period) = ?
+                ORDER BY period ASC
+            """, ("" if all_devices else self.device_id, first, last, 7 if months else 4)).fetchall()
+        return [dict(row) for row in rows]
+
+    @staticmethod
+    def heatmap_key(moment: datetime) -> Tuple[date, int]:
+        """``(week_start, slot)`` of a local time: the week's Monday and weekday*24 + hour."""
+        weekday = moment.weekday()
+        return moment.date() - timedelta(days=weekday), weekday * 24 + moment.hour
+
+    # -- running database stats ------------------------------------------------
+
+    def _new_bucket_rows(self, cursor, hours, days, months) -> Optional[Dict[str, int]]:
+        """How many of these hourly/daily/monthly keys have no row yet for this device."""
+        if self._stats is None:
+            return None
+        new_rows = {}
+        for stat, table, column, keys in (
+            ("hourly_aggregates_count", "hourly_aggregates", "hour", list(hours)),
+            ("daily_aggregates_count", "daily_aggregates", "date", list(days)),
+            ("monthly_aggregates_count", "monthly_aggregates", "month", list(months)),
+        ):
+            cursor.execute(
+                f"SELECT COUNT(*) FROM {table} WHERE device_id = ? AND {column} IN ({','.join('?' * len(keys))})",
+                (self.device_id, *keys),
+            )
+            new_rows[stat] = len(keys) - cursor.fetchone()[0]
+        return new_rows
+
+    def _logs_added(self, count: int, oldest: datetime, newest: datetime, new_rows: Optional[Dict[str, int]]):
+        # Caller holds _stats_lock
+        stats = self._stats
+        if stats is None or new_rows is None:
+            return
+        stats["usage_logs_count"] += count
+        stats["unsynced_count"] += count
+        for key, value in new_rows.items():
+            stats[key] += value
+        oldest, newest = str(oldest), str(newest)
+        if stats["oldest_timestamp"] is None or oldest < stats["oldest_timestamp"]:
+            stats["oldest_timestamp"] = oldest
+        if stats["newest_timestamp"] is None or newest > stats["newest_timestamp"]:
+            stats["newest_timestamp"] = newest
+
+    def _own_logs_matching(self, cursor, condition: str, params: tuple) -> Optional[Tuple[int, int]]:
+        """(synced, unsynced) logs of this device matching ``condition``, counted before a delete."""
+        if self._stats is None:
+            return None
+        cursor.execute(f"""
+            SELECT COALESCE(SUM(synced = 1), 0), COALESCE(SUM(synced = 0), 0)
+            FROM usage_logs WHERE device_id = ? AND {condition}
+        """, (self.device_id, *params))
+        return tuple(cursor.fetchone())
+
+    def _logs_removed(self, cursor, removed: Optional[Tuple[int, int]]):
+        # Caller holds _stats_lock; cursor is inside the deleting transaction
+        stats = self._stats
+        if stats is None or removed is None:
+            return
+        synced, unsynced = removed
+        stats["synced_count"] -= synced
+        stats["unsynced_count"] -= unsynced
+        stats["usage_logs_count"] -= synced + unsynced
+        if synced + unsynced:
+            # Indexed lookups on (device_id, timestamp)
+            cursor.execute("SELECT MIN(timestamp), MAX(timestamp) FROM usage_logs WHERE device_id = ?",
+                           (self.device_id,))
+            stats["oldest_timestamp"], stats["newest_timestamp"] = cursor.fetchone()
+
+    def _own_aggregates_matching(self, cursor, cutoff_date: date, cutoff_month: str) -> Optional[Dict[str, int]]:
+        """Rows of this device that an all-devices aggregate cleanup is about to delete."""
+        if self._stats is None:
+            return None
+        counts = {}
+        for stat, table, column, cutoff in (
+            ("hourly_aggregates_count", "hourly_aggregates", "hour", cutoff_date),
+            ("daily_aggregates_count", "daily_aggregates", "date", cutoff_date),
+            ("monthly_aggregates_count", "monthly_aggregates", "month", cutoff_month),
+        ):
+            cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE device_id = ? AND {column} < ?",
+                           (self.device_id, cutoff))
+            counts[stat] = cursor.fetchone()[0]
+        return counts
+
+    def _aggregates_removed(self, removed: Optional[Dict[str, int]]):
+        # Caller holds _stats_lock
+        if self._stats is None or removed is None:
+            return
+        for key, value in removed.items():
+            self._stats[key] -= value
     
     def get_unsynced_logs(self, limit: int = 1000) -> List[Dict]:
         """Get unsynced usage logs."""
@@ -182,7 +772,7 @@ class Storage:
         if not log_ids:
             return
         
-        with self.get_connection() as conn:
+        with self._stats_lock, self.get_connection() as conn:
             cursor = conn.cursor()
             placeholders = ",".join("?" * len(log_ids))
             cursor.execute(f"""
@@ -190,7 +780,160 @@ class Storage:
                 SET synced = 1
                 WHERE id IN ({placeholders})
             """, log_ids)
+            # Ids may belong to any device or already be synced: recount lazily
+            self._stats = None
     
+    def get_unsynced_buckets(self, limit: int = 5000, max_id: Optional[int] = None) -> Tuple[List[list], Optional[int]]:
+        """Bucket the oldest unsynced logs of this device into per-day deltas.
+
+        Returns ``([[date, bytes_sent, bytes_received, peak_speed, samples], ...], max_id)``.
+        The batch is always "every unsynced log with id <= max_id", so passing
+        the same ``max_id`` again rebuilds an identical batch for a retry.
+        Peak speed is not stored per log; the day's local peak is sent instead
+        (the hub keeps the MAX, so resending it is harmless).
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            if max_id is None:
+                cursor.execute("""
+                    SELECT MAX(id) as max_id FROM (
+                        SELECT id FROM usage_logs
+                        WHERE device_id = ? AND synced = 0
+                        ORDER BY id ASC
+                        LIMIT ?
+                    )
+                """, (self.device_id, limit))
+                max_id = cursor.fetchone()["max_id"]
+                if max_id is None:
+                    return [], None
+
+            cursor.execute("""
+                SELECT l.day,
+                       SUM(l.bytes_sent) as bytes_sent,
+                       SUM(l.bytes_received) as bytes_received,
+                       COALESCE(MAX(d.peak_speed), 0) as peak_speed,
+                       COUNT(*) as samples
+                FROM (
+                    SELECT date(timestamp) as day, bytes_sent, bytes_received
+                    FROM usage_logs
+                    WHERE device_id = ? AND synced = 0 AND id <= ?
+                ) l
+                LEFT JOIN daily_aggregates d ON d.device_id = ? AND d.date = l.day
+                GROUP BY l.day
+                ORDER BY l.day ASC
+            """, (self.device_id, max_id, self.device_id))
+            buckets = [
+                [row["day"], row["bytes_sent"], row["bytes_received"], row["peak_speed"], row["samples"]]
+                for row in cursor.fetchall()
+            ]
+            return buckets, max_id
+
+    def mark_logs_synced_upto(self, max_id: int) -> int:
+        """Mark every log of this device with id <= max_id as synced."""
+        with self._stats_lock, self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE usage_logs
+                SET synced = 1
+                WHERE device_id = ? AND synced = 0 AND id <= ?
+            """, (self.device_id, max_id))
+            if self._stats is not None:
+                self._stats["synced_count"] += cursor.rowcount
+                self._stats["unsynced_count"] -= cursor.rowcount
+            return cursor.rowcount
+
+    def apply_ingest_batches(self, batches: List[Dict]) -> List[str]:
+        """Apply agent batches pushed to a hub in a single transaction.
+
+        Each batch is ``{device_id, os_type, hostname, epoch, seq, buckets}``
+        with buckets as returned by ``get_unsynced_buckets``. A batch whose
+        ``seq`` is not newer than the last one applied for the same device
+        epoch is a retry and is skipped. Returns "applied"/"duplicate" per batch.
+        """
+        statuses = []
+        devices = {}
+        sequences = {}
+        daily_rows = []
+        monthly = {}
+
+        with self._stats_lock, self.get_connection() as conn:
+            seq = self._next_write_seq()
+            cursor = conn.cursor()
+            for batch in batches:
+                device_id = batch["device_id"]
+                last = sequences.get(device_id)
+                if last is None:
+                    cursor.execute("SELECT epoch, last_seq FROM ingest_sequences WHERE device_id = ?", (device_id,))
+                    row = cursor.fetchone()
+                    last = (row["epoch"], row["last_seq"]) if row else None
+                if last and last[0] == batch["epoch"] and batch["seq"] <= last[1]:
+                    statuses.append("duplicate")
+                    continue
+
+                sequences[device_id] = (batch["epoch"], batch["seq"])
+                devices[device_id] = (device_id, batch["os_type"], batch["hostname"])
+                for day, sent, received, peak, samples in batch["buckets"]:
+                    daily_rows.append((device_id, day, sent, received, peak, samples))
+                    totals = monthly.setdefault((device_id, day[:7]), [0, 0])
+                    totals[0] += sent
+                    totals[1] += received
+                statuses.append("applied")
+
+            if not devices:
+                return statuses
+
+            cursor.executemany("""
+                INSERT INTO devices (device_id, os_type, hostname)
+                VALUES (?, ?, ?)
+                ON CONFLICT(device_id) DO UPDATE SET
+                    os_type = excluded.os_type,
+                    hostname = excluded.hostname
+            """, list(devices.values()))
+            day_deltas: Dict[str, Dict[str, list]] = {}
+            for device_id, day, sent, received, peak, _samples in daily_rows:
+                delta = day_deltas.setdefault(device_id, {}).setdefault(day, [0, 0, 0])
+                delta[0] += sent
+                delta[1] += received
+                delta[2] = max(delta[2], peak)
+            existing_days = {device_id: self._existing_days(cursor, device_id, deltas)
+                             for device_id, deltas in day_deltas.items()}
+            cursor.executemany("""
+                INSERT INTO daily_aggregates (device_id, date, bytes_sent, bytes_received, peak_speed, samples)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(device_id, date) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received,
+                    peak_speed = MAX(peak_speed, excluded.peak_speed),
+                    samples = samples + excluded.samples
+            """, daily_rows)
+            for device_id, deltas in day_deltas.items():
+                self._update_period_stats(cursor, device_id, deltas, existing_days[device_id])
+            cursor.executemany("""
+                INSERT INTO monthly_aggregates (device_id, month, bytes_sent, bytes_received)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(device_id, month) DO UPDATE SET
+                    bytes_sent = bytes_sent + excluded.bytes_sent,
+                    bytes_received = bytes_received + excluded.bytes_received
+            """, [(device_id, month, s, r) for (device_id, month), (s, r) in monthly.items()])
+            cursor.executemany("""
+                INSERT OR REPLACE INTO ingest_sequences (device_id, epoch, last_seq, updated_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            """, [(device_id, epoch, seq) for device_id, (epoch, seq) in sequences.items()])
+            if daily_rows:
+                self._touch_history(cursor, date.fromisoformat(min(row[1] for row in daily_rows)))
+
+        self.bump_data_version()
+        self._notify_writes({device_id: {day: sent + received for day, (sent, received, _peak) in deltas.items()}
+                             for device_id, deltas in day_deltas.items()}, seq)
+        return statuses
+
+    def get_device_count(self) -> int:
+        """Number of devices known to the local database (hub: every agent)."""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT COUNT(*) as count FROM devices")
+            return cursor.fetchone()["count"]
+
     def get_today_usage(self) -> Tuple[int, int, int]:
         """Get today's total usage and peak speed (sent, received, peak)."""
         today = date.today()
@@ -418,12 +1161,299 @@ class Storage:
             
             return [dict(row) for row in cursor.fetchall()]
     
+    def iter_usage_logs(self, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                        after_id: int = 0, all_devices: bool = False,
+                        chunk_size: int = 5000) -> Iterator[List[Dict]]:
+        """Yield raw usage logs oldest-first in chunks of at most ``chunk_size`` rows.
+
+        Pages by primary key (logs are appended in time order) and opens a
+        fresh connection per chunk, so memory stays bounded by one chunk, no
+        read transaction is held open while a slow consumer drains the
+        stream, and the generator may be resumed from any thread.
+        ``since`` is inclusive, ``until`` exclusive; ``after_id`` resumes an
+        earlier export.
+        """
+        filters = ["id > ?"]
+        params: list = []
+        if not all_devices:
+            filters.append("device_id = ?")
+            params.append(self.device_id)
+        if since is not None:
+            filters.append("timestamp >= ?")
+            params.append(since)
+        if until is not None:
+            filters.append("timestamp < ?")
+            params.append(until)
+        query = f"""
+            SELECT id, device_id, timestamp, bytes_sent, bytes_received
+            FROM usage_logs
+            WHERE {" AND ".join(filters)}
+            ORDER BY id ASC
+            LIMIT ?
+        """
+
+        last_id = after_id
+        while True:
+            with self.get_connection() as conn:
+                rows = conn.execute(query, (last_id, *params, chunk_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            yield [dict(row) for row in rows]
+            if len(rows) < chunk_size:
+                return
+
+    def iter_daily_aggregates(self, from_date: Optional[date] = None, to_date: Optional[date] = None,
+                              all_devices: bool = False, chunk_size: int = 1000) -> Iterator[List[Dict]]:
+        """Yield daily aggregates oldest-first in chunks (``to_date`` inclusive).
+
+        Per-device rows when ``all_devices`` is False; otherwise one row per
+        date summed across devices, like ``get_all_devices_daily_aggregates``.
+        """
+        filters = ["date > ?"]
+        params: list = []
+        if not all_devices:
+            filters.append("device_id = ?")
+            params.append(self.device_id)
+        if from_date is not None:
+            filters.append("date >= ?")
+            params.append(from_date)
+        if to_date is not None:
+            filters.append("date <= ?")
+            params.append(to_date)
+        where = " AND ".join(filters)
+        if all_devices:
+            query = f"""
+                SELECT date,
+                       SUM(bytes_sent) as bytes_sent,
+                       SUM(bytes_received) as bytes_received,
+                       MAX(peak_speed) as peak_speed,
+                       SUM(samples) as samples
+                FROM daily_aggregates
+                WHERE {where}
+                GROUP BY date
+                ORDER BY date ASC
+                LIMIT ?
+            """
+        else:
+            query = f"""
+                SELECT date, bytes_sent, bytes_received, peak_speed, samples
+                FROM daily_aggregates
+                WHERE {where}
+                ORDER BY date ASC
+                LIMIT ?
+            """
+
+        last_date = ""
+        while True:
+            with self.get_connection() as conn:
+                rows = conn.execute(query, (last_date, *params, chunk_size)).fetchall()
+            if not rows:
+                return
+            last_date = rows[-1]["date"]
+            yield [dict(row) for row in rows]
+            if len(rows) < chunk_size:
+                return
+
+    # tier -> (table, time column)
+    AGGREGATE_TIERS = {"hourly": ("hourly_aggregates", "hour"), "daily": ("daily_aggregates", "date")}
+
+    @staticmethod
+    def _bucket_bound(tier: str, moment):
+        """Convert a datetime bound to the tier's time column (first bucket starting at/after it)."""
+        if tier != "daily" or not isinstance(moment, datetime):
+            return moment
+        return moment.date() if moment.time() == datetime.min.time() else moment.date() + timedelta(days=1)
+
+    def iter_aggregate_rows(self, tier: str, since=None, until=None, all_devices: bool = False,
+                            chunk_size: int = 5000) -> Iterator[List[Dict]]:
+        """Yield stored per-device ``hourly``/``daily`` aggregate rows in chunks.
+
+        Unlike ``iter_daily_aggregates`` rows are never summed across
+        devices. Pages on the (device_id, time) primary key; ``since`` is
+        inclusive and ``until`` exclusive, compared against the bucket start.
+        """
+        table, column = self.AGGREGATE_TIERS[tier]
+        filters = [f"(device_id, {column}) > (?, ?)"]
+        params: list = []
+        if not all_devices:
+            filters.append("device_id = ?")
+            params.append(self.device_id)
+        if since is not None:
+            filters.append(f"{column} >= ?")
+            params.append(self._bucket_bound(tier, since))
+        if until is not None:
+            filters.append(f"{column} < ?")
+            params.append(self._bucket_bound(tier, until))
+        query = f"""
+            SELECT device_id, {column}, bytes_sent, bytes_received, peak_speed, samples
+            FROM {table}
+            WHERE {" AND ".join(filters)}
+            ORDER BY device_id, {column}
+            LIMIT ?
+        """
+
+        last_key = ("", "")
+        while True:
+            with self.get_connection() as conn:
+                rows = conn.execute(query, (*last_key, *params, chunk_size)).fetchall()
+            if not rows:
+                return
+            last_key = (rows[-1]["device_id"], rows[-1][column])
+            yield [dict(row) for row in rows]
+            if len(rows) < chunk_size:
+                return
+
+    # Series tiers, finest first: tier -> (table, time column, peak expression)
+    SERIES_TIERS = {
+        "raw": ("usage_logs", "timestamp", "MAX(bytes_sent + bytes_received) / ?"),
+        "hourly": ("hourly_aggregates", "hour", "MAX(peak_speed)"),
+        "daily": ("daily_aggregates", "date", "MAX(peak_speed)"),
+    }
+
+    def get_tier_start(self, tier: str, all_devices: bool = False) -> Optional[str]:
+        """Oldest timestamp/hour/date still stored in a series tier (None if empty)."""
+        table, column, _ = self.SERIES_TIERS[tier]
+        order = "id" if tier == "raw" else column
+        where, params = ("", ()) if all_devices else ("WHERE device_id = ?", (self.device_id,))
+        with self.get_connection() as conn:
+            row = conn.execute(
+                f"SELECT {column} FROM {table} {where} ORDER BY {order} ASC LIMIT 1", params
+            ).fetchone()
+        return row[0] if row else None
+
+    def get_series_buckets(self, tier: str, since: datetime, until: datetime, width: int,
+                           all_devices: bool = False) -> List[tuple]:
+        """Sum a tier into fixed ``width``-second buckets inside SQLite.
+
+        Returns ``(bucket_epoch, bytes_sent, bytes_received, peak_speed)``
+        tuples ordered by time. Epochs are wall-clock seconds (stored local
+        timestamps read as if UTC). Aggregating here keeps the rows handed
+        to Python proportional to the chart size, not the history size.
+        """
+        table, column, peak = self.SERIES_TIERS[tier]
+        params: list = [width, width]
+        if tier == "raw":
+            params.append(max(config.get("monitoring", "poll_interval", default=1), 1))
+        params += [self._bucket_bound(tier, since), self._bucket_bound(tier, until)]
+        device_filter = ""
+        if not all_devices:
+            device_filter = "AND device_id = ?"
+            params.append(self.device_id)
+
+        with self.get_connection() as conn:
+            return [tuple(row) for row in conn.execute(f"""
+                SELECT (CAST(strftime('%s', {column}) AS INTEGER) / ?) * ? AS bucket,
+                       SUM(bytes_sent), SUM(bytes_received), {peak}
+                FROM {table}
+                WHERE {column} >= ? AND {column} < ? {device_filter}
+                GROUP BY bucket
+                ORDER BY bucket
+            """, params)]
+
+    def get_daily_columns(self, until: Optional[date] = None, all_devices: bool = False) -> Tuple[tuple, tuple, tuple]:
+        """``(dates, bytes_sent, bytes_received)`` of every stored daily row up to ``until`` (inclusive).
+
+        Rows are per device, unsorted and not summed: callers that want one
+        value per date group them in NumPy (``bincount``), which avoids
+        SQLite's temporary GROUP BY b-tree and per-row ``sqlite3.Row`` objects.
+        """
+        filters, params = ["date <= ?"], [until or date.max]
+        if not all_devices:
+            filters.append("device_id = ?")
+            params.append(self.device_id)
+        with self.get_connection() as conn:
+            conn.row_factory = None
+            rows = conn.execute(f"""
+                SELECT date, bytes_sent, bytes_received FROM daily_aggregates WHERE {" AND ".join(filters)}
+            """, params).fetchall()
+        return tuple(zip(*rows)) if rows else ((), (), ())
+
+    def get_cycle_usage(self, start: date, end: date, device_id: Optional[str] = None) -> Tuple[int, int]:
+        """``(bytes, write_seq)``: total sent + received on days ``[start, end)``, for one device or all (``None``).
+
+        Summed under ``_stats_lock``, so the total includes exactly the writes
+        up to the returned ``write_seq``, whether or not they were notified yet.
+        """
+        filters, params = ["date >= ?", "date < ?"], [start, end]
+        if device_id is not None:
+            filters.append("device_id = ?")
+            params.append(device_id)
+        with self._stats_lock, self.get_connection() as conn:
+            row = conn.execute(f"""
+                SELECT COALESCE(SUM(bytes_sent + bytes_received), 0) FROM daily_aggregates
+                WHERE {" AND ".join(filters)}
+            """, params).fetchone()
+            return row[0], self.write_seq
+
+    def get_heatmap_slots(self, first_week: date, last_week: date,
+                          all_devices: bool = False) -> Tuple[List[tuple], int]:
+        """Sum the weekly hour-of-week partials of ``[first_week, last_week]`` (Mondays).
+
+        Returns ``([(slot, bytes_sent, bytes_received, samples), ...], weeks_with_data)``.
+        Reads at most 168 rows per week per device, independent of poll rate.
+        """
+        params: list = [first_week, last_week]
+        device_filter = ""
+        if not all_devices:
+            device_filter = "AND device_id = ?"
+            params.append(self.device_id)
+
+        with self.get_connection() as conn:
+            rows = [tuple(row) for row in conn.execute(f"""
+                SELECT slot, SUM(bytes_sent), SUM(bytes_received), SUM(samples)
+                FROM weekly_heatmap
+                WHERE week_start >= ? AND week_start <= ? {device_filter}
+                GROUP BY slot
+                ORDER BY slot
+            """, params)]
+            weeks = conn.execute(f"""
+                SELECT COUNT(DISTINCT week_start) FROM weekly_heatmap
+                WHERE week_start >= ? AND week_start <= ? {device_filter}
+            """, params).fetchone()[0]
+        return rows, weeks
+
+    def get_speed_histogram(self, since: datetime, until: datetime, all_devices: bool = False) -> SpeedHistogram:
+        """Merged speed histogram for ``[since, until)`` at hour granularity.
+
+        Whole days inside the range come from the per-day rows and the
+        partial days at either end from per-hour rows, so at most
+        ``days + 48`` small blobs are read whatever the poll rate.
+        """
+        start_hour = since.replace(minute=0, second=0, microsecond=0)
+        first_day = since.date() if since == datetime.combine(since.date(), datetime.min.time()) \
+            else since.date() + timedelta(days=1)
+        end_day = until.date()
+        if first_day < end_day:
+            ranges = [
+                ("day", first_day.isoformat(), end_day.isoformat()),
+                ("hour", str(start_hour), str(datetime.combine(first_day, datetime.min.time()))),
+                ("hour", str(datetime.combine(end_day, datetime.min.time())), str(until)),
+            ]
+        else:
+            ranges = [("hour", str(start_hour), str(until))]
+
+        conditions = " OR ".join("(resolution = ? AND bucket >= ? AND bucket < ?)" for _ in ranges)
+        params = [value for condition in ranges for value in condition]
+        device_filter = ""
+        if not all_devices:
+            device_filter = "AND device_id = ?"
+            params.append(self.device_id)
+
+        histogram = SpeedHistogram()
+        with self.get_connection() as conn:
+            for (blob,) in conn.execute(
+                f"SELECT histogram FROM speed_histograms WHERE ({conditions}) {device_filter}", params
+            ):
+                histogram.merge(SpeedHistogram.from_bytes(blob))
+        return histogram
+
     def get_all_daily_aggregates(self) -> List[Dict]:
         """Get all daily aggregates with peak speeds for comprehensive exports."""
         with self.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute("""
-                SELECT device_id, date, bytes_sent, bytes_received, peak_speed
+                SELECT device_id, date, bytes_sent, bytes_received, peak_speed, samples
                 FROM daily_aggregates
                 WHERE device_id = ?
                 ORDER BY date ASC
@@ -491,6 +1521,39 @@ class Storage:
             row = cursor.fetchone()
             return dict(row) if row else {}
 
+    def insert_anomaly_events(self, events: List[Dict]):
+        """Store closed anomaly events (dicts of ``AnomalyEvent`` fields) for this device."""
+        if not events:
+            return
+        with self.get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO anomaly_events (device_id, direction, started_at, ended_at, samples, bytes,
+                                            peak_speed, baseline_speed, peak_score)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [(self.device_id, e["direction"], e["started_at"], e["ended_at"], e["samples"], e["bytes"],
+                   e["peak_speed"], e["baseline_speed"], round(e["peak_score"], 2)) for e in events])
+
+    def get_anomaly_events(self, since: datetime, until: datetime, direction: Optional[str] = None,
+                           limit: int = 100, all_devices: bool = False) -> List[Dict]:
+        """Anomaly events that started in ``[since, until)``, newest first."""
+        filters, params = ["started_at >= ?", "started_at < ?"], [since, until]
+        if direction:
+            filters.append("direction = ?")
+            params.append(direction)
+        if not all_devices:
+            filters.append("device_id = ?")
+            params.append(self.device_id)
+        with self.get_connection() as conn:
+            rows = conn.execute(f"""
+                SELECT device_id, direction, started_at, ended_at, samples, bytes,
+                       peak_speed, baseline_speed, peak_score
+                FROM anomaly_events
+                WHERE {" AND ".join(filters)}
+                ORDER BY started_at DESC
+                LIMIT ?
+            """, (*params, limit)).fetchall()
+        return [dict(row) for row in rows]
+
     def get_state(self, key: str) -> Dict:
         """Get a value from system_state."""
         with self.get_connection() as conn:
@@ -512,13 +1575,16 @@ class Storage:
         """Delete synced logs older than N days. Returns count of deleted rows."""
         cutoff_date = datetime.now() - timedelta(days=days_to_keep)
         try:
-            with self.get_connection() as conn:
+            with self._stats_lock, self.get_connection() as conn:
                 cursor = conn.cursor()
+                removed = self._own_logs_matching(cursor, "synced = 1 AND timestamp < ?", (cutoff_date,))
                 cursor.execute("""
                     DELETE FROM usage_logs
                     WHERE synced = 1 AND timestamp < ? AND device_id = ?
                 """, (cutoff_date, self.device_id))
-                return cursor.rowcount
+                deleted = cursor.rowcount
+                self._logs_removed(cursor, removed)
+                return deleted
         except Exception:
             logger.warning("Failed to cleanup synced logs", exc_info=True)
             return 0
@@ -531,13 +1597,16 @@ class Storage:
         """
         cutoff_date = datetime.now() - timedelta(days=days_to_keep)
         try:
-            with self.get_connection() as conn:
+            with self._stats_lock, self.get_connection() as conn:
                 cursor = conn.cursor()
+                removed = self._own_logs_matching(cursor, "timestamp < ?", (cutoff_date,))
                 cursor.execute("""
                     DELETE FROM usage_logs
                     WHERE timestamp < ? AND device_id = ?
                 """, (cutoff_date, self.device_id))
-                return cursor.rowcount
+                deleted = cursor.rowcount
+                self._logs_removed(cursor, removed)
+                return deleted
         except Exception:
             logger.warning("Failed to cleanup old logs", exc_info=True)
             return 0
@@ -546,13 +1615,16 @@ class Storage:
         """Delete ALL old raw logs across ALL devices older than N days."""
         cutoff_date = datetime.now() - timedelta(days=days_to_keep)
         try:
-            with self.get_connection() as conn:
+            with self._stats_lock, self.get_connection() as conn:
                 cursor = conn.cursor()
+                removed = self._own_logs_matching(cursor, "timestamp < ?", (cutoff_date,))
                 cursor.execute("""
                     DELETE FROM usage_logs
                     WHERE timestamp < ?
                 """, (cutoff_date,))
-                return cursor.rowcount
+                deleted = cursor.rowcount
+                self._logs_removed(cursor, removed)
+                return deleted
         except Exception:
             logger.warning("Failed to cleanup old logs (all devices)", exc_info=True)
             return 0
@@ -561,10 +1633,16 @@ class Storage:
         """Delete aggregates older than N months. Returns counts dict."""
         cutoff_date = date.today() - timedelta(days=months_to_keep * 30)
         cutoff_month = cutoff_date.strftime("%Y-%m")
-        result = {'daily': 0, 'monthly': 0}
+        result = {'hourly': 0, 'daily': 0, 'monthly': 0, 'heatmap': 0, 'histograms': 0, 'anomalies': 0}
         try:
-            with self.get_connection() as conn:
+            with self._stats_lock, self.get_connection() as conn:
                 cursor = conn.cursor()
+                cursor.execute("""
+                    DELETE FROM hourly_aggregates
+                    WHERE hour < ? AND device_id = ?
+                """, (cutoff_date, self.device_id))
+                result['hourly'] = cursor.rowcount
+
                 cursor.execute("""
                     DELETE FROM daily_aggregates
                     WHERE date < ? AND device_id = ?
@@ -576,6 +1654,31 @@ class Storage:
                     WHERE month < ? AND device_id = ?
                 """, (cutoff_month, self.device_id))
                 result['monthly'] = cursor.rowcount
+                self._aggregates_removed({f"{tier}_aggregates_count": result[tier]
+                                          for tier in ("hourly", "daily", "monthly")})
+
+                cursor.execute("""
+                    DELETE FROM weekly_heatmap
+                    WHERE week_start < ? AND device_id = ?
+                """, (cutoff_date, self.device_id))
+                result['heatmap'] = cursor.rowcount
+
+                cursor.execute("""
+                    DELETE FROM speed_histograms
+                    WHERE bucket < ? AND device_id = ?
+                """, (cutoff_date.isoformat(), self.device_id))
+                result['histograms'] = cursor.rowcount
+
+                cursor.execute("""
+                    DELETE FROM anomaly_events
+                    WHERE started_at < ? AND device_id = ?
+                """, (cutoff_date, self.device_id))
+                result['anomalies'] = cursor.rowcount
+                if result['daily'] or result['monthly']:
+                    self._touch_history(cursor)
+                if result['daily']:
+                    self._rebuild_period_stats(cursor, cutoff_date.year)
+            self.bump_data_version()
         except Exception:
             logger.warning("Failed to cleanup old aggregates", exc_info=True)
         return result
@@ -584,10 +1687,17 @@ class Storage:
         """Delete aggregates older than N months across ALL devices."""
         cutoff_date = date.today() - timedelta(days=months_to_keep * 30)
         cutoff_month = cutoff_date.strftime("%Y-%m")
-        result = {'daily': 0, 'monthly': 0}
+        result = {'hourly': 0, 'daily': 0, 'monthly': 0, 'heatmap': 0, 'histograms': 0, 'anomalies': 0}
         try:
-            with self.get_connection() as conn:
+            with self._stats_lock, self.get_connection() as conn:
                 cursor = conn.cursor()
+                removed = self._own_aggregates_matching(cursor, cutoff_date, cutoff_month)
+                cursor.execute("""
+                    DELETE FROM hourly_aggregates
+                    WHERE hour < ?
+                """, (cutoff_date,))
+                result['hourly'] = cursor.rowcount
+
                 cursor.execute("""
                     DELETE FROM daily_aggregates
                     WHERE date < ?
@@ -599,6 +1709,30 @@ class Storage:
                     WHERE month < ?
                 """, (cutoff_month,))
                 result['monthly'] = cursor.rowcount
+                self._aggregates_removed(removed)
+
+                cursor.execute("""
+                    DELETE FROM weekly_heatmap
+                    WHERE week_start < ?
+                """, (cutoff_date,))
+                result['heatmap'] = cursor.rowcount
+
+                cursor.execute("""
+                    DELETE FROM speed_histograms
+                    WHERE bucket < ?
+                """, (cutoff_date.isoformat(),))
+                result['histograms'] = cursor.rowcount
+
+                cursor.execute("""
+                    DELETE FROM anomaly_events
+                    WHERE started_at < ?
+                """, (cutoff_date,))
+                result['anomalies'] = cursor.rowcount
+                if result['daily'] or result['monthly']:
+                    self._touch_history(cursor)
+                if result['daily']:
+                    self._rebuild_period_stats(cursor, cutoff_date.year)
+            self.bump_data_version()
         except Exception:
             logger.warning("Failed to cleanup old aggregates (all devices)", exc_info=True)
         return result
@@ -611,19 +1745,40 @@ class Storage:
         except Exception:
             logger.warning("VACUUM failed", exc_info=True)
     
-    def get_database_stats(self) -> dict:
-        """Return comprehensive database statistics."""
-        stats = {
-            'usage_logs_count': 0,
-            'daily_aggregates_count': 0,
-            'monthly_aggregates_count': 0,
-            'synced_count': 0,
-            'unsynced_count': 0,
-            'oldest_timestamp': None,
-            'newest_timestamp': None,
-            'db_size_mb': 0.0,
-            'storage_usage_percent': 0.0
-        }
+    def get_database_stats(self, refresh: bool = False) -> dict:
+        """Return comprehensive database statistics.
+
+        Row counts are taken in full on the first call (or with ``refresh``)
+        and kept current by the write and cleanup paths afterwards, so later
+        calls cost a file ``stat`` rather than six table scans.
+        """
+        with self._stats_lock:
+            if refresh or self._stats is None:
+                self._stats = self._count_database_stats()
+            stats = dict(self._stats) if self._stats is not None else {
+                'usage_logs_count': 0,
+                'daily_aggregates_count': 0,
+                'monthly_aggregates_count': 0,
+                'hourly_aggregates_count': 0,
+                'synced_count': 0,
+                'unsynced_count': 0,
+                'oldest_timestamp': None,
+                'newest_timestamp': None,
+            }
+        stats['db_size_mb'] = 0.0
+        stats['storage_usage_percent'] = 0.0
+        try:
+            if self.db_path.exists():
+                stats['db_size_mb'] = round(self.db_path.stat().st_size / (1024 * 1024), 2)
+                max_db_size = config.storage.max_storage_mb
+                stats['storage_usage_percent'] = round((stats['db_size_mb'] / max_db_size) * 100, 1)
+        except Exception:
+            logger.warning("Failed to stat database file", exc_info=True)
+        return stats
+
+    def _count_database_stats(self) -> Optional[dict]:
+        """Full recount of the row-count stats; None if the database can't be read."""
+        stats = {'oldest_timestamp': None, 'newest_timestamp': None}
         try:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
@@ -636,6 +1791,9 @@ class Storage:
                 
                 cursor.execute("SELECT COUNT(*) as count FROM monthly_aggregates WHERE device_id = ?", (self.device_id,))
                 stats['monthly_aggregates_count'] = cursor.fetchone()['count']
+
+                cursor.execute("SELECT COUNT(*) as count FROM hourly_aggregates WHERE device_id = ?", (self.device_id,))
+                stats['hourly_aggregates_count'] = cursor.fetchone()['count']
                 
                 cursor.execute("SELECT COUNT(*) as count FROM usage_logs WHERE synced = 1 AND device_id = ?", (self.device_id,))
                 stats['synced_count'] = cursor.fetchone()['count']
@@ -651,13 +1809,9 @@ class Storage:
                 if row and row['oldest']:
                     stats['oldest_timestamp'] = row['oldest']
                     stats['newest_timestamp'] = row['newest']
-            
-            if self.db_path.exists():
-                stats['db_size_mb'] = round(self.db_path.stat().st_size / (1024 * 1024), 2)
-                max_db_size = config.storage.max_storage_mb
-                stats['storage_usage_percent'] = round((stats['db_size_mb'] / max_db_size) * 100, 1)
         except Exception:
             logger.warning("Failed to get database stats", exc_info=True)
+            return None
         return stats
     
     def get_unsynced_log_count(self) -> int:
@@ -758,4 +1912,8 @@ class Storage:
 
 
 # Global storage instance
+# Per-method SQLite latency histograms for /metrics
+instrument_methods(Storage, STORAGE_QUERY_SECONDS, exclude=("bump_data_version", "get_connection", "add_write_listener"))
+
 storage = Storage()
+STORAGE_DATA_VERSION.set_function(lambda: storage.data_version)
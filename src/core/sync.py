@@ -1,43 +1,189 @@
 """NeonDB sync module for cloud data replication."""
 
 import asyncio
+import json
 import logging
 import time
 import asyncpg
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from datetime import datetime, date
 from typing import Optional, Tuple, Dict, Any
 
 logger = logging.getLogger(__name__)
 
 from ..utils.config import config
-from .storage import storage
+from ..utils.metrics import CACHE_REQUESTS, SYNC_CYCLE_SECONDS, SYNC_ERRORS, SYNC_ROWS
+from .storage import Storage, storage
+from .remote_schema import (
+    MIGRATION_LOCK_ID,
+    REMOTE_MIGRATIONS,
+    REMOTE_SCHEMA_VERSION,
+    REMOTE_TABLES,
+    LEGACY_TABLES,
+    REGISTER_DEVICE_SQL,
+    DAILY_UPSERT_SQL,
+    MONTHLY_UPSERT_SQL,
+    YEARLY_UPSERT_SQL,
+    GLOBAL_TODAY_SQL,
+    GLOBAL_LIFETIME_SQL,
+)
 
 
 class NeonSync:
-    """Async NeonDB synchronization manager."""
+    """Async NeonDB synchronization manager.
+
+    Two connection modes are supported (``[sync] connection_mode``):
+
+    - ``pool``: a long-lived asyncpg pool, one connection always held open.
+    - ``on_demand``: connect, run one pipelined sync cycle, disconnect. Nothing
+      is held between cycles, so a serverless compute can scale to zero.
+
+    ``db_url`` and ``local_storage`` default to the configured NeonDB URL and
+    the global local store; benchmarks pass their own to drive a throwaway
+    database with synthetic devices.
+    """
     
-    def __init__(self):
+    def __init__(self, db_url: Optional[str] = None, local_storage: Optional[Storage] = None):
         self.running = False
         self.pool: Optional[asyncpg.Pool] = None
+        self.db_url = db_url or config.neon_db_url
+        self.storage = local_storage or storage
         self.sync_interval = config.get("sync", "interval", default=300)
         self.retry_delay = config.get("sync", "retry_delay", default=5)
         self.max_retries = config.get("sync", "max_retries", default=3)
-        self.enabled = config.sync_enabled
+        self.enabled = config.sync_enabled if db_url is None else bool(db_url)
+        self.connection_mode = config.get("sync", "connection_mode", default="pool")
+        if self.connection_mode not in ("pool", "on_demand"):
+            logger.warning("Unknown sync connection_mode %r, using 'pool'", self.connection_mode)
+            self.connection_mode = "pool"
+        self.cold_start_ms = config.get("sync", "cold_start_threshold_ms", default=500)
+        # Remote integer surrogate for this device (assigned by schema v2)
+        self.device_key: Optional[int] = None
+        self.schema_version = 0
         # Local TTL cache for remote queries — avoids burning CU-hours on hot API paths
         self._cache: Dict[str, Tuple[Any, float]] = {}
         self._cache_ttl = config.get("sync", "cache_ttl", default=300)
+        # On-demand session of the current task: (connection, prepared statements).
+        # Per task, so an API read during a sync cycle opens its own connection
+        # instead of interleaving queries on (or closing) the cycle's one.
+        self._session: ContextVar[Optional[Tuple[asyncpg.Connection, Dict[str, Any]]]] = ContextVar(
+            f"neon_session_{id(self)}", default=None
+        )
+        # Remote retention, applied by the server-side pb_maintenance() routine
+        neon_cfg = config.storage.neon
+        self.daily_retention_months = neon_cfg.neon_aggregate_retention_months
+        self.monthly_retention_months = max(neon_cfg.neon_monthly_retention_months, self.daily_retention_months)
+        self.maintenance_interval = neon_cfg.neon_maintenance_interval_hours * 3600
+        # Last size/row-count snapshot (also persisted locally so CLI and API share it)
+        self._storage_snapshot: Optional[dict] = None
+        self.connection_stats: Dict[str, Any] = {
+            "mode": self.connection_mode,
+            "connects": 0,
+            "last_connect_ms": None,
+            "avg_connect_ms": None,
+            "max_connect_ms": None,
+            "cold_starts": 0,
+            "cycles": 0,
+            "last_cycle_ms": None,
+            "last_cycle_rows": 0,
+            "last_cycle_at": None,
+        }
 
     def _cache_get(self, key: str):
         """Get cached value if not expired."""
         if key in self._cache:
             value, expiry = self._cache[key]
             if time.monotonic() < expiry:
+                CACHE_REQUESTS.inc(cache="neon", result="hit")
                 return value
+        CACHE_REQUESTS.inc(cache="neon", result="miss")
         return None
 
     def _cache_set(self, key: str, value: Any, ttl: Optional[int] = None):
         """Set cached value with TTL in seconds (defaults to self._cache_ttl)."""
         self._cache[key] = (value, time.monotonic() + (ttl or self._cache_ttl))
+
+    def cache_tag(self, key: str) -> Optional[str]:
+        """Token that changes whenever the cached value for ``key`` is replaced.
+
+        None when nothing valid is cached (the next read will hit NeonDB).
+        """
+        if key in self._cache:
+            _, expiry = self._cache[key]
+            if time.monotonic() < expiry:
+                return f"{expiry:.3f}"
+        return None
+
+    @property
+    def on_demand(self) -> bool:
+        return self.connection_mode == "on_demand"
+
+    def _available(self) -> bool:
+        """True when remote queries can be issued."""
+        return self.enabled
+
+    async def _connect(self) -> asyncpg.Connection:
+        """Open a single connection and record its connect latency."""
+        started = time.perf_counter()
+        conn = await asyncpg.connect(self.db_url)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        stats = self.connection_stats
+        stats["connects"] += 1
+        stats["last_connect_ms"] = round(elapsed_ms, 1)
+        prev_avg = stats["avg_connect_ms"] or 0.0
+        stats["avg_connect_ms"] = round(prev_avg + (elapsed_ms - prev_avg) / stats["connects"], 1)
+        stats["max_connect_ms"] = round(max(stats["max_connect_ms"] or 0.0, elapsed_ms), 1)
+        if elapsed_ms >= self.cold_start_ms:
+            stats["cold_starts"] += 1
+        return conn
+
+    @asynccontextmanager
+    async def session(self):
+        """Hold one connection for a group of statements.
+
+        In on-demand mode this opens a fresh connection, reuses it (and its
+        prepared statements) for everything the same task issues inside the
+        block, then closes it. Other tasks (API reads during a sync cycle) get
+        their own short-lived connection. In pool mode it simply acquires a
+        pooled connection.
+        """
+        if not self.on_demand and self.pool is not None:
+            async with self.pool.acquire() as conn:
+                yield conn
+            return
+
+        current = self._session.get()
+        if current is not None:
+            yield current[0]
+            return
+
+        conn = await self._connect()
+        token = self._session.set((conn, {}))
+        try:
+            yield conn
+        finally:
+            self._session.reset(token)
+            await conn.close()
+
+    async def _executemany(self, conn: asyncpg.Connection, sql: str, args: list):
+        """Pipelined executemany, preparing the statement once per session."""
+        current = self._session.get()
+        if current is None or conn is not current[0]:
+            # Pooled connections keep asyncpg's own statement cache alive
+            await conn.executemany(sql, args)
+            return
+        statements = current[1]
+        stmt = statements.get(sql)
+        if stmt is None:
+            stmt = await conn.prepare(sql)
+            statements[sql] = stmt
+        await stmt.executemany(args)
+
+    def get_connection_stats(self) -> dict:
+        """Connection lifecycle stats (connect latency per cycle, cold starts)."""
+        return dict(self.connection_stats, enabled=self.enabled, interval=self.sync_interval)
     
     async def start(self):
         """Start sync service."""
@@ -48,15 +194,7 @@ class NeonSync:
         self.running = True
         
         try:
-            # Create connection pool
-            self.pool = await asyncpg.create_pool(
-                config.neon_db_url,
-                min_size=1,
-                max_size=config.get("database", "pool_size", default=5),
-            )
-            
-            # Initialize remote schema
-            await self._init_remote_schema()
+            await self.connect()
             
             # Start sync loop
             await self._sync_loop()
@@ -65,68 +203,54 @@ class NeonSync:
             logger.error("Sync service error: %s", e)
             self.enabled = False
     
+    async def connect(self):
+        """Open the pool (pool mode), migrate the remote schema and register the device."""
+        if not self.on_demand:
+            # Create connection pool
+            self.pool = await asyncpg.create_pool(
+                self.db_url,
+                min_size=1,
+                max_size=config.get("database", "pool_size", default=5),
+            )
+        else:
+            logger.info("Sync using on-demand connections (remote compute may suspend between cycles)")
+        
+        # Initialize remote schema
+        await self._init_remote_schema()
+
     async def _init_remote_schema(self):
-        """Initialize NeonDB schema."""
-        async with self.pool.acquire() as conn:
-            # Devices table
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS devices (
-                    device_id TEXT PRIMARY KEY,
-                    os_type TEXT NOT NULL,
-                    hostname TEXT NOT NULL,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            
-            # Usage logs
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS usage_logs (
-                    id SERIAL PRIMARY KEY,
-                    device_id TEXT NOT NULL,
-                    timestamp TIMESTAMP NOT NULL,
-                    bytes_sent BIGINT NOT NULL,
-                    bytes_received BIGINT NOT NULL,
-                    FOREIGN KEY (device_id) REFERENCES devices(device_id)
-                )
-            """)
-            
-            await conn.execute("""
-                CREATE INDEX IF NOT EXISTS idx_usage_logs_device_timestamp 
-                ON usage_logs(device_id, timestamp)
-            """)
-            
-            # Daily aggregates
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS daily_aggregates (
-                    device_id TEXT NOT NULL,
-                    date DATE NOT NULL,
-                    bytes_sent BIGINT NOT NULL,
-                    bytes_received BIGINT NOT NULL,
-                    PRIMARY KEY (device_id, date),
-                    FOREIGN KEY (device_id) REFERENCES devices(device_id)
-                )
-            """)
-            
-            # Monthly aggregates
-            await conn.execute("""
-                CREATE TABLE IF NOT EXISTS monthly_aggregates (
-                    device_id TEXT NOT NULL,
-                    month TEXT NOT NULL,
-                    bytes_sent BIGINT NOT NULL,
-                    bytes_received BIGINT NOT NULL,
-                    PRIMARY KEY (device_id, month),
-                    FOREIGN KEY (device_id) REFERENCES devices(device_id)
-                )
-            """)
-            
-            # Register device
-            await conn.execute("""
-                INSERT INTO devices (device_id, os_type, hostname)
-                VALUES ($1, $2, $3)
-                ON CONFLICT (device_id) DO UPDATE SET
-                    os_type = EXCLUDED.os_type,
-                    hostname = EXCLUDED.hostname
-            """, storage.device_id, storage.os_type, storage.hostname)
+        """Bring the NeonDB schema up to date and register this device."""
+        async with self.session() as conn:
+            await self._migrate_remote_schema(conn)
+            await self._register_device(conn)
+            await self._maybe_run_maintenance(conn)
+
+    async def _migrate_remote_schema(self, conn: asyncpg.Connection):
+        """Apply pending versioned migrations (see remote_schema.py)."""
+        await conn.execute("""
+            CREATE TABLE IF NOT EXISTS schema_migrations (
+                version INTEGER PRIMARY KEY,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        async with conn.transaction():
+            await conn.execute("SELECT pg_advisory_xact_lock($1)", MIGRATION_LOCK_ID)
+            current = await conn.fetchval("SELECT COALESCE(MAX(version), 0) FROM schema_migrations")
+
+            for version in range(current + 1, REMOTE_SCHEMA_VERSION + 1):
+                logger.info("Applying NeonDB schema migration v%d", version)
+                for statement in REMOTE_MIGRATIONS[version]:
+                    await conn.execute(statement)
+                await conn.execute("INSERT INTO schema_migrations (version) VALUES ($1)", version)
+
+        self.schema_version = REMOTE_SCHEMA_VERSION
+
+    async def _register_device(self, conn: asyncpg.Connection):
+        """Upsert this device and remember its integer key."""
+        self.device_key = await conn.fetchval(
+            REGISTER_DEVICE_SQL, self.storage.device_id, self.storage.os_type, self.storage.hostname
+        )
     
     async def _sync_loop(self):
         """Main sync loop."""
@@ -139,6 +263,7 @@ class NeonSync:
             try:
                 await self._sync_data()
             except Exception as e:
+                SYNC_ERRORS.inc()
                 logger.error("Sync error: %s", e)
     
     async def _sync_data(self):
@@ -148,36 +273,63 @@ class NeonSync:
         NOT raw usage_logs. Raw per-second logs consume ~90%+ of storage
         but provide zero value for multi-device cross-device views.
         Aggregates are ~0.01% the size and contain all information needed.
+
+        Local aggregates are running totals, so remote rows are overwritten
+        rather than incremented. Each table is sent as one pipelined
+        ``executemany`` on a statement prepared once per session.
         """
-        daily = storage.get_all_daily_aggregates()
-        monthly = storage.get_all_monthly_aggregates()
+        daily = self.storage.get_all_daily_aggregates()
+        monthly = self.storage.get_all_monthly_aggregates()
         
         if not daily and not monthly:
             return
-        
+
         for attempt in range(self.max_retries):
             try:
-                async with self.pool.acquire() as conn:
+                started = time.perf_counter()
+                async with self.session() as conn:
+                    if self.device_key is None:
+                        await self._register_device(conn)
+                    daily_args, monthly_args, yearly_args = _build_sync_rows(self.device_key, daily, monthly)
+                    # Rows the server-side maintenance already folded away are not re-sent
+                    daily_cutoff = _month_start(date.today(), self.daily_retention_months)
+                    monthly_cutoff = _month_start(date.today(), self.monthly_retention_months)
+                    daily_args = [row for row in daily_args if row[1] >= daily_cutoff]
+                    monthly_args = [row for row in monthly_args if row[1] >= monthly_cutoff]
+
                     async with conn.transaction():
-                        for day in daily:
-                            await conn.execute("""
-                                INSERT INTO daily_aggregates (device_id, date, bytes_sent, bytes_received)
-                                VALUES ($1, $2, $3, $4)
-                                ON CONFLICT (device_id, date) DO UPDATE SET
-                                    bytes_sent = daily_aggregates.bytes_sent + EXCLUDED.bytes_sent,
-                                    bytes_received = daily_aggregates.bytes_received + EXCLUDED.bytes_received
-                            """, day["device_id"], day["date"], day["bytes_sent"], day["bytes_received"])
-                        
-                        for m in monthly:
-                            await conn.execute("""
-                                INSERT INTO monthly_aggregates (device_id, month, bytes_sent, bytes_received)
-                                VALUES ($1, $2, $3, $4)
-                                ON CONFLICT (device_id, month) DO UPDATE SET
-                                    bytes_sent = monthly_aggregates.bytes_sent + EXCLUDED.bytes_sent,
-                                    bytes_received = monthly_aggregates.bytes_received + EXCLUDED.bytes_received
-                            """, m["device_id"], m["month"], m["bytes_sent"], m["bytes_received"])
-                
-                logger.info("Synced %d daily + %d monthly aggregates to NeonDB", len(daily), len(monthly))
+                        if daily_args:
+                            await self._executemany(conn, DAILY_UPSERT_SQL, daily_args)
+                        if monthly_args:
+                            await self._executemany(conn, MONTHLY_UPSERT_SQL, monthly_args)
+                        if yearly_args:
+                            await self._executemany(conn, YEARLY_UPSERT_SQL, yearly_args)
+
+                    if self.on_demand:
+                        # Refresh global views while the compute is awake so API
+                        # reads are served from cache instead of waking it again.
+                        await self._refresh_global_cache(conn)
+
+                    await self._maybe_run_maintenance(conn)
+
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                stats = self.connection_stats
+                stats["cycles"] += 1
+                stats["last_cycle_ms"] = round(elapsed_ms, 1)
+                stats["last_cycle_rows"] = len(daily_args) + len(monthly_args) + len(yearly_args)
+                stats["last_cycle_at"] = datetime.utcnow().isoformat()
+                SYNC_CYCLE_SECONDS.observe(elapsed_ms / 1000)
+                SYNC_ROWS.inc(len(daily_args), table="daily_usage")
+                SYNC_ROWS.inc(len(monthly_args), table="monthly_usage")
+                SYNC_ROWS.inc(len(yearly_args), table="yearly_usage")
+
+                if self.on_demand:
+                    logger.info(
+                        "Synced %d daily + %d monthly aggregates to NeonDB (connect %.0f ms, cycle %.0f ms)",
+                        len(daily), len(monthly), stats["last_connect_ms"] or 0, elapsed_ms,
+                    )
+                else:
+                    logger.info("Synced %d daily + %d monthly aggregates to NeonDB", len(daily), len(monthly))
                 break
                 
             except Exception as e:
@@ -186,6 +338,20 @@ class NeonSync:
                 else:
                     raise
 
+    async def _refresh_global_cache(self, conn: asyncpg.Connection):
+        """Populate the global usage cache using an already-open connection."""
+        ttl = max(self._cache_ttl, self.sync_interval * 2)
+        today_row = await conn.fetchrow(GLOBAL_TODAY_SQL, date.today())
+        if today_row and today_row["total_sent"] is not None:
+            self._cache_set("global_today", (int(today_row["total_sent"]), int(today_row["total_received"])), ttl)
+
+        lifetime_row = await conn.fetchrow(GLOBAL_LIFETIME_SQL)
+        if lifetime_row and lifetime_row["total_sent"] is not None:
+            self._cache_set("global_lifetime", (int(lifetime_row["total_sent"]), int(lifetime_row["total_received"])), ttl)
+
+        count = await conn.fetchval("SELECT COUNT(*) FROM devices")
+        self._cache_set("device_count", count or 1, ttl)
+
     async def get_global_today_usage(self) -> Tuple[int, int]:
         """Fetch today's total usage across all devices from NeonDB.
         
@@ -195,19 +361,13 @@ class NeonSync:
         if cached is not None:
             return cached
         
-        if not self.enabled or not self.pool:
+        if not self._available():
             return 0, 0
             
         try:
             today_date = date.today()
-            async with self.pool.acquire() as conn:
-                row = await conn.fetchrow("""
-                    SELECT 
-                        SUM(bytes_sent) as total_sent,
-                        SUM(bytes_received) as total_received
-                    FROM daily_aggregates
-                    WHERE date = $1
-                """, today_date)
+            async with self.session() as conn:
+                row = await conn.fetchrow(GLOBAL_TODAY_SQL, today_date)
                 
                 if row and row["total_sent"] is not None:
                     result = (int(row["total_sent"]), int(row["total_received"]))
@@ -226,17 +386,12 @@ class NeonSync:
         if cached is not None:
             return cached
         
-        if not self.enabled or not self.pool:
+        if not self._available():
             return 0, 0
             
         try:
-            async with self.pool.acquire() as conn:
-                row = await conn.fetchrow("""
-                    SELECT 
-                        SUM(bytes_sent) as total_sent,
-                        SUM(bytes_received) as total_received
-                    FROM monthly_aggregates
-                """)
+            async with self.session() as conn:
+                row = await conn.fetchrow(GLOBAL_LIFETIME_SQL)
                 
                 if row and row["total_sent"] is not None:
                     result = (int(row["total_sent"]), int(row["total_received"]))
@@ -256,11 +411,11 @@ class NeonSync:
         if cached is not None:
             return cached
         
-        if not self.enabled or not self.pool:
+        if not self._available():
             return 1
             
         try:
-            async with self.pool.acquire() as conn:
+            async with self.session() as conn:
                 count = await conn.fetchval("SELECT COUNT(*) FROM devices")
                 result = count or 1
                 self._cache_set("device_count", result)
@@ -275,67 +430,152 @@ class NeonSync:
         Free-tier optimization: Only vacuums aggregate tables — raw usage_logs
         are no longer synced to NeonDB.
         """
-        if not self.enabled or not self.pool:
+        if not self._available():
             return False
         
         try:
-            async with self.pool.acquire() as conn:
-                await conn.execute("VACUUM ANALYZE daily_aggregates")
-                await conn.execute("VACUUM ANALYZE monthly_aggregates")
-                await conn.execute("VACUUM ANALYZE devices")
+            async with self.session() as conn:
+                for table in REMOTE_TABLES:
+                    await conn.execute(f"VACUUM ANALYZE {table}")
                 return True
         except Exception as e:
             logger.error("Failed to vacuum NeonDB: %s", e)
         return False
 
+    async def drop_legacy_tables(self) -> list:
+        """Drop the v1 tables the v2 migration left behind; returns the ones that existed.
+
+        Only safe once every device sharing the database runs schema v2 or
+        later: older releases still write to these tables.
+        """
+        if not self._available():
+            return []
+
+        async with self.session() as conn:
+            existing = await conn.fetch(
+                "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename = ANY($1::TEXT[])",
+                list(LEGACY_TABLES),
+            )
+            dropped = [row["tablename"] for row in existing]
+            async with conn.transaction():
+                for table in dropped:
+                    await conn.execute(f"DROP TABLE IF EXISTS {table}")
+        return dropped
+
     async def get_storage_usage_percent(self) -> float:
         """Get storage usage as percentage of 512MB NeonDB free tier limit."""
         storage_info = await self.get_storage_usage()
         total_mb = storage_info.get("total_mb", 0)
         return round((total_mb / 512) * 100, 1)
 
+    def _maintenance_due(self) -> bool:
+        snapshot = self._get_storage_snapshot()
+        if not snapshot or not snapshot.get("ran_at"):
+            return True
+        elapsed = datetime.utcnow() - datetime.fromisoformat(snapshot["ran_at"])
+        return elapsed.total_seconds() >= self.maintenance_interval
+
+    async def _maybe_run_maintenance(self, conn: asyncpg.Connection):
+        """Run scheduled maintenance on an already-open connection, if due.
+
+        Piggybacks on connections opened for sync so maintenance never wakes
+        a suspended compute on its own.
+        """
+        if not self._maintenance_due():
+            return
+        try:
+            result = await self._run_maintenance(conn, self.daily_retention_months, self.monthly_retention_months, vacuum=True)
+            logger.info(
+                "NeonDB maintenance: rolled up %d daily / %d monthly, deleted %d daily / %d monthly rows",
+                result.get("daily_rolled_up", 0), result.get("yearly_rolled_up", 0),
+                result.get("daily_deleted", 0), result.get("monthly_deleted", 0),
+            )
+        except Exception as e:
+            logger.error("NeonDB maintenance failed: %s", e)
+
+    async def _run_maintenance(self, conn: asyncpg.Connection, daily_keep_months: int,
+                               monthly_keep_months: int, vacuum: bool = False) -> dict:
+        """One pb_maintenance() call (+ optional VACUUM); caches the returned size stats."""
+        result = json.loads(await conn.fetchval("SELECT pb_maintenance($1, $2)", daily_keep_months, monthly_keep_months))
+        result["vacuum_run"] = False
+        if vacuum and (result.get("daily_deleted") or result.get("monthly_deleted")):
+            # VACUUM cannot run inside the function's transaction
+            for table in REMOTE_TABLES:
+                await conn.execute(f"VACUUM ANALYZE {table}")
+            result["vacuum_run"] = True
+        self._set_storage_snapshot(result, ran_at=datetime.utcnow().isoformat())
+        return result
+
+    async def run_maintenance(self, daily_keep_months: Optional[int] = None,
+                              monthly_keep_months: Optional[int] = None, vacuum: bool = False) -> dict:
+        """Prune + roll up remote aggregates in one server-side call.
+
+        Daily rows older than ``daily_keep_months`` are folded into their month,
+        monthly rows older than ``monthly_keep_months`` into the yearly arrays,
+        so lifetime totals are kept. Returns counts and fresh size stats.
+        """
+        if not self._available():
+            return {}
+
+        daily_keep = daily_keep_months if daily_keep_months is not None else self.daily_retention_months
+        monthly_keep = max(monthly_keep_months if monthly_keep_months is not None else self.monthly_retention_months, daily_keep)
+        try:
+            async with self.session() as conn:
+                return await self._run_maintenance(conn, daily_keep, monthly_keep, vacuum)
+        except Exception as e:
+            logger.error("NeonDB maintenance failed: %s", e)
+        return {}
+
+    def _get_storage_snapshot(self) -> Optional[dict]:
+        if self._storage_snapshot is None:
+            state = self.storage.get_state("neon_storage_snapshot")
+            if state.get("value_text"):
+                try:
+                    self._storage_snapshot = json.loads(state["value_text"])
+                except ValueError:
+                    pass
+        return self._storage_snapshot
+
+    def _set_storage_snapshot(self, stats: dict, ran_at: Optional[str]):
+        """Cache size stats; ``ran_at`` is the last maintenance run (drives scheduling)."""
+        snapshot = {
+            key: stats.get(key)
+            for key in ("device_count", "daily_count", "monthly_count", "yearly_count", "total_bytes", "tables", "measured_at")
+        }
+        snapshot["ran_at"] = ran_at
+        self._storage_snapshot = snapshot
+        self.storage.set_state("neon_storage_snapshot", value_text=json.dumps(snapshot))
+
+    async def refresh_storage_stats(self) -> Optional[dict]:
+        """Re-measure sizes/row counts now (wakes the compute; for explicit user requests)."""
+        if not self._available():
+            return None
+        try:
+            async with self.session() as conn:
+                stats = json.loads(await conn.fetchval("SELECT pb_storage_stats()"))
+            # Re-measuring is not a maintenance run: keep the schedule as it was
+            previous = self._get_storage_snapshot() or {}
+            self._set_storage_snapshot(stats, ran_at=previous.get("ran_at"))
+            return self._storage_snapshot
+        except Exception as e:
+            logger.error("Failed to refresh NeonDB storage stats: %s", e)
+        return None
+
     async def aggressive_cleanup(self) -> dict:
         """Aggressive cleanup when storage is critically high.
         
         Free-tier optimization: Only cleans aggregates — raw logs are no
         longer synced to NeonDB. Reduces retention to minimal levels.
+        Older rows are still folded into monthly/yearly totals.
         """
-        if not self.enabled or not self.pool:
-            return {"aggregates_deleted": {}, "vacuum_run": False}
-        
-        results = {"aggregates_deleted": {}, "vacuum_run": False}
-        
-        try:
-            async with self.pool.acquire() as conn:
-                daily_deleted = await conn.fetchval("""
-                    WITH deleted AS (
-                        DELETE FROM daily_aggregates
-                        WHERE date < CURRENT_DATE - INTERVAL '1 month'
-                        RETURNING 1
-                    )
-                    SELECT COUNT(*) FROM deleted
-                """)
-                
-                monthly_deleted = await conn.fetchval("""
-                    WITH deleted AS (
-                        DELETE FROM monthly_aggregates
-                        WHERE month < TO_CHAR(CURRENT_DATE - INTERVAL '2 months', 'YYYY-MM')
-                        RETURNING 1
-                    )
-                    SELECT COUNT(*) FROM deleted
-                """)
-                
-                results["aggregates_deleted"] = {
-                    "daily": daily_deleted or 0,
-                    "monthly": monthly_deleted or 0
-                }
-            
-            results["vacuum_run"] = await self.vacuum_database()
-            
-        except Exception as e:
-            logger.error("Aggressive cleanup failed: %s", e)
-        
-        return results
+        result = await self.run_maintenance(daily_keep_months=1, monthly_keep_months=2, vacuum=True)
+        return {
+            "aggregates_deleted": {
+                "daily": result.get("daily_deleted", 0),
+                "monthly": result.get("monthly_deleted", 0),
+            } if result else {},
+            "vacuum_run": result.get("vacuum_run", False),
+        }
 
     async def cleanup_old_logs(self, days_to_keep: int = 30) -> int:
         """Deprecated: Raw logs are no longer synced to NeonDB.
@@ -346,126 +586,66 @@ class NeonSync:
         return 0
 
     async def cleanup_old_aggregates(self, months_to_keep: int = 12) -> dict:
-        if not self.enabled or not self.pool:
-            return {"daily_deleted": 0, "monthly_deleted": 0}
-        
-        try:
-            async with self.pool.acquire() as conn:
-                daily_deleted = await conn.fetchval("""
-                    WITH deleted AS (
-                        DELETE FROM daily_aggregates
-                        WHERE date < CURRENT_DATE - INTERVAL '1 month' * $1
-                        RETURNING 1
-                    )
-                    SELECT COUNT(*) FROM deleted
-                """, months_to_keep)
-                
-                monthly_deleted = await conn.fetchval("""
-                    WITH deleted AS (
-                        DELETE FROM monthly_aggregates
-                        WHERE month < TO_CHAR(CURRENT_DATE - INTERVAL '1 month' * $1, 'YYYY-MM')
-                        RETURNING 1
-                    )
-                    SELECT COUNT(*) FROM deleted
-                """, months_to_keep)
-                
-                return {
-                    "daily_deleted": daily_deleted or 0,
-                    "monthly_deleted": monthly_deleted or 0
-                }
-        except Exception as e:
-            logger.error("Failed to cleanup old aggregates: %s", e)
-        return {"daily_deleted": 0, "monthly_deleted": 0}
+        """Prune daily rows older than ``months_to_keep`` (rolled up, see run_maintenance)."""
+        result = await self.run_maintenance(daily_keep_months=months_to_keep)
+        return {
+            "daily_deleted": result.get("daily_deleted", 0),
+            "monthly_deleted": result.get("monthly_deleted", 0),
+        }
 
-    async def get_remote_stats(self) -> dict:
+    async def get_remote_stats(self, refresh: bool = False) -> dict:
         """Get remote statistics.
         
-        Free-tier optimization: Only queries aggregate tables and devices.
-        Raw usage_logs are no longer synced to NeonDB.
+        Served from the snapshot taken by the last maintenance run, so
+        dashboard views never wake the remote compute. ``refresh`` re-measures.
         """
-        if not self.enabled or not self.pool:
+        snapshot = await self.refresh_storage_stats() if refresh else self._get_storage_snapshot()
+        if not self.enabled or not snapshot:
             return {
                 "device_count": 0,
                 "daily_count": 0,
                 "monthly_count": 0,
                 "table_sizes": {}
             }
-        
-        try:
-            async with self.pool.acquire() as conn:
-                device_count = await conn.fetchval("SELECT COUNT(*) FROM devices")
-                daily_count = await conn.fetchval("SELECT COUNT(*) FROM daily_aggregates")
-                monthly_count = await conn.fetchval("SELECT COUNT(*) FROM monthly_aggregates")
-                
-                table_sizes = await conn.fetch("""
-                    SELECT 
-                        tablename,
-                        pg_relation_size(schemaname || '.' || tablename) as size_bytes
-                    FROM pg_tables 
-                    WHERE schemaname = 'public'
-                """)
-                
-                return {
-                    "device_count": device_count or 0,
-                    "daily_count": daily_count or 0,
-                    "monthly_count": monthly_count or 0,
-                    "table_sizes": {
-                        row["tablename"]: row["size_bytes"] or 0
-                        for row in table_sizes
-                    }
-                }
-        except Exception as e:
-            logger.error("Failed to get remote stats: %s", e)
+
         return {
-            "device_count": 0,
-            "daily_count": 0,
-            "monthly_count": 0,
-            "table_sizes": {}
+            "device_count": snapshot.get("device_count") or 0,
+            "daily_count": snapshot.get("daily_count") or 0,
+            "monthly_count": snapshot.get("monthly_count") or 0,
+            "yearly_count": snapshot.get("yearly_count") or 0,
+            "schema_version": self.schema_version,
+            "measured_at": snapshot.get("measured_at"),
+            "table_sizes": {
+                name: sizes.get("size_bytes") or 0
+                for name, sizes in (snapshot.get("tables") or {}).items()
+            }
         }
 
-    async def get_storage_usage(self) -> dict:
-        if not self.enabled or not self.pool:
+    async def get_storage_usage(self, refresh: bool = False) -> dict:
+        """Remote size per table, from the cached maintenance snapshot (see get_remote_stats)."""
+        snapshot = await self.refresh_storage_stats() if refresh else self._get_storage_snapshot()
+        if not self.enabled or not snapshot:
             return {"total_mb": 0.0, "tables": {}}
-        
-        try:
-            async with self.pool.acquire() as conn:
-                table_sizes = await conn.fetch("""
-                    SELECT 
-                        tablename,
-                        pg_relation_size(schemaname || '.' || tablename) as size_bytes,
-                        pg_total_relation_size(schemaname || '.' || tablename) as total_bytes
-                    FROM pg_tables 
-                    WHERE schemaname = 'public'
-                    ORDER BY total_bytes DESC
-                """)
-                
-                total_bytes = 0
-                tables = {}
-                
-                for row in table_sizes:
-                    size_bytes = row["size_bytes"] or 0
-                    total_bytes_table = row["total_bytes"] or 0
-                    total_bytes += total_bytes_table
-                    
-                    tables[row["tablename"]] = {
-                        "table_size_mb": round(size_bytes / (1024 * 1024), 2),
-                        "total_size_mb": round(total_bytes_table / (1024 * 1024), 2)
-                    }
-                
-                return {
-                    "total_mb": round(total_bytes / (1024 * 1024), 2),
-                    "tables": tables
-                }
-        except Exception as e:
-            logger.error("Failed to get storage usage: %s", e)
-        return {"total_mb": 0.0, "tables": {}}
+
+        tables = {}
+        for name, sizes in sorted((snapshot.get("tables") or {}).items(), key=lambda item: -(item[1].get("total_bytes") or 0)):
+            tables[name] = {
+                "table_size_mb": round((sizes.get("size_bytes") or 0) / (1024 * 1024), 2),
+                "total_size_mb": round((sizes.get("total_bytes") or 0) / (1024 * 1024), 2)
+            }
+
+        return {
+            "total_mb": round((snapshot.get("total_bytes") or 0) / (1024 * 1024), 2),
+            "tables": tables,
+            "measured_at": snapshot.get("measured_at"),
+        }
 
     async def stop(self):
         """Stop sync service gracefully."""
         self.running = False
         
         # Final sync attempt
-        if self.enabled and self.pool:
+        if self._available():
             try:
                 await self._sync_data()
             except Exception as e:
@@ -475,5 +655,61 @@ class NeonSync:
             await self.pool.close()
 
 
+def _as_date(value) -> date:
+    """SQLite returns DATE columns as ISO strings; asyncpg wants date objects."""
+    if isinstance(value, str):
+        return date.fromisoformat(value)
+    return value
+
+
+def _month_start(today: date, months_back: int) -> date:
+    """First day of the month ``months_back`` months before ``today`` (matches pb_maintenance)."""
+    index = today.year * 12 + today.month - 1 - months_back
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _build_sync_rows(device_key: int, daily: list, monthly: list) -> Tuple[list, list, list]:
+    """Shape local aggregates into schema v2 rows.
+
+    Monthly peak/sample columns are derived from the daily rows, but only for
+    months whose daily rows are all still held locally (their byte totals add
+    up to the monthly row); for pruned or partly pruned months they are NULL
+    and the server keeps what it has. Yearly rows carry 12-slot arrays where
+    months without local data are NULL in the same way.
+    """
+    daily_args = []
+    month_extra: Dict[str, list] = {}
+    for d in daily:
+        day = _as_date(d["date"])
+        peak = d.get("peak_speed") or 0
+        samples = d.get("samples") or 0
+        daily_args.append((device_key, day, d["bytes_sent"], d["bytes_received"], peak, samples))
+        extra = month_extra.setdefault(day.strftime("%Y-%m"), [0, 0, 0, 0])
+        extra[0] = max(extra[0], peak)
+        extra[1] += samples
+        extra[2] += d["bytes_sent"]
+        extra[3] += d["bytes_received"]
+
+    monthly_args = []
+    years: Dict[int, list] = {}
+    for m in monthly:
+        month_start = date.fromisoformat(m["month"] + "-01")
+        peak = samples = None
+        extra = month_extra.get(m["month"])
+        if extra and extra[2] == m["bytes_sent"] and extra[3] == m["bytes_received"]:
+            peak, samples = extra[0], extra[1]
+        monthly_args.append((device_key, month_start, m["bytes_sent"], m["bytes_received"], peak, samples))
+
+        slots = years.setdefault(month_start.year, [[None] * 12 for _ in range(4)])
+        i = month_start.month - 1
+        slots[0][i] = m["bytes_sent"]
+        slots[1][i] = m["bytes_received"]
+        slots[2][i] = peak
+        slots[3][i] = samples
+
+    yearly_args = [(device_key, year, *slots) for year, slots in sorted(years.items())]
+    return daily_args, monthly_args, yearly_args
+
+
 # Global sync instance
 sync = NeonSync()
@@ -1,15 +1,21 @@
 """Export rewind system API routes."""
 
+import itertools
 import logging
 
 from datetime import date as date_type
+from typing import Iterator, Optional
 
 from fastapi import APIRouter, Query
-from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
 
-from .data_provider import compute_export_data
-from .html_report import generate_html_report
+from ..core.storage import storage
+from ..core.sync import sync
+from .archive import archive
+from .data_provider import compute_export_data, resolve_range
+from .html_report import stream_html_report
 from .markdown_report import generate_markdown_report
+from .report_cache import reports
 
 logger = logging.getLogger(__name__)
 
@@ -22,35 +28,63 @@ async def generate_export(
     format: str = Query("html", description="html or markdown"),
     start_date: str = Query(None, description="YYYY-MM-DD for custom range"),
     end_date: str = Query(None, description="YYYY-MM-DD for custom range"),
+    daily: bool = Query(False, description="HTML only: add a per-day usage table"),
 ):
     try:
         start = date_type.fromisoformat(start_date) if start_date else None
         end = date_type.fromisoformat(end_date) if end_date else None
+        range_start, range_end = resolve_range(range_type, start, end)
+        all_devices = not sync.enabled
+        format = "markdown" if format == "markdown" else "html"
 
-        data = compute_export_data(
-            range_type=range_type,
-            start_date=start,
-            end_date=end,
-        )
-
-        if data.get("total_bytes", 0) == 0:
-            return HTMLResponse(status_code=204)
+        def report_data() -> Optional[dict]:
+            data = compute_export_data(
+                range_type="custom",
+                start_date=range_start,
+                end_date=range_end,
+                all_devices=all_devices,
+            )
+            return data if data.get("total_bytes", 0) else None
 
         if format == "markdown":
-            content = generate_markdown_report(data)
+            def render() -> str:
+                data = report_data()
+                return generate_markdown_report(data) if data else ""
+
+            # Closed ranges (ending before today) are served from the cache until history changes
+            content = reports.get_or_render("generate:markdown", render, range_start, range_end, all_devices)
+            if not content:
+                return HTMLResponse(status_code=204)
             return PlainTextResponse(
                 content=content,
                 media_type="text/markdown",
                 headers={
-                    "Content-Disposition": f"attachment; filename=packetbuddy_report_{data.get('start_date', 'export')}.md"
+                    "Content-Disposition": f"attachment; filename=packetbuddy_report_{range_start.isoformat()}.md"
                 },
             )
 
-        content = generate_html_report(data)
-        return HTMLResponse(
-            content=content,
+        def render_html() -> Iterator[str]:
+            data = report_data()
+            if not data:
+                return iter(())
+            days = None
+            if daily:
+                chunks = storage.iter_daily_aggregates(from_date=range_start, to_date=range_end,
+                                                       all_devices=all_devices)
+                days = (row for chunk in chunks for row in chunk)
+            return stream_html_report(data, days)
+
+        kind = "generate:html:daily" if daily else "generate:html"
+        body = reports.stream_or_render(kind, render_html, range_start, range_end, all_devices)
+        first = next(body, b"")
+        if not first:
+            return HTMLResponse(status_code=204)
+        # The rest (e.g. years of daily rows) is rendered while it is sent
+        return StreamingResponse(
+            itertools.chain((first,), body),
+            media_type="text/html",
             headers={
-                "Content-Disposition": f"attachment; filename=packetbuddy_report_{data.get('start_date', 'export')}.html"
+                "Content-Disposition": f"attachment; filename=packetbuddy_report_{range_start.isoformat()}.html"
             },
         )
     except Exception as e:
@@ -59,3 +93,19 @@ async def generate_export(
             status_code=500,
             content={"error": "Failed to generate export", "detail": str(e)},
         )
+
+
+@export_router.get("/archive")
+async def list_archive():
+    """Pre-rendered reports of closed months and years, newest first."""
+    return {"reports": archive.list()}
+
+
+@export_router.get("/archive/{filename}")
+async def download_archive(filename: str):
+    """One archived report file (served straight from disk)."""
+    found = archive.find(filename)
+    if found is None:
+        return JSONResponse(status_code=404, content={"error": f"No archived report named {filename}"})
+    path, media_type = found
+    return FileResponse(path, media_type=media_type, filename=f"packetbuddy_report_{filename}")
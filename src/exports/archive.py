@@ -0,0 +1,218 @@
+"""Pre-rendered reports for closed months and years (``/api/exports/archive``).
+
+A month or year that has ended gains no new days, so its HTML, Markdown and
+TOON reports are rendered once, shortly after the boundary, by a background
+task on a single low-priority thread, and written to
+``~/.packetbuddy/reports``. Downloads are then a file read. Each period's
+``period_stats`` row is kept in ``index.json`` as a fingerprint: a late
+write into a closed period (a hub batch, a backfill) changes it, and the
+period is rendered again on the next check.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..core.storage import storage
+from ..core.sync import sync
+from ..utils.config import config
+from .data_provider import summarize_model
+from .html_report import generate_html_report
+from .markdown_report import generate_markdown_report
+from .model import build_range_model
+from .report_cache import write_atomic
+from .toon_report import generate_toon_report
+
+logger = logging.getLogger(__name__)
+
+# format -> (file extension, media type)
+ARCHIVE_FORMATS = {
+    "html": ("html", "text/html"),
+    "markdown": ("md", "text/markdown"),
+    "toon": ("toon", "text/plain"),
+}
+
+# Let the last samples of a period land before rendering it
+BOUNDARY_DELAY = timedelta(minutes=10)
+# Between boundaries, re-check hourly (late writes, suspend/resume, clock changes)
+CHECK_INTERVAL = 3600
+
+_FINGERPRINT = ("bytes_sent", "bytes_received", "days_tracked", "peak_speed", "peak_day_bytes")
+
+
+@dataclass(frozen=True)
+class Period:
+    name: str  # "2026-09" (month) or "2025" (year)
+    start: date
+    end: date
+
+    @property
+    def kind(self) -> str:
+        return "month" if len(self.name) == 7 else "year"
+
+
+def closed_periods(today: date, months: int) -> List[Period]:
+    """The last ``months`` closed months, then the last closed year (newest first)."""
+    periods = []
+    end = today.replace(day=1) - timedelta(days=1)
+    for _ in range(months):
+        periods.append(Period(end.strftime("%Y-%m"), end.replace(day=1), end))
+        end = end.replace(day=1) - timedelta(days=1)
+    year = today.year - 1
+    periods.append(Period(str(year), date(year, 1, 1), date(year, 12, 31)))
+    return periods
+
+
+def seconds_until_next_check(now: datetime) -> float:
+    """Until just after the next month boundary, but at most ``CHECK_INTERVAL``."""
+    boundary = datetime(now.year, now.month, 1) + BOUNDARY_DELAY
+    if now >= boundary:
+        next_month = (now.replace(day=1) + timedelta(days=32)).replace(day=1)
+        boundary = datetime(next_month.year, next_month.month, 1) + BOUNDARY_DELAY
+    return max(1.0, min(CHECK_INTERVAL, (boundary - now).total_seconds()))
+
+
+def _lower_priority():
+    # Runs on the archive thread: on Linux a thread id is a valid PRIO_PROCESS target,
+    # so only this thread is reniced (elsewhere it would renice the whole process)
+    if not sys.platform.startswith("linux"):
+        return
+    try:
+        tid = threading.get_native_id()
+        os.setpriority(os.PRIO_PROCESS, tid, min(19, os.getpriority(os.PRIO_PROCESS, tid) + 10))
+    except (AttributeError, OSError):
+        logger.debug("Could not lower the report archive thread's priority", exc_info=True)
+
+
+class ReportArchive:
+    """Rendered reports of closed periods in a directory, listed by ``index.json``."""
+
+    def __init__(self, directory: Path, months: int = 12):
+        self.directory = directory
+        self.months = months
+        self._index: Optional[Dict[str, dict]] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / "index.json"
+
+    def _load_index(self) -> Dict[str, dict]:
+        if self._index is None:
+            try:
+                self._index = json.loads(self.index_path.read_text(encoding="utf-8"))
+            except FileNotFoundError:
+                self._index = {}
+            except (OSError, ValueError):
+                logger.warning("Could not read report archive index %s", self.index_path, exc_info=True)
+                self._index = {}
+        return self._index
+
+    @staticmethod
+    def _fingerprint(period: Period, all_devices: bool) -> Optional[list]:
+        rows = storage.get_period_stats(period.kind == "month", period.name, period.name, all_devices=all_devices)
+        return [rows[0][column] for column in _FINGERPRINT] if rows else None
+
+    def _is_current(self, entry: Optional[dict], scope: str, fingerprint: list) -> bool:
+        return (
+            entry is not None
+            and entry["scope"] == scope
+            and entry["fingerprint"] == fingerprint
+            and all((self.directory / f["file"]).exists() for f in entry["files"].values())
+        )
+
+    def _render(self, period: Period, all_devices: bool, scope: str, fingerprint: list) -> dict:
+        model = build_range_model(storage, period.start, period.end, all_devices)
+        summary = summarize_model(model)
+        bodies = {
+            "html": generate_html_report(summary),
+            "markdown": generate_markdown_report(summary),
+            "toon": generate_toon_report(model),
+        }
+        files = {}
+        for fmt, body in bodies.items():
+            data = body.encode("utf-8")
+            filename = f"{period.name}.{ARCHIVE_FORMATS[fmt][0]}"
+            write_atomic(self.directory / filename, data)
+            files[fmt] = {"file": filename, "bytes": len(data)}
+        return {
+            "kind": period.kind,
+            "start": period.start.isoformat(),
+            "end": period.end.isoformat(),
+            "scope": scope,
+            "fingerprint": fingerprint,
+            "generated_at": datetime.utcnow().isoformat(),
+            "files": files,
+        }
+
+    def refresh(self, today: Optional[date] = None) -> List[str]:
+        """Render closed periods that have data but no current archive; returns their names."""
+        all_devices = not sync.enabled
+        scope = "all" if all_devices else storage.device_id
+        rendered = []
+        with self._lock:
+            index = dict(self._load_index())
+            for period in closed_periods(today or date.today(), self.months):
+                fingerprint = self._fingerprint(period, all_devices)
+                if fingerprint is None or self._is_current(index.get(period.name), scope, fingerprint):
+                    continue
+                index[period.name] = self._render(period, all_devices, scope, fingerprint)
+                rendered.append(period.name)
+            if rendered:
+                write_atomic(self.index_path, json.dumps(index, indent=2, sort_keys=True).encode("utf-8"))
+                self._index = index
+        return rendered
+
+    def list(self) -> List[dict]:
+        """Archived periods, newest first, with their download URLs."""
+        entries = []
+        for name, entry in sorted(self._load_index().items(), key=lambda item: item[1]["end"], reverse=True):
+            entries.append({
+                "period": name,
+                "kind": entry["kind"],
+                "start": entry["start"],
+                "end": entry["end"],
+                "generated_at": entry["generated_at"],
+                "formats": {
+                    fmt: {"url": f"/api/exports/archive/{f['file']}", "bytes": f["bytes"]}
+                    for fmt, f in entry["files"].items()
+                },
+            })
+        return entries
+
+    def find(self, filename: str) -> Optional[tuple]:
+        """``(path, media type)`` of an archived file; only names listed in the index resolve."""
+        for entry in self._load_index().values():
+            for fmt, f in entry["files"].items():
+                if f["file"] == filename:
+                    path = self.directory / filename
+                    return (path, ARCHIVE_FORMATS[fmt][1]) if path.exists() else None
+        return None
+
+    async def run(self):
+        """Background task: archive closed periods now, then just after every month boundary."""
+        loop = asyncio.get_running_loop()
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-archive",
+                                      initializer=_lower_priority)
+        try:
+            while True:
+                try:
+                    rendered = await loop.run_in_executor(executor, self.refresh)
+                    if rendered:
+                        logger.info("Archived reports for %s", ", ".join(rendered))
+                except Exception:
+                    logger.warning("Report archive refresh failed", exc_info=True)
+                await asyncio.sleep(seconds_until_next_check(datetime.now()))
+        finally:
+            executor.shutdown(wait=False)
+
+
+archive = ReportArchive(config.reports_dir, months=config.get("exports", "archive_months", default=12))
@@ -0,0 +1,190 @@
+"""Batch rendering of HTML/Markdown/TOON reports for many devices and ranges (``pb report batch``).
+
+Every (device, range) pair is one job. Jobs run in a process pool: each
+worker opens the database once, read-only, builds the export model for its
+job with a single read and renders every requested format from it. Reports
+are written atomically, so a directory being synced or served never holds a
+half-written file.
+"""
+
+import calendar
+import logging
+import os
+import re
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+from ..core.storage import Storage
+from .data_provider import VALID_RANGES, resolve_range, summarize_model
+from .html_report import generate_html_report
+from .markdown_report import generate_markdown_report
+from .model import build_range_model
+from .report_cache import write_atomic
+from .toon_report import generate_toon_report
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"html": "html", "markdown": "md", "toon": "toon"}
+
+
+class ReadOnlyStorage(Storage):
+    """One device's view of a database over a single read-only connection.
+
+    Skips schema setup and every write path of ``Storage``: only the read
+    queries the export models use are meant to be called on it.
+    """
+
+    def __init__(self, connection: sqlite3.Connection, device_id: str):
+        self.db_path = None
+        self.device_id = device_id
+        self._connection = connection
+
+    @staticmethod
+    def connect(db_path) -> sqlite3.Connection:
+        conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    @contextmanager
+    def get_connection(self):
+        yield self._connection
+
+
+@dataclass(frozen=True)
+class ReportRange:
+    label: str  # file name stem, e.g. "2026-09" or "all"
+    start: date
+    end: date
+
+
+@dataclass
+class BatchResult:
+    written: List[Path] = field(default_factory=list)
+    empty: int = 0
+    failed: Dict[str, str] = field(default_factory=dict)
+    bytes_written: int = 0
+    seconds: float = 0.0
+
+    @property
+    def reports_per_second(self) -> float:
+        return len(self.written) / self.seconds if self.seconds else 0.0
+
+
+def parse_range(spec: str, today: Optional[date] = None) -> ReportRange:
+    """Range from ``today|week|month|year|all``, ``last-month``, ``YYYY``, ``YYYY-MM`` or ``FROM:TO`` dates.
+
+    Raises ``ValueError`` for anything else.
+    """
+    today = today or date.today()
+    spec = spec.strip()
+    if spec in VALID_RANGES - {"custom"}:
+        start, end = resolve_range(spec)
+        return ReportRange(spec, start, end)
+    if spec == "last-month":
+        end = today.replace(day=1) - timedelta(days=1)
+        return ReportRange(end.strftime("%Y-%m"), end.replace(day=1), end)
+    if re.fullmatch(r"\d{4}", spec):
+        year = int(spec)
+        return ReportRange(spec, date(year, 1, 1), min(date(year, 12, 31), today))
+    if re.fullmatch(r"\d{4}-\d{2}", spec):
+        year, month = map(int, spec.split("-"))
+        start = date(year, month, 1)
+        end = start.replace(day=calendar.monthrange(year, month)[1])
+        return ReportRange(spec, start, min(end, today))
+    if ":" in spec:
+        first, last = (date.fromisoformat(part) for part in spec.split(":", 1))
+        if last < first:
+            raise ValueError(f"range ends before it starts: {spec}")
+        return ReportRange(f"{first.isoformat()}_{last.isoformat()}", first, last)
+    raise ValueError(f"unknown range: {spec}")
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9._-]+", "-", text).strip("-") or "device"
+
+
+def device_directory(device_id: str, hostname: str) -> str:
+    """Output sub-directory of a device: readable and unique (hostnames can repeat)."""
+    return f"{_slug(hostname)}-{device_id[:8]}"
+
+
+# Per-process state of pool workers, set up once by _init_worker
+_worker_conn: Optional[sqlite3.Connection] = None
+
+
+def _init_worker(db_path: str):
+    global _worker_conn
+    _worker_conn = ReadOnlyStorage.connect(db_path)
+
+
+def render_job(device: tuple, report_range: ReportRange, formats: Sequence[str], output_dir: str,
+               today: Optional[date] = None) -> List[tuple]:
+    """Render one device and range in every format: ``[(path, size)]``, empty when the range has no data."""
+    device_id, _os_type, hostname = device
+    store = ReadOnlyStorage(_worker_conn, device_id)
+    model = build_range_model(store, report_range.start, report_range.end, all_devices=False,
+                              today=today, device=device)
+    if not model.days_tracked:
+        return []
+
+    summary = None
+    written = []
+    directory = Path(output_dir) / device_directory(device_id, hostname)
+    for fmt in formats:
+        if fmt == "toon":
+            body = generate_toon_report(model)
+        else:
+            summary = summary or summarize_model(model)
+            body = generate_html_report(summary) if fmt == "html" else generate_markdown_report(summary)
+        path = directory / f"{report_range.label}.{FORMATS[fmt]}"
+        data = body.encode("utf-8")
+        write_atomic(path, data)
+        written.append((str(path), len(data)))
+    return written
+
+
+def list_devices(store: Storage, device_ids: Iterable[str] = ()) -> List[tuple]:
+    """``(device_id, os_type, hostname)`` of the requested devices (default: every known device)."""
+    wanted = set(device_ids)
+    with store.get_connection() as conn:
+        rows = conn.execute("SELECT device_id, os_type, hostname FROM devices ORDER BY hostname, device_id").fetchall()
+    return [tuple(row) for row in rows if not wanted or row["device_id"] in wanted]
+
+
+def run_batch(db_path, devices: Sequence[tuple], ranges: Sequence[ReportRange], formats: Sequence[str],
+              output_dir, workers: Optional[int] = None) -> BatchResult:
+    """Render ``devices x ranges`` in ``formats`` into ``output_dir`` with a pool of ``workers`` processes."""
+    result = BatchResult()
+    jobs = [(device, report_range) for device in devices for report_range in ranges]
+    workers = max(1, min(workers or os.cpu_count() or 1, len(jobs) or 1))
+    today = date.today()
+    started = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(str(db_path),)) as pool:
+        futures = {
+            pool.submit(render_job, device, report_range, tuple(formats), str(output_dir), today):
+                f"{device[2]}/{report_range.label}"
+            for device, report_range in jobs
+        }
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                written = future.result()
+            except Exception as e:
+                logger.warning("Batch report %s failed", name, exc_info=True)
+                result.failed[name] = str(e)
+                continue
+            if not written:
+                result.empty += 1
+            for path, size in written:
+                result.written.append(Path(path))
+                result.bytes_written += size
+
+    result.seconds = time.perf_counter() - started
+    return result
@@ -0,0 +1,139 @@
+"""Apache Arrow IPC / Parquet export of raw logs and the hourly/daily tiers.
+
+Record batches are built straight from ``Storage`` cursor chunks and written
+incrementally, so files of any size are produced with one batch in memory.
+Requires the optional ``pyarrow`` package (``pip install pyarrow``).
+"""
+
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency
+    pa = pq = None
+
+from .streaming import DATASETS, iter_dataset
+
+COLUMNAR_FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.file", "arrow"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+# Rows per record batch / Parquet row group
+BATCH_ROWS = 65536
+
+
+class ColumnarUnavailable(RuntimeError):
+    """pyarrow is not installed."""
+
+
+def _column_types() -> Dict[str, "pa.DataType"]:
+    return {
+        "id": pa.int64(),
+        "device_id": pa.string(),
+        "timestamp": pa.timestamp("us"),
+        "hour": pa.timestamp("us"),
+        "date": pa.date32(),
+        "bytes_sent": pa.int64(),
+        "bytes_received": pa.int64(),
+        "peak_speed": pa.int64(),
+        "samples": pa.int64(),
+    }
+
+
+def dataset_schema(name: str) -> "pa.Schema":
+    """Arrow schema for one of ``DATASETS`` (int64 counters, real timestamp/date columns)."""
+    if pa is None:
+        raise ColumnarUnavailable("pyarrow is required for Arrow/Parquet export (pip install pyarrow)")
+    types = _column_types()
+    return pa.schema([(column, types[column]) for column in DATASETS[name]])
+
+
+def _to_batch(chunk: List[Dict], schema: "pa.Schema") -> "pa.RecordBatch":
+    arrays = []
+    for field in schema:
+        values = [row[field.name] for row in chunk]
+        if pa.types.is_timestamp(field.type) or pa.types.is_date(field.type):
+            # SQLite hands these back as ISO strings; let Arrow parse them in C
+            arrays.append(pa.array(values, pa.string()).cast(field.type))
+        else:
+            arrays.append(pa.array(values, field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def writable(self) -> bool:
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _open_writer(format: str, sink, schema: "pa.Schema"):
+    if format == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression="zstd"))
+
+
+def iter_columnar(store, name: str, format: str = "parquet", since: Optional[datetime] = None,
+                  until: Optional[datetime] = None, all_devices: bool = False) -> Iterator[bytes]:
+    """Yield an Arrow IPC file or Parquet file for a dataset, one record batch at a time."""
+    if format not in COLUMNAR_FORMATS:
+        raise ValueError(f"unsupported format: {format}")
+    schema = dataset_schema(name)
+    sink = _ChunkSink()
+    writer = _open_writer(format, sink, schema)
+    try:
+        for chunk in iter_dataset(store, name, since, until, all_devices, chunk_size=BATCH_ROWS):
+            writer.write_batch(_to_batch(chunk, schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def write_columnar(store, name: str, output: BinaryIO, format: str = "parquet",
+                   since: Optional[datetime] = None, until: Optional[datetime] = None,
+                   all_devices: bool = False) -> int:
+    """Write a dataset to an open binary file; returns the number of rows written."""
+    if format not in COLUMNAR_FORMATS:
+        raise ValueError(f"unsupported format: {format}")
+    schema = dataset_schema(name)
+    rows = 0
+    writer = _open_writer(format, output, schema)
+    try:
+        for chunk in iter_dataset(store, name, since, until, all_devices, chunk_size=BATCH_ROWS):
+            writer.write_batch(_to_batch(chunk, schema))
+            rows += len(chunk)
+    finally:
+        writer.close()
+    return rows
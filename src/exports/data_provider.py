@@ -1,13 +1,10 @@
 import logging
 from datetime import date, datetime, timedelta
 from typing import Optional
-from collections import defaultdict
 
-from ..core.storage import storage
-from ..core.sync import sync
-from ..core.device import get_device_info
 from ..utils.formatters import format_bytes
 from ..utils.cost_calculator import get_cost_breakdown
+from .model import ExportModel, is_whole_months, load_export_model, load_period_model
 
 logger = logging.getLogger(__name__)
 
@@ -64,11 +61,12 @@ def compute_comparisons(total_bytes: int) -> dict:
 VALID_RANGES = frozenset({"today", "week", "month", "year", "all", "custom"})
 
 
-def compute_export_data(
+def resolve_range(
     range_type: str = "all",
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
-) -> dict:
+) -> tuple:
+    """``(start, end)`` dates (inclusive) of a report range."""
     if range_type not in VALID_RANGES:
         range_type = "all"
 
@@ -92,16 +90,33 @@ def compute_export_data(
     else:
         start = date.min
         end = today
+    return start, end
 
-    all_days = storage.get_all_daily_aggregates()
 
-    for d in all_days:
-        if isinstance(d["date"], str):
-            d["date"] = date.fromisoformat(d["date"])
+def compute_export_data(
+    range_type: str = "all",
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    all_devices: Optional[bool] = None,
+) -> dict:
+    """Totals, peak and monthly breakdown for a report range (from the shared export model).
+
+    ``all_devices`` defaults to what the API routes use: every local device
+    unless NeonDB sync is on (then this device only).
+    """
+    start, end = resolve_range(range_type, start_date, end_date)
+    if is_whole_months(start, end):
+        # Month, year and lifetime reports: a few pre-materialized period rows
+        model = load_period_model(start, end, all_devices)
+    else:
+        model = load_export_model(start, end, all_devices)
+    return summarize_model(model)
 
-    filtered = [d for d in all_days if start <= d["date"] <= end]
 
-    if not filtered:
+def summarize_model(model: ExportModel) -> dict:
+    """The HTML/Markdown report dict for an export model of any device and range."""
+    start, end = model.start, model.end
+    if not model.days_tracked:
         return {
             "total_sent": 0,
             "total_received": 0,
@@ -116,51 +131,30 @@ def compute_export_data(
             "cost": get_cost_breakdown(0, 0),
             "start_date": start.isoformat(),
             "end_date": end.isoformat(),
+            "hostname": model.hostname,
         }
 
-    total_sent = sum(d["bytes_sent"] for d in filtered)
-    total_received = sum(d["bytes_received"] for d in filtered)
-    total_bytes = total_sent + total_received
-    days_tracked = len(filtered)
-
-    daily_avg = round(total_bytes / days_tracked) if days_tracked else 0
-
-    peak_day_entry = max(filtered, key=lambda d: d.get("peak_speed", 0))
-    peak_speed = peak_day_entry.get("peak_speed", 0) if peak_day_entry else 0
-    peak_day = peak_day_entry["date"].isoformat() if peak_day_entry else None
-
-    personality = classify_personality(total_sent, total_received)
-    comparisons = compute_comparisons(total_bytes)
-    cost = get_cost_breakdown(total_sent, total_received)
-
-    monthly = defaultdict(lambda: {"sent": 0, "received": 0})
-    for d in filtered:
-        month_key = d["date"].strftime("%Y-%m")
-        monthly[month_key]["sent"] += d["bytes_sent"]
-        monthly[month_key]["received"] += d["bytes_received"]
-
-    monthly_breakdown = []
-    for month_key in sorted(monthly.keys()):
-        m = monthly[month_key]
-        monthly_breakdown.append({
-            "month": month_key,
-            "bytes_sent": m["sent"],
-            "bytes_received": m["received"],
-            "total_bytes": m["sent"] + m["received"],
-        })
-
     return {
-        "total_sent": total_sent,
-        "total_received": total_received,
-        "total_bytes": total_bytes,
-        "days_tracked": days_tracked,
-        "daily_avg": daily_avg,
-        "peak_speed": peak_speed,
-        "peak_day": peak_day,
-        "personality": personality,
-        "fun_comparisons": comparisons,
-        "monthly_breakdown": monthly_breakdown,
-        "cost": cost,
+        "total_sent": model.total_sent,
+        "total_received": model.total_received,
+        "total_bytes": model.total_bytes,
+        "days_tracked": model.days_tracked,
+        "daily_avg": round(model.avg_daily),
+        "peak_speed": model.peak_speed,
+        "peak_day": model.peak_speed_day.date,
+        "personality": classify_personality(model.total_sent, model.total_received),
+        "fun_comparisons": compute_comparisons(model.total_bytes),
+        "monthly_breakdown": [
+            {
+                "month": m.month,
+                "bytes_sent": m.bytes_sent,
+                "bytes_received": m.bytes_received,
+                "total_bytes": m.total_bytes,
+            }
+            for m in model.months
+        ],
+        "cost": get_cost_breakdown(model.total_sent, model.total_received),
         "start_date": start.isoformat(),
         "end_date": end.isoformat(),
-    }
\ No newline at end of file
+        "hostname": model.hostname,
+    }
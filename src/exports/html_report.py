@@ -2,9 +2,10 @@
 
 import logging
 from datetime import datetime
+from typing import Iterable, Iterator, Optional
 
 from ..core.device import get_device_info
-from ..utils.formatters import format_bytes, format_speed
+from .template import Template
 
 logger = logging.getLogger(__name__)
 
@@ -167,128 +168,147 @@ def _period_label(start_date: str, end_date: str, days_tracked: int) -> str:
     return "Period"
 
 
-def _month_bars(breakdown: list) -> str:
-    if not breakdown:
-        return ""
-    max_total = max(m["total_bytes"] for m in breakdown)
-    rows = []
-    for m in breakdown:
-        pct = (m["total_bytes"] / max_total * 100) if max_total > 0 else 0
-        rows.append(
-            f"""        <div class="month-row">
-          <span class="month-label">{m["month"]}</span>
+DAILY_CSS = """
+.day-table { width: 100%; border-collapse: collapse; font-size: 13px; font-variant-numeric: tabular-nums; }
+.day-table th { text-align: right; font-weight: 600; color: rgba(255,255,255,0.5); padding: 6px 8px; border-bottom: 1px solid rgba(255,255,255,0.1); }
+.day-table td { text-align: right; padding: 4px 8px; border-bottom: 1px solid rgba(255,255,255,0.04); }
+.day-table th:first-child, .day-table td:first-child { text-align: left; }
+"""
+
+REPORT_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1.0" />
+  <title>Your {{ label }} in Internet &mdash; PacketBuddy</title>
+  <style>{{ css }}{% if days is not None %}{{ daily_css }}{% endif %}</style>
+</head>
+<body>
+  <div class="wrapper">
+
+    <!-- Hero -->
+    <div class="hero">
+      <div class="eyebrow">Your {{ label }} in Internet</div>
+      <h1>{{ hostname | e }}</h1>
+      <div class="hostname">{{ start }} &mdash; {{ end }}</div>
+      <div class="giant-number">{{ total | bytes }}</div>
+      <div class="date-range">total data transferred</div>
+      <div class="breakdown">
+        <div><span class="label">Upload </span><span class="up">{{ sent | bytes }}</span></div>
+        <div><span class="label">Download </span><span class="down">{{ received | bytes }}</span></div>
+      </div>
+    </div>
+
+    <!-- Personality -->
+    <div class="personality-card">
+      <div class="icon">{{ personality.get("icon", "") }}</div>
+      <div class="type">{{ personality.get("type", "User") }}</div>
+      <div class="desc">{{ personality.get("desc", "") }}</div>
+    </div>
+
+    <!-- Stats Grid -->
+    <div class="stats-grid">
+      <div class="stat-card"><div class="stat-value">{{ total | bytes }}</div><div class="stat-label">Total Data</div></div>
+      <div class="stat-card"><div class="stat-value">{{ days_tracked }}</div><div class="stat-label">Days Tracked</div></div>
+      <div class="stat-card"><div class="stat-value">{{ peak_speed | speed }}</div><div class="stat-label">Peak Speed</div></div>
+      <div class="stat-card"><div class="stat-value">{{ daily_avg | bytes }}</div><div class="stat-label">Daily Average</div></div>
+    </div>
+
+    <!-- Monthly Breakdown -->
+{% if breakdown %}
+{% set max_total = max(m["total_bytes"] for m in breakdown) %}
+    <div class="card">
+      <div class="section-title">Monthly Breakdown</div>
+{% for m in breakdown %}
+        <div class="month-row">
+          <span class="month-label">{{ m["month"] }}</span>
           <div class="month-bar-track">
-            <div class="month-bar-fill" style="width: {pct:.1f}%"></div>
+            <div class="month-bar-fill" style="width: {{ (m["total_bytes"] / max_total * 100 if max_total > 0 else 0) | fmt(".1f") }}%"></div>
           </div>
-          <span class="month-value">{format_bytes(m["total_bytes"])}</span>
-        </div>"""
-        )
-    return "\n".join(rows)
-
-
-def _peak_day_html(data: dict) -> str:
-    peak_day = data.get("peak_day")
-    peak_speed = data.get("peak_speed", 0)
-    if not peak_day:
-        return ""
-    speed_str = format_speed(peak_speed) if peak_speed else ""
-    return (
-        f'        <div class="peak-day-box">\n'
-        f'          <div class="label">Peak Day</div>\n'
-        f'          <div class="value">{peak_day}{" &middot; " + speed_str if speed_str else ""}</div>\n'
-        f'        </div>'
-    )
+          <span class="month-value">{{ m["total_bytes"] | bytes }}</span>
+        </div>
+{% endfor %}
+{% if peak_day %}
+        <div class="peak-day-box">
+          <div class="label">Peak Day</div>
+          <div class="value">{{ peak_day }}{% if peak_speed %} &middot; {{ peak_speed | speed }}{% endif %}</div>
+        </div>
+{% else %}
 
+{% endif %}
+    </div>
+{% else %}
 
-def generate_html_report(data: dict) -> str:
-    _device_id, _os_type, hostname = get_device_info()
+{% endif %}
+{% if days is not None %}
+
+    <!-- Daily Usage -->
+    <div class="card">
+      <div class="section-title">Daily Usage</div>
+      <table class="day-table">
+        <tr><th>Date</th><th>Upload</th><th>Download</th><th>Total</th><th>Peak Speed</th></tr>
+{% for day in days %}
+        <tr><td>{{ day["date"] }}</td><td>{{ day["bytes_sent"] | bytes }}</td><td>{{ day["bytes_received"] | bytes }}</td><td>{{ day["bytes_sent"] + day["bytes_received"] | bytes }}</td><td>{{ day["peak_speed"] | speed }}</td></tr>
+{% endfor %}
+      </table>
+    </div>
+{% endif %}
+
+    <!-- Fun Comparisons -->
+    <div class="card">
+      <div class="section-title">Fun Facts</div>
+      <div class="fun-grid">
+        <div class="fun-card"><div class="fun-emoji">&#x1F4BF;</div><div class="fun-value">{{ comparisons.get("dvd_equivalent", 0) }}</div><div class="fun-label">DVDs Worth</div></div>
+        <div class="fun-card"><div class="fun-emoji">&#x1F3AC;</div><div class="fun-value">{{ comparisons.get("hd_movies", 0) }}</div><div class="fun-label">HD Movies</div></div>
+        <div class="fun-card"><div class="fun-emoji">&#x1F310;</div><div class="fun-value">{{ comparisons.get("web_pages", 0) | fmt(",") }}</div><div class="fun-label">Web Pages</div></div>
+        <div class="fun-card"><div class="fun-emoji">&#x2615;</div><div class="fun-value">{{ comparisons.get("coffee_cups", 0) }}</div><div class="fun-label">Cups of Coffee</div></div>
+      </div>
+    </div>
+
+    <!-- Footer -->
+    <div class="footer">
+      Generated by PacketBuddy &mdash; {{ now }}
+    </div>
+
+  </div>
+</body>
+</html>""", "html_report")
+
+
+def _report_context(data: dict, days: Optional[Iterable[dict]] = None) -> dict:
     start = data.get("start_date", "")
     end = data.get("end_date", "")
-    days = data.get("days_tracked", 0)
-    label = _period_label(start, end, days)
-
-    total = data.get("total_bytes", 0)
-    sent = data.get("total_sent", 0)
-    received = data.get("total_received", 0)
-    daily_avg = data.get("daily_avg", 0)
-    peak_speed = data.get("peak_speed", 0)
-
-    personality = data.get("personality", {})
-    comparisons = data.get("fun_comparisons", {})
-    breakdown = data.get("monthly_breakdown", [])
-
-    now = datetime.now().strftime("%B %d, %Y at %I:%M %p")
-
-    month_section = ""
-    if breakdown:
-        month_section = (
-            f'    <div class="card">\n'
-            f'      <div class="section-title">Monthly Breakdown</div>\n'
-            f'{_month_bars(breakdown)}\n'
-            f'{_peak_day_html(data)}\n'
-            f'    </div>'
-        )
-
-    return (
-        '<!DOCTYPE html>\n'
-        '<html lang="en">\n'
-        '<head>\n'
-        '  <meta charset="UTF-8" />\n'
-        '  <meta name="viewport" content="width=device-width, initial-scale=1.0" />\n'
-        f'  <title>Your {label} in Internet &mdash; PacketBuddy</title>\n'
-        f'  <style>{SECTION_CSS}</style>\n'
-        '</head>\n'
-        '<body>\n'
-        '  <div class="wrapper">\n'
-        '\n'
-        '    <!-- Hero -->\n'
-        '    <div class="hero">\n'
-        f'      <div class="eyebrow">Your {label} in Internet</div>\n'
-        f'      <h1>{hostname}</h1>\n'
-        f'      <div class="hostname">{start} &mdash; {end}</div>\n'
-        f'      <div class="giant-number">{format_bytes(total)}</div>\n'
-        f'      <div class="date-range">total data transferred</div>\n'
-        f'      <div class="breakdown">\n'
-        f'        <div><span class="label">Upload </span><span class="up">{format_bytes(sent)}</span></div>\n'
-        f'        <div><span class="label">Download </span><span class="down">{format_bytes(received)}</span></div>\n'
-        f'      </div>\n'
-        '    </div>\n'
-        '\n'
-        '    <!-- Personality -->\n'
-        f'    <div class="personality-card">\n'
-        f'      <div class="icon">{personality.get("icon", "")}</div>\n'
-        f'      <div class="type">{personality.get("type", "User")}</div>\n'
-        f'      <div class="desc">{personality.get("desc", "")}</div>\n'
-        '    </div>\n'
-        '\n'
-        '    <!-- Stats Grid -->\n'
-        '    <div class="stats-grid">\n'
-        f'      <div class="stat-card"><div class="stat-value">{format_bytes(total)}</div><div class="stat-label">Total Data</div></div>\n'
-        f'      <div class="stat-card"><div class="stat-value">{days}</div><div class="stat-label">Days Tracked</div></div>\n'
-        f'      <div class="stat-card"><div class="stat-value">{format_speed(peak_speed)}</div><div class="stat-label">Peak Speed</div></div>\n'
-        f'      <div class="stat-card"><div class="stat-value">{format_bytes(daily_avg)}</div><div class="stat-label">Daily Average</div></div>\n'
-        '    </div>\n'
-        '\n'
-        '    <!-- Monthly Breakdown -->\n'
-        f'{month_section}\n'
-        '\n'
-        '    <!-- Fun Comparisons -->\n'
-        '    <div class="card">\n'
-        '      <div class="section-title">Fun Facts</div>\n'
-        '      <div class="fun-grid">\n'
-        f'        <div class="fun-card"><div class="fun-emoji">&#x1F4BF;</div><div class="fun-value">{comparisons.get("dvd_equivalent", 0)}</div><div class="fun-label">DVDs Worth</div></div>\n'
-        f'        <div class="fun-card"><div class="fun-emoji">&#x1F3AC;</div><div class="fun-value">{comparisons.get("hd_movies", 0)}</div><div class="fun-label">HD Movies</div></div>\n'
-        f'        <div class="fun-card"><div class="fun-emoji">&#x1F310;</div><div class="fun-value">{comparisons.get("web_pages", 0):,}</div><div class="fun-label">Web Pages</div></div>\n'
-        f'        <div class="fun-card"><div class="fun-emoji">&#x2615;</div><div class="fun-value">{comparisons.get("coffee_cups", 0)}</div><div class="fun-label">Cups of Coffee</div></div>\n'
-        '      </div>\n'
-        '    </div>\n'
-        '\n'
-        '    <!-- Footer -->\n'
-        '    <div class="footer">\n'
-        f'      Generated by PacketBuddy &mdash; {now}\n'
-        '    </div>\n'
-        '\n'
-        '  </div>\n'
-        '</body>\n'
-        '</html>'
-    )
+    days_tracked = data.get("days_tracked", 0)
+    return {
+        "css": SECTION_CSS,
+        "daily_css": DAILY_CSS,
+        "label": _period_label(start, end, days_tracked),
+        "hostname": data.get("hostname") or get_device_info()[2],
+        "start": start,
+        "end": end,
+        "days_tracked": days_tracked,
+        "total": data.get("total_bytes", 0),
+        "sent": data.get("total_sent", 0),
+        "received": data.get("total_received", 0),
+        "daily_avg": data.get("daily_avg", 0),
+        "peak_speed": data.get("peak_speed", 0),
+        "peak_day": data.get("peak_day"),
+        "personality": data.get("personality", {}),
+        "comparisons": data.get("fun_comparisons", {}),
+        "breakdown": data.get("monthly_breakdown", []),
+        "days": days,
+        "now": datetime.now().strftime("%B %d, %Y at %I:%M %p"),
+    }
+
+
+def generate_html_report(data: dict) -> str:
+    return REPORT_TEMPLATE.render(_report_context(data))
+
+
+def stream_html_report(data: dict, days: Optional[Iterable[dict]] = None) -> Iterator[str]:
+    """``generate_html_report`` in chunks, optionally with a per-day table.
+
+    ``days`` (``date, bytes_sent, bytes_received, peak_speed`` rows) is
+    consumed lazily while streaming, so it can be a cursor over years of rows.
+    """
+    return REPORT_TEMPLATE.stream(_report_context(data, days))
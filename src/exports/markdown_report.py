@@ -22,7 +22,7 @@ def _period_label(start_date: str, end_date: str, days_tracked: int) -> str:
 
 
 def generate_markdown_report(data: dict) -> str:
-    _device_id, _os_type, hostname = get_device_info()
+    hostname = data.get("hostname") or get_device_info()[2]
 
     start = data.get("start_date", "")
     end = data.get("end_date", "")
@@ -0,0 +1,253 @@
+"""Typed export model shared by every report format.
+
+``build_export_model`` folds the per-date daily rows of a range once,
+oldest-first, and collects every statistic the JSON, HTML, Markdown and
+TOON renderers need along the way: totals, tracked days, peaks, the
+monthly breakdown, the current-year slice and the last 30 days. Renderers
+only read the model, so exporting several formats of one range costs a
+single pass (and ``load_export_model`` memoizes that pass per data version).
+
+Reports that need no per-day rows use ``load_period_model`` instead, which
+fills the same model from the pre-materialized year/month rows in
+``period_stats``: a decade of history costs a few dozen rows.
+"""
+
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from ..core.device import get_device_info
+from ..core.storage import Storage, storage
+from ..core.sync import sync
+
+RECENT_DAYS = 30
+
+
+@dataclass
+class DayUsage:
+    """One tracked date (summed across devices when the scope is all devices)."""
+    date: str
+    bytes_sent: int
+    bytes_received: int
+    peak_speed: int
+
+    @property
+    def total_bytes(self) -> int:
+        return self.bytes_sent + self.bytes_received
+
+
+@dataclass
+class MonthUsage:
+    month: str
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    peak_speed: int = 0
+    days_tracked: int = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self.bytes_sent + self.bytes_received
+
+
+@dataclass
+class ExportModel:
+    device_id: str
+    os_type: str
+    hostname: str
+    start: date
+    end: date
+    today: date
+    days: List[DayUsage] = field(default_factory=list)
+    months: List[MonthUsage] = field(default_factory=list)
+    total_sent: int = 0
+    total_received: int = 0
+    peak_speed: int = 0
+    peak_speed_day: Optional[DayUsage] = None  # day holding the fastest sample
+    peak_day: Optional[DayUsage] = None  # day with the most bytes
+    year_sent: int = 0
+    year_received: int = 0
+    year_days: int = 0
+    recent_days: List[DayUsage] = field(default_factory=list)  # newest first
+    days_tracked: int = 0
+    first_date: Optional[str] = None
+    last_date: Optional[str] = None
+
+    @property
+    def total_bytes(self) -> int:
+        return self.total_sent + self.total_received
+
+    @property
+    def avg_daily(self) -> float:
+        return self.total_bytes / max(self.days_tracked, 1)
+
+    @property
+    def current_year(self) -> int:
+        return self.today.year
+
+    @property
+    def year_total(self) -> int:
+        return self.year_sent + self.year_received
+
+
+def build_export_model(rows: Iterable[Dict], start: date, end: date, today: Optional[date] = None,
+                       device: Optional[tuple] = None) -> ExportModel:
+    """Fold oldest-first per-date rows (``date, bytes_sent, bytes_received, peak_speed``) into a model."""
+    today = today or date.today()
+    device_id, os_type, hostname = device or get_device_info()
+    model = ExportModel(device_id=device_id, os_type=os_type, hostname=hostname,
+                        start=start, end=end, today=today)
+    year_prefix = str(today.year)
+    recent_from = (today - timedelta(days=RECENT_DAYS)).isoformat()
+    month: Optional[MonthUsage] = None
+
+    for row in rows:
+        day = DayUsage(str(row["date"]), row["bytes_sent"] or 0, row["bytes_received"] or 0,
+                       row["peak_speed"] or 0)
+        model.days.append(day)
+        model.days_tracked += 1
+        model.first_date = model.first_date or day.date
+        model.last_date = day.date
+        model.total_sent += day.bytes_sent
+        model.total_received += day.bytes_received
+
+        if model.peak_speed_day is None or day.peak_speed > model.peak_speed:
+            model.peak_speed = day.peak_speed
+            model.peak_speed_day = day
+        if model.peak_day is None or day.total_bytes > model.peak_day.total_bytes:
+            model.peak_day = day
+
+        if month is None or month.month != day.date[:7]:
+            month = MonthUsage(day.date[:7])
+            model.months.append(month)
+        month.bytes_sent += day.bytes_sent
+        month.bytes_received += day.bytes_received
+        month.peak_speed = max(month.peak_speed, day.peak_speed)
+        month.days_tracked += 1
+
+        if day.date.startswith(year_prefix):
+            model.year_sent += day.bytes_sent
+            model.year_received += day.bytes_received
+            model.year_days += 1
+        if day.date >= recent_from:
+            model.recent_days.append(day)
+
+    model.recent_days = model.recent_days[::-1][:RECENT_DAYS]
+    return model
+
+
+_models: "OrderedDict[tuple, ExportModel]" = OrderedDict()
+_MAX_MODELS = 8
+
+
+def load_export_model(start: Optional[date] = None, end: Optional[date] = None,
+                      all_devices: Optional[bool] = None) -> ExportModel:
+    """Export model for ``start..end`` (inclusive; default: all history up to today).
+
+    ``all_devices`` defaults to the API's scope: every local device unless
+    NeonDB sync is on. Models are memoized per data version, so rendering
+    several formats of the same range reads SQLite once.
+    """
+    if all_devices is None:
+        all_devices = not sync.enabled
+    today = date.today()
+    start = start or date.min
+    end = end or today
+    key = (start, end, all_devices, today, storage.data_version_tag)
+    model = _models.get(key)
+    if model is None:
+        chunks = storage.iter_daily_aggregates(from_date=start, to_date=end, all_devices=all_devices)
+        model = build_export_model((row for chunk in chunks for row in chunk), start, end, today)
+        _models[key] = model
+        while len(_models) > _MAX_MODELS:
+            _models.popitem(last=False)
+    else:
+        _models.move_to_end(key)
+    return model
+
+
+def _load_day(store: Storage, day: Optional[str], all_devices: bool) -> Optional[DayUsage]:
+    # Period rows keep a peak day's date only: fetch its breakdown (one primary-key lookup)
+    if not day:
+        return None
+    moment = date.fromisoformat(day)
+    for chunk in store.iter_daily_aggregates(from_date=moment, to_date=moment, all_devices=all_devices):
+        for row in chunk:
+            return DayUsage(row["date"], row["bytes_sent"], row["bytes_received"], row["peak_speed"])
+    return None
+
+
+def build_period_model(store: Storage, start: date, end: date, all_devices: bool,
+                       today: Optional[date] = None, device: Optional[tuple] = None) -> ExportModel:
+    """Model for whole months ``start..end`` from ``period_stats`` (``days`` stays empty).
+
+    Totals, tracked days and peaks come from year rows where the range covers
+    whole years (always true for lifetime reports), otherwise from month rows.
+    The two peak days are read back as single daily rows, and ``recent_days``
+    (30 daily rows) is filled when the range reaches today.
+    """
+    today = today or date.today()
+    device_id, os_type, hostname = device or get_device_info()
+    model = ExportModel(device_id=device_id, os_type=os_type, hostname=hostname,
+                        start=start, end=end, today=today)
+    first_month, last_month = start.strftime("%Y-%m"), end.strftime("%Y-%m")
+    months = store.get_period_stats(True, first_month, last_month, all_devices=all_devices)
+    whole_years = start.month == 1 and (end >= today or (end.month, end.day) == (12, 31))
+    totals = (store.get_period_stats(False, first_month[:4], last_month[:4], all_devices=all_devices)
+              if whole_years else months)
+
+    peak_speed_day = peak_day = None
+    peak_day_bytes = -1
+    for row in totals:
+        model.total_sent += row["bytes_sent"]
+        model.total_received += row["bytes_received"]
+        model.days_tracked += row["days_tracked"]
+        model.first_date = model.first_date or row["first_day"]
+        model.last_date = row["last_day"]
+        if peak_speed_day is None or row["peak_speed"] > model.peak_speed:
+            model.peak_speed, peak_speed_day = row["peak_speed"], row["peak_speed_day"]
+        if row["peak_day_bytes"] > peak_day_bytes:
+            peak_day_bytes, peak_day = row["peak_day_bytes"], row["peak_day"]
+        if row["period"][:4] == str(today.year):
+            model.year_sent += row["bytes_sent"]
+            model.year_received += row["bytes_received"]
+            model.year_days += row["days_tracked"]
+
+    model.peak_speed_day = _load_day(store, peak_speed_day, all_devices)
+    model.peak_day = model.peak_speed_day if peak_day == peak_speed_day else _load_day(store, peak_day, all_devices)
+    model.months = [
+        MonthUsage(row["period"], row["bytes_sent"], row["bytes_received"], row["peak_speed"], row["days_tracked"])
+        for row in months
+    ]
+    if end >= today:
+        recent = store.iter_daily_aggregates(from_date=today - timedelta(days=RECENT_DAYS), to_date=today,
+                                             all_devices=all_devices)
+        model.recent_days = [
+            DayUsage(row["date"], row["bytes_sent"], row["bytes_received"], row["peak_speed"])
+            for chunk in recent for row in chunk
+        ][::-1][:RECENT_DAYS]
+    return model
+
+
+def is_whole_months(start: date, end: date, today: Optional[date] = None) -> bool:
+    """Whether ``start..end`` can be answered from month rows (starts on the 1st, ends today or on a month end)."""
+    today = today or date.today()
+    return start.day == 1 and (end >= today or (end + timedelta(days=1)).day == 1)
+
+
+def build_range_model(store: Storage, start: date, end: date, all_devices: bool,
+                      today: Optional[date] = None, device: Optional[tuple] = None) -> ExportModel:
+    """Unmemoized model of any range: period rows for whole months, otherwise one fold over daily rows."""
+    today = today or date.today()
+    if is_whole_months(start, end, today):
+        return build_period_model(store, start, end, all_devices, today, device)
+    chunks = store.iter_daily_aggregates(from_date=start, to_date=end, all_devices=all_devices)
+    return build_export_model((row for chunk in chunks for row in chunk), start, end, today, device)
+
+
+def load_period_model(start: Optional[date] = None, end: Optional[date] = None,
+                      all_devices: Optional[bool] = None) -> ExportModel:
+    """``build_period_model`` for whole months (default: all history), with the API's default scope."""
+    if all_devices is None:
+        all_devices = not sync.enabled
+    return build_period_model(storage, start or date.min, end or date.today(), all_devices)
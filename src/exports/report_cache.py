@@ -0,0 +1,149 @@
+"""Cache of rendered HTML/Markdown/TOON reports.
+
+Reports are keyed by everything they depend on: the report kind and range,
+the device scope, the app version and a data version. A *closed* range (one
+ending before today) can only change when history is rewritten, so it is
+keyed on ``Storage.history_version_tag``, which is persisted with the database. Those entries are
+also written to ``~/.packetbuddy/cache`` and survive restarts. Open ranges
+are keyed on the in-process ``data_version_tag`` plus today's date, and are
+kept in memory only.
+"""
+
+import hashlib
+import logging
+import os
+import tempfile
+from collections import OrderedDict
+from datetime import date
+from pathlib import Path
+from typing import Callable, Iterable, Iterator, Optional, Union
+
+from ..core.storage import storage
+from ..utils.config import config
+from ..version import get_fresh_version
+
+logger = logging.getLogger(__name__)
+
+
+def write_atomic(path: Path, body: bytes):
+    """Write ``body`` to ``path`` via a temporary file and rename: readers never see a partial file."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(body)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+class ReportCache:
+    """In-memory LRU of rendered report bodies, optionally backed by a directory."""
+
+    def __init__(self, maxsize: int = 32, directory: Optional[Path] = None, max_entry_bytes: int = 4 << 20):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.max_entry_bytes = max_entry_bytes
+        self._entries: "OrderedDict[str, bytes]" = OrderedDict()
+
+    @staticmethod
+    def key(kind: str, start: Optional[date], end: Optional[date], all_devices: bool) -> tuple:
+        """Cache key and whether it may be persisted (closed ranges only)."""
+        closed = end is not None and end < date.today()
+        if closed:
+            version = f"h{storage.history_version_tag}"
+        else:
+            version = f"d{storage.data_version_tag}.{date.today().isoformat()}"
+        parts = (kind, start, end, "all" if all_devices else storage.device_id, get_fresh_version(), version)
+        return hashlib.sha256("|".join(map(str, parts)).encode("utf-8")).hexdigest(), closed
+
+    def _path(self, key: str) -> Optional[Path]:
+        return self.directory / f"{key}.report" if self.directory else None
+
+    def get(self, key: str) -> Optional[bytes]:
+        body = self._entries.get(key)
+        if body is not None:
+            self._entries.move_to_end(key)
+            return body
+        path = self._path(key)
+        if path is not None and path.exists():
+            try:
+                body = path.read_bytes()
+            except OSError:
+                logger.warning("Could not read cached report %s", path, exc_info=True)
+                return None
+            self._remember(key, body)
+        return body
+
+    def put(self, key: str, body: bytes, persist: bool = False):
+        self._remember(key, body)
+        path = self._path(key)
+        if persist and path is not None:
+            try:
+                write_atomic(path, body)
+                self._prune_disk()
+            except OSError:
+                logger.warning("Could not write cached report %s", path, exc_info=True)
+
+    def _prune_disk(self):
+        # Entries for superseded history versions are never read again: keep the newest maxsize
+        files = sorted(self.directory.glob("*.report"), key=lambda p: p.stat().st_mtime, reverse=True)
+        for stale in files[self.maxsize:]:
+            stale.unlink(missing_ok=True)
+
+    def _remember(self, key: str, body: bytes):
+        self._entries[key] = body
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def get_or_render(self, kind: str, render: Callable[[], Union[str, bytes]], start: Optional[date] = None,
+                      end: Optional[date] = None, all_devices: bool = False) -> bytes:
+        """Cached body for this report, rendering (and storing) it on a miss."""
+        key, closed = self.key(kind, start, end, all_devices)
+        body = self.get(key)
+        if body is None:
+            body = render()
+            if isinstance(body, str):
+                body = body.encode("utf-8")
+            self.put(key, body, persist=closed)
+        return body
+
+    def stream_or_render(self, kind: str, render: Callable[[], Iterable[str]], start: Optional[date] = None,
+                         end: Optional[date] = None, all_devices: bool = False) -> Iterator[bytes]:
+        """``get_or_render`` for chunked renderers: the cached body, or the chunks as they are rendered.
+
+        A streamed body is stored once the stream completes, unless it grew
+        past ``max_entry_bytes`` (then it is dropped to keep memory bounded).
+        """
+        key, closed = self.key(kind, start, end, all_devices)
+        body = self.get(key)
+        if body is not None:
+            yield body
+            return
+        parts, size = [], 0
+        for chunk in render():
+            data = chunk.encode("utf-8")
+            if parts is not None:
+                size += len(data)
+                if size <= self.max_entry_bytes:
+                    parts.append(data)
+                else:
+                    parts = None
+            yield data
+        if parts is not None:
+            self.put(key, b"".join(parts), persist=closed)
+
+    def clear(self):
+        """Drop memory entries and any persisted reports."""
+        self._entries.clear()
+        if self.directory is not None and self.directory.exists():
+            for path in self.directory.glob("*.report"):
+                path.unlink(missing_ok=True)
+
+
+reports = ReportCache(
+    maxsize=config.get("exports", "report_cache_entries", default=32),
+    directory=config.cache_dir if config.get("exports", "report_cache_disk", default=True) else None,
+)
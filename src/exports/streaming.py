@@ -0,0 +1,110 @@
+"""Chunked NDJSON / CSV / JSON-array encoders for streaming exports.
+
+Each encoder consumes an iterator of row chunks (lists of dicts, as yielded
+by ``Storage.iter_usage_logs`` / ``iter_daily_aggregates``) and yields one
+string per chunk, so peak memory is one chunk regardless of history size.
+"""
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+
+LOG_COLUMNS = ("id", "device_id", "timestamp", "bytes_sent", "bytes_received")
+DAILY_COLUMNS = ("date", "bytes_sent", "bytes_received", "total_bytes", "peak_speed")
+
+# dataset name -> stored columns (raw logs plus the per-device aggregate tiers)
+DATASETS: Dict[str, tuple] = {
+    "logs": LOG_COLUMNS,
+    "hourly": ("device_id", "hour", "bytes_sent", "bytes_received", "peak_speed", "samples"),
+    "daily": ("device_id", "date", "bytes_sent", "bytes_received", "peak_speed", "samples"),
+}
+
+Chunks = Iterable[List[Dict]]
+
+
+def _compact(row: Dict) -> str:
+    return json.dumps(row, separators=(",", ":"), default=str)
+
+
+def iter_ndjson(chunks: Chunks, columns: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """One JSON object per line."""
+    for chunk in chunks:
+        if columns:
+            chunk = [{c: row.get(c) for c in columns} for row in chunk]
+        yield "".join(_compact(row) + "\n" for row in chunk)
+
+
+def iter_csv(chunks: Chunks, columns: Sequence[str]) -> Iterator[str]:
+    """CSV with a header row; keys outside ``columns`` are dropped."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=list(columns), extrasaction="ignore")
+    writer.writeheader()
+    yield buffer.getvalue()
+    for chunk in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(chunk)
+        yield buffer.getvalue()
+
+
+def iter_json_array(chunks: Chunks, columns: Optional[Sequence[str]] = None) -> Iterator[str]:
+    """A single JSON array, emitted incrementally."""
+    yield "["
+    first = True
+    for chunk in chunks:
+        if columns:
+            chunk = [{c: row.get(c) for c in columns} for row in chunk]
+        if not chunk:
+            continue
+        body = ",".join(_compact(row) for row in chunk)
+        yield body if first else "," + body
+        first = False
+    yield "]"
+
+
+def iter_dataset(store, name: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                 all_devices: bool = False, chunk_size: int = 5000) -> Iterator[List[Dict]]:
+    """Row chunks for one of ``DATASETS``; ``since``/``until`` bound the row/bucket start."""
+    if name == "logs":
+        return store.iter_usage_logs(since=since, until=until, all_devices=all_devices, chunk_size=chunk_size)
+    return store.iter_aggregate_rows(name, since=since, until=until, all_devices=all_devices,
+                                     chunk_size=chunk_size)
+
+
+def with_total_bytes(chunks: Chunks) -> Iterator[List[Dict]]:
+    """Add a ``total_bytes`` column (sent + received) to every row."""
+    for chunk in chunks:
+        for row in chunk:
+            row["total_bytes"] = row["bytes_sent"] + row["bytes_received"]
+        yield chunk
+
+
+class RowCounter:
+    """Pass chunks through while counting rows (for CLI summaries)."""
+
+    def __init__(self, chunks: Chunks):
+        self.chunks = chunks
+        self.rows = 0
+
+    def __iter__(self) -> Iterator[List[Dict]]:
+        for chunk in self.chunks:
+            self.rows += len(chunk)
+            yield chunk
+
+
+# format name -> (encoder, media type, file extension)
+STREAM_FORMATS: Dict[str, tuple] = {
+    "ndjson": (iter_ndjson, "application/x-ndjson", "ndjson"),
+    "csv": (iter_csv, "text/csv", "csv"),
+    "json": (iter_json_array, "application/json", "json"),
+}
+
+
+def encode_stream(format: str, chunks: Chunks, columns: Sequence[str]) -> Iterator[str]:
+    """Encode ``chunks`` in one of ``STREAM_FORMATS``. Raises ValueError for unknown formats."""
+    if format not in STREAM_FORMATS:
+        raise ValueError(f"unsupported format: {format}")
+    encoder: Callable = STREAM_FORMATS[format][0]
+    return encoder(chunks, columns)
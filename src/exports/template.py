@@ -0,0 +1,204 @@
+"""Precompiled, streaming text templates for the HTML reports.
+
+A ``Template`` is compiled once, when it is constructed (at import for the
+module-level report templates), into a Python generator function; rendering
+only runs that function. Runs of text and ``{{ }}`` values between block tags
+are emitted as one joined chunk, and ``stream()`` groups them further into
+chunks of a fixed size, so a response can start before the last row exists.
+
+Syntax:
+
+- ``{{ expr }}`` inserts ``str(expr)``; ``{{ expr | bytes }}`` pipes the value
+  through a filter (``bytes``, ``speed``, ``e`` for HTML escaping,
+  ``fmt(spec)`` for ``format(value, spec)``)
+- ``{% for target in expr %}`` ... ``{% endfor %}``
+- ``{% if expr %}`` ... ``{% elif expr %}`` ... ``{% else %}`` ... ``{% endif %}``
+- ``{% set name = expr %}``
+
+Expressions are plain Python over the context's names (``|`` is reserved for
+filters). A block tag alone on its line takes the whole line with it, so block
+structure adds no blank lines. Templates ship with the code and are trusted:
+expressions are not sandboxed.
+"""
+
+import ast
+import builtins
+import html
+import re
+from typing import Callable, Dict, Iterator, List, Mapping, Set
+
+from ..utils.formatters import format_bytes, format_speed
+
+FILTERS: Dict[str, Callable] = {
+    "bytes": format_bytes,
+    "speed": format_speed,
+    "e": lambda value: html.escape(str(value)),
+    "fmt": format,
+}
+
+# A block tag alone on its line (with its indentation and newline), any other block tag, or a value
+_TOKEN = re.compile(r"^[ \t]*\{%(.*?)%\}[ \t]*\n|\{%(.*?)%\}|\{\{(.*?)\}\}", re.M)
+_FILTER = re.compile(r"^\s*(\w+)\s*(?:\((.*)\))?\s*$", re.S)
+_BUILTINS = frozenset(dir(builtins))
+
+
+class TemplateSyntaxError(ValueError):
+    pass
+
+
+def _split_filters(text: str) -> List[str]:
+    """Split ``expr | filter | filter(arg)`` on pipes outside strings and brackets."""
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote and text[i - 1] != "\\":
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char in "([{":
+            depth += 1
+        elif char in ")]}":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+
+class _Compiler:
+    def __init__(self, name: str):
+        self.name = name
+        self.lines: List[str] = []
+        self.indent = 1
+        self.stack: List[str] = []
+        self.loaded: Set[str] = set()
+        self.bound: Set[str] = set()
+        self.filters: Set[str] = set()
+        self.parts: List[str] = []  # pending output expressions of the current run
+        self.lineno = 1
+
+    def error(self, message: str) -> TemplateSyntaxError:
+        return TemplateSyntaxError(f"{self.name}, line {self.lineno}: {message}")
+
+    def _names(self, code: str, mode: str):
+        try:
+            tree = ast.parse(code, mode=mode)
+        except SyntaxError as e:
+            raise self.error(f"invalid syntax in {code.strip()!r}") from e
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Name):
+                (self.loaded if isinstance(node.ctx, ast.Load) else self.bound).add(node.id)
+
+    def emit(self, line: str):
+        self.lines.append("    " * self.indent + line)
+
+    def text(self, literal: str):
+        if literal:
+            self.parts.append(repr(literal))
+
+    def value(self, content: str):
+        expr, *filters = _split_filters(content)
+        expr = expr.strip()
+        self._names(expr, "eval")
+        for spec in filters:
+            match = _FILTER.match(spec)
+            if not match or match.group(1) not in FILTERS:
+                raise self.error(f"unknown filter {spec.strip()!r}")
+            name, args = match.groups()
+            self.filters.add(name)
+            if args:
+                self._names(f"({args},)", "eval")
+            expr = f"_f_{name}({expr}, {args})" if args else f"_f_{name}({expr})"
+        self.parts.append(f"_str({expr})")
+
+    def flush(self):
+        if len(self.parts) == 1:
+            self.emit(f"yield {self.parts[0]}")
+        elif self.parts:
+            self.emit(f"yield ''.join(({', '.join(self.parts)},))")
+        self.parts = []
+
+    def block(self, content: str):
+        self.flush()
+        keyword, _, rest = content.strip().partition(" ")
+        rest = rest.strip()
+        if keyword in ("for", "if"):
+            self._names(f"{keyword} {rest}: pass", "exec")
+            self.emit(f"{keyword} {rest}:")
+            self.stack.append(keyword)
+            self.indent += 1
+            self.emit("pass")
+        elif keyword in ("elif", "else"):
+            if not self.stack or self.stack[-1] != "if":
+                raise self.error(f"{keyword} outside of if")
+            self.indent -= 1
+            if keyword == "elif":
+                self._names(f"if {rest}: pass", "exec")
+            self.emit(f"elif {rest}:" if keyword == "elif" else "else:")
+            self.indent += 1
+            self.emit("pass")
+        elif keyword in ("endfor", "endif"):
+            if not self.stack or self.stack.pop() != keyword[3:]:
+                raise self.error(f"unexpected {keyword}")
+            self.indent -= 1
+        elif keyword == "set":
+            self._names(rest, "exec")
+            self.emit(rest)
+        else:
+            raise self.error(f"unknown tag {keyword!r}")
+
+    def compile(self, source: str) -> str:
+        position = 0
+        for match in _TOKEN.finditer(source):
+            self.text(source[position:match.start()])
+            self.lineno = source.count("\n", 0, match.start()) + 1
+            line_block, block, value = match.groups()
+            if value is not None:
+                self.value(value)
+            else:
+                self.block(line_block if line_block is not None else block)
+            position = match.end()
+        self.text(source[position:])
+        self.flush()
+        if self.stack:
+            raise self.error(f"unclosed {self.stack[-1]}")
+
+        header = ["def _render(_ctx):"]
+        for name in sorted(self.loaded - self.bound - _BUILTINS):
+            header.append(f"    {name} = _ctx[{name!r}]")
+        for name in sorted(self.filters):
+            header.append(f"    _f_{name} = _filters[{name!r}]")
+        header.append("    yield from ()")
+        return "\n".join(header + self.lines) + "\n"
+
+
+class Template:
+    """A template compiled to a generator function of its context."""
+
+    def __init__(self, source: str, name: str = "<template>"):
+        self.name = name
+        self.code = _Compiler(name).compile(source)
+        namespace = {"_filters": FILTERS, "_str": str}
+        exec(compile(self.code, name, "exec"), namespace)
+        self._render = namespace["_render"]
+
+    def generate(self, context: Mapping) -> Iterator[str]:
+        """Output pieces as they are produced (one per run of text and values)."""
+        return self._render(context)
+
+    def stream(self, context: Mapping, chunk_size: int = 16384) -> Iterator[str]:
+        """Output in chunks of at least ``chunk_size`` characters (the last may be shorter)."""
+        buffer: List[str] = []
+        size = 0
+        for piece in self._render(context):
+            buffer.append(piece)
+            size += len(piece)
+            if size >= chunk_size:
+                yield "".join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield "".join(buffer)
+
+    def render(self, context: Mapping) -> str:
+        return "".join(self._render(context))
@@ -0,0 +1,156 @@
+"""TOON export for LLM analysis (``/api/export/llm``, ``/api/export/wrapup?format=toon``)."""
+
+from datetime import datetime
+from typing import Optional
+
+from ..utils.formatters import format_bytes
+from ..version import get_fresh_version
+from .model import ExportModel
+
+
+def generate_toon_report(model: ExportModel, insights: Optional[dict] = None) -> str:
+    """TOON (Token Optimized Object Notation) export for LLM analysis.
+
+    ``insights`` (``build_insights`` output) adds trend, seasonality and forecast sections.
+    """
+    report = f"""# PacketBuddy Network Usage Export - TOON Format
+
+[meta]
+format = "TOON (Token Optimized Object Notation)"
+generated = "{datetime.utcnow().isoformat()}"
+device = "{model.hostname}"
+os = "{model.os_type}"
+device_id = "{model.device_id}"
+version = "{get_fresh_version()}"
+
+[tracking]
+first_date = "{model.first_date or "N/A"}"
+last_date = "{model.last_date or "N/A"}"
+total_days = {model.days_tracked}
+
+[totals]
+bytes_sent = {model.total_sent}
+bytes_received = {model.total_received}
+total_bytes = {model.total_bytes}
+human = {{sent="{format_bytes(model.total_sent)}", received="{format_bytes(model.total_received)}", total="{format_bytes(model.total_bytes)}"}}
+
+[year_{model.current_year}]
+bytes_sent = {model.year_sent}
+bytes_received = {model.year_received}
+total_bytes = {model.year_total}
+days = {model.year_days}
+human = {{sent="{format_bytes(model.year_sent)}", received="{format_bytes(model.year_received)}", total="{format_bytes(model.year_total)}"}}
+
+[records]
+peak_speed_bps = {model.peak_speed}
+peak_speed_human = "{format_bytes(model.peak_speed)}/s"
+"""
+    
+    if model.peak_day:
+        pd = model.peak_day
+        pd_total = pd.total_bytes
+        report += f"""peak_day_date = "{pd.date}"
+peak_day_bytes = {pd_total}
+peak_day_human = "{format_bytes(pd_total)}"
+peak_day_sent = {pd.bytes_sent}
+peak_day_received = {pd.bytes_received}
+peak_day_speed = {pd.peak_speed}
+"""
+    
+    ratio = model.total_sent / max(model.total_received, 1)
+    report += f"""
+[averages]
+daily_bytes = {int(model.avg_daily)}
+daily_human = "{format_bytes(int(model.avg_daily))}"
+
+[ratios]
+upload_download = {ratio:.2f}
+upload_percent = {(model.total_sent / max(model.total_bytes, 1) * 100):.1f}
+download_percent = {(model.total_received / max(model.total_bytes, 1) * 100):.1f}
+
+[comparisons]
+dvd_equivalent = {int(model.total_bytes / (1024**3) / 4.7)}
+cd_equivalent = {int(model.total_bytes / (1024**3) / 0.7)}
+hd_movie_equivalent = {int(model.total_bytes / (1024**3) / 5)}
+
+"""
+    
+    report += "[monthly_data]\n"
+    for i, m in enumerate(model.months):
+        m_total = m.total_bytes
+        report += f"""month_{i} = {{name="{m.month}", sent={m.bytes_sent}, received={m.bytes_received}, total={m_total}, peak={m.peak_speed}, days={m.days_tracked}, human="{format_bytes(m_total)}"}}
+"""
+    
+    report += "\n[recent_30_days]\n"
+    for i, day in enumerate(model.recent_days):
+        day_total = day.total_bytes
+        report += f"""day_{i} = {{date="{day.date}", sent={day.bytes_sent}, received={day.bytes_received}, total={day_total}, peak={day.peak_speed}}}
+"""
+    
+    if insights:
+        report += _insights_sections(insights)
+
+    report += f"""
+[llm_prompts]
+year_wrapup = "Create a fun, Spotify-style {model.current_year} wrap-up based on this network usage data. Include interesting insights, fun facts, and comparisons."
+professional = "Generate a professional network usage summary highlighting efficiency, patterns, and recommendations for optimization."
+personal = "Analyze my internet usage patterns and give me insights about my digital life. What does this data say about my online behavior?"
+trends = "Identify trends in my internet usage over time. Are there seasonal patterns? Which months had unusual activity?"
+
+[interpretation]
+note_1 = "1 GB = 1,073,741,824 bytes"
+note_2 = "Upload = Data sent from device to internet"
+note_3 = "Download = Data received from internet to device"
+note_4 = "Peak speed = Highest combined upload+download speed in bytes/second"
+note_5 = "All byte values are in raw bytes unless marked with 'human' suffix"
+
+[usage_tips]
+tip_1 = "This TOON format uses ~60% fewer tokens than markdown"
+tip_2 = "All data is preserved in compact key=value format"
+tip_3 = "Use the llm_prompts section for suggested analysis questions"
+tip_4 = "Human-readable values are in 'human' fields for easy reading"
+tip_5 = "Monthly and daily data use indexed format (month_0, day_0, etc.)"
+"""
+    return report
+
+
+def _toon_value(value) -> str:
+    return "null" if value is None else f'"{value}"' if isinstance(value, str) else str(value)
+
+
+def _insights_sections(insights: dict) -> str:
+    trend, forecast = insights["trend"], insights["forecast"]
+    wow, mom = insights["week_over_week"], insights["month_over_month"]
+    weekday, hourly = insights["seasonality"]["weekday"], insights["seasonality"]["hourly"]
+    lines = [
+        "",
+        "[trends]",
+        f"as_of = \"{insights['as_of']}\"",
+        f"moving_avg_7d = {_toon_value(insights['moving_average']['7d'])}",
+        f"moving_avg_30d = {_toon_value(insights['moving_average']['30d'])}",
+        f"week_over_week = {{current={wow['current']}, previous={wow['previous']}, "
+        f"change_percent={_toon_value(wow['change_percent'])}}}",
+        f"month_over_month = {{days={mom['days_compared']}, current={mom['current']}, previous={mom['previous']}, "
+        f"change_percent={_toon_value(mom['change_percent'])}}}",
+        f"trend = {{direction={_toon_value(trend['direction'])}, percent_per_week={_toon_value(trend['percent_per_week'])}, "
+        f"slope_bytes_per_day={_toon_value(trend['slope_bytes_per_day'])}}}",
+        "",
+        "[forecast]",
+        f"month = \"{forecast['month']}\"",
+        f"to_date = {forecast['to_date']}",
+        f"forecast = {forecast['forecast']}",
+        f"range = {{low={forecast['low']}, high={forecast['high']}}}",
+        f"days_remaining = {forecast['days_remaining']}",
+        f"forecast_human = \"{format_bytes(forecast['forecast'])}\"",
+        "",
+        "[seasonality]",
+        "weekday_avg = {" + ", ".join(
+            f"{label}={_toon_value(value)}" for label, value in zip(weekday["labels"], weekday["average"])
+        ) + "}",
+        f"busiest_weekday = {_toon_value(insights['seasonality']['busiest_weekday'])}",
+        f"quietest_weekday = {_toon_value(insights['seasonality']['quietest_weekday'])}",
+        "hourly_avg = [" + ", ".join(_toon_value(value) for value in hourly["average"]) + "]",
+        f"peak_hour = {_toon_value(hourly['peak_hour'])}",
+        "",
+    ]
+    return "\n".join(lines)
@@ -0,0 +1,218 @@
+"""Year wrap-up HTML export (``/api/export?format=html``, ``/api/export/wrapup``)."""
+
+from datetime import datetime
+from typing import Iterator
+
+from ..version import get_fresh_version
+from .model import ExportModel
+from .template import Template
+
+WRAPUP_TEMPLATE = Template("""<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <meta property="og:title" content="PacketBuddy {{ model.current_year }} Wrap-Up — {{ model.hostname | e }}">
+    <meta property="og:description" content="I used {{ model.year_total | bytes }} of internet data this year! See my full breakdown.">
+    <meta property="og:type" content="website">
+    <meta name="twitter:card" content="summary_large_image">
+    <title>PacketBuddy {{ model.current_year }} Year Wrap-Up — {{ model.hostname | e }}</title>
+    <style>
+        * { margin: 0; padding: 0; box-sizing: border-box; }
+        body {
+            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', system-ui, sans-serif;
+            background: #0a0a1a;
+            color: #e8e8f0;
+            padding: 0;
+            line-height: 1.5;
+        }
+        .wrap {
+            max-width: 1100px;
+            margin: 0 auto;
+            padding: 20px;
+        }
+        .card {
+            background: linear-gradient(135deg, #1a1a2e, #16213e);
+            border: 1px solid rgba(255,255,255,0.06);
+            border-radius: 24px;
+            padding: 32px;
+            margin-bottom: 24px;
+            backdrop-filter: blur(8px);
+        }
+        .hero {
+            text-align: center;
+            padding: 48px 32px 36px;
+            background: linear-gradient(135deg, #1a1a3e, #0f3460, #1a1a3e);
+            border-bottom: 3px solid #e94560;
+        }
+        .hero h1 {
+            font-size: 3.2em;
+            font-weight: 900;
+            letter-spacing: -1px;
+            background: linear-gradient(90deg, #e94560, #0f3460, #533483);
+            -webkit-background-clip: text;
+            -webkit-text-fill-color: transparent;
+            background-clip: text;
+        }
+        .hero h1 span {
+            -webkit-text-fill-color: #e8e8f0;
+        }
+        .hero .sub {
+            font-size: 1.15em;
+            opacity: 0.7;
+            margin-top: 8px;
+            font-weight: 500;
+        }
+        .hero-total {
+            margin-top: 28px;
+            padding: 24px;
+            background: rgba(233,69,96,0.12);
+            border: 1px solid rgba(233,69,96,0.25);
+            border-radius: 20px;
+            display: inline-block;
+            min-width: 320px;
+        }
+        .hero-total .label { font-size: 0.85em; opacity: 0.6; text-transform: uppercase; letter-spacing: 1px; font-weight: 700; }
+        .hero-total .value { font-size: 3em; font-weight: 900; margin: 4px 0; }
+        .hero-total .detail { font-size: 1em; opacity: 0.7; }
+        .hero-total .detail .up { color: #e94560; }
+        .hero-total .detail .down { color: #53d8fb; }
+        .stat-grid {
+            display: grid;
+            grid-template-columns: repeat(4, 1fr);
+            gap: 16px;
+            margin-top: 24px;
+        }
+        .stat-item {
+            text-align: center;
+            padding: 20px 12px;
+            background: rgba(255,255,255,0.04);
+            border-radius: 16px;
+        }
+        .stat-item .num { font-size: 1.8em; font-weight: 900; }
+        .stat-item .lbl { font-size: 0.8em; opacity: 0.55; text-transform: uppercase; letter-spacing: 0.5px; margin-top: 4px; font-weight: 600; }
+        .stat-item .ico { font-size: 1.4em; margin-bottom: 6px; }
+        .section-title {
+            font-size: 1.5em;
+            font-weight: 800;
+            margin-bottom: 20px;
+            display: flex;
+            align-items: center;
+            gap: 10px;
+        }
+        .month-grid {
+            display: grid;
+            grid-template-columns: repeat(auto-fill, minmax(160px, 1fr));
+            gap: 12px;
+        }
+        .month-item {
+            background: rgba(255,255,255,0.04);
+            border-radius: 14px;
+            padding: 14px;
+            text-align: center;
+        }
+        .month-item .name { font-weight: 700; font-size: 0.9em; margin-bottom: 6px; opacity: 0.85; }
+        .month-item .vol { font-weight: 800; font-size: 1.1em; color: #53d8fb; }
+        .month-item .meta { font-size: 0.75em; opacity: 0.5; margin-top: 4px; }
+        .highlight {
+            background: linear-gradient(90deg, #e94560, #533483);
+            border-radius: 16px;
+            padding: 20px 24px;
+            margin-top: 20px;
+            display: flex;
+            justify-content: space-between;
+            align-items: center;
+            flex-wrap: wrap;
+            gap: 12px;
+        }
+        .highlight .hl-label { font-weight: 700; font-size: 0.9em; opacity: 0.85; }
+        .highlight .hl-value { font-weight: 900; font-size: 1.3em; }
+        .footer {
+            text-align: center;
+            padding: 24px;
+            opacity: 0.4;
+            font-size: 0.85em;
+        }
+        @media (max-width: 700px) {
+            .stat-grid { grid-template-columns: repeat(2, 1fr); }
+            .hero h1 { font-size: 2em; }
+            .hero-total .value { font-size: 2em; }
+            .month-grid { grid-template-columns: repeat(2, 1fr); }
+        }
+    </style>
+</head>
+<body>
+    <div class="wrap">
+        <div class="card hero">
+            <h1>🌐 <span>{{ model.current_year }} Internet Wrap-Up</span></h1>
+            <div class="sub">{{ model.hostname | e }} — {{ model.os_type | e }}</div>
+            <div class="hero-total">
+                <div class="label">Total Data This Year</div>
+                <div class="value">{{ model.year_total | bytes }}</div>
+                <div class="detail">
+                    <span class="up">↑ {{ model.year_sent | bytes }}</span> &nbsp;•&nbsp; <span class="down">↓ {{ model.year_received | bytes }}</span>
+                </div>
+            </div>
+        </div>
+
+        <div class="stat-grid">
+            <div class="stat-item"><div class="ico">📊</div><div class="num">{{ model.total_bytes | bytes }}</div><div class="lbl">All-Time Total</div></div>
+            <div class="stat-item"><div class="ico">📅</div><div class="num">{{ model.days_tracked }}</div><div class="lbl">Days Tracked</div></div>
+            <div class="stat-item"><div class="ico">⚡</div><div class="num">{{ model.peak_speed | bytes }}/s</div><div class="lbl">Peak Speed</div></div>
+            <div class="stat-item"><div class="ico">📈</div><div class="num">{{ int(model.avg_daily) | bytes }}</div><div class="lbl">Daily Avg</div></div>
+        </div>
+        <div class="card">
+            <div class="section-title">📆 Monthly Breakdown</div>
+            <div class="month-grid">
+{% for m in model.months %}
+
+                <div class="month-item">
+                    <div class="name">{{ datetime.strptime(m.month + "-01", "%Y-%m-%d").strftime("%b %Y") }}</div>
+                    <div class="vol">{{ m.total_bytes | bytes }}</div>
+                    <div class="meta">↑ {{ m.bytes_sent | bytes }} / ↓ {{ m.bytes_received | bytes }}</div>
+                </div>{% endfor %}
+            </div>
+        </div>
+
+        <div class="card">
+            <div class="section-title">🏆 Highlights</div>
+{% if model.peak_day %}
+{% set pd = model.peak_day %}
+
+            <div class="highlight">
+                <div><div class="hl-label">🌟 Most Active Day</div><div class="hl-value">{{ pd.total_bytes | bytes }}</div></div>
+                <div style="text-align:right"><div class="hl-label">{{ datetime.strptime(pd.date, "%Y-%m-%d").strftime("%B %d, %Y") }}</div><div class="hl-value" style="font-size:1em;opacity:0.7">↑ {{ pd.bytes_sent | bytes }} / ↓ {{ pd.bytes_received | bytes }}</div></div>
+            </div>{% endif %}
+            <div class="highlight" style="background:linear-gradient(90deg,#1a1a3e,#16213e);border:1px solid rgba(255,255,255,0.06)">
+                <div><div class="hl-label">⚖️ Upload/Download Ratio</div><div class="hl-value">{{ model.total_sent / max(model.total_received, 1) | fmt(".2f") }}:1</div></div>
+                <div><div class="hl-label">💾 Storage Equivalent</div><div class="hl-value">{{ int(model.total_bytes / (1024**3) / 4.7) }} DVDs</div></div>
+            </div>
+        </div>
+
+        <div class="footer">
+            Generated by <strong>PacketBuddy</strong> v{{ version }} &bull; {{ generated }}
+            <br>Device: {{ model.hostname | e }} ({{ model.os_type | e }})
+        </div>
+    </div>
+</body>
+</html>
+""", "wrapup_report")
+
+
+def _wrapup_context(model: ExportModel) -> dict:
+    return {
+        "model": model,
+        "datetime": datetime,
+        "version": get_fresh_version(),
+        "generated": datetime.utcnow().strftime("%B %d, %Y at %H:%M UTC"),
+    }
+
+
+def generate_wrapup_html(model: ExportModel) -> str:
+    """Shareable year wrap-up page (current year plus all-time figures)."""
+    return WRAPUP_TEMPLATE.render(_wrapup_context(model))
+
+
+def stream_wrapup_html(model: ExportModel) -> Iterator[str]:
+    """``generate_wrapup_html`` in chunks."""
+    return WRAPUP_TEMPLATE.stream(_wrapup_context(model))
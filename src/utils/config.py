@@ -17,6 +17,8 @@ class NeonStorageConfig:
     """
     neon_log_retention_days: int = 1
     neon_aggregate_retention_months: int = 6
+    neon_monthly_retention_months: int = 24
+    neon_maintenance_interval_hours: int = 24
     neon_max_storage_mb: int = 450
     neon_storage_warning_threshold: int = 70
     neon_cleanup_on_sync: bool = False
@@ -43,6 +45,8 @@ class Config:
         self.config_path = config_path or self.app_dir / "config.toml"
         self.db_path = self.app_dir / "packetbuddy.db"
         self.device_id_path = self.app_dir / "device_id"
+        self.cache_dir = self.app_dir / "cache"
+        self.reports_dir = self.app_dir / "reports"
         
         self.config = self._load_config()
         self.storage = self._load_storage_config()
@@ -55,16 +59,55 @@ class Config:
                 "batch_write_interval": 30,  # seconds (optimized for resource efficiency)
                 "max_delta_bytes": 1_000_000_000,  # 1GB/s threshold for anomaly detection
             },
+            "anomaly": {
+                "enabled": True,  # flag unusual upload/download bursts (EWMA z-score per sample)
+                "window_samples": 300,  # baseline memory, in poll samples
+                "threshold": 4.0,  # z-score (log speed) a sample must reach
+                "warmup_samples": 60,  # samples observed before anything is flagged
+                "min_speed_bytes": 500_000,  # bytes/s below which nothing is flagged
+            },
+            "budget": {
+                "enabled": True,  # track the caps below (no caps: nothing to do)
+                "thresholds": [50, 80, 100],  # percent of a cap that raises an alert (per-cap override)
+                "command": "",  # run on each alert (shell), alert JSON on stdin
+                "webhook_url": "",  # POST the alert JSON here
+                "caps": [],  # [[budget.caps]] name, cap_gb, cycle_start_day, device, thresholds, cost_per_gb
+            },
             "sync": {
                 "enabled": True,
                 "interval": 300,  # seconds (5 mins for Neon DB scaling)
                 "retry_delay": 5,  # seconds
                 "max_retries": 3,
+                "connection_mode": "pool",  # "pool" or "on_demand" (lets serverless compute suspend)
+                "cold_start_threshold_ms": 500,  # connects slower than this count as a compute wake-up
+                "hub_url": os.getenv("PB_HUB_URL", ""),  # push to a LAN hub instead of NeonDB
+                "hub_token": os.getenv("PB_HUB_TOKEN", ""),
+                "hub_interval": 30,  # seconds between pushes to the hub
+                "hub_batch_size": 5000,  # raw log entries per pushed batch
+            },
+            "hub": {
+                "enabled": False,  # same as `pb serve --hub`
+                "token": os.getenv("PB_HUB_TOKEN", ""),  # shared secret agents must send (empty = open)
+                "max_pending": 1024,  # queued batches before answering 503
+                "max_batch": 256,  # batches applied per SQLite transaction
+                "max_body_kb": 1024,  # compressed request size limit
+                "max_decoded_kb": 16384,  # request size limit after decompression
+                "retry_after": 5,  # seconds, sent with 503 responses
             },
             "api": {
                 "host": "127.0.0.1",
                 "port": 7373,
                 "cors_enabled": True,
+                "metrics_enabled": True,  # Prometheus text format on GET /metrics
+                "compression_enabled": True,  # gzip/brotli for responses >= compression_min_bytes
+                "compression_min_bytes": 1024,
+                "status_refresh_seconds": 10,  # /api/health and /api/storage snapshot age
+            },
+            "exports": {
+                "report_cache_entries": 32,  # rendered HTML/Markdown/TOON reports kept in memory
+                "report_cache_disk": True,  # also keep closed-range reports in ~/.packetbuddy/cache
+                "archive": True,  # pre-render closed months/years into ~/.packetbuddy/reports
+                "archive_months": 12,  # closed months kept up to date (plus the last closed year)
             },
             "database": {
                 "neon_url": os.getenv("NEON_DB_URL", ""),
@@ -85,6 +128,8 @@ class Config:
                 "neon": {
                     "log_retention_days": 1,
                     "aggregate_retention_months": 6,
+                    "monthly_retention_months": 24,
+                    "maintenance_interval_hours": 24,
                     "max_storage_mb": 450,
                     "warning_threshold_percent": 70,
                     "cleanup_on_sync": False,
@@ -110,7 +155,7 @@ class Config:
         neon_cfg = storage_cfg.get("neon", {})
 
         neon_config = NeonStorageConfig()
-        for field in ("log_retention_days", "aggregate_retention_months", "max_storage_mb", "warning_threshold_percent", "cleanup_on_sync"):
+        for field in ("log_retention_days", "aggregate_retention_months", "monthly_retention_months", "maintenance_interval_hours", "max_storage_mb", "warning_threshold_percent", "cleanup_on_sync"):
             if field in neon_cfg:
                 setattr(neon_config, f"neon_{field}", neon_cfg[field])
 
@@ -146,10 +191,15 @@ class Config:
         """Get NeonDB URL from config or environment."""
         return os.getenv("NEON_DB_URL") or self.get("database", "neon_url", default="")
     
+    @property
+    def hub_url(self) -> str:
+        """URL of a PacketBuddy hub to push to (takes precedence over NeonDB)."""
+        return self.get("sync", "hub_url", default="") or ""
+
     @property
     def sync_enabled(self) -> bool:
         """Check if cloud sync is enabled."""
-        return self.get("sync", "enabled", default=True) and bool(self.neon_db_url)
+        return self.get("sync", "enabled", default=True) and bool(self.neon_db_url) and not self.hub_url
 
 
 # Global config instance
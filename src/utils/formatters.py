@@ -28,23 +28,26 @@ def format_speed(bytes_per_second: float) -> str:
     return f"{format_bytes(int(bytes_per_second))}/s"
 
 
-def format_usage_response(bytes_sent: int, bytes_received: int, peak_speed: int = 0) -> Dict:
-    """Format usage data for API responses."""
+def format_usage_response(bytes_sent: int, bytes_received: int, peak_speed: int = 0,
+                          raw: bool = False) -> Dict:
+    """Format usage data for API responses (``raw`` omits ``human_readable``)."""
     total_bytes = bytes_sent + bytes_received
     
     response = {
         "bytes_sent": bytes_sent,
         "bytes_received": bytes_received,
         "total_bytes": total_bytes,
-        "human_readable": {
+    }
+    if not raw:
+        response["human_readable"] = {
             "sent": format_bytes(bytes_sent),
             "received": format_bytes(bytes_received),
             "total": format_bytes(total_bytes),
         }
-    }
     
     if peak_speed > 0:
         response["peak_speed"] = peak_speed
-        response["human_readable"]["peak_speed"] = format_bytes(peak_speed) + "/s"
+        if not raw:
+            response["human_readable"]["peak_speed"] = format_bytes(peak_speed) + "/s"
         
     return response
@@ -0,0 +1,278 @@
+"""In-process metrics rendered in the Prometheus text exposition format.
+
+Hot paths only bump plain Python numbers (no locks, no I/O); ``render()``
+reads them, so a scrape never touches SQLite. Updates from executor threads
+rely on the GIL and may, very rarely, lose an increment under contention,
+which is an acceptable trade for monitoring counters.
+"""
+
+import asyncio
+import functools
+import inspect
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers sub-millisecond SQLite reads up to slow remote sync cycles
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+Sample = Tuple[str, Tuple[Tuple[str, str], ...], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class Registry:
+    """Holds metrics in registration order and renders them."""
+
+    def __init__(self):
+        self._metrics: List["_Metric"] = []
+
+    def register(self, metric: "_Metric"):
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            try:
+                samples = list(metric.samples())
+            except Exception:
+                # A failing callback must not break the whole scrape
+                continue
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), registry: Registry = REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        registry.register(self)
+
+    def _key(self, labels: Dict) -> Tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Tuple[Tuple[str, str], ...]:
+        return tuple(zip(self.labelnames, key))
+
+    def samples(self) -> Iterable[Sample]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonic counter; name it with a ``_total`` suffix."""
+
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, value in self._values.items():
+            yield self.name, self._labels(key), value
+
+
+class Gauge(_Metric):
+    """Point-in-time value, either set explicitly or read from a callback at scrape time.
+
+    A callback returns a number, or a dict mapping label-value tuples to numbers.
+    """
+
+    kind = "gauge"
+
+    def __init__(self, *args, fn: Optional[Callable] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def set(self, value: float, **labels):
+        self._values[self._key(labels)] = value
+
+    def set_function(self, fn: Callable):
+        self._fn = fn
+
+    def samples(self) -> Iterable[Sample]:
+        values = self._values
+        if self._fn is not None:
+            result = self._fn()
+            values = result if isinstance(result, dict) else {(): result}
+        for key, value in values.items():
+            yield self.name, self._labels(key), value
+
+
+class Histogram(_Metric):
+    """Cumulative-bucket histogram with ``_bucket``, ``_sum`` and ``_count`` series."""
+
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: Sequence[float] = LATENCY_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # key -> [per-bucket counts (+Inf last), sum, count]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        state = self._values.get(key)
+        if state is None:
+            state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        state[0][bisect_left(self.buckets, value)] += 1
+        state[1] += value
+        state[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> Iterable[Sample]:
+        for key, (counts, total, count) in self._values.items():
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                yield f"{self.name}_bucket", labels + (("le", _format_value(float(bound))),), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+def instrument_methods(cls, histogram: Histogram, exclude: Sequence[str] = ()):
+    """Time every public, non-generator method of ``cls`` into ``histogram{method=...}``."""
+    for name, attr in list(vars(cls).items()):
+        if name.startswith("_") or name in exclude:
+            continue
+        if not inspect.isfunction(attr) or inspect.isgeneratorfunction(attr):
+            continue
+
+        def wrap(func, method=name):
+            @functools.wraps(func)
+            def timed(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    histogram.observe(time.perf_counter() - started, method=method)
+            return timed
+
+        setattr(cls, name, wrap(attr))
+    return cls
+
+
+# ---------------------------------------------------------------------------
+# PacketBuddy metrics
+# ---------------------------------------------------------------------------
+
+PROCESS_START_TIME = Gauge("process_start_time_seconds", "Start time of the process since unix epoch in seconds.")
+PROCESS_START_TIME.set(time.time())
+
+MONITOR_LOOP_SECONDS = Histogram(
+    "pb_monitor_loop_seconds", "Time spent in one network poll iteration.",
+)
+MONITOR_MISSED_TICKS = Counter(
+    "pb_monitor_missed_ticks_total", "Poll ticks skipped because the loop woke up late.",
+)
+MONITOR_SAMPLES = Counter(
+    "pb_monitor_samples_total", "Poll samples with traffic buffered for writing.",
+)
+MONITOR_SKIPPED_SAMPLES = Counter(
+    "pb_monitor_skipped_samples_total", "Poll samples discarded.", ["reason"],
+)
+MONITOR_ANOMALIES = Counter(
+    "pb_monitor_anomalies_total", "Unusual traffic bursts flagged by the anomaly detector.", ["direction"],
+)
+MONITOR_BYTES = Counter(
+    "pb_monitor_bytes_total", "Bytes counted by the monitor since start.", ["direction"],
+)
+MONITOR_SPEED = Gauge(
+    "pb_monitor_speed_bytes_per_second", "Most recent measured throughput.", ["direction"],
+)
+MONITOR_PENDING_WRITES = Gauge(
+    "pb_monitor_pending_writes", "Samples buffered in memory awaiting the next batch flush.",
+)
+INTERFACE_BYTES = Gauge(
+    "pb_interface_bytes", "OS byte counters per network interface (read at scrape time).",
+    ["interface", "direction"],
+)
+
+BATCH_FLUSH_SECONDS = Histogram(
+    "pb_batch_flush_seconds", "Latency of flushing buffered samples to SQLite.",
+)
+BATCH_FLUSH_ROWS = Histogram(
+    "pb_batch_flush_rows", "Samples written per batch flush.", buckets=SIZE_BUCKETS,
+)
+
+STORAGE_QUERY_SECONDS = Histogram(
+    "pb_storage_query_seconds", "Latency of Storage methods (SQLite).", ["method"],
+)
+STORAGE_DATA_VERSION = Gauge(
+    "pb_storage_data_version", "Number of aggregate writes since start (drives ETags).",
+)
+
+SYNC_CYCLE_SECONDS = Histogram(
+    "pb_sync_cycle_seconds", "Duration of successful NeonDB sync cycles.",
+)
+SYNC_ROWS = Counter(
+    "pb_sync_rows_total", "Rows upserted to NeonDB.", ["table"],
+)
+SYNC_ERRORS = Counter(
+    "pb_sync_errors_total", "Failed sync cycles (after retries).",
+)
+
+CACHE_REQUESTS = Counter(
+    "pb_cache_requests_total", "Cache lookups by cache and result (hit/miss).", ["cache", "result"],
+)
+
+HUB_QUEUE_DEPTH = Gauge(
+    "pb_hub_queue_depth", "Agent batches waiting for the hub writer.",
+)
+
+EVENT_LOOP_LAG = Histogram(
+    "pb_event_loop_lag_seconds", "How late periodic event-loop wakeups fire.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+
+async def watch_event_loop_lag(interval: float = 0.5):
+    """Background task: record how late ``asyncio.sleep(interval)`` wakes up."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
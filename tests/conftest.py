@@ -0,0 +1,17 @@
+"""Shared fixtures. Config and the global storage live under HOME, so point it at a scratch directory first."""
+
+import os
+import tempfile
+
+_home = tempfile.mkdtemp(prefix="pb-tests-")
+os.environ["HOME"] = os.environ["USERPROFILE"] = _home
+
+import pytest
+
+from src.core.storage import Storage
+
+
+@pytest.fixture
+def store(tmp_path):
+    """An empty local database for this device."""
+    return Storage(db_path=tmp_path / "usage.db")
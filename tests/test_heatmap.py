@@ -0,0 +1,61 @@
+"""Weekly heatmap and hourly accumulators stay consistent with the daily totals."""
+
+import random
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from src.core.heatmap import build_heatmap
+
+
+def _write_samples(store, start: datetime, hours: int, seed: int = 1):
+    rng = random.Random(seed)
+    entries = []
+    for hour in range(hours):
+        for minute in rng.sample(range(60), 3):
+            entries.append({
+                "timestamp": start + timedelta(hours=hour, minutes=minute),
+                "bytes_sent": rng.randint(0, 10**6),
+                "bytes_received": rng.randint(0, 10**7),
+                "speed": rng.randint(0, 10**6),
+            })
+    # Several flushes, some touching hours an earlier flush already wrote
+    for i in range(0, len(entries), 50):
+        store.insert_usage_batch(entries[i:i + 50])
+    store.insert_usage(7, 11, start + timedelta(hours=5, minutes=30), speed=100)
+    return entries
+
+
+def _rows(store, sql: str) -> list:
+    with store.get_connection() as conn:
+        return [tuple(row) for row in conn.execute(sql).fetchall()]
+
+
+def test_hourly_and_heatmap_sum_to_daily_totals(store):
+    start = datetime(2026, 2, 26, 0, 0)  # spans a week and a month boundary
+    _write_samples(store, start, hours=24 * 10)
+
+    daily = {day: (sent, received) for day, sent, received in
+             _rows(store, "SELECT date, bytes_sent, bytes_received FROM daily_aggregates")}
+    hourly = defaultdict(lambda: [0, 0])
+    for hour, sent, received in _rows(store, "SELECT hour, bytes_sent, bytes_received FROM hourly_aggregates"):
+        hourly[str(hour)[:10]][0] += sent
+        hourly[str(hour)[:10]][1] += received
+    assert {day: tuple(values) for day, values in hourly.items()} == daily
+
+    heatmap_sent, heatmap_received = _rows(store, "SELECT SUM(bytes_sent), SUM(bytes_received) FROM weekly_heatmap")[0]
+    assert (heatmap_sent, heatmap_received) == tuple(map(sum, zip(*daily.values())))
+
+
+def test_heatmap_slots_match_hourly_rows(store):
+    start = datetime(2026, 3, 2, 0, 0)  # a Monday
+    _write_samples(store, start, hours=24 * 14, seed=2)
+
+    expected = [[0] * 24 for _ in range(7)]
+    for hour, sent, received in _rows(store, "SELECT hour, bytes_sent, bytes_received FROM hourly_aggregates"):
+        moment = datetime.fromisoformat(str(hour))
+        expected[moment.weekday()][moment.hour] += sent + received
+
+    body = build_heatmap(store, weeks=2, end=date(2026, 3, 15))
+    assert body["weeks_with_data"] == 2
+    assert body["matrix"] == expected
+    assert body["total"] == sum(map(sum, expected))
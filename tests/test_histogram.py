@@ -0,0 +1,80 @@
+"""Mergeable speed histograms: quantile error bound, merging, serialization and storage round-trip."""
+
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from src.core.histogram import SUB_BUCKETS, SpeedHistogram, bucket_bounds, bucket_index
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def _speeds(n: int, seed: int) -> list:
+    rng = random.Random(seed)
+    return [int(rng.lognormvariate(12, 2.5)) for _ in range(n)]
+
+
+def _exact(values: list, q: float) -> int:
+    ordered = sorted(values)
+    return ordered[max(1, min(len(ordered), int(q * len(ordered) + 0.999999))) - 1]
+
+
+def _assert_within_bucket(estimate: int, exact: int):
+    low, high = bucket_bounds(bucket_index(exact))
+    assert low <= estimate < high
+    assert abs(estimate - exact) <= max(exact / SUB_BUCKETS, 1)
+
+
+def test_bucket_bounds_contain_value():
+    for value in [0, 1, 15, 16, 17, 31, 32, 1000, 123_456_789, 2**40 + 3]:
+        low, high = bucket_bounds(bucket_index(value))
+        assert low <= value < high
+
+
+@pytest.mark.parametrize("q", QUANTILES)
+def test_quantile_within_bucket_error(q):
+    values = _speeds(20_000, seed=3)
+    histogram = SpeedHistogram()
+    for value in values:
+        histogram.record(value)
+    _assert_within_bucket(histogram.quantile(q), _exact(values, q))
+    assert histogram.max == max(values)
+    assert histogram.total == len(values)
+
+
+def test_merge_equals_single_histogram_and_survives_serialization():
+    parts = [_speeds(3_000, seed=s) for s in range(4)]
+    merged = SpeedHistogram()
+    for part in parts:
+        histogram = SpeedHistogram()
+        for value in part:
+            histogram.record(value)
+        merged.merge(SpeedHistogram.from_bytes(histogram.to_bytes()))
+
+    whole = SpeedHistogram()
+    for value in sum(parts, []):
+        whole.record(value)
+    assert merged.counts == whole.counts
+    assert merged.max == whole.max
+    for q in QUANTILES:
+        assert merged.quantile(q) == whole.quantile(q)
+
+
+def test_stored_hour_and_day_histograms_merge_over_a_range(store):
+    start = datetime(2026, 3, 2, 22, 0)
+    speeds = _speeds(600, seed=9)
+    entries = [{"timestamp": start + timedelta(minutes=5 * i), "bytes_sent": 1, "bytes_received": 1, "speed": speed}
+               for i, speed in enumerate(speeds)]
+    for i in range(0, len(entries), 100):
+        store.insert_usage_batch(entries[i:i + 100])
+
+    # Partial first day (hour rows), whole middle day (day row), partial last day (hour rows)
+    end = entries[-1]["timestamp"] + timedelta(hours=1)
+    histogram = store.get_speed_histogram(start, end.replace(minute=0))
+    # Idle polls (speed 0) are not recorded
+    inside = [e["speed"] for e in entries if e["timestamp"] < end.replace(minute=0) and e["speed"] > 0]
+    assert histogram.total == len(inside)
+    assert histogram.max == max(inside)
+    for q in QUANTILES:
+        _assert_within_bucket(histogram.quantile(q), _exact(inside, q))
@@ -0,0 +1,125 @@
+"""Hub ingest: (epoch, seq) idempotency, per-batch fallback and agent-side handling of rejections."""
+
+import asyncio
+import gzip
+import json
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from src.api import routes
+from src.core.hub import INT64_MAX, HubIngestor, IngestRejected
+from src.core.hub_sync import HubSync
+
+
+def _batch(device_id: str, seq: int, buckets: list, epoch: str = "e1") -> dict:
+    return {"device_id": device_id, "os_type": "Linux", "hostname": device_id, "epoch": epoch, "seq": seq,
+            "buckets": buckets}
+
+
+def _daily(store, device_id: str) -> dict:
+    with store.get_connection() as conn:
+        rows = conn.execute("SELECT date, bytes_sent, bytes_received FROM daily_aggregates WHERE device_id = ?",
+                            (device_id,)).fetchall()
+    return {row[0]: (row[1], row[2]) for row in rows}
+
+
+def test_duplicate_and_stale_seq_are_not_counted_again(store):
+    day = "2026-03-02"
+    assert store.apply_ingest_batches([_batch("a", 1, [[day, 100, 10, 5, 1]])]) == ["applied"]
+    assert store.apply_ingest_batches([_batch("a", 2, [[day, 200, 20, 5, 1]])]) == ["applied"]
+    # Retry of the last batch, an older one, and both inside a group with a new batch
+    assert store.apply_ingest_batches([_batch("a", 2, [[day, 200, 20, 5, 1]])]) == ["duplicate"]
+    assert store.apply_ingest_batches([_batch("a", 1, [[day, 100, 10, 5, 1]])]) == ["duplicate"]
+    assert store.apply_ingest_batches([
+        _batch("a", 3, [[day, 1, 1, 5, 1]]),
+        _batch("a", 3, [[day, 1, 1, 5, 1]]),
+    ]) == ["applied", "duplicate"]
+    assert _daily(store, "a") == {day: (301, 31)}
+
+    # A recreated agent database starts a new epoch: seq 1 counts again
+    assert store.apply_ingest_batches([_batch("a", 1, [[day, 5, 5, 5, 1]], epoch="e2")]) == ["applied"]
+    assert _daily(store, "a") == {day: (306, 36)}
+
+
+def test_bad_batch_in_group_gets_422_and_others_apply(store):
+    hub = HubIngestor(local_storage=store)
+    hub.enabled = True
+    app = FastAPI()
+    app.include_router(routes.router)
+    day = "2026-03-02"
+    bodies = [
+        _batch("good-1", 1, [[day, 100, 200, 5, 1]]),
+        # Each counter fits in int64 but the day's sum does not
+        _batch("bad", 1, [[day, INT64_MAX, 0, 5, 1], [day, 1, 0, 5, 1]]),
+        _batch("good-2", 1, [[day, 300, 400, 5, 1]]),
+    ]
+
+    async def run():
+        hub._queue = asyncio.Queue()
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://hub") as client:
+            posts = [asyncio.create_task(client.post("/api/ingest", content=gzip.compress(json.dumps(b).encode()),
+                                                     headers={"Content-Encoding": "gzip"}))
+                     for b in bodies]
+            for _ in range(500):
+                if hub._queue.qsize() == len(bodies) or any(post.done() for post in posts):
+                    break
+                await asyncio.sleep(0.01)
+            assert hub._queue.qsize() == len(bodies)
+            # All three are committed as one group, as the writer task would
+            group = [hub._queue.get_nowait() for _ in bodies]
+            await hub._commit(group)
+            return await asyncio.gather(*posts)
+
+    original = routes.hub
+    routes.hub = hub
+    try:
+        responses = asyncio.run(run())
+    finally:
+        routes.hub = original
+
+    assert [r.status_code for r in responses] == [200, 422, 200]
+    assert _daily(store, "good-1") == {day: (100, 200)}
+    assert _daily(store, "good-2") == {day: (300, 400)}
+    assert _daily(store, "bad") == {}
+    assert hub.stats["applied"] == 2
+    assert hub.stats["rejected_invalid"] == 1
+
+
+def test_ingestor_rejects_single_bad_batch(store):
+    hub = HubIngestor(local_storage=store)
+    day = "2026-03-02"
+
+    async def run():
+        future = asyncio.get_running_loop().create_future()
+        await hub._commit([(_batch("bad", 1, [[day, INT64_MAX, 0, 5, 1], [day, 1, 0, 5, 1]]), future)])
+        return future
+
+    with pytest.raises(IngestRejected):
+        asyncio.run(run()).result()
+
+
+def test_agent_skips_permanently_rejected_batch(store):
+    for days_ago in range(3):
+        store.insert_usage(100, 50, datetime.now() - timedelta(days=days_ago))
+    agent = HubSync(hub_url="http://hub", local_storage=store)
+    agent.batch_size = 1
+    sent = []
+    responses = iter([(401, {}, None), (422, {}, None), (200, {"status": "applied"}, None), (500, {}, None)])
+
+    def post(body):
+        sent.append(json.loads(gzip.decompress(body))["seq"])
+        return next(responses)
+
+    agent._post = post
+    assert asyncio.run(agent.push()) == 0  # 401: same batch next time
+    assert asyncio.run(agent.push()) == 1  # 422 skips seq 1, seq 2 is acknowledged, 500 keeps seq 3 pending
+    assert sent == [1, 1, 2, 3]
+    assert store.get_state("hub_seq")["value_int"] == 2
+    assert store.get_state("hub_pending")["value_text"] == "3"
+    dropped = json.loads(store.get_state("hub_last_dropped")["value_text"])
+    assert (dropped["seq"], dropped["status"], dropped["bytes_sent"], dropped["bytes_received"]) == (1, 422, 100, 50)
+    assert agent.stats["dropped"] == 1
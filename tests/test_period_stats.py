@@ -0,0 +1,54 @@
+"""Incremental ``period_stats`` upserts agree with a full ``_rebuild_period_stats``."""
+
+import random
+from datetime import datetime, timedelta
+
+
+def _period_rows(store) -> list:
+    with store.get_connection() as conn:
+        return [tuple(row) for row in conn.execute("SELECT * FROM period_stats ORDER BY scope, period").fetchall()]
+
+
+def _rebuild(store) -> list:
+    with store.get_connection() as conn:
+        store._rebuild_period_stats(conn.cursor())
+    return _period_rows(store)
+
+
+def test_incremental_equals_rebuild(store):
+    rng = random.Random(5)
+    start = datetime(2025, 12, 20, 8, 0)  # crosses a month and a year boundary
+    for flush in range(30):
+        entries = [{
+            "timestamp": start + timedelta(hours=rng.randint(0, 24 * 25), minutes=rng.randint(0, 59)),
+            "bytes_sent": rng.randint(0, 5 * 10**8),
+            "bytes_received": rng.randint(0, 5 * 10**9),
+            "speed": rng.randint(1, 10**8),
+        } for _ in range(20)]
+        store.insert_usage_batch(entries)
+    store.insert_usage(123, 456, datetime(2026, 1, 2, 12, 0), speed=10**9)
+
+    # Hub agents share days with this device and with each other
+    for seq, device_id in enumerate(["agent-a", "agent-b", "agent-a"], start=1):
+        day = (start + timedelta(days=rng.randint(0, 25))).date().isoformat()
+        status = store.apply_ingest_batches([{
+            "device_id": device_id, "os_type": "Linux", "hostname": device_id, "epoch": "e", "seq": seq,
+            "buckets": [[day, rng.randint(1, 10**10), rng.randint(1, 10**10), rng.randint(1, 10**9), 10]],
+        }])
+        assert status == ["applied"]
+
+    incremental = _period_rows(store)
+    scopes = {row[0] for row in incremental}
+    assert {"", store.device_id, "agent-a", "agent-b"} <= scopes
+    assert incremental == _rebuild(store)
+
+
+def test_growing_day_moves_peak_day(store):
+    store.insert_usage(100, 100, datetime(2026, 4, 1, 9, 0))
+    store.insert_usage(150, 100, datetime(2026, 4, 2, 9, 0))
+    store.insert_usage(200, 0, datetime(2026, 4, 1, 18, 0))  # April 1 overtakes April 2
+
+    year = store.get_period_stats(months=False, first="2026", last="2026")[0]
+    assert (year["peak_day"], year["peak_day_bytes"]) == ("2026-04-01", 400)
+    assert year["days_tracked"] == 2
+    assert _period_rows(store) == _rebuild(store)
@@ -0,0 +1,139 @@
+"""NeonSync round-trips against a throwaway PostgreSQL (``benchmarks.pg_harness``).
+
+Skipped when asyncpg or the PostgreSQL server binaries are not available.
+"""
+
+import asyncio
+import sqlite3
+import uuid
+from contextlib import asynccontextmanager
+
+import pytest
+
+asyncpg = pytest.importorskip("asyncpg")
+
+from benchmarks.pg_harness import LocalPostgres, PostgresUnavailable, reset_remote, seed_device_storage
+from src.core.remote_schema import LEGACY_TABLES
+from src.core.sync import NeonSync
+
+DAYS = 40
+
+
+@pytest.fixture(scope="module")
+def pg():
+    try:
+        server = LocalPostgres().start()
+    except PostgresUnavailable as e:
+        pytest.skip(f"no local PostgreSQL: {e}")
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def pg_url(pg):
+    async def reset():
+        conn = await asyncpg.connect(pg.url)
+        try:
+            await reset_remote(conn)
+        finally:
+            await conn.close()
+
+    asyncio.run(reset())
+    return pg.url
+
+
+@pytest.fixture
+def store(tmp_path):
+    return seed_device_storage(tmp_path / "device.db", str(uuid.uuid4()), days=DAYS, seed=7)
+
+
+@asynccontextmanager
+async def _connected(url: str, store):
+    client = NeonSync(db_url=url, local_storage=store)
+    await client.connect()
+    try:
+        yield client
+    finally:
+        if client.pool:
+            await client.pool.close()
+
+
+async def _sync(url: str, store) -> NeonSync:
+    async with _connected(url, store) as client:
+        await client._sync_data()
+    return client
+
+
+async def _fetch(url: str, sql: str, *args) -> list:
+    conn = await asyncpg.connect(url)
+    try:
+        return [dict(row) for row in await conn.fetch(sql, *args)]
+    finally:
+        await conn.close()
+
+
+def _local_months(store) -> dict:
+    months = {}
+    for d in store.get_all_daily_aggregates():
+        entry = months.setdefault(d["date"][:7], {"peak_speed": 0, "samples": 0})
+        entry["peak_speed"] = max(entry["peak_speed"], d["peak_speed"])
+        entry["samples"] += d["samples"]
+    for m in store.get_all_monthly_aggregates():
+        months[m["month"]].update(bytes_sent=m["bytes_sent"], bytes_received=m["bytes_received"])
+    return months
+
+
+def test_sync_round_trip(pg_url, store):
+    client = asyncio.run(_sync(pg_url, store))
+
+    daily = asyncio.run(_fetch(pg_url, """
+        SELECT to_char(day, 'YYYY-MM-DD') AS date, bytes_sent, bytes_received, peak_speed, samples
+        FROM daily_usage WHERE device_key = $1 ORDER BY day
+    """, client.device_key))
+    local_daily = [{k: d[k] for k in ("date", "bytes_sent", "bytes_received", "peak_speed", "samples")}
+                   for d in store.get_all_daily_aggregates()]
+    assert daily == local_daily
+
+    monthly = asyncio.run(_fetch(pg_url, """
+        SELECT to_char(month, 'YYYY-MM') AS month, bytes_sent, bytes_received, peak_speed, samples
+        FROM monthly_usage WHERE device_key = $1
+    """, client.device_key))
+    assert {m.pop("month"): m for m in monthly} == _local_months(store)
+
+    yearly = asyncio.run(_fetch(pg_url, """
+        SELECT SUM(s) AS sent FROM yearly_usage, unnest(monthly_sent) AS s WHERE device_key = $1
+    """, client.device_key))
+    assert yearly[0]["sent"] == sum(d["bytes_sent"] for d in local_daily)
+
+
+def test_resync_keeps_peaks_of_pruned_month(pg_url, store):
+    client = asyncio.run(_sync(pg_url, store))
+    before = _local_months(store)
+    oldest = min(before)
+
+    # Local retention prunes the month's daily rows; the monthly total stays
+    with sqlite3.connect(store.db_path) as conn:
+        conn.execute("DELETE FROM daily_aggregates WHERE substr(date, 1, 7) = ?", (oldest,))
+    asyncio.run(_sync(pg_url, store))
+
+    row = asyncio.run(_fetch(pg_url, """
+        SELECT bytes_sent, peak_speed, samples FROM monthly_usage
+        WHERE device_key = $1 AND to_char(month, 'YYYY-MM') = $2
+    """, client.device_key, oldest))[0]
+    assert row == {k: before[oldest][k] for k in ("bytes_sent", "peak_speed", "samples")}
+
+
+def test_migration_keeps_legacy_tables(pg_url, store):
+    legacy_sql = "SELECT tablename FROM pg_tables WHERE schemaname = 'public' AND tablename = ANY($1::TEXT[])"
+    # v1 never created usage_logs; it only exists on pre-versioning databases
+    expected = ["daily_aggregates", "monthly_aggregates"]
+
+    async def drop_legacy():
+        async with _connected(pg_url, store) as client:
+            kept = await _fetch(pg_url, legacy_sql, list(LEGACY_TABLES))
+            return kept, await client.drop_legacy_tables()
+
+    kept, dropped = asyncio.run(drop_legacy())
+    assert sorted(row["tablename"] for row in kept) == expected
+    assert sorted(dropped) == expected
+    assert asyncio.run(_fetch(pg_url, legacy_sql, list(LEGACY_TABLES))) == []